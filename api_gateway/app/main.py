@@ -2,12 +2,14 @@
 
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
+import asyncio
 import logging
 import uvicorn
 
 from .config import settings
-from .routes import orchestrator, health
+from .routes import orchestrator, health, events
+from .services.scan_events import scan_event_broker
 from .middleware.logging import LoggingMiddleware
 
 # Configure logging
@@ -24,7 +26,9 @@ app = FastAPI(
     description="API Gateway for VaPtER Vulnerability Assessment Platform",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    # orjson per tutte le risposte JSON del gateway
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -41,14 +45,26 @@ app.add_middleware(LoggingMiddleware)
 
 # Include routes
 app.include_router(health.router, prefix="/health", tags=["health"])
+app.include_router(events.router, prefix="/api/events", tags=["events"])
 app.include_router(orchestrator.router, prefix="/api/orchestrator", tags=["orchestrator"])
 
+
+@app.on_event("startup")
+async def start_scan_events():
+    """Start consuming the live scan events from RabbitMQ"""
+    scan_event_broker.start(asyncio.get_running_loop())
+
+
+@app.on_event("shutdown")
+async def stop_scan_events():
+    scan_event_broker.stop()
+
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Global exception handler for unexpected errors"""
     logger.error(f"Unexpected error in {request.method} {request.url}: {str(exc)}")
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={
             "error": "Internal server error",
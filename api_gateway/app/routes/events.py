@@ -0,0 +1,138 @@
+import asyncio
+import json
+import logging
+from typing import Optional, Set
+
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+
+from ..config import settings
+from ..services.scan_events import scan_event_broker
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+def _parse_scan_ids(scan_id: Optional[str]) -> Optional[Set[int]]:
+    """Parse the comma separated scan_id filter"""
+    if not scan_id:
+        return None
+    try:
+        return {int(value) for value in scan_id.split(",") if value.strip()}
+    except ValueError:
+        raise ValueError("scan_id must be a comma separated list of integers")
+
+
+def _sse_frame(event: str, data, event_id: Optional[str] = None) -> str:
+    frame = f"id: {event_id}\n" if event_id else ""
+    return frame + f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.get("/stream")
+async def stream_scan_events(
+    request: Request,
+    scan_id: Optional[str] = Query(None, description="Comma separated scan ids"),
+    customer_id: Optional[str] = Query(None),
+    last_event_id: Optional[str] = Query(None)
+):
+    """
+    Server-Sent Events stream of scan status changes and plugin progress.
+
+    Resumes after the Last-Event-ID header (sent by EventSource on reconnect)
+    or the last_event_id parameter; an 'event: ready' frame with
+    {"resync": true} tells the client that the missed events are gone and it
+    has to reload the scans.
+    """
+    try:
+        scan_ids = _parse_scan_ids(scan_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    resume_from = request.headers.get("last-event-id") or last_event_id
+    subscription, replay, resync = scan_event_broker.subscribe(scan_ids, customer_id, resume_from)
+
+    async def event_stream():
+        try:
+            yield f"retry: {settings.SCAN_EVENTS_RETRY_MS}\n\n"
+            # Senza replay l'id del ready fa da punto di ripresa per il client
+            yield _sse_frame("ready", {"resync": resync}, None if replay else scan_event_broker.head_id)
+            for event_id, event in replay:
+                yield _sse_frame(event["type"], event, event_id)
+
+            while not subscription.exhausted:
+                if await request.is_disconnected():
+                    break
+                item = await subscription.next(settings.SCAN_EVENTS_KEEPALIVE)
+                if item is None:
+                    yield ": keepalive\n\n"
+                    continue
+                event_id, event = item
+                yield _sse_frame(event["type"], event, event_id)
+        finally:
+            scan_event_broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # nginx non deve bufferizzare lo stream
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
+@router.websocket("/ws")
+async def scan_events_websocket(
+    websocket: WebSocket,
+    scan_id: Optional[str] = None,
+    customer_id: Optional[str] = None,
+    last_event_id: Optional[str] = None
+):
+    """
+    WebSocket variant of /stream: same filters, each event is sent as
+    {"id": ..., "event": ..., "data": ...}
+    """
+    try:
+        scan_ids = _parse_scan_ids(scan_id)
+    except ValueError:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    subscription, replay, resync = scan_event_broker.subscribe(scan_ids, customer_id, last_event_id)
+
+    async def wait_for_disconnect():
+        # Il client non invia nulla: receive() serve solo ad accorgersi della chiusura
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+
+    receiver = asyncio.create_task(wait_for_disconnect())
+    try:
+        await websocket.send_json({
+            "id": None if replay else scan_event_broker.head_id,
+            "event": "ready",
+            "data": {"resync": resync}
+        })
+        for event_id, event in replay:
+            await websocket.send_json({"id": event_id, "event": event["type"], "data": event})
+
+        while not subscription.exhausted and not receiver.done():
+            item = await subscription.next(settings.SCAN_EVENTS_KEEPALIVE)
+            if item is None:
+                continue
+            event_id, event = item
+            await websocket.send_json({"id": event_id, "event": event["type"], "data": event})
+
+        if not receiver.done():
+            await websocket.close()
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    except Exception as e:
+        logger.error(f"Error in scan events websocket: {str(e)}")
+    finally:
+        receiver.cancel()
+        scan_event_broker.unsubscribe(subscription)
@@ -1,6 +1,7 @@
 import time
 from fastapi import APIRouter, HTTPException
 from ..services.backend_client import backend_client
+from ..services.scan_events import scan_event_broker
 from ..config import settings
 
 router = APIRouter()
@@ -38,6 +39,11 @@ async def detailed_health_check():
                 "status": "healthy" if backend_healthy else "unhealthy",
                 "url": settings.BACKEND_URL,
                 "response_time_ms": round(backend_check_time * 1000, 2)
+            },
+            # Non bloccante: senza eventi live il frontend torna al polling
+            "scan_events": {
+                "status": "healthy" if scan_event_broker.connected else "unhealthy",
+                "subscribers": scan_event_broker.subscribers
             }
         }
     }
@@ -1,6 +1,7 @@
 import logging
 from fastapi import APIRouter, Request, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
 from typing import Dict, Any, Optional
 from ..services.backend_client import backend_client
 
@@ -8,16 +9,23 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
-async def _proxy_to_backend(request: Request, path: str = "") -> JSONResponse:
+# Header ricalcolati dalla risposta del gateway
+HOP_BY_HOP_HEADERS = {'content-length', 'content-encoding', 'transfer-encoding', 'connection'}
+
+
+async def _proxy_to_backend(request: Request, path: str = "") -> Response:
     """
     Generic proxy function to forward requests to Django backend
     
+    JSON bodies are forwarded as raw bytes in both directions: no decode and
+    re-encode of large payloads (parsed nmap results, GCE summaries) in the gateway.
+    
     Args:
         request: FastAPI request object
         path: Additional path to append to the API path
     
     Returns:
-        JSONResponse: Response from backend
+        Response: Response from backend
     """
     try:
         # Construct full path
@@ -26,13 +34,10 @@ async def _proxy_to_backend(request: Request, path: str = "") -> JSONResponse:
         # Extract query parameters
         params = dict(request.query_params) if request.query_params else None
         
-        # Extract JSON body for POST/PUT/PATCH requests
-        json_data = None
+        # Body of POST/PUT/PATCH requests (JSON or binary chunks), forwarded as it is
+        raw_body = None
         if request.method in ["POST", "PUT", "PATCH"]:
-            try:
-                json_data = await request.json()
-            except:
-                json_data = None
+            raw_body = await request.body()
         
         # Extract relevant headers (exclude some FastAPI/uvicorn specific headers)
         headers = {}
@@ -45,21 +50,28 @@ async def _proxy_to_backend(request: Request, path: str = "") -> JSONResponse:
             method=request.method,
             path=full_path,
             params=params,
-            json_data=json_data,
+            content=raw_body,
             headers=headers
         )
         
-        # Get response content
-        try:
-            content = response.json()
-        except:
-            content = {"detail": "Invalid JSON response from backend"}
+        response_headers = {
+            name: value for name, value in response.headers.items()
+            if name.lower() not in HOP_BY_HOP_HEADERS
+        }
         
-        # Return response with same status code
-        return JSONResponse(
+        # JSON responses are passed through unchanged, with the same status code
+        if response.headers.get("content-type", "").startswith("application/json") or not response.content:
+            return Response(
+                content=response.content,
+                status_code=response.status_code,
+                headers=response_headers
+            )
+        
+        response_headers.pop("content-type", None)
+        return ORJSONResponse(
             status_code=response.status_code,
-            content=content,
-            headers=dict(response.headers)
+            content={"detail": "Invalid JSON response from backend"},
+            headers=response_headers
         )
     
     except HTTPException:
@@ -70,6 +82,30 @@ async def _proxy_to_backend(request: Request, path: str = "") -> JSONResponse:
         raise HTTPException(status_code=500, detail="Internal gateway error")
 
 
+async def _stream_to_backend(request: Request, path: str) -> StreamingResponse:
+    """
+    Proxy for the bulk endpoints: the body (JSON or CSV) is forwarded as it is
+    and the NDJSON results are streamed back as the backend produces them
+    """
+    headers = {
+        name: value for name, value in request.headers.items()
+        if name.lower() not in ['host', 'content-length', 'connection']
+    }
+    response = await backend_client.stream_request(
+        method=request.method,
+        path=f"/api/orchestrator/{path}",
+        params=dict(request.query_params) if request.query_params else None,
+        headers=headers,
+        content=await request.body()
+    )
+    return StreamingResponse(
+        response.aiter_raw(),
+        status_code=response.status_code,
+        media_type=response.headers.get("content-type"),
+        background=BackgroundTask(response.aclose)
+    )
+
+
 # Root orchestrator endpoint
 @router.api_route("/", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
 async def orchestrator_root(request: Request):
@@ -141,6 +177,12 @@ async def targets_list(request: Request):
     return await _proxy_to_backend(request, "targets/")
 
 
+@router.api_route("/targets/bulk/", methods=["POST"])
+async def targets_bulk(request: Request):
+    """Proxy bulk target import (JSON or CSV, streamed NDJSON results)"""
+    return await _stream_to_backend(request, "targets/bulk/")
+
+
 @router.api_route("/targets/{target_id}/", methods=["GET", "PUT", "PATCH", "DELETE"])
 async def targets_detail(request: Request, target_id: int):
     """Proxy targets detail endpoints"""
@@ -166,6 +208,12 @@ async def scans_list(request: Request):
     return await _proxy_to_backend(request, "scans/")
 
 
+@router.api_route("/scans/bulk/", methods=["POST"])
+async def scans_bulk(request: Request):
+    """Proxy bulk scan launch (streamed NDJSON results)"""
+    return await _stream_to_backend(request, "scans/bulk/")
+
+
 @router.api_route("/scans/{scan_id}/", methods=["GET", "PUT", "PATCH", "DELETE"])
 async def scans_detail(request: Request, scan_id: int):
     """Proxy scans detail endpoints"""
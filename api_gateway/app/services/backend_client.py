@@ -30,7 +30,8 @@ class BackendClient:
         path: str,
         params: Optional[Dict[str, Any]] = None,
         json_data: Optional[Dict[str, Any]] = None,
-        headers: Optional[Dict[str, str]] = None
+        headers: Optional[Dict[str, str]] = None,
+        content: Optional[bytes] = None
     ) -> httpx.Response:
         """
         Proxy a request to the backend Django service
@@ -41,6 +42,7 @@ class BackendClient:
             params: Query parameters
             json_data: JSON data for request body
             headers: Additional headers
+            content: Raw request body, sent instead of json_data
         
         Returns:
             httpx.Response: Response from backend
@@ -63,6 +65,7 @@ class BackendClient:
                 url=path,
                 params=params,
                 json=json_data,
+                content=content,
                 headers=request_headers
             )
             
@@ -90,6 +93,52 @@ class BackendClient:
                 detail="Backend proxy error"
             )
     
+    async def stream_request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        content: Optional[bytes] = None
+    ) -> httpx.Response:
+        """
+        Proxy a request to the backend without buffering the response body
+        
+        The caller reads the body with aiter_raw() and must aclose() the response.
+        
+        Raises:
+            HTTPException: If backend is unreachable
+        """
+        try:
+            logger.info(f"Proxying {method} {path} to backend (streaming)")
+            request = self.client.build_request(
+                method=method,
+                url=path,
+                params=params,
+                content=content,
+                headers=headers or {}
+            )
+            return await self.client.send(request, stream=True)
+            
+        except httpx.TimeoutException:
+            logger.error(f"Timeout while proxying {method} {path} to backend")
+            raise HTTPException(
+                status_code=504,
+                detail="Backend service timeout"
+            )
+        except httpx.ConnectError:
+            logger.error(f"Connection error while proxying {method} {path} to backend")
+            raise HTTPException(
+                status_code=503,
+                detail="Backend service unavailable"
+            )
+        except Exception as e:
+            logger.error(f"Unexpected error while proxying {method} {path}: {str(e)}")
+            raise HTTPException(
+                status_code=502,
+                detail="Backend proxy error"
+            )
+    
     async def get(self, path: str, params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
         """Proxy GET request"""
         return await self.proxy_request("GET", path, params=params, headers=headers)
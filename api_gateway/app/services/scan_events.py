@@ -0,0 +1,170 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import pika
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """Events of one client (SSE or WebSocket), filtered by scan and/or customer"""
+
+    def __init__(self, scan_ids: Optional[Set[int]] = None, customer_id: Optional[str] = None):
+        self.scan_ids = scan_ids
+        self.customer_id = customer_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.SCAN_EVENTS_CLIENT_QUEUE)
+        self.overflowed = False
+
+    def matches(self, event: Dict[str, Any]) -> bool:
+        if self.scan_ids and event.get("scan_id") not in self.scan_ids:
+            return False
+        if self.customer_id and event.get("customer_id") != self.customer_id:
+            return False
+        return True
+
+    def push(self, event_id: str, event: Dict[str, Any]):
+        try:
+            self.queue.put_nowait((event_id, event))
+        except asyncio.QueueFull:
+            # Client troppo lento: lo stream viene chiuso e il client riprende dall'ultimo id ricevuto
+            self.overflowed = True
+
+    @property
+    def exhausted(self) -> bool:
+        """True once an overflowed subscription has delivered what it queued"""
+        return self.overflowed and self.queue.empty()
+
+    async def next(self, timeout: float) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Next (event_id, event), None after timeout seconds without events"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class ScanEventBroker:
+    """
+    Live scan events for the SSE/WebSocket clients.
+
+    The backend publishes status changes and plugin progress on the fanout
+    exchange RABBITMQ_SCAN_EVENTS_EXCHANGE; every gateway process consumes them
+    on its own exclusive queue (pika in a thread, like the plugins' control
+    listener) and fans them out to its subscriptions. The last
+    SCAN_EVENTS_BUFFER_SIZE events are kept to replay them to the clients
+    reconnecting with Last-Event-ID.
+    """
+
+    def __init__(self):
+        # Event id "<epoch>-<sequenza>": l'epoch cambia a ogni avvio, un id di un'altra epoch non è riprendibile
+        self.epoch = uuid.uuid4().hex[:8]
+        self._seq = 0
+        self._buffer: deque = deque(maxlen=settings.SCAN_EVENTS_BUFFER_SIZE)
+        self._subscriptions: Set[Subscription] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping = threading.Event()
+        self.connected = False
+
+    @property
+    def head_id(self) -> str:
+        """Id of the last event received"""
+        return f"{self.epoch}-{self._seq}"
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscriptions)
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """Start consuming the events in a background thread"""
+        self._loop = loop
+        thread = threading.Thread(target=self._consume, name="scan-events", daemon=True)
+        thread.start()
+
+    def stop(self):
+        self._stopping.set()
+
+    def _consume(self):
+        parameters = pika.URLParameters(settings.RABBITMQ_URL)
+        exchange = settings.RABBITMQ_SCAN_EVENTS_EXCHANGE
+        while not self._stopping.is_set():
+            try:
+                connection = pika.BlockingConnection(parameters)
+                channel = connection.channel()
+                channel.exchange_declare(exchange=exchange, exchange_type="fanout", durable=True)
+                queue = channel.queue_declare(queue="", exclusive=True, auto_delete=True).method.queue
+                channel.queue_bind(queue=queue, exchange=exchange)
+                channel.basic_consume(queue=queue, on_message_callback=self._on_message, auto_ack=True)
+                self.connected = True
+                logger.info(f"Listening for scan events on exchange {exchange}")
+
+                while not self._stopping.is_set():
+                    connection.process_data_events(time_limit=1)
+                connection.close()
+            except Exception as e:
+                logger.error(f"Scan events connection lost: {e}")
+                time.sleep(5)
+            finally:
+                self.connected = False
+
+    def _on_message(self, channel, method, properties, body):
+        try:
+            event = json.loads(body.decode("utf-8"))
+        except (ValueError, UnicodeDecodeError):
+            logger.warning(f"Ignoring malformed scan event: {body[:200]!r}")
+            return
+        # Il fan out gira nel loop asyncio, l'unico thread che tocca buffer e sottoscrizioni
+        self._loop.call_soon_threadsafe(self._dispatch, event)
+
+    def _dispatch(self, event: Dict[str, Any]):
+        self._seq += 1
+        event_id = self.head_id
+        self._buffer.append((self._seq, event_id, event))
+        for subscription in self._subscriptions:
+            if subscription.matches(event):
+                subscription.push(event_id, event)
+
+    def subscribe(
+        self,
+        scan_ids: Optional[Set[int]] = None,
+        customer_id: Optional[str] = None,
+        last_event_id: Optional[str] = None
+    ) -> Tuple[Subscription, List[Tuple[str, Dict[str, Any]]], bool]:
+        """
+        Subscribe a client, resuming after last_event_id if given
+
+        Returns:
+            (subscription, replay, resync): replay holds the buffered events
+            after last_event_id, resync is True when they can't be replayed
+            (id of a previous gateway process or older than the buffer) and
+            the client has to reload its state
+        """
+        subscription = Subscription(scan_ids, customer_id)
+        replay, resync = [], False
+
+        if last_event_id:
+            epoch, _, seq = last_event_id.partition("-")
+            oldest = self._buffer[0][0] if self._buffer else self._seq + 1
+            if epoch != self.epoch or not seq.isdigit() or not oldest - 1 <= int(seq) <= self._seq:
+                resync = True
+            else:
+                replay = [
+                    (event_id, event) for event_seq, event_id, event in self._buffer
+                    if event_seq > int(seq) and subscription.matches(event)
+                ]
+
+        self._subscriptions.add(subscription)
+        return subscription, replay, resync
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscriptions.discard(subscription)
+
+
+# Global broker instance, started with the application
+scan_event_broker = ScanEventBroker()
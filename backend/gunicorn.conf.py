@@ -0,0 +1,44 @@
+# backend/gunicorn.conf.py
+
+import multiprocessing
+import os
+
+# Production serving of the backend: python manage.py runserver is a single
+# process meant for development. Every value can be overridden from the env.
+#
+# BACKEND_SERVER_MODE=wsgi (default): sync DRF views on gthread workers,
+#   WORKERS processes x THREADS threads, one DB connection per thread.
+# BACKEND_SERVER_MODE=asgi: vapter_backend.asgi on uvicorn workers. The DRF
+#   views are sync and Django runs them on one thread per worker: raise the
+#   workers, and keep CONN_MAX_AGE=0 (connections are not reused under ASGI).
+
+mode = os.environ.get('BACKEND_SERVER_MODE', 'wsgi').lower()
+if mode not in ('wsgi', 'asgi'):
+    raise ValueError(f"BACKEND_SERVER_MODE must be wsgi or asgi, not '{mode}'")
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+
+if mode == 'asgi':
+    wsgi_app = 'vapter_backend.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'vapter_backend.wsgi:application'
+    worker_class = 'gthread'
+    threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Upload dei report GCE a chunk e liste grandi: timeout generoso
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Worker riciclati periodicamente (con jitter, non tutti insieme) contro la crescita della memoria
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 200))
+
+# Sviluppo con il sorgente montato: riavvia i worker quando cambia il codice
+reload = os.environ.get('GUNICORN_RELOAD', 'false').lower() == 'true'
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
@@ -1,16 +1,74 @@
 # backend/orchestrator_api/admin.py
 
 from django.contrib import admin
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.utils.html import format_html
 from django.urls import reverse
-from django.utils.safestring import mark_safe
 import json
 #from django.utils.html import format_html, mark_safe
 from .models import (
     Customer, PortList, ScanType, Target, Scan, ScanDetail, 
-    FingerprintDetail, GceResult
+    ScanShard, FingerprintDetail, GceResult, Vulnerability, OsMatch, ScriptResult,
+    ServiceInventory, ScanDiff, JobLease, ScanSchedule, ScanEvent
 )
 
+# Blob della scansione: mai caricati nelle changelist
+SCAN_BLOB_FIELDS = (
+    'parsed_nmap_results', 'parsed_finger_results', 'parsed_gce_results',
+    'parsed_web_results', 'parsed_vuln_results'
+)
+JSON_PREVIEW_LIMIT = 20000
+
+
+def related_fields(prefix, fields):
+    """Field names as seen through a relation, e.g. for defer('scan__...')"""
+    return [f'{prefix}__{field}' for field in fields]
+
+
+def count_subquery(queryset, field):
+    """Correlated COUNT of the queryset rows whose field points at the outer row"""
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by().values(field)
+        .annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def json_preview(value, limit=JSON_PREVIEW_LIMIT):
+    """Pretty-printed JSON, encoded only up to limit characters"""
+    if not value:
+        return '-'
+    chunks, size, truncated = [], 0, False
+    for chunk in json.JSONEncoder(indent=2).iterencode(value):
+        chunks.append(chunk)
+        size += len(chunk)
+        if size > limit:
+            truncated = True
+            break
+    text = ''.join(chunks)[:limit]
+    if truncated:
+        text += f'\n... (truncated at {limit} characters)'
+    return format_html(
+        '<pre style="white-space: pre-wrap; max-height: 300px; overflow-y: auto;">{}</pre>', text
+    )
+
+
+class ChangelistDeferMixin:
+    """Defer heavy fields on the changelist; the change view still loads the full row"""
+    
+    changelist_defer = ()
+    
+    def is_changelist(self, request):
+        opts = self.model._meta
+        match = getattr(request, 'resolver_match', None)
+        return match is not None and match.url_name == f'{opts.app_label}_{opts.model_name}_changelist'
+    
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if self.changelist_defer and self.is_changelist(request):
+            queryset = queryset.defer(*self.changelist_defer)
+        return queryset
+
 @admin.register(Customer)
 class CustomerAdmin(admin.ModelAdmin):
     """Admin configuration for Customer model"""
@@ -28,7 +86,7 @@ class CustomerAdmin(admin.ModelAdmin):
             'fields': ('contact_person', 'phone', 'address')
         }),
         ('Additional', {
-            'fields': ('notes',)
+            'fields': ('notes', 'retention_days')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at', 'deleted_at'),
@@ -36,23 +94,31 @@ class CustomerAdmin(admin.ModelAdmin):
         })
     )
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            targets_total=count_subquery(Target.objects.all(), 'customer'),
+            scans_total=count_subquery(Scan.objects.all(), 'target__customer'),
+        )
+    
     def targets_count(self, obj):
         """Display number of targets"""
-        count = obj.targets.count()
+        count = obj.targets_total
         if count > 0:
             url = reverse('admin:orchestrator_api_target_changelist') + f'?customer__id__exact={obj.id}'
             return format_html('<a href="{}">{}</a>', url, count)
         return count
     targets_count.short_description = 'Targets'
+    targets_count.admin_order_field = 'targets_total'
     
     def scans_count(self, obj):
         """Display number of scans"""
-        count = Scan.objects.filter(target__customer=obj).count()
+        count = obj.scans_total
         if count > 0:
             url = reverse('admin:orchestrator_api_scan_changelist') + f'?target__customer__id__exact={obj.id}'
             return format_html('<a href="{}">{}</a>', url, count)
         return count
     scans_count.short_description = 'Scans'
+    scans_count.admin_order_field = 'scans_total'
 
 
 @admin.register(PortList)
@@ -62,7 +128,7 @@ class PortListAdmin(admin.ModelAdmin):
     list_display = ['name', 'tcp_ports_preview', 'udp_ports_preview', 'scan_types_count', 'created_at']
     list_filter = ['created_at', 'updated_at']
     search_fields = ['name', 'description']
-    readonly_fields = ['created_at', 'updated_at', 'deleted_at']
+    readonly_fields = ['created_at', 'updated_at', 'deleted_at', 'tcp_port_count', 'udp_port_count', 'nmap_port_spec']
     
     fieldsets = (
         ('Basic Information', {
@@ -72,6 +138,10 @@ class PortListAdmin(admin.ModelAdmin):
             'fields': ('tcp_ports', 'udp_ports'),
             'description': 'Enter ports as comma-separated values (e.g., "22,80,443") or ranges (e.g., "1-1000")'
         }),
+        ('Compiled Ports (Read Only)', {
+            'fields': ('tcp_port_count', 'udp_port_count', 'nmap_port_spec'),
+            'classes': ('collapse',)
+        }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at', 'deleted_at'),
             'classes': ('collapse',)
@@ -80,32 +150,32 @@ class PortListAdmin(admin.ModelAdmin):
     
     def tcp_ports_preview(self, obj):
         """Display TCP ports preview"""
-        if obj.tcp_ports:
-            preview = obj.tcp_ports[:50]
-            if len(obj.tcp_ports) > 50:
-                preview += '...'
-            return preview
+        if obj.tcp_port_count:
+            return f"{obj.tcp_port_set.preview()} ({obj.tcp_port_count})"
         return '-'
     tcp_ports_preview.short_description = 'TCP Ports'
     
     def udp_ports_preview(self, obj):
         """Display UDP ports preview"""
-        if obj.udp_ports:
-            preview = obj.udp_ports[:50]
-            if len(obj.udp_ports) > 50:
-                preview += '...'
-            return preview
+        if obj.udp_port_count:
+            return f"{obj.udp_port_set.preview()} ({obj.udp_port_count})"
         return '-'
     udp_ports_preview.short_description = 'UDP Ports'
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            scan_types_total=count_subquery(ScanType.objects.all(), 'port_list')
+        )
+    
     def scan_types_count(self, obj):
         """Display number of scan types using this port list"""
-        count = obj.scantype_set.count()
+        count = obj.scan_types_total
         if count > 0:
             url = reverse('admin:orchestrator_api_scantype_changelist') + f'?port_list__id__exact={obj.id}'
             return format_html('<a href="{}">{}</a>', url, count)
         return count
     scan_types_count.short_description = 'Scan Types'
+    scan_types_count.admin_order_field = 'scan_types_total'
 
 
 @admin.register(ScanType)
@@ -154,14 +224,20 @@ class ScanTypeAdmin(admin.ModelAdmin):
     discovery_only.boolean = True
     discovery_only.short_description = 'Discovery Only'
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('port_list').annotate(
+            scans_total=count_subquery(Scan.objects.all(), 'scan_type')
+        )
+    
     def scans_count(self, obj):
         """Display number of scans using this scan type"""
-        count = obj.scans.count()
+        count = obj.scans_total
         if count > 0:
             url = reverse('admin:orchestrator_api_scan_changelist') + f'?scan_type__id__exact={obj.id}'
             return format_html('<a href="{}">{}</a>', url, count)
         return count
     scans_count.short_description = 'Scans'
+    scans_count.admin_order_field = 'scans_total'
 
 
 @admin.register(Target)
@@ -186,27 +262,37 @@ class TargetAdmin(admin.ModelAdmin):
         })
     )
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('customer').annotate(
+            scans_total=count_subquery(Scan.objects.all(), 'target'),
+            last_scan_status_value=Subquery(
+                Scan.objects.filter(target=OuterRef('pk')).order_by('-initiated_at').values('status')[:1]
+            ),
+        )
+    
     def scans_count(self, obj):
         """Display number of scans"""
-        count = obj.scans.count()
+        count = obj.scans_total
         if count > 0:
             url = reverse('admin:orchestrator_api_scan_changelist') + f'?target__id__exact={obj.id}'
             return format_html('<a href="{}">{}</a>', url, count)
         return count
     scans_count.short_description = 'Scans'
+    scans_count.admin_order_field = 'scans_total'
     
     def last_scan_status(self, obj):
         """Display last scan status"""
-        last_scan = obj.scans.first()
-        if last_scan:
-            color = 'green' if last_scan.status == 'Completed' else 'red' if last_scan.status == 'Failed' else 'orange'
+        status = obj.last_scan_status_value
+        if status:
+            color = 'green' if status == 'Completed' else 'red' if status == 'Failed' else 'orange'
             return format_html(
                 '<span style="color: {};">{}</span>',
                 color,
-                last_scan.status
+                status
             )
         return '-'
     last_scan_status.short_description = 'Last Scan'
+    last_scan_status.admin_order_field = 'last_scan_status_value'
 
 
 class ScanDetailInline(admin.StackedInline):
@@ -215,6 +301,7 @@ class ScanDetailInline(admin.StackedInline):
     readonly_fields = ['created_at', 'updated_at']
     fields = [
         ('open_ports', 'os_guess'),
+        ('port_delta', 'plugin_states'),
         ('nmap_started_at', 'nmap_completed_at'),
         ('finger_started_at', 'finger_completed_at'),
         ('gce_started_at', 'gce_completed_at'),
@@ -225,13 +312,31 @@ class ScanDetailInline(admin.StackedInline):
     extra = 0
 
 
+class ScanShardInline(admin.TabularInline):
+    """Inline admin for the nmap shards of range scans"""
+    model = ScanShard
+    fields = ['index', 'hosts', 'ports', 'status', 'progress', 'started_at', 'completed_at', 'error_message']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer('parsed_nmap_results')
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(Scan)
-class ScanAdmin(admin.ModelAdmin):
+class ScanAdmin(ChangelistDeferMixin, admin.ModelAdmin):
     """Admin configuration for Scan model"""
     
+    changelist_defer = SCAN_BLOB_FIELDS
+    list_select_related = ['target__customer', 'scan_type']
     list_display = ['id', 'target_info', 'scan_type', 'status_colored', 'duration_display', 'initiated_at']
-    list_filter = ['status', 'scan_type', 'target__customer', 'initiated_at']
+    list_filter = ['status', 'scan_mode', 'scan_type', 'target__customer', 'initiated_at']
     search_fields = ['target__name', 'target__address', 'target__customer__name']
+    raw_id_fields = ['baseline_scan', 'schedule']
     readonly_fields = [
         'initiated_at', 'created_at', 'updated_at', 'deleted_at', 'duration_display',
         'parsed_nmap_results_formatted', 'parsed_finger_results_formatted', 
@@ -241,10 +346,10 @@ class ScanAdmin(admin.ModelAdmin):
     
     fieldsets = (
         ('Basic Information', {
-            'fields': ('target', 'scan_type', 'status')
+            'fields': ('target', 'scan_type', 'status', 'scan_mode', 'baseline_scan')
         }),
         ('Timing', {
-            'fields': ('initiated_at', 'started_at', 'completed_at', 'duration_display')
+            'fields': ('schedule', 'scheduled_for', 'initiated_at', 'started_at', 'completed_at', 'duration_display')
         }),
         ('Results', {
             'fields': ('parsed_nmap_results', 'parsed_finger_results', 
@@ -271,7 +376,13 @@ class ScanAdmin(admin.ModelAdmin):
         })
     )
     
-    inlines = [ScanDetailInline]
+    inlines = [ScanDetailInline, ScanShardInline]
+    
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'target':
+            # Target.__str__ usa il customer
+            kwargs['queryset'] = Target.objects.select_related('customer')
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
     
     def target_info(self, obj):
         """Display target information"""
@@ -304,44 +415,40 @@ class ScanAdmin(admin.ModelAdmin):
     
     def parsed_nmap_results_formatted(self, obj):
         """Display formatted nmap results"""
-        if obj.parsed_nmap_results:
-            return mark_safe(f'<pre style="white-space: pre-wrap; max-height: 300px; overflow-y: auto;">{json.dumps(obj.parsed_nmap_results, indent=2)}</pre>')
-        return '-'
+        return json_preview(obj.parsed_nmap_results)
     parsed_nmap_results_formatted.short_description = 'Nmap Results (Formatted)'
     
     def parsed_finger_results_formatted(self, obj):
         """Display formatted fingerprint results"""
-        if obj.parsed_finger_results:
-            return mark_safe(f'<pre style="white-space: pre-wrap; max-height: 300px; overflow-y: auto;">{json.dumps(obj.parsed_finger_results, indent=2)}</pre>')
-        return '-'
+        return json_preview(obj.parsed_finger_results)
     parsed_finger_results_formatted.short_description = 'Fingerprint Results (Formatted)'
     
     def parsed_gce_results_formatted(self, obj):
         """Display formatted gce results"""
-        if obj.parsed_gce_results:
-            return mark_safe(f'<pre style="white-space: pre-wrap; max-height: 300px; overflow-y: auto;">{json.dumps(obj.parsed_gce_results, indent=2)}</pre>')
-        return '-'
+        return json_preview(obj.parsed_gce_results)
     parsed_gce_results_formatted.short_description = 'Gce Results (Formatted)'
     
     def parsed_web_results_formatted(self, obj):
         """Display formatted web results"""
-        if obj.parsed_web_results:
-            return mark_safe(f'<pre style="white-space: pre-wrap; max-height: 300px; overflow-y: auto;">{json.dumps(obj.parsed_web_results, indent=2)}</pre>')
-        return '-'
+        return json_preview(obj.parsed_web_results)
     parsed_web_results_formatted.short_description = 'Web Results (Formatted)'
     
     def parsed_vuln_results_formatted(self, obj):
         """Display formatted vulnerability results"""
-        if obj.parsed_vuln_results:
-            return mark_safe(f'<pre style="white-space: pre-wrap; max-height: 300px; overflow-y: auto;">{json.dumps(obj.parsed_vuln_results, indent=2)}</pre>')
-        return '-'
+        return json_preview(obj.parsed_vuln_results)
     parsed_vuln_results_formatted.short_description = 'Vulnerability Results (Formatted)'
 
 
 @admin.register(ScanDetail)
-class ScanDetailAdmin(admin.ModelAdmin):
+class ScanDetailAdmin(ChangelistDeferMixin, admin.ModelAdmin):
     """Admin configuration for ScanDetail model"""
     
+    changelist_defer = (
+        'open_ports', 'os_guess', 'port_delta', 'plugin_states',
+        *related_fields('scan', SCAN_BLOB_FIELDS)
+    )
+    list_select_related = ['scan__target']
+    raw_id_fields = ['scan']
     list_display = ['scan_id', 'scan_target', 'scan_status', 'nmap_duration', 'created_at']
     list_filter = ['created_at', 'updated_at']
     search_fields = ['scan__target__name', 'scan__target__address']
@@ -355,7 +462,7 @@ class ScanDetailAdmin(admin.ModelAdmin):
             'fields': ('scan',)
         }),
         ('Raw Results', {
-            'fields': ('open_ports', 'os_guess'),
+            'fields': ('open_ports', 'os_guess', 'port_delta', 'plugin_states'),
             'classes': ('collapse',)
         }),
         ('Formatted Results (Read Only)', {
@@ -381,8 +488,8 @@ class ScanDetailAdmin(admin.ModelAdmin):
         """Display scan ID with link"""
         return format_html(
             '<a href="{}">{}</a>',
-            reverse('admin:orchestrator_api_scan_change', args=[obj.scan.id]),
-            obj.scan.id
+            reverse('admin:orchestrator_api_scan_change', args=[obj.scan_id]),
+            obj.scan_id
         )
     scan_id.short_description = 'Scan ID'
     
@@ -395,6 +502,7 @@ class ScanDetailAdmin(admin.ModelAdmin):
         """Display scan status"""
         return obj.scan.status
     scan_status.short_description = 'Status'
+    scan_status.admin_order_field = 'scan__status'
     
     def nmap_duration(self, obj):
         """Display nmap duration"""
@@ -405,22 +513,20 @@ class ScanDetailAdmin(admin.ModelAdmin):
     
     def open_ports_formatted(self, obj):
         """Display formatted open ports"""
-        if obj.open_ports:
-            return mark_safe(f'<pre style="white-space: pre-wrap; max-height: 300px; overflow-y: auto;">{json.dumps(obj.open_ports, indent=2)}</pre>')
-        return '-'
+        return json_preview(obj.open_ports)
     open_ports_formatted.short_description = 'Open Ports (Formatted)'
     
     def os_guess_formatted(self, obj):
         """Display formatted OS guess"""
-        if obj.os_guess:
-            return mark_safe(f'<pre style="white-space: pre-wrap; max-height: 300px; overflow-y: auto;">{json.dumps(obj.os_guess, indent=2)}</pre>')
-        return '-'
+        return json_preview(obj.os_guess)
     os_guess_formatted.short_description = 'OS Detection (Formatted)'
 
 @admin.register(FingerprintDetail)
-class FingerprintDetailAdmin(admin.ModelAdmin):
+class FingerprintDetailAdmin(ChangelistDeferMixin, admin.ModelAdmin):
     """Admin configuration for FingerprintDetail model"""
     
+    changelist_defer = ('raw_response', 'additional_info')
+    raw_id_fields = ['scan', 'target']
     list_display = [
         'scan_id', 'target_address', 'port_display', 'service_name', 
         'service_version', 'confidence_score', 'fingerprint_method', 'created_at'
@@ -458,8 +564,8 @@ class FingerprintDetailAdmin(admin.ModelAdmin):
     
     def scan_id(self, obj):
         """Display scan ID with link"""
-        url = reverse('admin:orchestrator_api_scan_change', args=[obj.scan.id])
-        return format_html('<a href="{}">{}</a>', url, obj.scan.id)
+        url = reverse('admin:orchestrator_api_scan_change', args=[obj.scan_id])
+        return format_html('<a href="{}">{}</a>', url, obj.scan_id)
     scan_id.short_description = 'Scan'
     
     def target_address(self, obj):
@@ -476,12 +582,15 @@ class FingerprintDetailAdmin(admin.ModelAdmin):
     
     def get_queryset(self, request):
         """Optimize queryset with select_related"""
-        return super().get_queryset(request).select_related('scan', 'target')
+        return super().get_queryset(request).select_related('target')
 
 @admin.register(GceResult)
-class GceResultAdmin(admin.ModelAdmin):
+class GceResultAdmin(ChangelistDeferMixin, admin.ModelAdmin):
     """Admin configuration for GceResult model"""
     
+    changelist_defer = ('full_report', 'nvt_summary')
+    list_select_related = ['target']
+    raw_id_fields = ['scan', 'target']
     list_display = ['id', 'scan_link', 'target_link', 'gce_status', 'progress_display', 'vulnerabilities_summary', 'scan_duration', 'created_at']
     list_filter = ['gce_scan_status', 'report_format', 'created_at']
     search_fields = ['scan__id', 'target__name', 'target__address', 'gce_task_id', 'gce_report_id']
@@ -514,13 +623,13 @@ class GceResultAdmin(admin.ModelAdmin):
     
     def scan_link(self, obj):
         """Display scan as link"""
-        url = reverse('admin:orchestrator_api_scan_change', args=[obj.scan.id])
-        return format_html('<a href="{}">{}</a>', url, obj.scan.id)
+        url = reverse('admin:orchestrator_api_scan_change', args=[obj.scan_id])
+        return format_html('<a href="{}">{}</a>', url, obj.scan_id)
     scan_link.short_description = 'Scan'
     
     def target_link(self, obj):
         """Display target as link"""
-        url = reverse('admin:orchestrator_api_target_change', args=[obj.target.id])
+        url = reverse('admin:orchestrator_api_target_change', args=[obj.target_id])
         return format_html('<a href="{}">{}</a>', url, f"{obj.target.name} ({obj.target.address})")
     target_link.short_description = 'Target'
     
@@ -573,19 +682,146 @@ class GceResultAdmin(admin.ModelAdmin):
     
     def vulnerability_count_formatted(self, obj):
         """Display formatted vulnerability count"""
-        if obj.vulnerability_count:
-            return mark_safe(f'<pre>{json.dumps(obj.vulnerability_count, indent=2)}</pre>')
-        return '-'
+        return json_preview(obj.vulnerability_count)
     vulnerability_count_formatted.short_description = 'Vulnerability Count Details'
     
     def report_preview(self, obj):
         """Display a preview of the report"""
         if obj.full_report:
             preview = obj.full_report[:1000] + '...' if len(obj.full_report) > 1000 else obj.full_report
-            return mark_safe(f'<pre style="white-space: pre-wrap; max-height: 300px; overflow-y: auto;">{preview}</pre>')
+            return format_html('<pre style="white-space: pre-wrap; max-height: 300px; overflow-y: auto;">{}</pre>', preview)
         return '-'
     report_preview.short_description = 'Report Preview (first 1000 chars)'
     
+@admin.register(Vulnerability)
+class VulnerabilityAdmin(admin.ModelAdmin):
+    """Admin configuration for Vulnerability model"""
+    
+    list_display = ['name', 'threat', 'severity', 'host', 'port_display', 'scan_link', 'nvt_oid', 'created_at']
+    list_filter = ['threat', 'protocol', 'created_at']
+    search_fields = ['name', 'nvt_oid', 'host', 'cve_refs__cve']
+    raw_id_fields = ['scan', 'target', 'gce_result']
+    readonly_fields = ['created_at', 'updated_at', 'deleted_at', 'cve_list']
+    ordering = ['-severity']
+    
+    def scan_link(self, obj):
+        """Display scan as link"""
+        url = reverse('admin:orchestrator_api_scan_change', args=[obj.scan_id])
+        return format_html('<a href="{}">{}</a>', url, obj.scan_id)
+    scan_link.short_description = 'Scan'
+    
+    def port_display(self, obj):
+        """Display port with protocol"""
+        return f"{obj.port}/{obj.protocol}" if obj.port else obj.protocol or '-'
+    port_display.short_description = 'Port'
+    port_display.admin_order_field = 'port'
+    
+    def cve_list(self, obj):
+        """Display referenced CVEs"""
+        return ', '.join(ref.cve for ref in obj.cve_refs.all()) or '-'
+    cve_list.short_description = 'CVEs'
+    
+
+@admin.register(OsMatch)
+class OsMatchAdmin(admin.ModelAdmin):
+    """Admin configuration for OsMatch model"""
+    
+    list_display = ['host', 'name', 'accuracy', 'rank', 'osfamily', 'scan', 'created_at']
+    list_filter = ['osfamily', 'vendor']
+    search_fields = ['host', 'name']
+    raw_id_fields = ['scan', 'target']
+    readonly_fields = ['created_at']
+
+
+@admin.register(ScriptResult)
+class ScriptResultAdmin(admin.ModelAdmin):
+    """Admin configuration for ScriptResult model"""
+    
+    list_display = ['script_id', 'host', 'port', 'protocol', 'scan', 'created_at']
+    list_filter = ['protocol']
+    search_fields = ['script_id', 'host']
+    raw_id_fields = ['scan', 'target']
+    readonly_fields = ['created_at']
+
+
+@admin.register(ServiceInventory)
+class ServiceInventoryAdmin(admin.ModelAdmin):
+    """Admin configuration for ServiceInventory model"""
+    
+    list_display = ['host', 'port', 'protocol', 'service', 'product', 'version', 'is_open', 'target', 'last_seen']
+    list_filter = ['is_open', 'protocol']
+    search_fields = ['host', 'service', 'product']
+    raw_id_fields = ['target', 'last_scan']
+    readonly_fields = ['first_seen', 'last_seen']
+
+
+@admin.register(ScanDiff)
+class ScanDiffAdmin(admin.ModelAdmin):
+    """Admin configuration for ScanDiff model"""
+    
+    list_display = ['scan', 'previous_scan', 'target', 'ports_added', 'ports_removed', 'ports_changed',
+                    'vulns_added', 'vulns_removed', 'has_changes', 'computed_at']
+    list_filter = ['has_changes', 'computed_at']
+    raw_id_fields = ['scan', 'previous_scan', 'target']
+    readonly_fields = ['computed_at']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'scan__target', 'previous_scan__target', 'target__customer'
+        ).defer(
+            'diff', *related_fields('scan', SCAN_BLOB_FIELDS), *related_fields('previous_scan', SCAN_BLOB_FIELDS)
+        )
+
+
+@admin.register(JobLease)
+class JobLeaseAdmin(admin.ModelAdmin):
+    """Admin configuration for JobLease model"""
+    
+    list_display = ['scan', 'plugin', 'shard', 'state', 'attempt', 'worker', 'heartbeat_at', 'expires_at']
+    list_filter = ['plugin', 'state']
+    search_fields = ['worker']
+    raw_id_fields = ['scan', 'shard']
+    readonly_fields = ['created_at', 'heartbeat_at']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('scan__target', 'shard').defer(
+            *related_fields('scan', SCAN_BLOB_FIELDS), 'shard__parsed_nmap_results'
+        )
+
+
+@admin.register(ScanSchedule)
+class ScanScheduleAdmin(admin.ModelAdmin):
+    """Admin configuration for ScanSchedule model"""
+    
+    list_display = ['name', 'customer', 'scan_type', 'cron', 'interval_minutes', 'jitter_minutes', 'enabled', 'next_run_at', 'last_run_at']
+    list_filter = ['enabled', 'scan_type']
+    search_fields = ['name', 'customer__name']
+    filter_horizontal = ['targets']
+    readonly_fields = ['created_at', 'updated_at', 'last_run_at']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('customer', 'scan_type')
+
+
+
+@admin.register(ScanEvent)
+class ScanEventAdmin(admin.ModelAdmin):
+    """Admin configuration for ScanEvent model (read only)"""
+    
+    list_display = ['occurred_at', 'scan_id', 'module', 'status', 'shard_id', 'progress']
+    list_filter = ['module', 'status']
+    raw_id_fields = ['scan']
+    # Log append-only: nessun filtro per data sulla tabella più grande, si cerca per scansione
+    search_fields = ['=scan__id']
+    show_full_result_count = False
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 # Customize admin site
 admin.site.site_header = 'VaPtER Administration'
 admin.site.site_title = 'VaPtER Admin'
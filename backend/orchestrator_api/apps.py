@@ -9,6 +9,5 @@ class OrchestratorApiConfig(AppConfig):
     verbose_name = 'VaPtER Orchestrator API'
     
     def ready(self):
-        """App ready hook - import signals if any"""
-        # Import signals here if we add them later
-        pass
\ No newline at end of file
+        """App ready hook - import signals"""
+        from . import signals  # noqa: F401
\ No newline at end of file
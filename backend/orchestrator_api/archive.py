@@ -0,0 +1,64 @@
+# backend/orchestrator_api/archive.py
+
+import gzip
+import os
+
+try:
+    import zstandard
+except ImportError:  # zstandard è opzionale: senza gli archivi sono scritti in gzip
+    zstandard = None
+
+
+EXTENSIONS = {'zstd': '.jsonl.zst', 'gzip': '.jsonl.gz'}
+
+
+def resolve_compression(compression='auto'):
+    """
+    Codec for new archives: 'auto' picks zstd when zstandard is installed
+
+    Raises:
+        ValueError: on unknown codecs or zstd without zstandard
+    """
+    if compression == 'auto':
+        return 'zstd' if zstandard is not None else 'gzip'
+    if compression not in EXTENSIONS:
+        raise ValueError(f"Unknown archive compression '{compression}' (auto, zstd, gzip)")
+    if compression == 'zstd' and zstandard is None:
+        raise ValueError("zstd archives need the zstandard package")
+    return compression
+
+
+def archive_compression(path):
+    """Codec of an existing archive, from its extension"""
+    for compression, extension in EXTENSIONS.items():
+        if path.endswith(extension):
+            return compression
+    raise ValueError(f"Not a scan archive: {path} (expected {' or '.join(EXTENSIONS.values())})")
+
+
+def open_archive(path, mode='rt'):
+    """Open a JSONL archive as text, 'rt' or 'wt'; the codec follows the extension"""
+    compression = archive_compression(path)
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ValueError(f"Reading {path} needs the zstandard package")
+        return zstandard.open(path, mode, encoding='utf-8')
+    return gzip.open(path, mode, encoding='utf-8')
+
+
+def write_archive(path, lines):
+    """
+    Write the JSONL lines to path atomically: a temporary file, fsynced and
+    renamed, so that a crash never leaves a truncated archive behind
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    extension = EXTENSIONS[archive_compression(path)]
+    # Il file temporaneo tiene l'estensione per aprirlo con lo stesso codec
+    temp_path = path[:-len(extension)] + '.tmp' + extension
+    with open_archive(temp_path, 'wt') as archive:
+        for line in lines:
+            archive.write(line)
+            archive.write('\n')
+    with open(temp_path, 'rb') as archive:
+        os.fsync(archive.fileno())
+    os.replace(temp_path, path)
@@ -0,0 +1,238 @@
+# backend/orchestrator_api/bulk.py
+
+import ipaddress
+import logging
+import re
+import uuid
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.utils import timezone
+from .models import Scan, Target, TargetSummary, Customer
+from .events import ScanEventLogService
+from .messaging import BatchPublisher
+from .scheduler import ScheduleService
+from .services import ScanOrchestratorService
+from .summaries import SummaryService
+
+logger = logging.getLogger(__name__)
+
+
+class BulkTargetService:
+    """
+    Bulk import of targets. The rows are validated in one pass without
+    queries, deduplicated against the existing targets of their customers with
+    one query and inserted with bulk_create, BULK_BATCH_SIZE rows per
+    transaction. Results are yielded per row as each batch is committed.
+    """
+
+    FQDN_PATTERN = re.compile(
+        r'^[a-zA-Z0-9]([a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?'
+        r'(\.[a-zA-Z0-9]([a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?)*$'
+    )
+    ADDRESS_MAX_LENGTH = Target._meta.get_field('address').max_length
+    NAME_MAX_LENGTH = Target._meta.get_field('name').max_length
+
+    @staticmethod
+    def address_error(address):
+        """Validation error of a target address (same rules as TargetSerializer), None if valid"""
+        if not address:
+            return 'Address is required'
+        if len(address) > BulkTargetService.ADDRESS_MAX_LENGTH:
+            return f'Address too long (max {BulkTargetService.ADDRESS_MAX_LENGTH} characters)'
+        try:
+            ipaddress.ip_address(address)
+            return None
+        except ValueError:
+            pass
+        try:
+            networks = Target.parse_address_range(address)
+            if networks is not None:
+                Target.validate_range_size(networks)
+                return None
+        except DjangoValidationError as e:
+            return e.messages[0]
+        if not BulkTargetService.FQDN_PATTERN.match(address):
+            return 'Enter a valid IP address or FQDN'
+        return None
+
+    @staticmethod
+    def _customer_key(row, default_customer):
+        """Customer of a row as a canonical UUID string, '' if missing or malformed"""
+        try:
+            return str(uuid.UUID(str(row.get('customer') or default_customer)))
+        except ValueError:
+            return ''
+
+    @staticmethod
+    def _customer_ids(rows, default_customer):
+        """Customers referenced by the rows that exist, as strings"""
+        candidates = {BulkTargetService._customer_key(row, default_customer) for row in rows} - {''}
+        return {str(cid) for cid in Customer.objects.filter(id__in=candidates).values_list('id', flat=True)}
+
+    @staticmethod
+    def import_targets(rows, default_customer=None):
+        """
+        Import rows of {'customer', 'name', 'address', 'description'}; the
+        customer falls back to default_customer and the name to the address.
+
+        Yields:
+            dict: {'index', 'address', 'status', 'id'|'errors'} per row, where
+            status is created, restored (soft deleted target brought back),
+            exists, duplicate (repeated in the rows) or invalid; then
+            {'summary': counts per status}
+        """
+        customers = BulkTargetService._customer_ids(rows, default_customer)
+        # Una sola query: anche i target cancellati (soft) occupano (customer, address)
+        existing = {
+            (str(customer_id), address): (target_id, deleted_at)
+            for customer_id, address, target_id, deleted_at in Target.all_objects.filter(
+                customer_id__in=customers
+            ).values_list('customer_id', 'address', 'id', 'deleted_at').iterator()
+        }
+        seen = set()
+        counts = {}
+        batch_size = settings.BULK_BATCH_SIZE
+
+        for start in range(0, len(rows), batch_size):
+            results, created, restored = [], [], []
+            for index, row in enumerate(rows[start:start + batch_size], start):
+                address = str(row.get('address') or '').strip()
+                name = str(row.get('name') or '').strip() or address
+                description = str(row.get('description') or '').strip() or None
+                customer_id = BulkTargetService._customer_key(row, default_customer)
+                result = {'index': index, 'address': address}
+
+                errors = []
+                if customer_id not in customers:
+                    errors.append('Unknown customer' if row.get('customer') or default_customer else 'Customer is required')
+                address_error = BulkTargetService.address_error(address)
+                if address_error:
+                    errors.append(address_error)
+                if len(name) > BulkTargetService.NAME_MAX_LENGTH:
+                    errors.append(f'Name too long (max {BulkTargetService.NAME_MAX_LENGTH} characters)')
+
+                key = (customer_id, address)
+                if errors:
+                    result.update(status='invalid', errors=errors)
+                elif key in seen:
+                    result['status'] = 'duplicate'
+                elif key in existing and existing[key][1] is None:
+                    result.update(status='exists', id=existing[key][0])
+                else:
+                    target = Target(
+                        id=existing[key][0] if key in existing else None,
+                        customer_id=customer_id, name=name, address=address, description=description
+                    )
+                    # bulk_create/bulk_update non passano dal pre_save che calcola i limiti del range
+                    target.compile_address()
+                    if key in existing:
+                        result['status'] = 'restored'
+                        restored.append(target)
+                    else:
+                        result['status'] = 'created'
+                        created.append(target)
+                    result['target'] = target
+                seen.add(key)
+                results.append(result)
+
+            with transaction.atomic():
+                Target.objects.bulk_create(created)
+                TargetSummary.objects.bulk_create([TargetSummary(target_id=t.id) for t in created])
+                now = timezone.now()
+                for target in restored:
+                    target.deleted_at = None
+                    target.updated_at = now
+                Target.all_objects.bulk_update(
+                    restored, ['name', 'description', 'ip_start', 'ip_end', 'deleted_at', 'updated_at']
+                )
+
+            for target in restored:
+                SummaryService.refresh_target(target.id)
+            for result in results:
+                target = result.pop('target', None)
+                if target is not None:
+                    result['id'] = target.id
+                    existing[(str(target.customer_id), target.address)] = (target.id, None)
+                counts[result['status']] = counts.get(result['status'], 0) + 1
+                yield result
+
+        for customer_id in customers:
+            SummaryService.refresh_customer(customer_id)
+        logger.info(f"Bulk target import: {counts}")
+        yield {'summary': counts}
+
+
+class BulkScanService:
+    """
+    Bulk scan launch. Each batch of BULK_BATCH_SIZE targets gets its scans
+    created and started in one transaction; their plugin requests are
+    published in one batch after the commit.
+    """
+
+    @staticmethod
+    def launch(target_ids, scan_type, scan_mode='full'):
+        """
+        Create and start a scan of scan_type for each target.
+
+        Yields:
+            dict: {'index', 'target', 'status', 'scan_id'|'error'} per target,
+            where status is queued, failed, busy (scan already in progress),
+            duplicate or invalid; then {'summary': counts per status}
+        """
+        targets = Target.objects.filter(id__in=[t for t in target_ids if isinstance(t, int)]).in_bulk()
+        busy = set(
+            Scan.objects.filter(target_id__in=targets).exclude(
+                status__in=ScheduleService.IDLE_STATUSES
+            ).values_list('target_id', flat=True)
+        )
+        seen = set()
+        counts = {}
+        batch_size = settings.BULK_BATCH_SIZE
+
+        for start in range(0, len(target_ids), batch_size):
+            results, scans = [], []
+            for index, target_id in enumerate(target_ids[start:start + batch_size], start):
+                result = {'index': index, 'target': target_id}
+                if target_id not in targets:
+                    result.update(status='invalid', error='Unknown target')
+                elif target_id in seen:
+                    result['status'] = 'duplicate'
+                elif target_id in busy:
+                    result.update(status='busy', error='Target already has a running scan')
+                else:
+                    scan = Scan(target=targets[target_id], scan_type=scan_type, scan_mode=scan_mode)
+                    # I riepiloghi si aggiornano una volta alla fine del batch
+                    scan._defer_summaries = True
+                    scans.append(scan)
+                    result['scan'] = scan
+                seen.add(target_id)
+                results.append(result)
+
+            publisher = BatchPublisher()
+            with ScanEventLogService.buffered(), transaction.atomic():
+                Scan.objects.bulk_create(scans)
+                for scan in scans:
+                    ScanOrchestratorService.start_scan(scan, publisher)
+            unpublished = publisher.flush()
+
+            for scan in scans:
+                if scan.id in unpublished:
+                    ScanOrchestratorService.cancel_scan(scan, reason='Failed to queue scan in RabbitMQ')
+                SummaryService.refresh_target(scan.target_id)
+            for customer_id in {scan.target.customer_id for scan in scans}:
+                SummaryService.refresh_customer(customer_id)
+
+            for result in results:
+                scan = result.pop('scan', None)
+                if scan is not None:
+                    result['scan_id'] = scan.id
+                    if scan.status == 'Failed':
+                        result.update(status='failed', error=scan.error_message)
+                    else:
+                        result['status'] = 'queued'
+                counts[result['status']] = counts.get(result['status'], 0) + 1
+                yield result
+
+        logger.info(f"Bulk scan launch: {counts}")
+        yield {'summary': counts}
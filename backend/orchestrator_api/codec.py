@@ -0,0 +1,45 @@
+# backend/orchestrator_api/codec.py
+
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+
+try:
+    import orjson
+except ImportError:  # orjson è opzionale: senza si usa il modulo json della libreria standard
+    orjson = None
+
+
+# JSON codec of the API bodies and of the AMQP messages. orjson encodes and
+# decodes the large payloads (parsed nmap results, fingerprint lists, GCE
+# summaries) several times faster than json; both produce the same documents.
+
+ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson is not None else 0
+
+_django_encoder = DjangoJSONEncoder()
+
+
+def dumps(obj, default=None):
+    """
+    Encode obj as compact UTF-8 JSON bytes. Types JSON has no notation for
+    (datetimes, Decimal, lazy strings, ...) go through default, by default
+    DjangoJSONEncoder: the output matches json.dumps(obj, cls=DjangoJSONEncoder),
+    except for NaN/Infinity that orjson encodes as null.
+    """
+    default = default or _django_encoder.default
+    if orjson is not None:
+        return orjson.dumps(obj, default=default, option=ORJSON_OPTIONS)
+    return json.dumps(obj, default=default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def loads(data):
+    """
+    Decode JSON from bytes or str
+
+    Raises:
+        json.JSONDecodeError: on invalid documents (orjson's error is a subclass)
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = bytes(data).decode('utf-8')
+    return json.loads(data)
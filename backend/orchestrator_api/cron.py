@@ -0,0 +1,114 @@
+# backend/orchestrator_api/cron.py
+
+from datetime import datetime, timedelta
+
+
+# (min, max) of the five fields: minute, hour, day of month, month, day of week
+FIELD_BOUNDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+MACROS = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+    '@yearly': '0 0 1 1 *',
+    '@annually': '0 0 1 1 *',
+}
+
+# next_after() gives up on expressions that never match (e.g. '0 0 30 2 *')
+MAX_YEARS = 5
+
+
+class CronExpression:
+    """
+    Standard five-field cron expression (minute hour day month weekday).
+
+    Fields accept '*', single values, ranges, lists and steps ('*/15',
+    '1-5', '0,30', '8-18/2'); weekday 0 and 7 are both Sunday. As in cron,
+    when both day of month and day of week are restricted a day matches if
+    either of them does.
+    """
+
+    __slots__ = ('expression', 'minutes', 'hours', 'days', 'months', 'weekdays', '_day_or')
+
+    def __init__(self, expression):
+        self.expression = expression
+        text = MACROS.get(expression.strip().lower(), expression)
+        fields = text.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields, got {len(fields)}: '{expression}'")
+
+        parsed = [self._parse_field(field, low, high) for field, (low, high) in zip(fields, FIELD_BOUNDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = frozenset(day % 7 for day in weekdays)
+        self._day_or = not fields[2].startswith('*') and not fields[4].startswith('*')
+
+    @staticmethod
+    def _parse_field(field, low, high):
+        """
+        Parse one field into the set of its values.
+
+        Raises:
+            ValueError: on malformed entries or values out of bounds
+        """
+        values = set()
+        for part in field.split(','):
+            range_part, _, step = part.partition('/')
+            try:
+                step = int(step) if step else 1
+                if range_part == '*':
+                    start, end = low, high
+                elif '-' in range_part:
+                    start, end = (int(p) for p in range_part.split('-', 1))
+                else:
+                    start = int(range_part)
+                    end = high if step > 1 else start
+            except ValueError:
+                raise ValueError(f"Invalid cron field: '{field}'")
+            if step < 1 or start < low or end > high or start > end:
+                raise ValueError(f"Invalid cron field: '{field}' (allowed {low}-{high})")
+            values.update(range(start, end + 1, step))
+        return frozenset(values)
+
+    def _day_matches(self, moment):
+        # isoweekday(): lunedì=1 ... domenica=7, cron: domenica=0
+        weekday = moment.isoweekday() % 7
+        if self._day_or:
+            return moment.day in self.days or weekday in self.weekdays
+        return moment.day in self.days and weekday in self.weekdays
+
+    def next_after(self, moment):
+        """
+        First matching minute strictly after moment. Works on wall-clock time:
+        pass a naive or aware datetime, the result has the same tzinfo.
+
+        Raises:
+            ValueError: if the expression never matches
+        """
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment.year + MAX_YEARS
+
+        while candidate.year <= limit:
+            if candidate.month not in self.months:
+                # Primo giorno del mese successivo
+                year, month = divmod(candidate.year * 12 + candidate.month, 12)
+                candidate = candidate.replace(year=year, month=month + 1, day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+                continue
+            if candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+                continue
+            return candidate
+
+        raise ValueError(f"Cron expression never matches: '{self.expression}'")
+
+    @classmethod
+    def validate(cls, expression):
+        """Parse the expression and check that it matches at least once"""
+        cls(expression).next_after(datetime(2000, 1, 1))
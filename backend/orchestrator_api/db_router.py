@@ -0,0 +1,118 @@
+# backend/orchestrator_api/db_router.py
+
+import logging
+import time
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+# Read replica routing. Only the GET actions a viewset lists in replica_actions
+# (heavy lists and statistics used by the frontend) read from the replica:
+# everything else, the endpoints of the scan workflow and the consumers
+# included, stays on the primary. A browser that wrote something is pinned to
+# the primary for REPLICA_PIN_SECONDS by a cookie (read-your-writes); clients
+# without cookies (plugins, scripts) send the REPLICA_PRIMARY_HEADER header to
+# read from the primary. The replica is skipped while it lags more than
+# REPLICA_MAX_LAG seconds.
+
+_read_from_replica = ContextVar('read_from_replica', default=False)
+
+# Ultimo controllo del ritardo della replica, per processo: (istante, replica utilizzabile)
+_replica_health = {'checked_at': 0.0, 'usable': False}
+
+REPLICA_LAG_SQL = (
+    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+    'ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END'
+)
+
+
+def replica_usable():
+    """
+    True if the replica answers and lags less than REPLICA_MAX_LAG seconds,
+    checked at most every REPLICA_CHECK_INTERVAL seconds per process
+    """
+    now = time.monotonic()
+    if now - _replica_health['checked_at'] < settings.REPLICA_CHECK_INTERVAL:
+        return _replica_health['usable']
+
+    usable = False
+    try:
+        replica = connections[settings.REPLICA_DATABASE_ALIAS]
+        if replica.vendor != 'postgresql':
+            usable = True
+        else:
+            with replica.cursor() as cursor:
+                cursor.execute(REPLICA_LAG_SQL)
+                lag = cursor.fetchone()[0]
+            # NULL: il server non è in recovery (replica puntata sul primario)
+            usable = lag is None or float(lag) <= settings.REPLICA_MAX_LAG
+            if not usable:
+                logger.warning(f"Read replica lags {float(lag):.1f}s: reading from the primary")
+    except Exception as e:
+        logger.error(f"Read replica unavailable, reading from the primary: {str(e)}")
+
+    _replica_health.update(checked_at=now, usable=usable)
+    return usable
+
+
+class ReplicaRouter:
+    """Send the reads of the requests marked by ReplicaRoutingMiddleware to the replica"""
+
+    def db_for_read(self, model, **hints):
+        if _read_from_replica.get():
+            return settings.REPLICA_DATABASE_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Stessi dati su primario e replica
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Mark the GET/HEAD requests of the viewset actions in replica_actions for
+    the replica, unless the client is pinned to the primary (cookie) or asks
+    for it (header); pin the clients of successful writes
+    """
+
+    SAFE_METHODS = ('GET', 'HEAD')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.replica_token = None
+        try:
+            response = self.get_response(request)
+        finally:
+            if request.replica_token is not None:
+                _read_from_replica.reset(request.replica_token)
+
+        if request.method not in self.SAFE_METHODS and response.status_code < 400:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax'
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in self.SAFE_METHODS or request.COOKIES.get(settings.REPLICA_PIN_COOKIE):
+            return None
+        if request.headers.get(settings.REPLICA_PRIMARY_HEADER):
+            return None
+        # Viewset DRF: as_view() espone la classe e la mappa metodo -> action
+        view_class = getattr(view_func, 'cls', None)
+        actions = getattr(view_func, 'actions', None) or {}
+        action = actions.get(request.method.lower())
+        if action and action in getattr(view_class, 'replica_actions', ()) and replica_usable():
+            request.replica_token = _read_from_replica.set(True)
+        return None
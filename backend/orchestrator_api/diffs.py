@@ -0,0 +1,186 @@
+# backend/orchestrator_api/diffs.py
+
+import logging
+from .models import Scan, ScanDetail, ScanDiff
+from .incremental import IncrementalScanService
+
+logger = logging.getLogger(__name__)
+
+
+class ScanDiffService:
+    """
+    Port, service, version and vulnerability changes between two scans of a
+    target, computed with a sorted merge over normalized records
+    """
+
+    PORT_FIELDS = ('service', 'product', 'version')
+    VULN_FIELDS = ('severity', 'threat')
+
+    @staticmethod
+    def _host(scan, host):
+        """Single-host targets are keyed on the configured address (IP or FQDN)"""
+        return (host if scan.target.is_range else None) or scan.target.address
+
+    @staticmethod
+    def port_records(scan):
+        """
+        Open ports of a scan as a sorted list of ((protocol, host, port), {service, product, version}).
+        Product and version identified by fingerprint (inherited ones included) take precedence over nmap's.
+        """
+        open_ports = ScanDetail.objects.filter(scan=scan).values_list('open_ports', flat=True).first() or {}
+
+        records = {}
+        for protocol in ('tcp', 'udp'):
+            for port_data in open_ports.get(protocol, []):
+                key = (protocol, ScanDiffService._host(scan, port_data.get('host')), int(port_data.get('port', 0)))
+                records[key] = {field: port_data.get(field) or '' for field in ScanDiffService.PORT_FIELDS}
+
+        for fp in IncrementalScanService.effective_fingerprints(scan):
+            key = (fp.protocol, ScanDiffService._host(scan, (fp.additional_info or {}).get('host')), fp.port)
+            record = records.get(key)
+            if record is None:
+                continue
+            if fp.service_name and fp.service_name != 'unknown':
+                record['service'] = fp.service_name
+            if fp.service_product:
+                record['product'] = fp.service_product
+            if fp.service_version:
+                record['version'] = fp.service_version
+
+        return sorted(records.items())
+
+    @staticmethod
+    def vuln_records(scan):
+        """
+        Effective findings of a scan (inherited ones included, see
+        IncrementalScanService) as a sorted list of
+        ((nvt_oid, host, port, protocol), {name, severity, threat}).
+        Duplicates of the same NVT on the same port keep the highest severity.
+        """
+        records = {}
+        for vuln in IncrementalScanService.effective_vulnerabilities(scan):
+            # Porta -1 per i finding a livello host ('general/tcp')
+            key = (
+                vuln.nvt_oid, ScanDiffService._host(scan, vuln.host),
+                vuln.port if vuln.port is not None else -1, vuln.protocol or ''
+            )
+            if key not in records or vuln.severity > records[key]['severity']:
+                records[key] = {'name': vuln.name, 'severity': vuln.severity, 'threat': vuln.threat}
+        return sorted(records.items())
+
+    @staticmethod
+    def _merge(old_records, new_records):
+        """Walk two key-sorted record lists together, yielding (key, old, new)"""
+        i = j = 0
+        while i < len(old_records) or j < len(new_records):
+            if j == len(new_records) or (i < len(old_records) and old_records[i][0] < new_records[j][0]):
+                yield old_records[i][0], old_records[i][1], None
+                i += 1
+            elif i == len(old_records) or new_records[j][0] < old_records[i][0]:
+                yield new_records[j][0], None, new_records[j][1]
+                j += 1
+            else:
+                yield old_records[i][0], old_records[i][1], new_records[j][1]
+                i += 1
+                j += 1
+
+    @staticmethod
+    def _diff_records(old_records, new_records, key_fields, compared_fields):
+        delta = {'added': [], 'removed': [], 'changed': [], 'unchanged': 0}
+        for key, old, new in ScanDiffService._merge(old_records, new_records):
+            location = dict(zip(key_fields, key))
+            if location.get('port') == -1:
+                location['port'] = None
+            if old is None:
+                delta['added'].append({**location, **new})
+            elif new is None:
+                delta['removed'].append({**location, **old})
+            else:
+                fields = [field for field in compared_fields if old.get(field) != new.get(field)]
+                if fields:
+                    delta['changed'].append({
+                        **location,
+                        'fields': fields,
+                        'before': {field: old.get(field) for field in compared_fields},
+                        'after': {field: new.get(field) for field in compared_fields},
+                    })
+                else:
+                    delta['unchanged'] += 1
+        return delta
+
+    @staticmethod
+    def compute(old_scan, new_scan):
+        """
+        Diff between two scans (old_scan may be None for the first scan of a target).
+
+        Returns:
+            dict: {"ports": {added, removed, changed, unchanged}, "vulnerabilities": {...}, "summary": {...}}
+        """
+        old_ports = ScanDiffService.port_records(old_scan) if old_scan else []
+        old_vulns = ScanDiffService.vuln_records(old_scan) if old_scan else []
+
+        ports = ScanDiffService._diff_records(
+            old_ports, ScanDiffService.port_records(new_scan),
+            ('protocol', 'host', 'port'), ScanDiffService.PORT_FIELDS
+        )
+        vulns = ScanDiffService._diff_records(
+            old_vulns, ScanDiffService.vuln_records(new_scan),
+            ('nvt_oid', 'host', 'port', 'protocol'), ScanDiffService.VULN_FIELDS
+        )
+
+        summary = {
+            'ports_added': len(ports['added']),
+            'ports_removed': len(ports['removed']),
+            'ports_changed': len(ports['changed']),
+            'services_changed': sum(1 for c in ports['changed'] if 'service' in c['fields']),
+            'versions_changed': sum(1 for c in ports['changed'] if {'product', 'version'} & set(c['fields'])),
+            'vulns_added': len(vulns['added']),
+            'vulns_removed': len(vulns['removed']),
+            'vulns_changed': len(vulns['changed']),
+        }
+        return {
+            'scan_id': new_scan.id,
+            'previous_scan_id': old_scan.id if old_scan else None,
+            'ports': ports,
+            'vulnerabilities': vulns,
+            'summary': summary,
+        }
+
+    @staticmethod
+    def previous_scan(scan):
+        """Most recent completed scan of the same target before this one"""
+        previous = Scan.objects.filter(target_id=scan.target_id, status='Completed').exclude(id=scan.id)
+        if scan.completed_at:
+            previous = previous.filter(completed_at__lt=scan.completed_at)
+        return previous.order_by('-completed_at', '-id').first()
+
+    @staticmethod
+    def materialize(scan):
+        """Compute and store the diff of a completed scan against the previous one"""
+        try:
+            previous = ScanDiffService.previous_scan(scan)
+            diff = ScanDiffService.compute(previous, scan)
+            summary = diff['summary']
+            counters = {
+                field: summary[field]
+                for field in ('ports_added', 'ports_removed', 'ports_changed',
+                              'vulns_added', 'vulns_removed', 'vulns_changed')
+            }
+
+            scan_diff, _ = ScanDiff.objects.update_or_create(
+                scan=scan,
+                defaults={
+                    'previous_scan': previous,
+                    'target_id': scan.target_id,
+                    'diff': diff,
+                    # La prima scansione di un target non è un cambiamento
+                    'has_changes': previous is not None and any(counters.values()),
+                    **counters,
+                }
+            )
+            logger.info(f"Materialized diff of scan {scan.id} vs {previous.id if previous else '-'}: {summary}")
+            return scan_diff
+
+        except Exception as e:
+            logger.error(f"Error computing diff for scan {scan.id}: {str(e)}")
+            return None
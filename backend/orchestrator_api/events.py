@@ -0,0 +1,203 @@
+# backend/orchestrator_api/events.py
+
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min, Q
+from django.utils import timezone
+from .models import ScanEvent
+from .messaging import RabbitMQService
+from .partitions import ensure_monthly_partitions
+
+logger = logging.getLogger(__name__)
+
+
+class ScanEventService:
+    """
+    Live scan events, published on the RABBITMQ_SCAN_EVENTS_EXCHANGE fanout
+    exchange and pushed to the clients by the API gateway. Only ids, statuses
+    and progress, never results. Best effort: a lost event only delays the
+    client until the next one.
+    """
+
+    # Una connessione per thread (consumer, worker del server), riaperta se cade
+    _local = threading.local()
+
+    @staticmethod
+    def publish(event_type, scan, **data):
+        """Publish an event about scan: its ids and current status, plus data"""
+        try:
+            event = {
+                'type': event_type,
+                'scan_id': scan.id,
+                'target_id': scan.target_id,
+                'customer_id': str(scan.target.customer_id),
+                'scan_status': scan.status,
+                **{key: value for key, value in data.items() if value is not None},
+                'timestamp': timezone.now().isoformat()
+            }
+        except Exception as e:
+            logger.error(f"Error building {event_type} event for scan {scan.id}: {str(e)}")
+            return False
+
+        for _ in range(2):
+            rabbitmq_service = getattr(ScanEventService._local, 'rabbitmq_service', None)
+            if rabbitmq_service is None:
+                rabbitmq_service = ScanEventService._local.rabbitmq_service = RabbitMQService()
+            if rabbitmq_service.broadcast(settings.RABBITMQ_SCAN_EVENTS_EXCHANGE, event):
+                return True
+            # Connessione rimasta aperta ma chiusa dal broker (heartbeat scaduto): si riprova con una nuova
+            rabbitmq_service.close()
+            ScanEventService._local.rabbitmq_service = None
+        return False
+
+
+class ScanEventLogService:
+    """
+    Append-only scan timeline (ScanEvent). Events are recorded once the
+    transaction that caused them commits, so a rollback leaves no trace.
+    Inside buffered() (status consumer, bulk launches) they are collected and
+    written with bulk_create in batches, otherwise one insert per event.
+    """
+
+    TERMINAL_STATUSES = ('completed', 'failed', 'error', 'cancelled')
+
+    _local = threading.local()
+
+    @staticmethod
+    def record(scan_id, module, status, shard_id=None, progress=None, message=None):
+        """Append an event to the timeline of the scan, after commit"""
+        event = ScanEvent(
+            scan_id=scan_id,
+            module=module,
+            status=status,
+            shard_id=shard_id,
+            progress=progress,
+            message=(message or '')[:2000],
+            occurred_at=timezone.now()
+        )
+        transaction.on_commit(lambda: ScanEventLogService._append(event))
+
+    @staticmethod
+    def _append(event):
+        buffer = getattr(ScanEventLogService._local, 'buffer', None)
+        if buffer is None:
+            ScanEventLogService._write([event])
+            return
+        buffer.append(event)
+        if len(buffer) >= settings.SCAN_EVENT_LOG_BATCH_SIZE:
+            ScanEventLogService.flush()
+
+    @staticmethod
+    def _write(events):
+        try:
+            ScanEvent.objects.bulk_create(events, batch_size=settings.SCAN_EVENT_LOG_BATCH_SIZE)
+        except Exception as e:
+            # Lo storico non deve bloccare l'elaborazione degli stati
+            logger.error(f"Error writing {len(events)} scan events: {str(e)}")
+
+    @staticmethod
+    def flush():
+        """Write the buffered events"""
+        buffer = getattr(ScanEventLogService._local, 'buffer', None)
+        if buffer:
+            ScanEventLogService._write(list(buffer))
+            buffer.clear()
+        ScanEventLogService._local.flushed_at = timezone.now()
+
+    @staticmethod
+    def flush_if_due():
+        """Flush when SCAN_EVENT_LOG_FLUSH_INTERVAL elapsed since the last flush"""
+        flushed_at = getattr(ScanEventLogService._local, 'flushed_at', None)
+        interval = timedelta(seconds=settings.SCAN_EVENT_LOG_FLUSH_INTERVAL)
+        if flushed_at is None or timezone.now() - flushed_at >= interval:
+            ScanEventLogService.flush()
+
+    @staticmethod
+    @contextmanager
+    def buffered():
+        """Collect the events of the current thread, written in batches and on exit"""
+        if getattr(ScanEventLogService._local, 'buffer', None) is not None:
+            # Già dentro un buffered(): scrive chi lo ha aperto
+            yield
+            return
+        ScanEventLogService._local.buffer = []
+        try:
+            yield
+        finally:
+            ScanEventLogService.flush()
+            ScanEventLogService._local.buffer = None
+
+    @staticmethod
+    def current_state(scan_ids):
+        """
+        Latest event of each module of the scans: a compact projection of the
+        timeline, one row per (scan, module)
+
+        Returns:
+            dict: {scan_id: {module: {'status', 'progress', 'shard_id', 'message', 'occurred_at'}}}
+        """
+        latest_ids = (
+            ScanEvent.objects.filter(scan_id__in=scan_ids)
+            .values('scan_id', 'module')
+            .annotate(latest_id=Max('id'))
+            .values('latest_id')
+        )
+        state = {scan_id: {} for scan_id in scan_ids}
+        for event in ScanEvent.objects.filter(scan_id__in=scan_ids, id__in=latest_ids).order_by():
+            state[event.scan_id][event.module] = {
+                'status': event.status,
+                'progress': event.progress,
+                'shard_id': event.shard_id,
+                'message': event.message,
+                'occurred_at': event.occurred_at,
+            }
+        return state
+
+    @staticmethod
+    def phase_timings(scan_id):
+        """
+        Start, end and duration of every module of the scan, from its timeline:
+        first running update and last terminal update, one aggregate query
+
+        Returns:
+            dict: {module: {'started_at', 'completed_at', 'duration_seconds', 'events'}}
+        """
+        rows = (
+            ScanEvent.objects.filter(scan_id=scan_id)
+            .exclude(module=ScanEvent.SCAN_MODULE)
+            .values('module')
+            .annotate(
+                started_at=Min('occurred_at', filter=Q(status__in=ScanEvent.RUNNING_STATUSES)),
+                completed_at=Max('occurred_at', filter=Q(status__in=ScanEventLogService.TERMINAL_STATUSES)),
+                events=Count('id')
+            )
+            .order_by()
+        )
+        timings = {}
+        for row in rows:
+            started_at, completed_at = row['started_at'], row['completed_at']
+            timings[row['module']] = {
+                'started_at': started_at,
+                'completed_at': completed_at,
+                'duration_seconds': (completed_at - started_at).total_seconds() if started_at and completed_at else None,
+                'events': row['events'],
+            }
+        return timings
+
+    @staticmethod
+    def ensure_partitions():
+        """Create the monthly partitions of the scan event log ahead of time (PostgreSQL)"""
+        try:
+            created = ensure_monthly_partitions(
+                connection, ScanEvent._meta.db_table, settings.SCAN_EVENT_PARTITION_MONTHS_AHEAD
+            )
+            if created:
+                logger.info(f"Created scan event partitions: {', '.join(created)}")
+            return created
+        except Exception as e:
+            logger.error(f"Error creating scan event partitions: {str(e)}")
+            return []
@@ -1,6 +1,16 @@
 import django_filters
 from django.db.models import Q
-from .models import Customer, Target, Scan
+from rest_framework.exceptions import ValidationError
+from .models import Customer, Target, Scan, Vulnerability, OsMatch, ScriptResult, ServiceInventory, ScanDiff
+from .search import address_bounds, overlaps
+
+
+def filter_network(queryset, value, prefix=''):
+    """Targets (or rows of targets) whose address range overlaps an IP, CIDR or start-end range"""
+    bounds = address_bounds(value)
+    if bounds is None:
+        raise ValidationError({'network': f"Invalid IP address or network: {value}"})
+    return queryset.filter(overlaps(bounds, prefix))
 
 
 class CustomerFilter(django_filters.FilterSet):
@@ -25,6 +35,7 @@ class TargetFilter(django_filters.FilterSet):
     customer_name = django_filters.CharFilter(field_name='customer__name', lookup_expr='icontains')
     name = django_filters.CharFilter(lookup_expr='icontains')
     address = django_filters.CharFilter(lookup_expr='icontains')
+    network = django_filters.CharFilter(method='filter_network')
     created_after = django_filters.DateTimeFilter(field_name='created_at', lookup_expr='gte')
     created_before = django_filters.DateTimeFilter(field_name='created_at', lookup_expr='lte')
     
@@ -43,6 +54,10 @@ class TargetFilter(django_filters.FilterSet):
             thirty_days_ago = timezone.now() - timedelta(days=30)
             return queryset.filter(scans__initiated_at__gte=thirty_days_ago).distinct()
         return queryset
+    
+    def filter_network(self, queryset, name, value):
+        """IP/CIDR-aware match: 10.0.0.5 also finds the 10.0.0.0/24 target"""
+        return filter_network(queryset, value)
 
 
 class ScanFilter(django_filters.FilterSet):
@@ -51,6 +66,7 @@ class ScanFilter(django_filters.FilterSet):
     target = django_filters.ModelChoiceFilter(queryset=Target.objects.all())
     target_name = django_filters.CharFilter(field_name='target__name', lookup_expr='icontains')
     target_address = django_filters.CharFilter(field_name='target__address', lookup_expr='icontains')
+    target_network = django_filters.CharFilter(method='filter_target_network')
     customer = django_filters.ModelChoiceFilter(field_name='target__customer', queryset=Customer.objects.all())
     customer_name = django_filters.CharFilter(field_name='target__customer__name', lookup_expr='icontains')
     
@@ -76,6 +92,10 @@ class ScanFilter(django_filters.FilterSet):
         model = Scan
         fields = ['target', 'scan_type', 'status']
     
+    def filter_target_network(self, queryset, name, value):
+        """Scans of the targets overlapping an IP, CIDR or start-end range"""
+        return filter_network(queryset, value, 'target__')
+    
     def filter_is_running(self, queryset, name, value):
         """Filter running scans"""
         running_statuses = [
@@ -100,4 +120,80 @@ class ScanFilter(django_filters.FilterSet):
         if value:
             return queryset.filter(Q(status='Failed') | Q(error_message__isnull=False))
         else:
-            return queryset.filter(status__ne='Failed', error_message__isnull=True)
\ No newline at end of file
+            return queryset.filter(status__ne='Failed', error_message__isnull=True)
+
+
+class VulnerabilityFilter(django_filters.FilterSet):
+    """Filter for Vulnerability model"""
+    
+    customer = django_filters.ModelChoiceFilter(field_name='target__customer', queryset=Customer.objects.all())
+    cve = django_filters.CharFilter(method='filter_cve')
+    severity_min = django_filters.NumberFilter(field_name='severity', lookup_expr='gte')
+    severity_max = django_filters.NumberFilter(field_name='severity', lookup_expr='lte')
+    threat = django_filters.MultipleChoiceFilter(choices=Vulnerability.THREAT_CHOICES)
+    
+    class Meta:
+        model = Vulnerability
+        fields = ['scan', 'target', 'gce_result', 'nvt_oid', 'host', 'port', 'protocol']
+    
+    def filter_cve(self, queryset, name, value):
+        """Exact match on the indexed CVE table (stored uppercase)"""
+        return queryset.filter(cve_refs__cve=value.strip().upper())
+
+
+class OsMatchFilter(django_filters.FilterSet):
+    """Filter for OsMatch model"""
+    
+    customer = django_filters.ModelChoiceFilter(field_name='target__customer', queryset=Customer.objects.all())
+    accuracy_min = django_filters.NumberFilter(field_name='accuracy', lookup_expr='gte')
+    best = django_filters.BooleanFilter(method='filter_best')
+    
+    class Meta:
+        model = OsMatch
+        fields = ['scan', 'target', 'host', 'vendor', 'osfamily', 'osgen']
+    
+    def filter_best(self, queryset, name, value):
+        """Only the most accurate match of each host"""
+        return queryset.filter(rank=0) if value else queryset.exclude(rank=0)
+
+
+class ScriptResultFilter(django_filters.FilterSet):
+    """Filter for ScriptResult model"""
+    
+    customer = django_filters.ModelChoiceFilter(field_name='target__customer', queryset=Customer.objects.all())
+    host_scripts = django_filters.BooleanFilter(field_name='port', lookup_expr='isnull')
+    
+    class Meta:
+        model = ScriptResult
+        fields = ['scan', 'target', 'host', 'port', 'protocol', 'script_id']
+
+
+class ServiceInventoryFilter(django_filters.FilterSet):
+    """Filter for ServiceInventory model"""
+    
+    customer = django_filters.ModelChoiceFilter(field_name='target__customer', queryset=Customer.objects.all())
+    product = django_filters.CharFilter(lookup_expr='icontains')
+    seen_after = django_filters.DateTimeFilter(field_name='last_seen', lookup_expr='gte')
+    seen_before = django_filters.DateTimeFilter(field_name='last_seen', lookup_expr='lte')
+    first_seen_after = django_filters.DateTimeFilter(field_name='first_seen', lookup_expr='gte')
+    
+    class Meta:
+        model = ServiceInventory
+        fields = ['target', 'host', 'port', 'protocol', 'service', 'version', 'is_open', 'last_scan']
+
+
+class ScanDiffFilter(django_filters.FilterSet):
+    """Filter for ScanDiff model"""
+    
+    customer = django_filters.ModelChoiceFilter(field_name='target__customer', queryset=Customer.objects.all())
+    since = django_filters.DateTimeFilter(field_name='computed_at', lookup_expr='gte')
+    new_ports = django_filters.BooleanFilter(field_name='ports_added', method='filter_positive')
+    new_vulns = django_filters.BooleanFilter(field_name='vulns_added', method='filter_positive')
+    
+    class Meta:
+        model = ScanDiff
+        fields = ['target', 'scan', 'has_changes']
+    
+    def filter_positive(self, queryset, name, value):
+        """Diffs with (or without) at least one added port/finding"""
+        return queryset.filter(**{f'{name}__gt': 0}) if value else queryset.filter(**{name: 0})
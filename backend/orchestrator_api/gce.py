@@ -0,0 +1,412 @@
+# backend/orchestrator_api/gce.py
+
+import gzip
+import io
+import logging
+import os
+import uuid
+import xml.etree.ElementTree as ET
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import GceResult, Vulnerability, VulnerabilityCve
+from . import codec
+from .messaging import RabbitMQService
+
+logger = logging.getLogger(__name__)
+
+
+class GceReportStorageService:
+    """Append-only storage of the gzip-compressed GCE reports uploaded in chunks"""
+
+    @staticmethod
+    def report_name(scan, gce_task_id):
+        """Storage name, relative to MEDIA_ROOT"""
+        return f"gce_reports/scan_{scan.id}/{gce_task_id}.xml.gz"
+
+    @staticmethod
+    def report_path(scan, gce_task_id):
+        return os.path.join(settings.MEDIA_ROOT, GceReportStorageService.report_name(scan, gce_task_id))
+
+    @staticmethod
+    def append_chunk(scan, gce_task_id, offset, data):
+        """
+        Write a chunk at the given offset, truncating anything stored after it:
+        a retransmitted chunk overwrites itself and offset 0 restarts the upload.
+
+        Returns:
+            int: file size after the write, None if the offset would leave a gap
+        """
+        path = GceReportStorageService.report_path(scan, gce_task_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if offset > size:
+            logger.error(f"GCE report upload for scan {scan.id}: offset {offset} beyond stored size {size}")
+            return None
+
+        with open(path, 'r+b' if size else 'wb') as report_file:
+            report_file.seek(offset)
+            report_file.truncate()
+            report_file.write(data)
+            return report_file.tell()
+
+    @staticmethod
+    def finalize(scan, gce_task_id, size):
+        """
+        Attach the completed upload to the GceResult of the task.
+
+        Returns:
+            GceResult or None if the stored size does not match the announced one
+        """
+        path = GceReportStorageService.report_path(scan, gce_task_id)
+        stored_size = os.path.getsize(path) if os.path.exists(path) else 0
+        if stored_size != size:
+            logger.error(f"GCE report upload for scan {scan.id} incomplete: {stored_size}/{size} bytes")
+            return None
+
+        gce_result, _ = GceResult.objects.update_or_create(
+            scan=scan,
+            target=scan.target,
+            gce_task_id=gce_task_id,
+            defaults={
+                'report_file': GceReportStorageService.report_name(scan, gce_task_id),
+                'report_size': size,
+                'report_format': 'XML',
+            }
+        )
+        logger.info(f"Stored GCE report for scan {scan.id} ({size} bytes compressed)")
+        return gce_result
+
+
+class GceReportParser:
+    """Streaming parser of GCE XML reports: one finding per <result>, memory independent of report size"""
+
+    # Soglie CVSS delle severità GCE; sotto 0.1 il risultato è solo 'log'
+    SEVERITY_LEVELS = (('critical', 9.0), ('high', 7.0), ('medium', 4.0), ('low', 0.1))
+
+    @staticmethod
+    def severity_level(severity):
+        for level, threshold in GceReportParser.SEVERITY_LEVELS:
+            if severity >= threshold:
+                return level
+        return 'log'
+
+    @staticmethod
+    def _count(value):
+        """Integer of a <result_count> entry: plain text, or {'full': ...} since GMP 8"""
+        if isinstance(value, dict):
+            value = value.get('full', value.get('#text'))
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return 0
+
+    @staticmethod
+    def result_count_summary(full_report_content, report_format):
+        """
+        Severity counts of a report that is not ingested into Vulnerability rows.
+        XML reports are counted with the streaming parser; JSON reports (the GMP
+        response converted by xmltodict) only carry the totals of <result_count>.
+        """
+        counts = {'critical': 0, 'high': 0, 'medium': 0, 'low': 0, 'log': 0, 'total': 0}
+        if not full_report_content:
+            return counts
+
+        try:
+            if report_format == 'XML':
+                for finding in GceReportParser.iter_findings(io.BytesIO(full_report_content.encode('utf-8'))):
+                    counts[finding['threat']] += 1
+                    counts['total'] += 1
+            elif report_format == 'JSON':
+                report = codec.loads(full_report_content).get('get_reports_response', {}).get('report', {})
+                result_count = report.get('result_count') or {}
+                levels = ('high', 'medium', 'low', 'log')
+                for level in levels:
+                    counts[level] = GceReportParser._count(result_count.get(level))
+                counts['total'] = (
+                    GceReportParser._count(result_count.get('full')) or sum(counts[level] for level in levels)
+                )
+            else:
+                logger.warning(f"Unsupported GCE report format: {report_format}")
+        except (ET.ParseError, ValueError, AttributeError) as e:
+            logger.error(f"Error parsing the summary of a {report_format} GCE report: {str(e)}")
+
+        return counts
+
+    @staticmethod
+    def iter_findings(source):
+        """
+        Yield a finding dict for every top-level <result> of the report.
+        Results nested elsewhere (e.g. <detection><result>) are ignored.
+
+        Args:
+            source: path or binary file object (e.g. gzip.open of the stored report)
+        """
+        stack = []
+        results = None
+        for event, elem in ET.iterparse(source, events=('start', 'end')):
+            if event == 'start':
+                if elem.tag == 'results' and results is None:
+                    results = elem
+                stack.append(elem.tag)
+                continue
+
+            stack.pop()
+            if elem.tag == 'result' and stack and stack[-1] == 'results':
+                yield GceReportParser.parse_result(elem)
+                # Staccato dall'albero: la memoria resta quella di un singolo <result>
+                results.remove(elem)
+
+    @staticmethod
+    def parse_result(elem):
+        """Convert a <result> element into a finding dict"""
+        nvt = elem.find('nvt')
+        host_elem = elem.find('host')
+
+        port, protocol = None, ''
+        port_text = (elem.findtext('port') or '').strip()
+        if '/' in port_text:
+            number, protocol = port_text.split('/', 1)
+            port = int(number) if number.isdigit() else None
+
+        try:
+            severity = float(elem.findtext('severity') or 0)
+        except ValueError:
+            severity = 0.0
+
+        qod = (elem.findtext('qod/value') or '').strip()
+
+        try:
+            result_id = str(uuid.UUID(elem.get('id'))) if elem.get('id') else None
+        except ValueError:
+            result_id = None
+
+        cves = set()
+        if nvt is not None:
+            for ref in nvt.iterfind('refs/ref'):
+                if ref.get('type', '').lower() == 'cve' and ref.get('id'):
+                    cves.add(ref.get('id').strip().upper())
+            # GMP < 8 riporta le CVE come testo separato da virgole in <nvt><cve>
+            for cve in (nvt.findtext('cve') or '').split(','):
+                cve = cve.strip()
+                if cve.upper().startswith('CVE-'):
+                    cves.add(cve.upper())
+
+        return {
+            'result_id': result_id,
+            'nvt_oid': nvt.get('oid', '') if nvt is not None else '',
+            'name': ((elem.findtext('name') or (nvt.findtext('name') if nvt is not None else '')) or '')[:500],
+            'family': ((nvt.findtext('family') if nvt is not None else '') or '')[:255],
+            'host': ((host_elem.text or '').strip() if host_elem is not None else '')[:255],
+            'hostname': ((host_elem.findtext('hostname') if host_elem is not None else '') or '').strip()[:255],
+            'port': port,
+            'protocol': protocol[:10],
+            'severity': severity,
+            'threat': GceReportParser.severity_level(severity),
+            'qod': int(qod) if qod.isdigit() else None,
+            'description': elem.findtext('description') or '',
+            'solution': (nvt.findtext('solution') if nvt is not None else '') or '',
+            'cves': sorted(cves),
+        }
+
+
+class VulnerabilityIngestService:
+    """Populate the Vulnerability table from a GCE report, in batches"""
+
+    BATCH_SIZE = 1000
+
+    @staticmethod
+    def ingest(gce_result, source, batch_size=None):
+        """
+        Replace the findings of a GceResult with the ones parsed from source
+        and store the severity counts. Runs in a transaction: on a parse error
+        the previous findings are kept.
+
+        Returns:
+            dict: severity counts, or None if the report could not be parsed
+        """
+        batch_size = batch_size or VulnerabilityIngestService.BATCH_SIZE
+        counts = {'critical': 0, 'high': 0, 'medium': 0, 'low': 0, 'log': 0, 'total': 0}
+
+        try:
+            with transaction.atomic():
+                Vulnerability.all_objects.filter(gce_result=gce_result).delete()
+
+                batch = []
+                for finding in GceReportParser.iter_findings(source):
+                    counts[finding['threat']] += 1
+                    counts['total'] += 1
+                    batch.append(finding)
+                    if len(batch) >= batch_size:
+                        VulnerabilityIngestService._flush(gce_result, batch)
+                        batch = []
+                if batch:
+                    VulnerabilityIngestService._flush(gce_result, batch)
+
+                gce_result.vulnerability_count = counts
+                gce_result.save(update_fields=['vulnerability_count', 'updated_at'])
+
+        except ET.ParseError as e:
+            logger.error(f"Error parsing GCE report of result {gce_result.id}: {str(e)}")
+            return None
+
+        logger.info(f"Ingested {counts['total']} GCE findings for scan {gce_result.scan_id}")
+        return counts
+
+    @staticmethod
+    def _flush(gce_result, findings):
+        vulnerabilities = Vulnerability.objects.bulk_create([
+            Vulnerability(
+                scan_id=gce_result.scan_id,
+                target_id=gce_result.target_id,
+                gce_result=gce_result,
+                **{key: value for key, value in finding.items() if key != 'cves'}
+            )
+            for finding in findings
+        ])
+        VulnerabilityCve.objects.bulk_create([
+            VulnerabilityCve(vulnerability=vulnerability, cve=cve)
+            for vulnerability, finding in zip(vulnerabilities, findings)
+            for cve in finding['cves']
+        ])
+
+
+class GceIngestService:
+    """
+    Background ingest of stored GCE reports: the API persists the raw report
+    and publishes a job, the consume_gce_ingest workers parse it into counts
+    and Vulnerability rows.
+    """
+
+    @staticmethod
+    def request(gce_result):
+        """Mark the result as pending and publish an ingest job once the transaction commits"""
+        requested_at = timezone.now()
+        GceResult.objects.filter(id=gce_result.id).update(
+            ingest_status='pending',
+            ingest_requested_at=requested_at,
+            ingest_error=None,
+        )
+        gce_result.ingest_status = 'pending'
+        gce_result.ingest_requested_at = requested_at
+
+        message = {
+            'gce_result_id': gce_result.id,
+            'gce_task_id': str(gce_result.gce_task_id),
+            'scan_id': gce_result.scan_id,
+            'requested_at': requested_at.isoformat(),
+        }
+        transaction.on_commit(lambda: GceIngestService._publish(settings.RABBITMQ_GCE_INGEST_QUEUE, message))
+
+    @staticmethod
+    def requeue_pending():
+        """Publish again the jobs of results still pending (e.g. broker down when requested)"""
+        pending = GceResult.objects.filter(ingest_status='pending')
+        count = 0
+        for gce_result in pending:
+            GceIngestService.request(gce_result)
+            count += 1
+        return count
+
+    @staticmethod
+    def process(message):
+        """
+        Run an ingest job. Idempotent per gce_task_id: the GceResult row stays
+        locked for the whole ingest, so duplicate deliveries run one at a time,
+        and a job requested before the last completed ingest is skipped.
+        Findings are always replaced, never appended.
+
+        Returns:
+            bool: False if the GceResult does not exist
+        """
+        gce_result_id = message.get('gce_result_id')
+        requested_at = parse_datetime(message.get('requested_at') or '')
+
+        GceResult.objects.filter(id=gce_result_id, ingest_status='pending').update(ingest_status='running')
+
+        with transaction.atomic():
+            try:
+                gce_result = GceResult.objects.select_for_update().get(id=gce_result_id)
+            except GceResult.DoesNotExist:
+                logger.error(f"GceResult {gce_result_id} not found, dropping ingest job")
+                return False
+
+            if (gce_result.ingest_status == 'completed' and gce_result.ingested_at
+                    and requested_at and gce_result.ingested_at >= requested_at):
+                logger.info(f"GCE task {gce_result.gce_task_id} already ingested, skipping duplicate job")
+                return True
+
+            try:
+                counts = GceIngestService._ingest(gce_result)
+                error = None if counts is not None else 'Report could not be parsed'
+            except OSError as e:
+                counts, error = None, f"Stored report not readable: {str(e)}"
+
+            gce_result.ingest_status = 'completed' if error is None else 'failed'
+            gce_result.ingest_error = error
+            gce_result.ingested_at = timezone.now()
+            gce_result.save(update_fields=['ingest_status', 'ingest_error', 'ingested_at', 'updated_at'])
+
+        status_update = {
+            'scan_id': gce_result.scan_id,
+            'module': 'gce_ingest',
+            'status': gce_result.ingest_status,
+            'gce_result_id': gce_result.id,
+            'gce_task_id': str(gce_result.gce_task_id),
+            'timestamp': timezone.now().isoformat(),
+        }
+        if error:
+            logger.error(f"GCE ingest failed for task {gce_result.gce_task_id}: {error}")
+            status_update['error_details'] = error
+        else:
+            status_update['message'] = f"{counts.get('total', 0)} GCE findings ingested"
+        GceIngestService._publish(settings.RABBITMQ_SCAN_STATUS_UPDATE_QUEUE, status_update)
+        return True
+
+    @staticmethod
+    def fail(message, error):
+        """Mark the ingest of a job that cannot be retried as failed and report it on the scan"""
+        gce_result_id = message.get('gce_result_id')
+        updated = GceResult.objects.filter(id=gce_result_id).exclude(ingest_status='completed').update(
+            ingest_status='failed',
+            ingest_error=error,
+            ingested_at=timezone.now(),
+        )
+        logger.error(f"GCE ingest failed for result {gce_result_id}: {error}")
+        if updated and message.get('scan_id'):
+            GceIngestService._publish(settings.RABBITMQ_SCAN_STATUS_UPDATE_QUEUE, {
+                'scan_id': message['scan_id'],
+                'module': 'gce_ingest',
+                'status': 'failed',
+                'gce_result_id': gce_result_id,
+                'gce_task_id': message.get('gce_task_id'),
+                'error_details': error,
+                'timestamp': timezone.now().isoformat(),
+            })
+
+    @staticmethod
+    def _ingest(gce_result):
+        """Parse whatever raw report is stored: chunked gzip upload first, then the inline report"""
+        if gce_result.report_file:
+            with gzip.open(gce_result.report_file.path, 'rb') as report_file:
+                return VulnerabilityIngestService.ingest(gce_result, report_file)
+
+        if gce_result.full_report and gce_result.report_format == 'XML':
+            return VulnerabilityIngestService.ingest(gce_result, io.BytesIO(gce_result.full_report.encode('utf-8')))
+
+        if gce_result.full_report:
+            counts = GceReportParser.result_count_summary(gce_result.full_report, gce_result.report_format)
+            gce_result.vulnerability_count = counts
+            gce_result.save(update_fields=['vulnerability_count', 'updated_at'])
+            return counts
+
+        raise OSError("no report stored")
+
+    @staticmethod
+    def _publish(queue_name, message):
+        rabbitmq_service = RabbitMQService()
+        if not rabbitmq_service.publish_message(queue_name, message):
+            logger.error(f"Failed to publish to {queue_name}: {message}")
+        rabbitmq_service.close()
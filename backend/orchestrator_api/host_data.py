@@ -0,0 +1,104 @@
+# backend/orchestrator_api/host_data.py
+
+import logging
+from django.db import transaction
+from .models import OsMatch, ScriptResult
+
+logger = logging.getLogger(__name__)
+
+
+class NmapHostDataService:
+    """
+    OS matches and NSE script output of an nmap scan, stored in the os_match and
+    script_result tables instead of Scan.parsed_nmap_results
+    """
+
+    BATCH_SIZE = 1000
+
+    @staticmethod
+    def split(parsed_nmap_results):
+        """
+        Separate OS matches and script output from the nmap results.
+
+        Returns:
+            tuple: (results without osmatches/scripts, {'os_matches': [...], 'scripts': [...]})
+        """
+        host_data = {'os_matches': [], 'scripts': []}
+        if not parsed_nmap_results or 'hosts' not in parsed_nmap_results:
+            return parsed_nmap_results, host_data
+
+        hosts = []
+        for host in parsed_nmap_results.get('hosts', []):
+            address = host.get('address') or host.get('hostname') or ''
+            for rank, match in enumerate(host.get('osmatches') or []):
+                host_data['os_matches'].append({'host': address, 'rank': rank, **match})
+            for script in host.get('scripts') or []:
+                host_data['scripts'].append({'host': address, 'port': None, 'protocol': '', **script})
+
+            ports = []
+            for port in host.get('ports', []):
+                for script in port.get('scripts') or []:
+                    host_data['scripts'].append({
+                        'host': address,
+                        'port': int(port.get('portid') or 0),
+                        'protocol': port.get('protocol') or '',
+                        **script
+                    })
+                ports.append({key: value for key, value in port.items() if key != 'scripts'})
+
+            # Resta solo l'OS più probabile (host['os']), usato per os_guess
+            host = {key: value for key, value in host.items() if key not in ('osmatches', 'scripts')}
+            host['ports'] = ports
+            hosts.append(host)
+
+        return {**parsed_nmap_results, 'hosts': hosts}, host_data
+
+    @staticmethod
+    def store(scan, host_data):
+        """Replace the OS matches and script results of a scan"""
+        try:
+            with transaction.atomic():
+                OsMatch.objects.filter(scan=scan).delete()
+                ScriptResult.objects.filter(scan=scan).delete()
+
+                OsMatch.objects.bulk_create(
+                    (
+                        OsMatch(
+                            scan=scan,
+                            target_id=scan.target_id,
+                            host=match['host'],
+                            rank=match['rank'],
+                            name=(match.get('name') or '')[:255],
+                            accuracy=int(match.get('accuracy') or 0),
+                            line=match.get('line') or '',
+                            vendor=(match.get('osclass') or {}).get('vendor') or '',
+                            os_type=(match.get('osclass') or {}).get('type') or '',
+                            osfamily=(match.get('osclass') or {}).get('osfamily') or '',
+                            osgen=(match.get('osclass') or {}).get('osgen') or '',
+                            cpe=match.get('cpe') or [],
+                        )
+                        for match in host_data['os_matches']
+                    ),
+                    batch_size=NmapHostDataService.BATCH_SIZE
+                )
+                ScriptResult.objects.bulk_create(
+                    (
+                        ScriptResult(
+                            scan=scan,
+                            target_id=scan.target_id,
+                            host=script['host'],
+                            port=script['port'],
+                            protocol=script['protocol'],
+                            script_id=script.get('id') or '',
+                            output=script.get('output') or '',
+                        )
+                        for script in host_data['scripts']
+                    ),
+                    batch_size=NmapHostDataService.BATCH_SIZE
+                )
+
+            logger.info(f"Stored {len(host_data['os_matches'])} OS matches and "
+                        f"{len(host_data['scripts'])} script results for scan {scan.id}")
+
+        except Exception as e:
+            logger.error(f"Error storing OS matches and script results for scan {scan.id}: {str(e)}")
@@ -0,0 +1,334 @@
+# backend/orchestrator_api/incremental.py
+
+import logging
+from django.db import transaction
+from .models import Scan, ScanDetail, FingerprintDetail, GceResult, Vulnerability, VulnerabilityCve
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalScanService:
+    """Service for incremental scans that reuse the results of a baseline scan"""
+
+    # Plugins that only need to look at ports whose state or service changed
+    DELTA_PLUGINS = ('fingerprint', 'gce')
+
+    # Port attributes compared against the baseline
+    COMPARED_FIELDS = ('state', 'service', 'product', 'version')
+
+    # gce_scan_status of the GceResult holding the findings copied from the baseline
+    INHERITED_GCE_STATUS = 'Inherited'
+
+    @staticmethod
+    def find_baseline(scan):
+        """Return the most recent completed scan of the same target with parsed ports"""
+        return Scan.objects.filter(
+            target=scan.target,
+            status='Completed',
+            details__open_ports__isnull=False,
+        ).exclude(id=scan.id).select_related('details').order_by('-completed_at').first()
+
+    @staticmethod
+    def prepare_scan(scan):
+        """Attach a baseline to an incremental scan, falling back to a full scan if none exists"""
+        if scan.scan_mode != 'incremental':
+            return scan
+
+        if not scan.baseline_scan_id:
+            baseline = IncrementalScanService.find_baseline(scan)
+            if baseline:
+                scan.baseline_scan = baseline
+                logger.info(f"Scan {scan.id} is incremental against baseline scan {baseline.id}")
+            else:
+                scan.scan_mode = 'full'
+                logger.info(f"No baseline found for scan {scan.id}, running a full scan")
+            scan.save(update_fields=['scan_mode', 'baseline_scan', 'updated_at'])
+        return scan
+
+    @staticmethod
+    def _index_ports(open_ports, default_host=''):
+        """Map (protocol, host, port) -> port data for an open_ports dict"""
+        index = {}
+        for protocol in ('tcp', 'udp'):
+            for port_data in (open_ports or {}).get(protocol, []):
+                host = port_data.get('host') or default_host
+                index[(protocol, host, port_data.get('port'))] = port_data
+        return index
+
+    @staticmethod
+    def compute_port_delta(baseline_open_ports, open_ports, default_host=''):
+        """
+        Compare two open_ports dicts (see NmapResultsParser.extract_open_ports).
+        Ports recorded without a host are attributed to default_host.
+
+        Returns:
+            dict: {"added": [...], "removed": [...], "changed": [...], "unchanged": int}
+        """
+        baseline = IncrementalScanService._index_ports(baseline_open_ports, default_host)
+        current = IncrementalScanService._index_ports(open_ports, default_host)
+
+        delta = {'added': [], 'removed': [], 'changed': [], 'unchanged': 0}
+
+        for key in sorted(current.keys() | baseline.keys()):
+            protocol, host, port = key
+            new, old = current.get(key), baseline.get(key)
+            if old is None:
+                delta['added'].append({'protocol': protocol, **new})
+            elif new is None:
+                delta['removed'].append({'protocol': protocol, **old})
+            elif any(new.get(f) != old.get(f) for f in IncrementalScanService.COMPARED_FIELDS):
+                delta['changed'].append({
+                    'protocol': protocol,
+                    'host': host,
+                    'port': port,
+                    'before': {f: old.get(f) for f in IncrementalScanService.COMPARED_FIELDS if old.get(f)},
+                    'after': {f: new.get(f) for f in IncrementalScanService.COMPARED_FIELDS if new.get(f)},
+                })
+            else:
+                delta['unchanged'] += 1
+
+        return delta
+
+    @staticmethod
+    def process_nmap_delta(scan, scan_detail):
+        """Store the port delta against the baseline on the scan detail"""
+        if scan.scan_mode != 'incremental' or not scan.baseline_scan_id:
+            return None
+
+        baseline_detail = ScanDetail.objects.filter(scan_id=scan.baseline_scan_id).first()
+        baseline_ports = baseline_detail.open_ports if baseline_detail else None
+
+        delta = IncrementalScanService.compute_port_delta(
+            baseline_ports, scan_detail.open_ports, scan.target.address
+        )
+        scan_detail.port_delta = delta
+
+        logger.info(
+            f"Scan {scan.id} delta vs baseline {scan.baseline_scan_id}: "
+            f"{len(delta['added'])} added, {len(delta['removed'])} removed, "
+            f"{len(delta['changed'])} changed, {delta['unchanged']} unchanged"
+        )
+        return delta
+
+    @staticmethod
+    def delta_ports(scan):
+        """
+        Ports a delta-aware plugin must (re)scan, or None when the plugin
+        has to run on everything (full scan or no delta computed).
+        """
+        if scan.scan_mode != 'incremental' or not scan.baseline_scan_id:
+            return None
+
+        scan_detail = ScanDetail.objects.filter(scan=scan).first()
+        if not scan_detail or scan_detail.port_delta is None:
+            return None
+
+        delta = scan_detail.port_delta
+        ports = []
+        for entry in delta.get('added', []) + delta.get('changed', []):
+            port = {'port': entry['port'], 'protocol': entry['protocol']}
+            if entry.get('host'):
+                port['host'] = entry['host']
+            ports.append(port)
+        return ports
+
+    @staticmethod
+    def _host(scan, host):
+        """Same host convention as ScanDiffService._host"""
+        return (host if scan.target.is_range else None) or scan.target.address
+
+    @staticmethod
+    def _fingerprint_key(scan, protocol, host, port):
+        """(protocol, host, port) of a fingerprint or delta entry"""
+        return (protocol, IncrementalScanService._host(scan, host), int(port))
+
+    @staticmethod
+    def _covered_by_delta(scan):
+        """Keys of the removed and changed ports of an incremental scan"""
+        key = IncrementalScanService._fingerprint_key
+        delta = ScanDetail.objects.filter(scan=scan).values_list('port_delta', flat=True).first() or {}
+        return {
+            key(scan, e['protocol'], e.get('host'), e['port'])
+            for e in delta.get('removed', []) + delta.get('changed', [])
+        }
+
+    @staticmethod
+    def _inheritable_fingerprints(scan):
+        """
+        Baseline fingerprints of the ports still open and unchanged that the
+        scan has no row for. A completed baseline already holds the rows it
+        inherited (see materialize_fingerprints): one level is enough.
+        """
+        if scan.scan_mode != 'incremental' or not scan.baseline_scan_id:
+            return []
+
+        key = IncrementalScanService._fingerprint_key
+        # Removed ports are gone, changed ports were re-fingerprinted: never inherit them
+        covered = IncrementalScanService._covered_by_delta(scan)
+        covered.update(
+            key(scan, protocol, (additional_info or {}).get('host'), port)
+            for protocol, port, additional_info in FingerprintDetail.objects.filter(scan=scan).values_list(
+                'protocol', 'port', 'additional_info'
+            )
+        )
+
+        baseline_rows = FingerprintDetail.objects.filter(scan_id=scan.baseline_scan_id).select_related('target')
+        return [
+            fp for fp in baseline_rows
+            if key(scan, fp.protocol, (fp.additional_info or {}).get('host'), fp.port) not in covered
+        ]
+
+    @staticmethod
+    def effective_fingerprints(scan):
+        """
+        Fingerprints valid for a scan: its own rows plus, for incremental
+        scans, the baseline rows of ports that are still open and unchanged.
+        """
+        own = list(FingerprintDetail.objects.filter(scan=scan).select_related('target'))
+        inherited = IncrementalScanService._inheritable_fingerprints(scan)
+        return sorted(own + inherited, key=lambda fp: (fp.protocol, fp.port))
+
+    @staticmethod
+    def materialize_fingerprints(scan):
+        """
+        Copy the inherited baseline fingerprints into a finished incremental
+        scan, so that it no longer depends on the baseline chain. Idempotent:
+        the copied rows cover their ports on the next call.
+
+        Returns:
+            int: number of rows copied
+        """
+        inherited = IncrementalScanService._inheritable_fingerprints(scan)
+        for fp in inherited:
+            fp.pk = None
+            fp.scan_id = scan.id
+            # Scansione che ha davvero rilevato il fingerprint, anche attraverso più baseline
+            fp.additional_info = {'inherited_from_scan': scan.baseline_scan_id, **(fp.additional_info or {})}
+        FingerprintDetail.objects.bulk_create(inherited, batch_size=1000)
+        if inherited:
+            logger.info(f"Scan {scan.id}: {len(inherited)} fingerprints inherited from baseline {scan.baseline_scan_id}")
+        return len(inherited)
+
+    @staticmethod
+    def _vulnerability_key(scan, host, port, protocol):
+        """(protocol, host, port) of a finding, host-level findings ('general/tcp') on port -1"""
+        return (protocol or '', IncrementalScanService._host(scan, host), port if port is not None else -1)
+
+    @staticmethod
+    def _inheritable_vulnerabilities(scan):
+        """
+        Baseline findings of the ports still open and unchanged, and of the
+        hosts, that the scan has no finding for. As for the fingerprints, a
+        completed baseline already holds the findings it inherited.
+        """
+        if scan.scan_mode != 'incremental' or not scan.baseline_scan_id:
+            return []
+
+        key = IncrementalScanService._vulnerability_key
+        # Le porte rimosse non hanno più finding, quelle cambiate sono state riscansionate da GCE
+        covered = IncrementalScanService._covered_by_delta(scan)
+        covered.update(
+            key(scan, host, port, protocol)
+            for host, port, protocol in Vulnerability.objects.filter(scan=scan).values_list('host', 'port', 'protocol')
+        )
+
+        baseline_rows = Vulnerability.objects.filter(scan_id=scan.baseline_scan_id).prefetch_related('cve_refs')
+        return [
+            vuln for vuln in baseline_rows
+            if key(scan, vuln.host, vuln.port, vuln.protocol) not in covered
+        ]
+
+    @staticmethod
+    def effective_vulnerabilities(scan):
+        """
+        Findings valid for a scan: its own rows plus, for incremental scans,
+        the baseline findings of ports and hosts it did not rescan.
+        """
+        own = list(Vulnerability.objects.filter(scan=scan))
+        inherited = IncrementalScanService._inheritable_vulnerabilities(scan)
+        return own + inherited
+
+    @staticmethod
+    def effective_vulnerability_counts(scan, severities=('critical', 'high', 'medium', 'low', 'log')):
+        """
+        Severity counts of the effective findings: the counts stored on the
+        scan's GceResults (reports not ingested into rows included) plus the
+        findings still to be inherited from the baseline.
+        """
+        counts = dict.fromkeys(severities, 0)
+        for stored in GceResult.objects.filter(scan=scan).values_list('vulnerability_count', flat=True):
+            for severity in severities:
+                counts[severity] += int((stored or {}).get(severity) or 0)
+        for vuln in IncrementalScanService._inheritable_vulnerabilities(scan):
+            if vuln.threat in counts:
+                counts[vuln.threat] += 1
+        return counts
+
+    @staticmethod
+    def materialize_vulnerabilities(scan):
+        """
+        Copy the inherited baseline findings into a finished incremental scan,
+        under a GceResult of their own (gce_scan_status INHERITED_GCE_STATUS).
+        The GCE ingest may end after the scan: copies at locations that the
+        scan's own findings now cover are dropped first, so the call can be
+        repeated after each ingest.
+
+        Returns:
+            int: number of rows copied
+        """
+        key = IncrementalScanService._vulnerability_key
+        with transaction.atomic():
+            holder = GceResult.objects.filter(
+                scan=scan, gce_scan_status=IncrementalScanService.INHERITED_GCE_STATUS
+            ).first()
+
+            stale = []
+            if holder:
+                own = {
+                    key(scan, host, port, protocol)
+                    for host, port, protocol in Vulnerability.objects.filter(scan=scan).exclude(
+                        gce_result=holder
+                    ).values_list('host', 'port', 'protocol')
+                }
+                stale = [
+                    vuln_id for vuln_id, host, port, protocol in Vulnerability.objects.filter(
+                        gce_result=holder
+                    ).values_list('id', 'host', 'port', 'protocol')
+                    if key(scan, host, port, protocol) in own
+                ]
+                Vulnerability.all_objects.filter(id__in=stale).delete()
+
+            inherited = IncrementalScanService._inheritable_vulnerabilities(scan)
+            if inherited and holder is None:
+                holder = GceResult.objects.create(
+                    scan=scan,
+                    target_id=scan.target_id,
+                    gce_scan_status=IncrementalScanService.INHERITED_GCE_STATUS,
+                    gce_scan_progress=100,
+                )
+
+            cves = []
+            for vuln in inherited:
+                cves.append([ref.cve for ref in vuln.cve_refs.all()])
+                vuln.pk = None
+                vuln.scan_id = scan.id
+                vuln.gce_result = holder
+            inherited = Vulnerability.objects.bulk_create(inherited, batch_size=1000)
+            VulnerabilityCve.objects.bulk_create([
+                VulnerabilityCve(vulnerability=vuln, cve=cve)
+                for vuln, vuln_cves in zip(inherited, cves)
+                for cve in vuln_cves
+            ], batch_size=1000)
+
+            if holder and (stale or inherited):
+                # Stessa forma dei conteggi dell'ingest (VulnerabilityIngestService)
+                counts = {'critical': 0, 'high': 0, 'medium': 0, 'low': 0, 'log': 0, 'total': 0}
+                for threat in Vulnerability.objects.filter(gce_result=holder).values_list('threat', flat=True):
+                    counts[threat] += 1
+                    counts['total'] += 1
+                holder.vulnerability_count = counts
+                holder.save(update_fields=['vulnerability_count', 'updated_at'])
+
+        if inherited:
+            logger.info(f"Scan {scan.id}: {len(inherited)} findings inherited from baseline {scan.baseline_scan_id}")
+        return len(inherited)
@@ -0,0 +1,144 @@
+# backend/orchestrator_api/inventory.py
+
+import logging
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import ServiceInventory
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceInventoryService:
+    """Bulk upserts (ON CONFLICT DO UPDATE) into the ServiceInventory table"""
+
+    BATCH_SIZE = 1000
+
+    # Updated only when the source reports a value, so that an nmap scan
+    # without -sV does not wipe the product/version found by fingerprint
+    SERVICE_FIELDS = ('service', 'product', 'version')
+
+    @staticmethod
+    def _host(scan, host):
+        """Same host convention as ScanSnapshotService.open_ports"""
+        return (host if scan.target.is_range else None) or scan.target.address
+
+    @staticmethod
+    def _upsert(rows):
+        groups = {}
+        for row in rows:
+            fields = tuple(field for field in ServiceInventoryService.SERVICE_FIELDS if getattr(row, field))
+            groups.setdefault(fields, []).append(row)
+
+        for fields, group in groups.items():
+            # first_seen non è tra i campi aggiornati: resta quello del primo inserimento
+            ServiceInventory.objects.bulk_create(
+                group,
+                batch_size=ServiceInventoryService.BATCH_SIZE,
+                update_conflicts=True,
+                unique_fields=['target', 'host', 'port', 'protocol'],
+                update_fields=['is_open', 'last_seen', 'last_scan', *fields],
+            )
+
+    @staticmethod
+    def _row(scan, host, port, protocol, seen_at, service='', product='', version=''):
+        return ServiceInventory(
+            target_id=scan.target_id,
+            host=host,
+            port=int(port),
+            protocol=protocol or 'tcp',
+            service=(service or '')[:100],
+            product=(product or '')[:255],
+            version=(version or '')[:255],
+            is_open=True,
+            first_seen=seen_at,
+            last_seen=seen_at,
+            last_scan=scan,
+        )
+
+    @staticmethod
+    def record_nmap(scan, open_ports, hosts=None):
+        """
+        Upsert the open ports of an nmap scan and mark as closed the known
+        ports of the scanned hosts that fall in the scanned port list but
+        were not found open this time. Errors propagate: the caller decides
+        whether the scan can go on (backfill_service_inventory rebuilds it).
+        """
+        now = timezone.now()
+        rows = {}
+        for protocol in ('tcp', 'udp'):
+            for port_data in (open_ports or {}).get(protocol, []):
+                host = ServiceInventoryService._host(scan, port_data.get('host'))
+                rows[(host, int(port_data.get('port', 0)), protocol)] = ServiceInventoryService._row(
+                    scan, host, port_data.get('port', 0), protocol, now,
+                    service=port_data.get('service'),
+                    product=port_data.get('product'),
+                    version=port_data.get('version'),
+                )
+
+        with transaction.atomic():
+            ServiceInventoryService._upsert(list(rows.values()))
+            closed = ServiceInventoryService._close_missing(scan, set(rows), hosts)
+
+        logger.info(f"Service inventory of target {scan.target_id}: {len(rows)} open ports upserted, "
+                    f"{closed} marked closed (scan {scan.id})")
+        return len(rows)
+
+    @staticmethod
+    def _close_missing(scan, seen, hosts):
+        port_list = scan.scan_type.port_list
+        if port_list is None:
+            # Porte di default di nmap: non sappiamo quali porte sono state controllate
+            return 0
+
+        scanned_hosts = {
+            ServiceInventoryService._host(scan, host.get('address'))
+            for host in hosts or []
+            if host.get('state') == 'up'
+        }
+        if not scanned_hosts:
+            return 0
+
+        # Solo le righe aperte degli host scansionati nelle porte della port list, filtrate in SQL
+        scanned_ports = Q(pk__in=[])
+        for protocol, port_set in (('tcp', port_list.tcp_port_set), ('udp', port_list.udp_port_set)):
+            for start, end in port_set.ranges:
+                scanned_ports |= Q(protocol=protocol, port__range=(start, end))
+
+        scanned_hosts = sorted(scanned_hosts)
+        closed_ids = []
+        for start in range(0, len(scanned_hosts), ServiceInventoryService.BATCH_SIZE):
+            candidates = ServiceInventory.objects.filter(
+                scanned_ports,
+                target_id=scan.target_id,
+                is_open=True,
+                host__in=scanned_hosts[start:start + ServiceInventoryService.BATCH_SIZE],
+            ).values_list('id', 'host', 'port', 'protocol')
+            closed_ids.extend(
+                row_id for row_id, host, port, protocol in candidates.iterator()
+                if (host, port, protocol) not in seen
+            )
+        for start in range(0, len(closed_ids), ServiceInventoryService.BATCH_SIZE):
+            ServiceInventory.objects.filter(
+                id__in=closed_ids[start:start + ServiceInventoryService.BATCH_SIZE]
+            ).update(is_open=False, last_scan=scan)
+        return len(closed_ids)
+
+    @staticmethod
+    def record_fingerprints(scan, fingerprint_details):
+        """Upsert the services identified by the fingerprint plugin; errors propagate as in record_nmap"""
+        now = timezone.now()
+        rows = {}
+        for detail in fingerprint_details:
+            host = ServiceInventoryService._host(scan, (detail.additional_info or {}).get('host'))
+            service = detail.service_name if detail.service_name != 'unknown' else ''
+            rows[(host, detail.port, detail.protocol)] = ServiceInventoryService._row(
+                scan, host, detail.port, detail.protocol, now,
+                service=service,
+                product=detail.service_product,
+                version=detail.service_version,
+            )
+
+        with transaction.atomic():
+            ServiceInventoryService._upsert(list(rows.values()))
+        return len(rows)
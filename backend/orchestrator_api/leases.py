@@ -0,0 +1,126 @@
+# backend/orchestrator_api/leases.py
+
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import JobLease
+
+logger = logging.getLogger(__name__)
+
+
+class LeaseService:
+    """
+    Leases of the dispatched plugin jobs. A lease is granted when a job is
+    published, renewed by every status update and heartbeat of the plugin and
+    released when the job reaches a terminal status. LeaseRecoveryService
+    (recovery.py) recovers the jobs whose plugin instance died or whose request
+    was lost.
+    """
+
+    @staticmethod
+    def _lookup(scan_id, plugin, shard_id=None):
+        if shard_id is not None:
+            return {'shard_id': int(shard_id)}
+        return {'scan_id': scan_id, 'plugin': plugin, 'shard__isnull': True}
+
+    @staticmethod
+    def _queued_expiry():
+        return timezone.now() + timedelta(seconds=settings.SCAN_LEASE_QUEUED_TIMEOUT)
+
+    @staticmethod
+    def _requeue(lease, expires_at):
+        lease.attempt += 1
+        lease.state = 'queued'
+        lease.worker = ''
+        lease.expires_at = expires_at
+
+    @staticmethod
+    def grant(scan, plugin, shard=None):
+        """Grant the lease of a job about to be published (a new attempt on re-dispatch)"""
+        expires_at = LeaseService._queued_expiry()
+        lease = JobLease.objects.filter(
+            **LeaseService._lookup(scan.id, plugin, shard.id if shard else None)
+        ).first()
+        if lease is None:
+            return JobLease.objects.create(scan=scan, plugin=plugin, shard=shard, expires_at=expires_at)
+        LeaseService._requeue(lease, expires_at)
+        lease.save(update_fields=['attempt', 'state', 'worker', 'expires_at'])
+        return lease
+
+    @staticmethod
+    def grant_shards(scan, shards):
+        """
+        Grant the leases of several nmap shards with one bulk insert/update.
+
+        Returns:
+            dict: shard id -> lease
+        """
+        expires_at = LeaseService._queued_expiry()
+        leases = {lease.shard_id: lease for lease in JobLease.objects.filter(shard__in=shards)}
+        for lease in leases.values():
+            LeaseService._requeue(lease, expires_at)
+        JobLease.objects.bulk_update(leases.values(), ['attempt', 'state', 'worker', 'expires_at'])
+
+        new_leases = [
+            JobLease(scan=scan, plugin='nmap', shard=shard, expires_at=expires_at)
+            for shard in shards if shard.id not in leases
+        ]
+        JobLease.objects.bulk_create(new_leases)
+        leases.update((lease.shard_id, lease) for lease in new_leases)
+        return leases
+
+    @staticmethod
+    def dispatch_fields(lease):
+        """Lease fields of a plugin request: the plugin echoes the attempt and resumes from the checkpoint"""
+        fields = {'attempt': lease.attempt}
+        if lease.checkpoint:
+            fields['checkpoint'] = lease.checkpoint
+        return fields
+
+    @staticmethod
+    def renew(scan_id, plugin, shard_id=None, attempt=None, worker=None, checkpoint=None):
+        """
+        Extend the lease of a job after a sign of life of the plugin: a single
+        UPDATE, unless the update carries a checkpoint to merge. Updates of a
+        superseded attempt do not renew the current lease.
+        """
+        now = timezone.now()
+        leases = JobLease.objects.filter(**LeaseService._lookup(scan_id, plugin, shard_id))
+        if attempt is not None:
+            leases = leases.filter(attempt=attempt)
+
+        fields = {
+            'state': 'running',
+            'heartbeat_at': now,
+            'expires_at': now + timedelta(seconds=settings.SCAN_LEASE_TTL),
+        }
+        if worker:
+            fields['worker'] = worker[:255]
+
+        if not checkpoint:
+            return leases.update(**fields) > 0
+
+        with transaction.atomic():
+            lease = leases.select_for_update().first()
+            if lease is None:
+                return False
+            for field, value in fields.items():
+                setattr(lease, field, value)
+            lease.checkpoint = {**lease.checkpoint, **checkpoint}
+            lease.save(update_fields=[*fields, 'checkpoint'])
+        return True
+
+    @staticmethod
+    def is_superseded(scan_id, plugin, shard_id=None, attempt=None):
+        """True when the job was re-dispatched after the attempt that sent an update"""
+        if attempt is None:
+            return False
+        return JobLease.objects.filter(**LeaseService._lookup(scan_id, plugin, shard_id)).exclude(
+            attempt=attempt
+        ).exists()
+
+    @staticmethod
+    def release(scan_id, plugin, shard_id=None):
+        JobLease.objects.filter(**LeaseService._lookup(scan_id, plugin, shard_id)).delete()
@@ -0,0 +1,84 @@
+import logging
+import signal
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from orchestrator_api.retention import RetentionService
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Django management command applying the retention policies: archives and
+    deletes the finished scans past the retention of their customer, purges
+    the rows soft-deleted more than SOFT_DELETE_RETENTION_DAYS ago and drops
+    the expired scan event partitions.
+
+    Usage: python manage.py apply_retention [--once] [--customer UUID] [--dry-run]
+    """
+
+    help = 'Archive expired scans and purge soft-deleted rows'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.should_stop = False
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--customer',
+            type=str,
+            help='Only archive the scans of this customer'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count what would be archived and purged'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=86400,
+            help='Seconds between two passes'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run a single pass and exit'
+        )
+
+    def handle(self, *args, **options):
+        """Main command handler"""
+        signal.signal(signal.SIGINT, self._signal_handler)
+        signal.signal(signal.SIGTERM, self._signal_handler)
+
+        once = options['once'] or options['dry_run'] or options['customer']
+        if not once:
+            self.stdout.write(self.style.SUCCESS(f"Retention started, interval {options['interval']}s"))
+
+        while not self.should_stop:
+            close_old_connections()
+            try:
+                result = RetentionService.run(options['customer'], dry_run=options['dry_run'])
+                prefix = 'Would archive' if options['dry_run'] else 'Archived'
+                self.stdout.write(f"{prefix} {sum(result['archived'].values())} scans")
+                for customer_id, count in result['archived'].items():
+                    self.stdout.write(f"  customer {customer_id}: {count}")
+                if result['purged']:
+                    purged = ', '.join(f"{count} {name}" for name, count in result['purged'].items())
+                    self.stdout.write(f"{'Would purge' if options['dry_run'] else 'Purged'}: {purged}")
+                for name in result['partitions_dropped']:
+                    self.stdout.write(f"Dropped partition {name}")
+            except Exception as e:
+                logger.error(f"Error applying the retention policies: {str(e)}")
+
+            if once:
+                break
+            # Sleep a passi di 1s per reagire subito a SIGTERM
+            for _ in range(options['interval']):
+                if self.should_stop:
+                    break
+                time.sleep(1)
+
+    def _signal_handler(self, signum, frame):
+        self.should_stop = True
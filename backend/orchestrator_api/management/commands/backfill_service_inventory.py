@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from orchestrator_api.models import Scan, FingerprintDetail
+from orchestrator_api.inventory import ServiceInventoryService
+
+
+class Command(BaseCommand):
+    """
+    Populate the ServiceInventory table from the results already stored,
+    replaying the scans from the oldest to the newest.
+
+    Usage: python manage.py backfill_service_inventory [--target 12]
+    """
+
+    help = 'Backfill the service inventory from the stored nmap and fingerprint results'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target',
+            type=int,
+            help='Only the scans of this target'
+        )
+
+    def handle(self, *args, **options):
+        scans = Scan.objects.filter(details__isnull=False).select_related(
+            'target', 'scan_type__port_list', 'details'
+        ).order_by('completed_at', 'id')
+        if options['target']:
+            scans = scans.filter(target_id=options['target'])
+
+        count = 0
+        failed = []
+        for scan in scans.iterator():
+            if not scan.details.open_ports:
+                continue
+            hosts = (scan.parsed_nmap_results or {}).get('hosts')
+            try:
+                ServiceInventoryService.record_nmap(scan, scan.details.open_ports, hosts)
+                ServiceInventoryService.record_fingerprints(scan, FingerprintDetail.objects.filter(scan=scan))
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"Scan {scan.id}: {str(e)}"))
+                failed.append(scan.id)
+                continue
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Replayed {count} scans into the service inventory"))
+        if failed:
+            raise CommandError(f"{len(failed)} scans not replayed: {', '.join(map(str, failed))}")
@@ -0,0 +1,115 @@
+import gzip
+import os
+import tempfile
+import time
+import tracemalloc
+import uuid
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from orchestrator_api.models import Customer, Target, ScanType, Scan, GceResult, Vulnerability
+from orchestrator_api.gce import GceReportParser, VulnerabilityIngestService
+
+
+class Rollback(Exception):
+    """Raised to discard the benchmark data"""
+
+
+class Command(BaseCommand):
+    """
+    Benchmark the GCE findings ingest on a synthetic report.
+    Measures the streaming parser alone (throughput and peak memory) and
+    parser + bulk insert; all data is rolled back.
+
+    Usage: python manage.py benchmark_gce_ingest --results 10000 100000
+    """
+
+    help = 'Benchmark GCE report parsing and Vulnerability ingest throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--results',
+            type=int,
+            nargs='+',
+            default=[1000, 10000, 50000],
+            help='Report sizes (number of <result> elements) to benchmark'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=VulnerabilityIngestService.BATCH_SIZE,
+            help='bulk_create batch size'
+        )
+
+    def handle(self, *args, **options):
+        scan_type = ScanType.objects.first()
+        if scan_type is None:
+            self.stdout.write(self.style.ERROR('No scan type found: load initial_data.json first'))
+            return
+
+        self.stdout.write(f"{'results':>10} {'report MB':>10} {'parse/s':>10} {'ingest/s':>10} {'ingest s':>9} {'parse peak MB':>14}")
+        for size in options['results']:
+            path = self._write_report(size)
+            try:
+                report_mb = os.path.getsize(path) / 1024 / 1024
+
+                # Parser alone, with allocation tracing: peak must not grow with the report
+                tracemalloc.start()
+                start = time.perf_counter()
+                with gzip.open(path, 'rb') as report_file:
+                    parsed = sum(1 for _ in GceReportParser.iter_findings(report_file))
+                parse_rate = parsed / (time.perf_counter() - start)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+                # Parser + bulk insert, untraced (tracemalloc slows the ORM down several times)
+                start = time.perf_counter()
+                try:
+                    with transaction.atomic():
+                        gce_result = self._create_result(scan_type)
+                        with gzip.open(path, 'rb') as report_file:
+                            VulnerabilityIngestService.ingest(gce_result, report_file, options['batch_size'])
+                        stored = Vulnerability.all_objects.filter(gce_result=gce_result).count()
+                        raise Rollback()
+                except Rollback:
+                    pass
+                elapsed = time.perf_counter() - start
+
+                if stored != size:
+                    self.stdout.write(self.style.WARNING(f"Stored {stored} findings, expected {size}"))
+                self.stdout.write(
+                    f"{size:>10} {report_mb:>10.1f} {parse_rate:>10.0f} {size / elapsed:>10.0f} "
+                    f"{elapsed:>9.2f} {peak / 1024 / 1024:>14.1f}"
+                )
+            finally:
+                os.unlink(path)
+
+    def _create_result(self, scan_type):
+        customer = Customer.objects.create(name='benchmark', email='benchmark@example.com')
+        target = Target.objects.create(customer=customer, name='benchmark', address='10.0.0.0/16')
+        scan = Scan.objects.create(target=target, scan_type=scan_type)
+        return GceResult.objects.create(scan=scan, target=target, gce_task_id=uuid.uuid4())
+
+    @staticmethod
+    def _write_report(size):
+        """Synthetic gzip report shaped like the ones stored by the GCE plugin"""
+        handle, path = tempfile.mkstemp(suffix='.xml.gz')
+        os.close(handle)
+        severities = ['0.0', '2.6', '5.0', '7.5', '9.8']
+        with gzip.open(path, 'wt', encoding='utf-8') as report_file:
+            report_file.write('<get_reports_response status="200" status_text="OK"><report id="bench">')
+            report_file.write(f'<result_count>{size}<filtered>{size}</filtered></result_count><results>')
+            for i in range(size):
+                nvt = i % 400
+                report_file.write(
+                    f'<result id="{uuid.uuid4()}"><name>Synthetic NVT {nvt}</name>'
+                    f'<host>10.0.{i // 250 % 256}.{i % 250 + 1}<hostname>h{i}.example.com</hostname></host>'
+                    f'<port>{(i % 1000) + 1}/tcp</port>'
+                    f'<nvt oid="1.3.6.1.4.1.25623.1.0.{nvt}"><name>Synthetic NVT {nvt}</name><family>General</family>'
+                    f'<refs><ref type="cve" id="CVE-2024-{nvt:04d}"/><ref type="url" id="https://example.com"/></refs>'
+                    f'<solution type="VendorFix">Update the software.</solution></nvt>'
+                    f'<severity>{severities[nvt % 5]}</severity><qod><value>80</value></qod>'
+                    f'<description>Synthetic finding {i} used by the ingest benchmark.</description>'
+                    f'<detection><result id="{uuid.uuid4()}"><details/></result></detection></result>'
+                )
+            report_file.write('</results></report></get_reports_response>')
+        return path
@@ -0,0 +1,115 @@
+import statistics
+import threading
+import time
+from collections import defaultdict
+import httpx
+from django.core.management.base import BaseCommand, CommandError
+
+
+DEFAULT_PATHS = [
+    '/api/orchestrator/customers/',
+    '/api/orchestrator/targets/',
+    '/api/orchestrator/scans/',
+    '/api/orchestrator/scan-types/',
+    '/api/orchestrator/service-inventory/',
+]
+
+
+class Command(BaseCommand):
+    """
+    HTTP load test of a running backend: --concurrency clients, each with its
+    own keep-alive connection, request the --path endpoints in turn for
+    --duration seconds. Reports requests/second and latency percentiles per
+    endpoint; run it against runserver and gunicorn to compare the two.
+
+    Usage: python manage.py benchmark_http --url http://backend:8000 --concurrency 32 --duration 30
+    """
+
+    help = 'Load test the backend API: requests/second and latency per endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000', help='Base URL of the backend')
+        parser.add_argument('--path', action='append', dest='paths', help='Endpoint to request (repeatable)')
+        parser.add_argument('--concurrency', type=int, default=16, help='Concurrent clients')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds of load')
+        parser.add_argument('--warmup', type=float, default=3, help='Seconds of load not measured')
+        parser.add_argument('--timeout', type=float, default=30, help='Timeout of a request in seconds')
+        parser.add_argument('--label', default='', help='Label printed with the results, e.g. runserver or gunicorn')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or DEFAULT_PATHS
+        base_url = options['url'].rstrip('/')
+
+        try:
+            httpx.get(f"{base_url}{paths[0]}", timeout=options['timeout'])
+        except httpx.HTTPError as e:
+            raise CommandError(f"Backend not reachable at {base_url}: {e}")
+
+        latencies = defaultdict(list)
+        errors = defaultdict(int)
+        lock = threading.Lock()
+        started = time.perf_counter()
+        measure_from = started + options['warmup']
+        stop_at = measure_from + options['duration']
+
+        def client(offset):
+            local_latencies = defaultdict(list)
+            local_errors = defaultdict(int)
+            with httpx.Client(base_url=base_url, timeout=options['timeout']) as http:
+                i = offset
+                while True:
+                    path = paths[i % len(paths)]
+                    i += 1
+                    start = time.perf_counter()
+                    if start >= stop_at:
+                        break
+                    try:
+                        ok = http.get(path).status_code < 400
+                    except httpx.HTTPError:
+                        ok = False
+                    end = time.perf_counter()
+                    if start < measure_from:
+                        continue
+                    if ok:
+                        local_latencies[path].append(end - start)
+                    else:
+                        local_errors[path] += 1
+            with lock:
+                for path, values in local_latencies.items():
+                    latencies[path].extend(values)
+                for path, count in local_errors.items():
+                    errors[path] += count
+
+        threads = [threading.Thread(target=client, args=(n,)) for n in range(options['concurrency'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - measure_from
+
+        label = f" [{options['label']}]" if options['label'] else ''
+        self.stdout.write(
+            f"{base_url}{label}: {options['concurrency']} clients, {elapsed:.1f}s measured"
+        )
+        self.stdout.write(
+            f"{'endpoint':<40} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}"
+        )
+        every = []
+        for path in paths:
+            values = latencies.get(path, [])
+            every.extend(values)
+            self._row(path, values, errors.get(path, 0), elapsed)
+        self._row('total', every, sum(errors.values()), elapsed)
+
+    def _row(self, label, values, error_count, elapsed):
+        if len(values) >= 2:
+            cuts = statistics.quantiles(values, n=100)
+            p50, p95, p99 = statistics.median(values), cuts[94], cuts[98]
+        elif values:
+            p50 = p95 = p99 = values[0]
+        else:
+            p50 = p95 = p99 = 0
+        self.stdout.write(
+            f"{label:<40} {len(values) / elapsed:>8.1f} {p50 * 1000:>8.1f} {p95 * 1000:>8.1f} "
+            f"{p99 * 1000:>8.1f} {error_count:>7}"
+        )
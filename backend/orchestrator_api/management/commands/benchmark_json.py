@@ -0,0 +1,153 @@
+import io
+import json
+import statistics
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from orchestrator_api import codec
+from orchestrator_api.parsers import ORJSONParser
+from orchestrator_api.renderers import ORJSONRenderer
+
+
+class Command(BaseCommand):
+    """
+    Benchmark the JSON codecs on payloads shaped like the real ones: the
+    parsed nmap results of a /24 scan, a page of fingerprint details and the
+    findings of a GCE report. Compares DRF's stdlib renderer/parser and the
+    json AMQP bodies with the orjson ones, median of --repeat runs; every
+    payload is checked to decode to the same document with both codecs.
+
+    Usage: python manage.py benchmark_json --hosts 256 --fingerprints 1000 --findings 2000
+    """
+
+    help = 'Benchmark stdlib json against orjson on API and AMQP payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hosts', type=int, default=256, help='Hosts in the parsed nmap results')
+        parser.add_argument('--ports', type=int, default=30, help='Open ports per host')
+        parser.add_argument('--fingerprints', type=int, default=1000, help='Fingerprint details in the list')
+        parser.add_argument('--findings', type=int, default=2000, help='Findings of the GCE report')
+        parser.add_argument('--repeat', type=int, default=20, help='Runs per measure')
+
+    def handle(self, *args, **options):
+        if codec.orjson is None:
+            self.stdout.write(self.style.WARNING('orjson is not installed: both columns use the stdlib json'))
+
+        payloads = [
+            ('parsed nmap results', self._nmap_results(options['hosts'], options['ports'])),
+            ('fingerprint list', self._fingerprints(options['fingerprints'])),
+            ('GCE findings', self._findings(options['findings'])),
+        ]
+
+        self.stdout.write(
+            f"{'payload':<22} {'operation':<14} {'size KB':>9} {'json ms':>9} {'orjson ms':>10} {'speedup':>8}"
+        )
+        for label, data in payloads:
+            stdlib_body = JSONRenderer().render(data)
+            fast_body = ORJSONRenderer().render(data)
+            if json.loads(stdlib_body) != json.loads(fast_body):
+                self.stdout.write(self.style.ERROR(f"{label}: the two renderers produce different documents"))
+                continue
+            amqp_data = json.loads(stdlib_body)
+
+            measures = [
+                ('DRF render', lambda: JSONRenderer().render(data), lambda: ORJSONRenderer().render(data)),
+                ('DRF parse', lambda: JSONParser().parse(io.BytesIO(stdlib_body)),
+                 lambda: ORJSONParser().parse(io.BytesIO(stdlib_body))),
+                ('AMQP encode', lambda: json.dumps(amqp_data), lambda: codec.dumps(amqp_data)),
+                ('AMQP decode', lambda: json.loads(stdlib_body.decode('utf-8')), lambda: codec.loads(stdlib_body)),
+            ]
+            for operation, stdlib, fast in measures:
+                stdlib_ms = self._median_ms(stdlib, options['repeat'])
+                fast_ms = self._median_ms(fast, options['repeat'])
+                self.stdout.write(
+                    f"{label:<22} {operation:<14} {len(stdlib_body) / 1024:>9.0f} {stdlib_ms:>9.2f} "
+                    f"{fast_ms:>10.2f} {stdlib_ms / fast_ms:>7.1f}x"
+                )
+
+    def _median_ms(self, function, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings) * 1000
+
+    def _nmap_results(self, hosts, ports):
+        services = [
+            (22, 'ssh', 'OpenSSH', '8.9p1 Ubuntu 3ubuntu0.6'), (80, 'http', 'nginx', '1.24.0'),
+            (443, 'https', 'nginx', '1.24.0'), (3306, 'mysql', 'MySQL', '8.0.36'),
+            (5432, 'postgresql', 'PostgreSQL DB', '16.2'), (8080, 'http-proxy', 'Apache Tomcat', '9.0.85'),
+        ]
+        return {
+            'scan_info': {'type': 'syn', 'protocol': 'tcp', 'numservices': 65535, 'services': '1-65535'},
+            'hosts': [
+                {
+                    'address': f'10.0.{h // 256}.{h % 256}',
+                    'hostnames': [{'name': f'host-{h}.corp.example.com', 'type': 'PTR'}],
+                    'status': {'state': 'up', 'reason': 'syn-ack'},
+                    'ports': [
+                        {
+                            'port': port + i * 1000 if i >= len(services) else port,
+                            'protocol': 'tcp',
+                            'state': 'open',
+                            'reason': 'syn-ack',
+                            'service': {'name': name, 'product': product, 'version': version, 'method': 'probed', 'conf': 10},
+                            'scripts': [{'id': 'banner', 'output': f'{product} {version} ' + 'x' * 80}],
+                        }
+                        for i in range(ports)
+                        for port, name, product, version in [services[i % len(services)]]
+                    ],
+                    'os': {'name': 'Linux 5.0 - 5.14', 'accuracy': 96, 'osclass': {'vendor': 'Linux', 'osfamily': 'Linux'}},
+                }
+                for h in range(hosts)
+            ],
+        }
+
+    def _fingerprints(self, count):
+        created = datetime(2026, 10, 19, 10, 0, tzinfo=dt_timezone.utc)
+        return [
+            {
+                'id': i,
+                'scan': 18,
+                'target': 12,
+                'port': (22, 80, 443, 8080, 3306)[i % 5],
+                'protocol': 'tcp',
+                'service_name': ('ssh', 'http', 'https', 'http-proxy', 'mysql')[i % 5],
+                'service_product': 'nginx',
+                'service_version': '1.24.0',
+                'confidence_score': Decimal('87.50'),
+                'fingerprint_method': 'fingerprintx',
+                'additional_info': {
+                    'tls': i % 5 == 2,
+                    'headers': {'Server': 'nginx/1.24.0', 'X-Powered-By': 'PHP/8.2.15'},
+                    'technologies': ['nginx', 'PHP', 'jQuery 3.7.1', 'Bootstrap 5.3'],
+                },
+                'created_at': created + timedelta(seconds=i),
+            }
+            for i in range(count)
+        ]
+
+    def _findings(self, count):
+        return {
+            'summary': {'critical': count // 50, 'high': count // 10, 'medium': count // 4, 'low': count // 3},
+            'results': [
+                {
+                    'nvt_oid': f'1.3.6.1.4.1.25623.1.0.{100000 + i}',
+                    'name': f'Outdated component detected ({i})',
+                    'host': f'10.0.0.{i % 254 + 1}',
+                    'port': (443, 80, 22, None)[i % 4],
+                    'protocol': 'tcp',
+                    'severity': round(10.0 - (i % 100) / 10, 1),
+                    'threat': ('High', 'Medium', 'Low', 'Log')[i % 4],
+                    'qod': 80,
+                    'description': 'The remote host is affected by a vulnerability in an outdated component. ' * 6,
+                    'solution': 'Update to the latest version released by the vendor.',
+                    'cves': [f'CVE-2024-{1000 + i}', f'CVE-2023-{2000 + i}'],
+                }
+                for i in range(count)
+            ],
+        }
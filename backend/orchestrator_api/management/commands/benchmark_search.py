@@ -0,0 +1,136 @@
+import ipaddress
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from orchestrator_api.filters import TargetFilter, ScanFilter
+from orchestrator_api.models import Customer, Target, ScanType, Scan
+from orchestrator_api.search import NetworkSearchFilter
+from orchestrator_api.views import TargetViewSet, ScanViewSet
+
+
+class Rollback(Exception):
+    """Raised to discard the benchmark data"""
+
+
+class Command(BaseCommand):
+    """
+    Benchmark the target/scan filters and ?search= on a synthetic inventory.
+    Targets are a mix of single IPs, /28 blocks and FQDNs; every query is run
+    --repeat times and the median latency is reported, with the table access
+    nodes of the query plan on PostgreSQL. All data is rolled back.
+
+    Usage: python manage.py benchmark_search --targets 1000000 --scans 200000
+    """
+
+    help = 'Benchmark trigram search and IP/CIDR filters on targets and scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--targets', type=int, default=1000000, help='Synthetic targets to create')
+        parser.add_argument('--scans', type=int, default=200000, help='Synthetic scans to create')
+        parser.add_argument('--customers', type=int, default=1000, help='Customers the targets are spread over')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per query')
+        parser.add_argument('--batch-size', type=int, default=5000, help='bulk_create batch size')
+
+    def handle(self, *args, **options):
+        scan_type = ScanType.objects.first()
+        if scan_type is None:
+            self.stdout.write(self.style.ERROR('No scan type found: load initial_data.json first'))
+            return
+
+        try:
+            with transaction.atomic():
+                start = time.perf_counter()
+                self._populate(scan_type, options)
+                self.stdout.write(
+                    f"Created {options['targets']} targets and {options['scans']} scans "
+                    f"in {time.perf_counter() - start:.1f}s ({connection.vendor})"
+                )
+                if connection.vendor == 'postgresql':
+                    with connection.cursor() as cursor:
+                        cursor.execute('ANALYZE customer; ANALYZE target; ANALYZE scan')
+
+                self.stdout.write(f"{'query':<34} {'rows':>8} {'median ms':>10}  plan")
+                for label, queryset in self._queries(options):
+                    self._run(label, queryset, options['repeat'])
+                raise Rollback()
+        except Rollback:
+            pass
+
+    def _populate(self, scan_type, options):
+        customers = Customer.objects.bulk_create([
+            Customer(name=f'Customer {i:05d}', company_name=f'Company {i:05d} S.p.A.', email=f'contact{i}@customer{i}.example.com')
+            for i in range(options['customers'])
+        ])
+
+        batch = []
+        for i in range(options['targets']):
+            kind = i % 10
+            if kind < 6:
+                address = f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}"
+            elif kind < 8:
+                # /28 blocks in 100.64.0.0/10
+                address = f"{ipaddress.ip_address(0x64400000 + (i % 262144) * 16)}/28"
+            else:
+                address = f"host-{i}.dc{i % 40}.example.com"
+            target = Target(
+                customer=customers[i % len(customers)],
+                name=f"srv-{i:07d}-{('web', 'db', 'mail', 'vpn', 'dns')[i % 5]}",
+                address=address,
+                description=f"Synthetic target {i} of rack {i % 500}",
+            )
+            target.compile_address()
+            batch.append(target)
+            if len(batch) >= options['batch_size']:
+                Target.objects.bulk_create(batch)
+                batch = []
+        Target.objects.bulk_create(batch)
+
+        target_ids = list(Target.objects.order_by('id').values_list('id', flat=True)[:options['scans']])
+        batch = []
+        for i in range(options['scans']):
+            batch.append(Scan(target_id=target_ids[i % len(target_ids)], scan_type=scan_type, status='Completed'))
+            if len(batch) >= options['batch_size']:
+                Scan.objects.bulk_create(batch)
+                batch = []
+        Scan.objects.bulk_create(batch)
+
+    def _queries(self, options):
+        middle = options['targets'] // 2
+        targets = Target.objects.all()
+        scans = Scan.objects.all()
+        return [
+            ('targets name=srv-00123', TargetFilter({'name': 'srv-00123'}, targets).qs),
+            ('targets customer_name=00042', TargetFilter({'customer_name': '00042'}, targets).qs),
+            ('targets address=.dc18.', TargetFilter({'address': '.dc18.'}, targets).qs),
+            ('targets network=10.1.2.3', TargetFilter({'network': '10.1.2.3'}, targets).qs),
+            ('targets network=100.64.16.0/20', TargetFilter({'network': '100.64.16.0/20'}, targets).qs),
+            (f'targets search=srv-{middle:07d}', self._search(TargetViewSet, targets, f'srv-{middle:07d}')),
+            ('targets search=10.0.7.9', self._search(TargetViewSet, targets, '10.0.7.9')),
+            ('scans target_name=srv-00012', ScanFilter({'target_name': 'srv-00012'}, scans).qs),
+            ('scans target_network=10.0.0.0/20', ScanFilter({'target_network': '10.0.0.0/20'}, scans).qs),
+            ('scans search=Customer 00042', self._search(ScanViewSet, scans, 'Customer 00042')),
+        ]
+
+    @staticmethod
+    def _search(viewset, queryset, term):
+        request = Request(APIRequestFactory().get('/', {'search': term}))
+        return NetworkSearchFilter().filter_queryset(request, queryset, viewset())
+
+    def _run(self, label, queryset, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows = len(list(queryset.order_by().values_list('pk', flat=True)[:1000]))
+            timings.append((time.perf_counter() - start) * 1000)
+
+        plan = ''
+        if connection.vendor == 'postgresql':
+            # Solo i nodi di accesso alle tabelle: Seq Scan vs Index/Bitmap Index Scan
+            lines = queryset.order_by().values_list('pk', flat=True)[:1000].explain().splitlines()
+            plan = ', '.join(
+                line.strip(' ->').split('  (')[0] for line in lines if 'Scan' in line
+            )
+        self.stdout.write(f"{label:<34} {rows:>8} {statistics.median(timings):>10.1f}  {plan}")
@@ -0,0 +1,171 @@
+import functools
+import json
+import logging
+import signal
+import threading
+import pika
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, close_old_connections, connections
+from orchestrator_api import codec
+from orchestrator_api.gce import GceIngestService
+
+logger = logging.getLogger(__name__)
+
+# Errori temporanei (database o filesystem non raggiungibili): il job è idempotente e torna in coda
+TRANSIENT_ERRORS = (OperationalError, InterfaceError, OSError)
+
+
+class Command(BaseCommand):
+    """
+    Django management command running a GCE ingest worker: parses the stored
+    GCE reports into counts and Vulnerability rows off the request thread.
+    Run several instances (docker-compose replicas) to get a worker pool.
+    Each job runs on a worker thread, so that the connection keeps serving
+    heartbeats during long ingests; the ack goes back through
+    add_callback_threadsafe.
+
+    Usage: python manage.py consume_gce_ingest
+    """
+
+    help = 'Consume GCE report ingest jobs from RabbitMQ'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.connection = None
+        self.channel = None
+        self.should_stop = False
+        self.workers = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--queue',
+            type=str,
+            default=settings.RABBITMQ_GCE_INGEST_QUEUE,
+            help='Queue name to consume from'
+        )
+        parser.add_argument(
+            '--prefetch',
+            type=int,
+            default=1,
+            help='Number of messages to prefetch'
+        )
+        parser.add_argument(
+            '--requeue-pending',
+            action='store_true',
+            help='Publish again the jobs of results left pending before starting'
+        )
+
+    def handle(self, *args, **options):
+        """Main command handler"""
+        self.stdout.write(self.style.SUCCESS('Starting GCE ingest worker...'))
+
+        signal.signal(signal.SIGINT, self._signal_handler)
+        signal.signal(signal.SIGTERM, self._signal_handler)
+
+        if options['requeue_pending']:
+            count = GceIngestService.requeue_pending()
+            self.stdout.write(f"Requeued {count} pending ingest jobs")
+
+        try:
+            parameters = pika.URLParameters(settings.RABBITMQ_URL)
+            self.connection = pika.BlockingConnection(parameters)
+            self.channel = self.connection.channel()
+        except Exception as e:
+            logger.error(f"Failed to connect to RabbitMQ: {str(e)}")
+            self.stdout.write(self.style.ERROR('Failed to connect to RabbitMQ'))
+            return
+
+        queue_name = options['queue']
+        try:
+            self.channel.queue_declare(queue=queue_name, durable=True)
+            # Un report alla volta per worker: il parallelismo viene dal numero di worker
+            self.channel.basic_qos(prefetch_count=options['prefetch'])
+            self.channel.basic_consume(
+                queue=queue_name,
+                on_message_callback=self._process_message,
+                auto_ack=False
+            )
+
+            self.stdout.write(self.style.SUCCESS(f'Consuming from queue: {queue_name}'))
+
+            while not self.should_stop:
+                self.connection.process_data_events(time_limit=1)
+                self.workers = [worker for worker in self.workers if worker.is_alive()]
+
+        except Exception as e:
+            logger.error(f"Error in ingest worker: {str(e)}")
+            self.stdout.write(self.style.ERROR(f'Worker error: {str(e)}'))
+        finally:
+            self._cleanup()
+
+    def _process_message(self, channel, method, properties, body):
+        """Validate an ingest job and hand it to a worker thread"""
+        try:
+            message = codec.loads(body)
+        except json.JSONDecodeError as e:
+            logger.error(f"Invalid JSON in message: {str(e)}")
+            channel.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+            return
+
+        logger.info(f"Received ingest job: {message}")
+        if not isinstance(message, dict) or not message.get('gce_result_id'):
+            logger.error(f"Invalid ingest job: {message}")
+            channel.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+            return
+
+        worker = threading.Thread(
+            target=self._run_job, args=(channel, method.delivery_tag, message),
+            name=f"gce-ingest-{message['gce_result_id']}", daemon=True
+        )
+        self.workers.append(worker)
+        worker.start()
+
+    def _run_job(self, channel, delivery_tag, message):
+        """Run an ingest job on the worker thread and settle its message on the connection thread"""
+        close_old_connections()
+        try:
+            if GceIngestService.process(message):
+                settle = functools.partial(channel.basic_ack, delivery_tag=delivery_tag)
+            else:
+                settle = functools.partial(channel.basic_nack, delivery_tag=delivery_tag, requeue=False)
+        except TRANSIENT_ERRORS as e:
+            logger.error(f"Transient error processing ingest job, requeued: {str(e)}")
+            settle = functools.partial(channel.basic_nack, delivery_tag=delivery_tag, requeue=True)
+        except Exception as e:
+            # Errore permanente (report o dati non validi): rimetterlo in coda lo ripeterebbe all'infinito
+            try:
+                GceIngestService.fail(message, f"Ingest error: {str(e)}")
+            except Exception as fail_error:
+                logger.error(f"Error marking ingest job as failed: {str(fail_error)}")
+            settle = functools.partial(channel.basic_nack, delivery_tag=delivery_tag, requeue=False)
+        finally:
+            # Connessione del thread: non deve sopravvivergli
+            connections.close_all()
+
+        try:
+            self.connection.add_callback_threadsafe(settle)
+        except Exception as e:
+            # Connessione chiusa: il broker riconsegna il messaggio non confermato
+            logger.error(f"Could not settle ingest job {message.get('gce_result_id')}: {str(e)}")
+
+    def _signal_handler(self, signum, frame):
+        """Handle shutdown signals"""
+        self.stdout.write(self.style.WARNING('Received shutdown signal. Stopping worker...'))
+        self.should_stop = True
+
+    def _cleanup(self):
+        """Cleanup connections"""
+        try:
+            # Lascia finire i job in corso e manda i loro ack prima di chiudere
+            for worker in self.workers:
+                worker.join()
+            if self.connection and self.connection.is_open:
+                self.connection.process_data_events(time_limit=0)
+            if self.channel and not self.channel.is_closed:
+                self.channel.stop_consuming()
+            if self.connection and not self.connection.is_closed:
+                self.connection.close()
+            logger.info("GCE ingest worker stopped")
+        except Exception as e:
+            logger.error(f"Error during cleanup: {str(e)}")
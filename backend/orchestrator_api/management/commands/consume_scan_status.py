@@ -2,13 +2,20 @@ import json
 import logging
 import signal
 import sys
+import time
 import pika
 from django.core.management.base import BaseCommand
 from django.conf import settings
+from django.db import close_old_connections
+from orchestrator_api import codec
+from orchestrator_api.events import ScanEventLogService
 from orchestrator_api.services import ScanStatusService
 
 logger = logging.getLogger(__name__)
 
+# Le partizioni del log eventi vengono create con mesi di anticipo: un controllo all'ora basta
+PARTITION_CHECK_INTERVAL = 3600
+
 
 class Command(BaseCommand):
     """
@@ -81,12 +88,18 @@ class Command(BaseCommand):
                 self.style.SUCCESS('Waiting for messages. To exit press CTRL+C')
             )
             
-            # Start consuming
-            while not self.should_stop:
-                try:
-                    self.connection.process_data_events(time_limit=1)
-                except KeyboardInterrupt:
-                    break
+            # Start consuming; the scan events of the updates are written in batches
+            partitions_checked_at = 0
+            with ScanEventLogService.buffered():
+                while not self.should_stop:
+                    if time.monotonic() - partitions_checked_at >= PARTITION_CHECK_INTERVAL:
+                        ScanEventLogService.ensure_partitions()
+                        partitions_checked_at = time.monotonic()
+                    try:
+                        self.connection.process_data_events(time_limit=1)
+                    except KeyboardInterrupt:
+                        break
+                    ScanEventLogService.flush_if_due()
             
         except Exception as e:
             logger.error(f"Error in consumer: {str(e)}")
@@ -195,9 +208,11 @@ class Command(BaseCommand):
     
     def _process_message(self, channel, method, properties, body):
         """Process incoming message"""
+        # Riusa la connessione al database (CONN_MAX_AGE) scartandola se scaduta o caduta
+        close_old_connections()
         try:
             # Parse message
-            message = json.loads(body.decode('utf-8'))
+            message = codec.loads(body)
             
             # Log received message
             logger.info(f"Received message: {message}")
@@ -221,7 +236,12 @@ class Command(BaseCommand):
                 module=module,
                 status=status,
                 message=message_text,
-                error_details=error_details
+                error_details=error_details,
+                shard_id=message.get('shard_id'),
+                progress=message.get('progress'),
+                attempt=message.get('attempt'),
+                worker=message.get('worker'),
+                checkpoint=message.get('checkpoint')
             )
             
             if success:
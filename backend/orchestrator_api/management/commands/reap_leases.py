@@ -0,0 +1,75 @@
+import logging
+import signal
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from orchestrator_api.recovery import LeaseRecoveryService
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Django management command running the lease reaper: re-dispatches the
+    plugin jobs whose lease expired (dead plugin container, lost request) and
+    fails them after SCAN_LEASE_MAX_ATTEMPTS, so that no scan stays running
+    forever and blocks new scans of its target.
+
+    Usage: python manage.py reap_leases [--once]
+    """
+
+    help = 'Recover plugin jobs with expired leases'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.should_stop = False
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=30,
+            help='Seconds between two passes'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=500,
+            help='Expired leases handled per pass'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run a single pass and exit'
+        )
+
+    def handle(self, *args, **options):
+        """Main command handler"""
+        signal.signal(signal.SIGINT, self._signal_handler)
+        signal.signal(signal.SIGTERM, self._signal_handler)
+
+        if not options['once']:
+            self.stdout.write(self.style.SUCCESS(f"Lease reaper started, interval {options['interval']}s"))
+
+        while not self.should_stop:
+            close_old_connections()
+            try:
+                result = LeaseRecoveryService.reap(options['limit'])
+                if options['once'] or any(result.values()):
+                    self.stdout.write(
+                        f"Leases: {result['redispatched']} re-dispatched, "
+                        f"{result['failed']} failed, {result['released']} released"
+                    )
+            except Exception as e:
+                logger.error(f"Error reaping leases: {str(e)}")
+
+            if options['once']:
+                break
+            # Sleep a passi di 1s per reagire subito a SIGTERM
+            for _ in range(options['interval']):
+                if self.should_stop:
+                    break
+                time.sleep(1)
+
+    def _signal_handler(self, signum, frame):
+        self.should_stop = True
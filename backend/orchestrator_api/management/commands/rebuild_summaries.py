@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from orchestrator_api.summaries import SummaryService
+
+
+class Command(BaseCommand):
+    """
+    Recompute the TargetSummary/CustomerSummary tables from the raw scans,
+    e.g. after the first deploy or a manual change to the database.
+
+    Usage: python manage.py rebuild_summaries [--customer <uuid>]
+    """
+
+    help = 'Rebuild the materialized customer and target summaries'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--customer',
+            help='Only the summaries of this customer'
+        )
+
+    def handle(self, *args, **options):
+        targets, customers = SummaryService.rebuild(options['customer'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt the summaries of {targets} targets and {customers} customers"
+        ))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from orchestrator_api.retention import ScanArchiveService
+
+
+class Command(BaseCommand):
+    """
+    Restore archived scans (written by apply_retention) with all their rows
+    and GCE reports. Scans that still exist or whose target is gone are skipped.
+
+    Usage: python manage.py restore_scans <archive> [<archive> ...] [--dry-run]
+    """
+
+    help = 'Restore scans from retention archives'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths',
+            nargs='+',
+            help='Archive files (.jsonl.zst or .jsonl.gz)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only list what would be restored'
+        )
+
+    def handle(self, *args, **options):
+        for path in options['paths']:
+            try:
+                result = ScanArchiveService.restore(path, dry_run=options['dry_run'])
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read {path}: {e}")
+
+            prefix = 'Would restore' if options['dry_run'] else 'Restored'
+            self.stdout.write(self.style.SUCCESS(f"{path}: {prefix} {len(result['restored'])} scans"))
+            if result['skipped']:
+                self.stdout.write(f"  skipped (existing scan or missing target): {result['skipped']}")
+            if result['errors']:
+                self.stdout.write(self.style.ERROR(f"  failed: {result['errors']}"))
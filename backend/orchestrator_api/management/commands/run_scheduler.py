@@ -0,0 +1,66 @@
+import logging
+import signal
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from orchestrator_api.scheduler import ScheduleService
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Django management command running the scan scheduler: creates the runs of
+    the due schedules and starts their scans, spread over the jitter window and
+    within the SCHEDULER_* concurrency and queue depth limits.
+
+    Usage: python manage.py run_scheduler [--once]
+    """
+
+    help = 'Run the recurring scan scheduler'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.should_stop = False
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=30,
+            help='Seconds between two passes'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run a single pass and exit'
+        )
+
+    def handle(self, *args, **options):
+        """Main command handler"""
+        signal.signal(signal.SIGINT, self._signal_handler)
+        signal.signal(signal.SIGTERM, self._signal_handler)
+
+        if not options['once']:
+            self.stdout.write(self.style.SUCCESS(f"Scan scheduler started, interval {options['interval']}s"))
+
+        while not self.should_stop:
+            close_old_connections()
+            try:
+                created = ScheduleService.run_due()
+                started = ScheduleService.dispatch()
+                if options['once'] or created or started:
+                    self.stdout.write(f"Scheduled scans: {created} created, {started} started")
+            except Exception as e:
+                logger.error(f"Error running the scan scheduler: {str(e)}")
+
+            if options['once']:
+                break
+            # Sleep a passi di 1s per reagire subito a SIGTERM
+            for _ in range(options['interval']):
+                if self.should_stop:
+                    break
+                time.sleep(1)
+
+    def _signal_handler(self, signum, frame):
+        self.should_stop = True
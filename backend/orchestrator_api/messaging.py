@@ -0,0 +1,173 @@
+# backend/orchestrator_api/messaging.py
+
+import logging
+import pika
+from django.conf import settings
+from . import codec
+
+logger = logging.getLogger(__name__)
+
+
+# RabbitMQ publishing of the backend: RabbitMQService opens a connection per
+# use, BatchPublisher reuses one connection for many messages.
+
+
+class RabbitMQService:
+    """Service for RabbitMQ communication"""
+    
+    def __init__(self):
+        self.connection = None
+        self.channel = None
+    
+    def connect(self):
+        """Establish connection to RabbitMQ"""
+        try:
+            # Parse RabbitMQ URL
+            parameters = pika.URLParameters(settings.RABBITMQ_URL)
+            self.connection = pika.BlockingConnection(parameters)
+            self.channel = self.connection.channel()
+            
+            # Declare all queues
+            self._declare_queues()
+            
+            logger.info("Connected to RabbitMQ successfully")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to connect to RabbitMQ: {str(e)}")
+            return False
+    
+    def _declare_queues(self):
+        """Declare all required queues"""
+        queues = [
+            settings.RABBITMQ_NMAP_SCAN_REQUEST_QUEUE,
+            settings.RABBITMQ_GCE_SCAN_REQUEST_QUEUE,
+            settings.RABBITMQ_FINGERPRINT_SCAN_REQUEST_QUEUE,
+            settings.RABBITMQ_WEB_SCAN_REQUEST_QUEUE,
+            settings.RABBITMQ_VULN_LOOKUP_REQUEST_QUEUE,
+            settings.RABBITMQ_REPORT_REQUEST_QUEUE,
+            settings.RABBITMQ_SCAN_STATUS_UPDATE_QUEUE,
+            settings.RABBITMQ_GCE_INGEST_QUEUE,
+        ]
+        
+        for queue in queues:
+            self.channel.queue_declare(queue=queue, durable=True)
+    
+    def publish_message(self, queue_name, message):
+        """Publish a message to a queue"""
+        try:
+            if not self.connection or self.connection.is_closed:
+                if not self.connect():
+                    return False
+            
+            # Ensure message is JSON
+            body = codec.dumps(message) if isinstance(message, dict) else message
+            
+            self.channel.basic_publish(
+                exchange='',
+                routing_key=queue_name,
+                body=body,
+                properties=pika.BasicProperties(
+                    delivery_mode=2,  # Make message persistent
+                )
+            )
+            
+            logger.info(f"Published message to queue {queue_name}: {message}")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Failed to publish message to {queue_name}: {str(e)}")
+            return False
+    
+    def broadcast(self, exchange, message):
+        """Publish a message to every consumer bound to a fanout exchange"""
+        try:
+            if not self.connection or self.connection.is_closed:
+                if not self.connect():
+                    return False
+
+            body = codec.dumps(message) if isinstance(message, dict) else message
+
+            self.channel.exchange_declare(exchange=exchange, exchange_type='fanout', durable=True)
+            self.channel.basic_publish(
+                exchange=exchange,
+                routing_key='',
+                body=body,
+            )
+
+            logger.info(f"Broadcast message on exchange {exchange}: {message}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to broadcast message on {exchange}: {str(e)}")
+            return False
+
+    def publish_messages(self, messages):
+        """
+        Publish (queue_name, message) pairs over this connection, in order.
+
+        Returns:
+            int: number of messages published (stops at the first failure)
+        """
+        published = 0
+        for queue_name, message in messages:
+            if not self.publish_message(queue_name, message):
+                break
+            published += 1
+        return published
+
+    def queue_depth(self, queue_name):
+        """Messages waiting in a queue, None if RabbitMQ can't be reached"""
+        try:
+            if not self.connection or self.connection.is_closed:
+                if not self.connect():
+                    return None
+
+            # Passive declare: reads the counters without touching the queue arguments
+            result = self.channel.queue_declare(queue=queue_name, passive=True)
+            return result.method.message_count
+
+        except Exception as e:
+            logger.error(f"Failed to read depth of queue {queue_name}: {str(e)}")
+            return None
+
+    def close(self):
+        """Close RabbitMQ connection"""
+        try:
+            if self.connection and not self.connection.is_closed:
+                self.connection.close()
+                logger.info("RabbitMQ connection closed")
+        except Exception as e:
+            logger.error(f"Error closing RabbitMQ connection: {str(e)}")
+
+
+class BatchPublisher:
+    """
+    Stand-in for RabbitMQService that collects the messages published inside
+    a transaction; flush() sends them in one batch once the rows they refer
+    to are committed.
+    """
+
+    def __init__(self):
+        self.messages = []
+
+    def publish_message(self, queue_name, message):
+        self.messages.append((queue_name, message))
+        return True
+
+    def close(self):
+        pass
+
+    def flush(self):
+        """
+        Publish the collected messages over one connection.
+
+        Returns:
+            set: scan ids with messages that could not be published
+        """
+        messages, self.messages = self.messages, []
+        if not messages:
+            return set()
+        rabbitmq_service = RabbitMQService()
+        published = rabbitmq_service.publish_messages(messages)
+        rabbitmq_service.close()
+        return {message.get('scan_id') for _, message in messages[published:]}
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orchestrator_api', '0004_add_gceresult'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scandetail',
+            name='plugin_states',
+            field=models.JSONField(blank=True, default=dict, help_text='Per-plugin execution state of the scan workflow graph'),
+        ),
+    ]
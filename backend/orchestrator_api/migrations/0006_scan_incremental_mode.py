@@ -0,0 +1,29 @@
+# backend/orchestrator_api/migrations/0006_scan_incremental_mode.py
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orchestrator_api', '0005_scandetail_plugin_states'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scan',
+            name='scan_mode',
+            field=models.CharField(choices=[('full', 'Full'), ('incremental', 'Incremental')], default='full', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='scan',
+            name='baseline_scan',
+            field=models.ForeignKey(blank=True, help_text='Previous scan of the same target used as baseline for incremental scans', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='incremental_scans', to='orchestrator_api.scan'),
+        ),
+        migrations.AddField(
+            model_name='scandetail',
+            name='port_delta',
+            field=models.JSONField(blank=True, help_text='Open port/service changes against the baseline scan (incremental scans only)', null=True),
+        ),
+    ]
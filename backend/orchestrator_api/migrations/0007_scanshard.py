@@ -0,0 +1,48 @@
+# backend/orchestrator_api/migrations/0007_scanshard.py
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orchestrator_api', '0006_scan_incremental_mode'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='target',
+            name='address',
+            field=models.CharField(help_text='IP address, FQDN or address range (CIDR or start-end)', max_length=50),
+        ),
+        migrations.CreateModel(
+            name='ScanShard',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('index', models.PositiveIntegerField()),
+                ('hosts', models.TextField(help_text='Space-separated nmap target specification of the shard')),
+                ('ports', models.TextField(blank=True, help_text='nmap -p specification, empty to use the scan type port list', null=True)),
+                ('host_count', models.PositiveIntegerField(default=1)),
+                ('port_count', models.PositiveIntegerField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('progress', models.FloatField(default=0, help_text='Shard progress percentage', validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)])),
+                ('parsed_nmap_results', models.JSONField(blank=True, null=True)),
+                ('error_message', models.TextField(blank=True, null=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('scan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shards', to='orchestrator_api.scan')),
+            ],
+            options={
+                'verbose_name': 'Scan Shard',
+                'verbose_name_plural': 'Scan Shards',
+                'db_table': 'scan_shard',
+                'ordering': ['scan', 'index'],
+                'unique_together': {('scan', 'index')},
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+# backend/orchestrator_api/migrations/0008_portlist_compiled_ports.py
+
+from django.db import migrations, models
+
+from orchestrator_api.ports import PortSet, nmap_port_spec
+
+
+def compile_port_lists(apps, schema_editor):
+    """Compile the port strings of the existing port lists"""
+    PortList = apps.get_model('orchestrator_api', 'PortList')
+    for port_list in PortList.objects.all():
+        try:
+            tcp = PortSet.parse(port_list.tcp_ports)
+            udp = PortSet.parse(port_list.udp_ports)
+        except ValueError:
+            # Invalid legacy value: left uncompiled until the next save
+            continue
+        port_list.tcp_ranges = [list(r) for r in tcp.ranges]
+        port_list.udp_ranges = [list(r) for r in udp.ranges]
+        port_list.tcp_port_count = len(tcp)
+        port_list.udp_port_count = len(udp)
+        port_list.nmap_port_spec = nmap_port_spec(tcp, udp)
+        port_list.save(update_fields=[
+            'tcp_ranges', 'udp_ranges', 'tcp_port_count', 'udp_port_count', 'nmap_port_spec'
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orchestrator_api', '0007_scanshard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='portlist',
+            name='tcp_ranges',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.AddField(
+            model_name='portlist',
+            name='udp_ranges',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.AddField(
+            model_name='portlist',
+            name='tcp_port_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='portlist',
+            name='udp_port_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='portlist',
+            name='nmap_port_spec',
+            field=models.TextField(blank=True, default='', editable=False, help_text="nmap -p specification (e.g. 'T:1-1000,U:53')"),
+        ),
+        migrations.RunPython(compile_port_lists, migrations.RunPython.noop),
+    ]
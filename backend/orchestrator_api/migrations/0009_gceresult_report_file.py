@@ -0,0 +1,28 @@
+# backend/orchestrator_api/migrations/0009_gceresult_report_file.py
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orchestrator_api', '0008_portlist_compiled_ports'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gceresult',
+            name='report_file',
+            field=models.FileField(blank=True, help_text='Raw GCE report, gzip-compressed, uploaded in chunks by the plugin', max_length=255, null=True, upload_to='gce_reports/'),
+        ),
+        migrations.AddField(
+            model_name='gceresult',
+            name='report_size',
+            field=models.BigIntegerField(default=0, help_text='Size in bytes of the compressed report file'),
+        ),
+        migrations.AddField(
+            model_name='gceresult',
+            name='nvt_summary',
+            field=models.JSONField(blank=True, default=list, help_text='Per-NVT summary: [{oid, name, severity, count, hosts}], highest severity first', null=True),
+        ),
+    ]
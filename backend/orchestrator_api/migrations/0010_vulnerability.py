@@ -0,0 +1,68 @@
+# backend/orchestrator_api/migrations/0010_vulnerability.py
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orchestrator_api', '0009_gceresult_report_file'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Vulnerability',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('result_id', models.UUIDField(blank=True, help_text='Result ID in Greenbone', null=True)),
+                ('nvt_oid', models.CharField(help_text='OID of the NVT that produced the finding', max_length=100)),
+                ('name', models.CharField(max_length=500)),
+                ('family', models.CharField(blank=True, max_length=255)),
+                ('host', models.CharField(help_text='Host address as reported by GCE', max_length=255)),
+                ('hostname', models.CharField(blank=True, max_length=255)),
+                ('port', models.IntegerField(blank=True, help_text="Null for host-level findings ('general/tcp')", null=True)),
+                ('protocol', models.CharField(blank=True, max_length=10)),
+                ('severity', models.FloatField(default=0.0, help_text='CVSS score')),
+                ('threat', models.CharField(choices=[('critical', 'Critical'), ('high', 'High'), ('medium', 'Medium'), ('low', 'Low'), ('log', 'Log')], default='log', max_length=10)),
+                ('qod', models.IntegerField(blank=True, help_text='Quality of detection 0-100', null=True)),
+                ('description', models.TextField(blank=True)),
+                ('solution', models.TextField(blank=True)),
+                ('gce_result', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vulnerabilities', to='orchestrator_api.gceresult')),
+                ('scan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vulnerabilities', to='orchestrator_api.scan')),
+                ('target', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vulnerabilities', to='orchestrator_api.target')),
+            ],
+            options={
+                'verbose_name': 'Vulnerability',
+                'verbose_name_plural': 'Vulnerabilities',
+                'db_table': 'vulnerability',
+                'ordering': ['-severity', 'host', 'port'],
+                'indexes': [
+                    models.Index(fields=['nvt_oid'], name='vulnerabili_nvt_oid_0ec327_idx'),
+                    models.Index(fields=['severity'], name='vulnerabili_severit_1a798b_idx'),
+                    models.Index(fields=['host', 'port'], name='vulnerabili_host_643b2d_idx'),
+                    models.Index(fields=['target', 'severity'], name='vulnerabili_target__7935e2_idx'),
+                    models.Index(fields=['scan', 'severity'], name='vulnerabili_scan_id_d98fc7_idx'),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name='VulnerabilityCve',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('cve', models.CharField(db_index=True, max_length=50)),
+                ('vulnerability', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cve_refs', to='orchestrator_api.vulnerability')),
+            ],
+            options={
+                'verbose_name': 'Vulnerability CVE',
+                'verbose_name_plural': 'Vulnerability CVEs',
+                'db_table': 'vulnerability_cve',
+                'constraints': [
+                    models.UniqueConstraint(fields=('vulnerability', 'cve'), name='unique_vulnerability_cve'),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# backend/orchestrator_api/migrations/0011_gceresult_ingest_status.py
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orchestrator_api', '0010_vulnerability'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gceresult',
+            name='ingest_status',
+            field=models.CharField(blank=True, choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], help_text='Null when there is no stored report to ingest', max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='gceresult',
+            name='ingest_requested_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='gceresult',
+            name='ingested_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='gceresult',
+            name='ingest_error',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
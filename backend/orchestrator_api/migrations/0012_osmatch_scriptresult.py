@@ -0,0 +1,69 @@
+# backend/orchestrator_api/migrations/0012_osmatch_scriptresult.py
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orchestrator_api', '0011_gceresult_ingest_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OsMatch',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('host', models.CharField(max_length=255)),
+                ('rank', models.PositiveSmallIntegerField(default=0, help_text='0 = best match of the host')),
+                ('name', models.CharField(max_length=255)),
+                ('accuracy', models.PositiveSmallIntegerField(default=0, help_text='Accuracy 0-100')),
+                ('line', models.CharField(blank=True, help_text='Line in the nmap OS database', max_length=20)),
+                ('vendor', models.CharField(blank=True, max_length=100)),
+                ('os_type', models.CharField(blank=True, max_length=100)),
+                ('osfamily', models.CharField(blank=True, max_length=100)),
+                ('osgen', models.CharField(blank=True, max_length=50)),
+                ('cpe', models.JSONField(blank=True, default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('scan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='os_matches', to='orchestrator_api.scan')),
+                ('target', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='os_matches', to='orchestrator_api.target')),
+            ],
+            options={
+                'verbose_name': 'OS Match',
+                'verbose_name_plural': 'OS Matches',
+                'db_table': 'os_match',
+                'ordering': ['scan', 'host', 'rank'],
+                'indexes': [
+                    models.Index(fields=['scan', 'host'], name='os_match_scan_id_94b5b1_idx'),
+                    models.Index(fields=['target', 'host'], name='os_match_target__e80b73_idx'),
+                    models.Index(fields=['osfamily'], name='os_match_osfamil_b232d1_idx'),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name='ScriptResult',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('host', models.CharField(max_length=255)),
+                ('port', models.IntegerField(blank=True, help_text='Null for host scripts', null=True)),
+                ('protocol', models.CharField(blank=True, max_length=10)),
+                ('script_id', models.CharField(help_text='NSE script name, e.g. http-title', max_length=100)),
+                ('output', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('scan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='script_results', to='orchestrator_api.scan')),
+                ('target', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='script_results', to='orchestrator_api.target')),
+            ],
+            options={
+                'verbose_name': 'Script Result',
+                'verbose_name_plural': 'Script Results',
+                'db_table': 'script_result',
+                'ordering': ['scan', 'host', 'port', 'script_id'],
+                'indexes': [
+                    models.Index(fields=['scan', 'host', 'port'], name='script_resu_scan_id_2c3e07_idx'),
+                    models.Index(fields=['script_id'], name='script_resu_script__55182c_idx'),
+                    models.Index(fields=['target', 'script_id'], name='script_resu_target__a5a7c7_idx'),
+                ],
+            },
+        ),
+    ]
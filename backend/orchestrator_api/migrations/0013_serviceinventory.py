@@ -0,0 +1,45 @@
+# backend/orchestrator_api/migrations/0013_serviceinventory.py
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orchestrator_api', '0012_osmatch_scriptresult'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ServiceInventory',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('host', models.CharField(help_text='Target address for single hosts, scanned IP for ranges', max_length=255)),
+                ('port', models.IntegerField()),
+                ('protocol', models.CharField(default='tcp', max_length=10)),
+                ('service', models.CharField(blank=True, max_length=100)),
+                ('product', models.CharField(blank=True, max_length=255)),
+                ('version', models.CharField(blank=True, max_length=255)),
+                ('is_open', models.BooleanField(default=True, help_text='False once a later scan of the port found it closed')),
+                ('first_seen', models.DateTimeField()),
+                ('last_seen', models.DateTimeField()),
+                ('last_scan', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='orchestrator_api.scan')),
+                ('target', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='services', to='orchestrator_api.target')),
+            ],
+            options={
+                'verbose_name': 'Service Inventory',
+                'verbose_name_plural': 'Service Inventory',
+                'db_table': 'service_inventory',
+                'ordering': ['target', 'host', 'port', 'protocol'],
+                'indexes': [
+                    models.Index(fields=['port', 'protocol'], name='service_inv_port_35ae0a_idx'),
+                    models.Index(fields=['service'], name='service_inv_service_46bf7c_idx'),
+                    models.Index(fields=['last_seen'], name='service_inv_last_se_3da65f_idx'),
+                ],
+                'constraints': [
+                    models.UniqueConstraint(fields=('target', 'host', 'port', 'protocol'), name='unique_service_inventory'),
+                ],
+            },
+        ),
+    ]
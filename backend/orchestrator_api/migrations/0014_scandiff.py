@@ -0,0 +1,42 @@
+# backend/orchestrator_api/migrations/0014_scandiff.py
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orchestrator_api', '0013_serviceinventory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScanDiff',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('ports_added', models.PositiveIntegerField(default=0)),
+                ('ports_removed', models.PositiveIntegerField(default=0)),
+                ('ports_changed', models.PositiveIntegerField(default=0)),
+                ('vulns_added', models.PositiveIntegerField(default=0)),
+                ('vulns_removed', models.PositiveIntegerField(default=0)),
+                ('vulns_changed', models.PositiveIntegerField(default=0)),
+                ('has_changes', models.BooleanField(default=False)),
+                ('diff', models.JSONField(blank=True, default=dict)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('previous_scan', models.ForeignKey(blank=True, help_text='Null for the first scan of the target', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='orchestrator_api.scan')),
+                ('scan', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='diff', to='orchestrator_api.scan')),
+                ('target', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scan_diffs', to='orchestrator_api.target')),
+            ],
+            options={
+                'verbose_name': 'Scan Diff',
+                'verbose_name_plural': 'Scan Diffs',
+                'db_table': 'scan_diff',
+                'ordering': ['-computed_at'],
+                'indexes': [
+                    models.Index(fields=['target', 'computed_at'], name='scan_diff_target__28e518_idx'),
+                    models.Index(fields=['has_changes', 'computed_at'], name='scan_diff_has_cha_f9b73d_idx'),
+                ],
+            },
+        ),
+    ]
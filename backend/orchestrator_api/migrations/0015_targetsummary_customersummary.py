@@ -0,0 +1,60 @@
+# backend/orchestrator_api/migrations/0015_targetsummary_customersummary.py
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orchestrator_api', '0014_scandiff'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TargetSummary',
+            fields=[
+                ('target', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='orchestrator_api.target')),
+                ('scans_count', models.PositiveIntegerField(default=0)),
+                ('last_scan_status', models.CharField(blank=True, max_length=50)),
+                ('last_scan_at', models.DateTimeField(blank=True, null=True)),
+                ('last_scan_completed_at', models.DateTimeField(blank=True, null=True)),
+                ('open_ports', models.JSONField(blank=True, default=list, help_text="[22, 80, 'udp/53']")),
+                ('open_ports_count', models.PositiveIntegerField(default=0)),
+                ('os_guess', models.CharField(blank=True, max_length=255)),
+                ('vulns_critical', models.PositiveIntegerField(default=0)),
+                ('vulns_high', models.PositiveIntegerField(default=0)),
+                ('vulns_medium', models.PositiveIntegerField(default=0)),
+                ('vulns_low', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('last_completed_scan', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='orchestrator_api.scan')),
+                ('last_scan', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='orchestrator_api.scan')),
+            ],
+            options={
+                'verbose_name': 'Target Summary',
+                'verbose_name_plural': 'Target Summaries',
+                'db_table': 'target_summary',
+            },
+        ),
+        migrations.CreateModel(
+            name='CustomerSummary',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='orchestrator_api.customer')),
+                ('targets_count', models.PositiveIntegerField(default=0)),
+                ('scans_count', models.PositiveIntegerField(default=0)),
+                ('status_distribution', models.JSONField(blank=True, default=dict)),
+                ('open_ports_count', models.PositiveIntegerField(default=0)),
+                ('vulns_critical', models.PositiveIntegerField(default=0)),
+                ('vulns_high', models.PositiveIntegerField(default=0)),
+                ('vulns_medium', models.PositiveIntegerField(default=0)),
+                ('vulns_low', models.PositiveIntegerField(default=0)),
+                ('last_scan_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Customer Summary',
+                'verbose_name_plural': 'Customer Summaries',
+                'db_table': 'customer_summary',
+            },
+        ),
+    ]
@@ -0,0 +1,108 @@
+# backend/orchestrator_api/migrations/0016_target_ip_bounds_trigram_indexes.py
+
+import ipaddress
+
+from django.db import migrations, models
+
+
+def ip_key(ip):
+    """Sortable key of an address (copy of orchestrator_api.search.ip_key at this migration)"""
+    return f"{ip.version}{int(ip):032x}"
+
+
+def address_bounds(address):
+    """First and last key covered by an IP, CIDR or start-end range (copy of orchestrator_api.search)"""
+    if not address:
+        return None
+    address = address.strip()
+    try:
+        if '/' in address:
+            network = ipaddress.ip_network(address, strict=False)
+            return ip_key(network.network_address), ip_key(network.broadcast_address)
+        if address.count('-') == 1:
+            start, end = (ipaddress.ip_address(part.strip()) for part in address.split('-'))
+            if start.version != end.version or end < start:
+                return None
+            return ip_key(start), ip_key(end)
+        ip = ipaddress.ip_address(address)
+        return ip_key(ip), ip_key(ip)
+    except ValueError:
+        return None
+
+
+# Colonne cercate con icontains (filtri e ?search=). Su PostgreSQL Django genera
+# UPPER("col"::text) LIKE UPPER('%term%'): l'indice trigram deve essere sulla
+# stessa espressione per essere usato.
+TRIGRAM_INDEXES = [
+    ('customer', 'name'),
+    ('customer', 'company_name'),
+    ('customer', 'email'),
+    ('customer', 'contact_person'),
+    ('target', 'name'),
+    ('target', 'address'),
+    ('target', 'description'),
+    ('fingerprint_detail', 'service_name'),
+    ('fingerprint_detail', 'service_product'),
+    ('fingerprint_detail', 'service_version'),
+]
+
+
+def trigram_index_name(table, column):
+    return f"{table}_{column}_trgm_idx"
+
+
+def compile_target_addresses(apps, schema_editor):
+    """Compute the address range bounds of the existing targets"""
+    Target = apps.get_model('orchestrator_api', 'Target')
+    targets = []
+    for target in Target.objects.only('id', 'address').iterator():
+        bounds = address_bounds(target.address)
+        if bounds:
+            target.ip_start, target.ip_end = bounds
+            targets.append(target)
+    Target.objects.bulk_update(targets, ['ip_start', 'ip_end'], batch_size=1000)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """GIN trigram indexes, PostgreSQL only (SQLite keeps the sequential scan)"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {trigram_index_name(table, column)} '
+            f'ON {table} USING gin (UPPER(("{column}")::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {trigram_index_name(table, column)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orchestrator_api', '0015_targetsummary_customersummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='target',
+            name='ip_start',
+            field=models.CharField(blank=True, default='', editable=False, max_length=33),
+        ),
+        migrations.AddField(
+            model_name='target',
+            name='ip_end',
+            field=models.CharField(blank=True, default='', editable=False, max_length=33),
+        ),
+        migrations.AddIndex(
+            model_name='target',
+            index=models.Index(fields=['ip_start', 'ip_end'], name='target_ip_star_2848c9_idx'),
+        ),
+        migrations.RunPython(compile_target_addresses, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
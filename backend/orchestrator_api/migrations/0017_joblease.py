@@ -0,0 +1,43 @@
+# backend/orchestrator_api/migrations/0017_joblease.py
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orchestrator_api', '0016_target_ip_bounds_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobLease',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('plugin', models.CharField(max_length=20)),
+                ('state', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running')], default='queued', max_length=10)),
+                ('attempt', models.PositiveIntegerField(default=1, help_text='Dispatch number, echoed by the plugin in its updates')),
+                ('worker', models.CharField(blank=True, help_text='Host name of the plugin instance holding the job', max_length=255)),
+                ('expires_at', models.DateTimeField()),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True)),
+                ('checkpoint', models.JSONField(blank=True, default=dict, help_text='Progress saved by the plugin to resume the job')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('scan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leases', to='orchestrator_api.scan')),
+                ('shard', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='leases', to='orchestrator_api.scanshard')),
+            ],
+            options={
+                'verbose_name': 'Job Lease',
+                'verbose_name_plural': 'Job Leases',
+                'db_table': 'job_lease',
+                'ordering': ['expires_at'],
+                'indexes': [
+                    models.Index(fields=['expires_at'], name='job_lease_expires_9b9a06_idx'),
+                ],
+                'constraints': [
+                    models.UniqueConstraint(condition=models.Q(('shard__isnull', True)), fields=('scan', 'plugin'), name='unique_job_lease_plugin'),
+                    models.UniqueConstraint(condition=models.Q(('shard__isnull', False)), fields=('shard',), name='unique_job_lease_shard'),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# backend/orchestrator_api/migrations/0018_scanschedule.py
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orchestrator_api', '0017_joblease'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScanSchedule',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('deleted_at', models.DateTimeField(blank=True, null=True)),
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255)),
+                ('scan_mode', models.CharField(choices=[('full', 'Full'), ('incremental', 'Incremental')], default='full', max_length=20)),
+                ('cron', models.CharField(blank=True, help_text='Cron expression (minute hour day month weekday), in the server time zone', max_length=100)),
+                ('interval_minutes', models.PositiveIntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(1)])),
+                ('jitter_minutes', models.PositiveIntegerField(default=60, help_text='The scans of a run start spread over this window')),
+                ('enabled', models.BooleanField(default=True)),
+                ('next_run_at', models.DateTimeField(blank=True, null=True)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scan_schedules', to='orchestrator_api.customer')),
+                ('scan_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedules', to='orchestrator_api.scantype')),
+                ('targets', models.ManyToManyField(blank=True, help_text='Targets to scan; empty means every target of the customer', related_name='scan_schedules', to='orchestrator_api.target')),
+            ],
+            options={
+                'verbose_name': 'Scan Schedule',
+                'verbose_name_plural': 'Scan Schedules',
+                'db_table': 'scan_schedule',
+                'ordering': ['customer', 'name'],
+                'indexes': [
+                    models.Index(fields=['enabled', 'next_run_at'], name='scan_schedu_enabled_270d8e_idx'),
+                ],
+            },
+        ),
+        migrations.AddField(
+            model_name='scan',
+            name='schedule',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='scans', to='orchestrator_api.scanschedule'),
+        ),
+        migrations.AddField(
+            model_name='scan',
+            name='scheduled_for',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='scan',
+            index=models.Index(fields=['status', 'scheduled_for'], name='scan_status_98ca83_idx'),
+        ),
+    ]
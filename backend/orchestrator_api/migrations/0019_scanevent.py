@@ -0,0 +1,50 @@
+# backend/orchestrator_api/migrations/0019_scanevent.py
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+from orchestrator_api.partitions import create_partitioned_table, ensure_monthly_partitions
+
+
+def partition_scan_event(apps, schema_editor):
+    """Monthly range partitions on occurred_at, PostgreSQL only"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    create_partitioned_table(schema_editor, 'scan_event', 'occurred_at')
+    ensure_monthly_partitions(schema_editor.connection, 'scan_event', settings.SCAN_EVENT_PARTITION_MONTHS_AHEAD)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orchestrator_api', '0018_scanschedule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScanEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('module', models.CharField(help_text="'scan' for status transitions, else the plugin", max_length=20)),
+                ('status', models.CharField(max_length=50)),
+                ('shard_id', models.IntegerField(blank=True, null=True)),
+                ('progress', models.FloatField(blank=True, null=True)),
+                ('message', models.TextField(blank=True)),
+                ('occurred_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('scan', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='events', to='orchestrator_api.scan')),
+            ],
+            options={
+                'verbose_name': 'Scan Event',
+                'verbose_name_plural': 'Scan Events',
+                'db_table': 'scan_event',
+                'ordering': ['occurred_at', 'id'],
+                'indexes': [
+                    models.Index(fields=['scan', 'occurred_at'], name='scan_event_scan_id_d169b5_idx'),
+                ],
+            },
+        ),
+        # Il drop della tabella (reverse di CreateModel) rimuove anche le partizioni
+        migrations.RunPython(partition_scan_event, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# backend/orchestrator_api/migrations/0020_customer_retention_days.py
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orchestrator_api', '0019_scanevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='retention_days',
+            field=models.PositiveIntegerField(blank=True, help_text='Days finished scans are kept before being archived; empty = SCAN_RETENTION_DAYS, 0 = keep forever', null=True),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# backend/orchestrator_api/migrations/0021_target_ip_range_gist.py
+
+from django.db import migrations
+
+
+# Il B-tree su (ip_start, ip_end) serve solo il primo confronto dell'overlap
+# (ip_start <= last): con ip_end >= first la scansione dell'indice parte comunque
+# dall'inizio. Su PostgreSQL i due estremi diventano un range di testo (chiavi a
+# larghezza fissa, collation "C") e && usa un indice GiST, come inet && inet.
+RANGE_TYPE = 'ip_key_range'
+INDEX_NAME = 'target_ip_key_range_gist_idx'
+
+
+def create_range_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f"DO $$ BEGIN CREATE TYPE {RANGE_TYPE} AS RANGE (subtype = text, collation = \"C\"); "
+        f"EXCEPTION WHEN duplicate_object THEN NULL; END $$"
+    )
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON target USING gist ({RANGE_TYPE}(ip_start, ip_end, '[]'))"
+    )
+
+
+def drop_range_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+    schema_editor.execute(f'DROP TYPE IF EXISTS {RANGE_TYPE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orchestrator_api', '0020_customer_retention_days'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_range_index, drop_range_index),
+    ]
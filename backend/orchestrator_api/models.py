@@ -1,4 +1,6 @@
 import uuid
+from datetime import timedelta
+from functools import cached_property
 from django.db import models
 from django.core.validators import RegexValidator
 from django.core.validators import MinValueValidator, MaxValueValidator
@@ -7,6 +9,10 @@ from django.contrib.auth.models import User
 from django.utils import timezone
 import ipaddress
 
+from .cron import CronExpression
+from .ports import PortSet, nmap_port_spec
+from .search import address_bounds
+
 
 
 class TimestampMixin(models.Model):
@@ -66,6 +72,11 @@ class Customer(TimestampMixin, SoftDeleteMixin):
     contact_person = models.CharField(max_length=255, blank=True)
     address = models.TextField(blank=True)
     notes = models.TextField(blank=True)
+    retention_days = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Days finished scans are kept before being archived; empty = SCAN_RETENTION_DAYS, 0 = keep forever"
+    )
     
     objects = SoftDeleteManager()
     all_objects = models.Manager()  # Includes soft deleted
@@ -96,6 +107,18 @@ class PortList(TimestampMixin, SoftDeleteMixin):
     )
     description = models.TextField(null=True, blank=True)
     
+    # Compiled form of tcp_ports/udp_ports (merged ranges), refreshed on every save
+    tcp_ranges = models.JSONField(default=list, blank=True, editable=False)
+    udp_ranges = models.JSONField(default=list, blank=True, editable=False)
+    tcp_port_count = models.PositiveIntegerField(default=0, editable=False)
+    udp_port_count = models.PositiveIntegerField(default=0, editable=False)
+    nmap_port_spec = models.TextField(
+        blank=True,
+        default='',
+        editable=False,
+        help_text="nmap -p specification (e.g. 'T:1-1000,U:53')"
+    )
+    
     objects = SoftDeleteManager()
     all_objects = models.Manager()
     
@@ -113,7 +136,7 @@ class PortList(TimestampMixin, SoftDeleteMixin):
         if not self.tcp_ports and not self.udp_ports:
             raise ValidationError("At least one of TCP ports or UDP ports must be specified")
         
-        # Validate port format (basic validation)
+        # Validate port format
         for ports, port_type in [(self.tcp_ports, 'TCP'), (self.udp_ports, 'UDP')]:
             if ports:
                 self._validate_port_string(ports, port_type)
@@ -121,23 +144,36 @@ class PortList(TimestampMixin, SoftDeleteMixin):
     def _validate_port_string(self, ports_string, port_type):
         """Validate port string format"""
         try:
-            parts = [p.strip() for p in ports_string.split(',')]
-            for part in parts:
-                if '-' in part:
-                    # Range validation
-                    start, end = part.split('-')
-                    start_port, end_port = int(start), int(end)
-                    if not (1 <= start_port <= 65535) or not (1 <= end_port <= 65535):
-                        raise ValidationError(f"Invalid {port_type} port range: {part}")
-                    if start_port > end_port:
-                        raise ValidationError(f"Invalid {port_type} port range: {part} (start > end)")
-                else:
-                    # Single port validation
-                    port = int(part)
-                    if not (1 <= port <= 65535):
-                        raise ValidationError(f"Invalid {port_type} port: {part}")
-        except ValueError:
-            raise ValidationError(f"Invalid {port_type} port format: {ports_string}")
+            return PortSet.parse(ports_string)
+        except ValueError as e:
+            raise ValidationError(f"Invalid {port_type} ports: {e}")
+    
+    def compile_ports(self):
+        """Compile tcp_ports/udp_ports into merged ranges, counts and the nmap port spec"""
+        tcp = self._validate_port_string(self.tcp_ports, 'TCP')
+        udp = self._validate_port_string(self.udp_ports, 'UDP')
+        
+        self.tcp_ranges = [list(r) for r in tcp.ranges]
+        self.udp_ranges = [list(r) for r in udp.ranges]
+        self.tcp_port_count = len(tcp)
+        self.udp_port_count = len(udp)
+        self.nmap_port_spec = nmap_port_spec(tcp, udp)
+        
+        # Drop the cached sets of the previous values
+        self.__dict__.pop('tcp_port_set', None)
+        self.__dict__.pop('udp_port_set', None)
+    
+    @cached_property
+    def tcp_port_set(self):
+        return PortSet(self.tcp_ranges)
+    
+    @cached_property
+    def udp_port_set(self):
+        return PortSet(self.udp_ranges)
+    
+    @property
+    def total_ports(self):
+        return self.tcp_port_count + self.udp_port_count
 
 
 class ScanType(TimestampMixin, SoftDeleteMixin):
@@ -208,10 +244,14 @@ class Target(TimestampMixin, SoftDeleteMixin):
     name = models.CharField(max_length=255)
     address = models.CharField(
         max_length=50,
-        help_text="IP address or FQDN"
+        help_text="IP address, FQDN or address range (CIDR or start-end)"
     )
     description = models.TextField(null=True, blank=True)
     
+    # First/last address covered, as sortable keys (see search.py); empty for FQDNs
+    ip_start = models.CharField(max_length=33, blank=True, default='', editable=False)
+    ip_end = models.CharField(max_length=33, blank=True, default='', editable=False)
+    
     objects = SoftDeleteManager()
     all_objects = models.Manager()
     
@@ -219,6 +259,9 @@ class Target(TimestampMixin, SoftDeleteMixin):
         db_table = 'target'
         ordering = ['customer', 'name']
         unique_together = [['customer', 'address']]
+        indexes = [
+            models.Index(fields=['ip_start', 'ip_end']),
+        ]
         verbose_name = 'Target'
         verbose_name_plural = 'Targets'
     
@@ -237,12 +280,75 @@ class Target(TimestampMixin, SoftDeleteMixin):
         except ValueError:
             pass
         
+        # Address ranges (CIDR or start-end)
+        networks = self.parse_address_range(self.address)
+        if networks is not None:
+            self.validate_range_size(networks)
+            return
+        
         # If not IP, validate as FQDN (basic validation)
         fqdn_validator = RegexValidator(
             regex=r'^[a-zA-Z0-9]([a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?(\.[a-zA-Z0-9]([a-zA-Z0-9\-]{0,61}[a-zA-Z0-9])?)*$',
             message='Enter a valid IP address or FQDN'
         )
         fqdn_validator(self.address)
+    
+    def compile_address(self):
+        """Store the address range bounds used by the network filters"""
+        self.ip_start, self.ip_end = address_bounds(self.address) or ('', '')
+    
+    @property
+    def is_range(self):
+        """True when the target is an address block rather than a single host"""
+        return self.parse_address_range(self.address) is not None
+    
+    @staticmethod
+    def parse_address_range(address):
+        """
+        Parse a range address into the list of networks it covers.
+        Supports CIDR ('10.0.0.0/24') and start-end ('10.0.0.1-10.0.0.50').
+        
+        Returns:
+            list: ip_network objects, or None if the address is not a range
+        
+        Raises:
+            ValidationError: if the address looks like a range but is invalid
+        """
+        if not address:
+            return None
+        
+        try:
+            if '/' in address:
+                network = ipaddress.ip_network(address, strict=False)
+                return [network] if network.num_addresses > 1 else None
+            
+            if address.count('-') == 1:
+                start, end = (part.strip() for part in address.split('-'))
+                try:
+                    start_ip = ipaddress.ip_address(start)
+                except ValueError:
+                    # FQDN containing a hyphen
+                    return None
+                end_ip = ipaddress.ip_address(end)
+                if end_ip < start_ip:
+                    raise ValidationError(f"Invalid address range: {address} (start > end)")
+                return list(ipaddress.summarize_address_range(start_ip, end_ip))
+        except (ValueError, TypeError):
+            raise ValidationError(f"Invalid address range: {address}")
+        
+        return None
+    
+    @staticmethod
+    def validate_range_size(networks):
+        """Reject ranges larger than NMAP_MAX_TARGET_ADDRESSES"""
+        from django.conf import settings
+        
+        total = sum(network.num_addresses for network in networks)
+        if total > settings.NMAP_MAX_TARGET_ADDRESSES:
+            raise ValidationError(
+                f"Address range too large: {total} addresses "
+                f"(max {settings.NMAP_MAX_TARGET_ADDRESSES})"
+            )
 
 
 class Scan(TimestampMixin, SoftDeleteMixin):
@@ -265,6 +371,11 @@ class Scan(TimestampMixin, SoftDeleteMixin):
         ('Completed', 'Completed'),
         ('Failed', 'Failed'),
     ]
+
+    SCAN_MODE_CHOICES = [
+        ('full', 'Full'),
+        ('incremental', 'Incremental'),
+    ]
     
     id = models.AutoField(primary_key=True)
     target = models.ForeignKey(
@@ -290,6 +401,31 @@ class Scan(TimestampMixin, SoftDeleteMixin):
     initiated_at = models.DateTimeField(auto_now_add=True)
     started_at = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
+
+    # Incremental scans only re-run plugins on ports that changed since the baseline
+    scan_mode = models.CharField(
+        max_length=20,
+        choices=SCAN_MODE_CHOICES,
+        default='full'
+    )
+    baseline_scan = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='incremental_scans',
+        help_text="Previous scan of the same target used as baseline for incremental scans"
+    )
+
+    # Scans created by a schedule wait as Pending until scheduled_for (see ScheduleService)
+    schedule = models.ForeignKey(
+        'ScanSchedule',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='scans'
+    )
+    scheduled_for = models.DateTimeField(null=True, blank=True)
     
     # Results storage
     parsed_nmap_results = models.JSONField(null=True, blank=True)
@@ -310,6 +446,9 @@ class Scan(TimestampMixin, SoftDeleteMixin):
     class Meta:
         db_table = 'scan'
         ordering = ['-initiated_at']
+        indexes = [
+            models.Index(fields=['status', 'scheduled_for']),
+        ]
         verbose_name = 'Scan'
         verbose_name_plural = 'Scans'
     
@@ -349,7 +488,20 @@ class ScanDetail(TimestampMixin, SoftDeleteMixin):
         blank=True,
         help_text="Operating system detection results"
     )
-    
+
+    port_delta = models.JSONField(
+        null=True,
+        blank=True,
+        help_text="Open port/service changes against the baseline scan (incremental scans only)"
+    )
+
+    # Plugin dependency graph state: {plugin_name: pending|queued|running|completed|failed|skipped}
+    plugin_states = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Per-plugin execution state of the scan workflow graph"
+    )
+
     # Timing information for individual modules
     nmap_started_at = models.DateTimeField(null=True, blank=True)
     nmap_completed_at = models.DateTimeField(null=True, blank=True)
@@ -373,6 +525,264 @@ class ScanDetail(TimestampMixin, SoftDeleteMixin):
     def __str__(self):
         return f"Details for Scan #{self.scan.id}"
     
+class ScanShard(TimestampMixin, SoftDeleteMixin):
+    """Slice of a range scan (address block and/or port range) run as a separate nmap job"""
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    TERMINAL_STATUSES = ('completed', 'failed')
+    
+    id = models.AutoField(primary_key=True)
+    scan = models.ForeignKey(
+        Scan,
+        on_delete=models.CASCADE,
+        related_name='shards'
+    )
+    index = models.PositiveIntegerField()
+    hosts = models.TextField(
+        help_text="Space-separated nmap target specification of the shard"
+    )
+    ports = models.TextField(
+        null=True,
+        blank=True,
+        help_text="nmap -p specification, empty to use the scan type port list"
+    )
+    host_count = models.PositiveIntegerField(default=1)
+    port_count = models.PositiveIntegerField(null=True, blank=True)
+    
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='pending'
+    )
+    progress = models.FloatField(
+        default=0,
+        validators=[MinValueValidator(0), MaxValueValidator(100)],
+        help_text="Shard progress percentage"
+    )
+    parsed_nmap_results = models.JSONField(null=True, blank=True)
+    error_message = models.TextField(null=True, blank=True)
+    
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    objects = SoftDeleteManager()
+    all_objects = models.Manager()
+    
+    class Meta:
+        db_table = 'scan_shard'
+        ordering = ['scan', 'index']
+        unique_together = [['scan', 'index']]
+        verbose_name = 'Scan Shard'
+        verbose_name_plural = 'Scan Shards'
+    
+    def __str__(self):
+        return f"Shard {self.index} of Scan #{self.scan_id} ({self.hosts})"
+    
+    @property
+    def weight(self):
+        """Amount of work of the shard, used to weight its progress"""
+        return self.host_count * (self.port_count or 1)
+    
+    @property
+    def is_terminal(self):
+        return self.status in self.TERMINAL_STATUSES
+
+
+class JobLease(models.Model):
+    """
+    Ownership of a dispatched plugin job (one plugin of a scan, or one nmap
+    shard). Plugins renew it with heartbeats; the lease reaper re-dispatches
+    or fails the jobs whose lease expired.
+    """
+
+    STATE_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    scan = models.ForeignKey(
+        Scan,
+        on_delete=models.CASCADE,
+        related_name='leases'
+    )
+    plugin = models.CharField(max_length=20)
+    shard = models.ForeignKey(
+        ScanShard,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='leases'
+    )
+
+    state = models.CharField(max_length=10, choices=STATE_CHOICES, default='queued')
+    attempt = models.PositiveIntegerField(default=1, help_text="Dispatch number, echoed by the plugin in its updates")
+    worker = models.CharField(max_length=255, blank=True, help_text="Host name of the plugin instance holding the job")
+    expires_at = models.DateTimeField()
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    checkpoint = models.JSONField(default=dict, blank=True, help_text="Progress saved by the plugin to resume the job")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'job_lease'
+        ordering = ['expires_at']
+        verbose_name = 'Job Lease'
+        verbose_name_plural = 'Job Leases'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['scan', 'plugin'],
+                condition=models.Q(shard__isnull=True),
+                name='unique_job_lease_plugin'
+            ),
+            models.UniqueConstraint(
+                fields=['shard'],
+                condition=models.Q(shard__isnull=False),
+                name='unique_job_lease_shard'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at']),
+        ]
+
+    def __str__(self):
+        job = f"shard {self.shard_id}" if self.shard_id else self.plugin
+        return f"Lease of scan {self.scan_id} {job} (attempt {self.attempt})"
+
+
+class ScanSchedule(TimestampMixin, SoftDeleteMixin):
+    """Recurring scan of a target group"""
+    id = models.AutoField(primary_key=True)
+    name = models.CharField(max_length=255)
+    customer = models.ForeignKey(
+        Customer,
+        on_delete=models.CASCADE,
+        related_name='scan_schedules'
+    )
+    targets = models.ManyToManyField(
+        Target,
+        blank=True,
+        related_name='scan_schedules',
+        help_text="Targets to scan; empty means every target of the customer"
+    )
+    scan_type = models.ForeignKey(
+        ScanType,
+        on_delete=models.CASCADE,
+        related_name='schedules'
+    )
+    scan_mode = models.CharField(
+        max_length=20,
+        choices=Scan.SCAN_MODE_CHOICES,
+        default='full'
+    )
+
+    # Either a cron expression or a fixed interval
+    cron = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text="Cron expression (minute hour day month weekday), in the server time zone"
+    )
+    interval_minutes = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(1)]
+    )
+    jitter_minutes = models.PositiveIntegerField(
+        default=60,
+        help_text="The scans of a run start spread over this window"
+    )
+
+    enabled = models.BooleanField(default=True)
+    next_run_at = models.DateTimeField(null=True, blank=True)
+    last_run_at = models.DateTimeField(null=True, blank=True)
+
+    objects = SoftDeleteManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        db_table = 'scan_schedule'
+        ordering = ['customer', 'name']
+        indexes = [
+            models.Index(fields=['enabled', 'next_run_at']),
+        ]
+        verbose_name = 'Scan Schedule'
+        verbose_name_plural = 'Scan Schedules'
+
+    def __str__(self):
+        return f"{self.customer.name} - {self.name}"
+
+    def clean(self):
+        """Validate the recurrence"""
+        if bool(self.cron) == bool(self.interval_minutes):
+            raise ValidationError("Set either a cron expression or an interval")
+        if self.cron:
+            try:
+                CronExpression.validate(self.cron)
+            except ValueError as e:
+                raise ValidationError({'cron': str(e)})
+
+    def next_run_after(self, moment):
+        """First run strictly after moment"""
+        if self.cron:
+            local = timezone.localtime(moment)
+            return CronExpression(self.cron).next_after(local.replace(tzinfo=None)).replace(tzinfo=local.tzinfo)
+        return moment + timedelta(minutes=self.interval_minutes)
+
+    def save(self, *args, **kwargs):
+        if self.next_run_at is None and (self.cron or self.interval_minutes):
+            self.next_run_at = self.next_run_after(timezone.now())
+        super().save(*args, **kwargs)
+
+
+class ScanEvent(models.Model):
+    """
+    Append-only timeline of a scan: its status transitions (module 'scan')
+    and the updates of its plugins. Rows are never updated; on PostgreSQL the
+    table is partitioned by month on occurred_at.
+    """
+
+    SCAN_MODULE = 'scan'
+
+    # Stati degli aggiornamenti dei plugin che aprono e chiudono con errore un modulo
+    RUNNING_STATUSES = ('running', 'started')
+    FAILED_STATUSES = ('failed', 'error')
+
+    id = models.BigAutoField(primary_key=True)
+    # Nessun vincolo nel database: le tabelle partizionate non sono referenziate e lo storico resta leggibile
+    scan = models.ForeignKey(
+        Scan,
+        on_delete=models.CASCADE,
+        db_constraint=False,
+        db_index=False,
+        related_name='events'
+    )
+    module = models.CharField(max_length=20, help_text="'scan' for status transitions, else the plugin")
+    status = models.CharField(max_length=50)
+    shard_id = models.IntegerField(null=True, blank=True)
+    progress = models.FloatField(null=True, blank=True)
+    message = models.TextField(blank=True)
+    occurred_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'scan_event'
+        ordering = ['occurred_at', 'id']
+        verbose_name = 'Scan Event'
+        verbose_name_plural = 'Scan Events'
+        indexes = [
+            models.Index(fields=['scan', 'occurred_at']),
+        ]
+
+    def __str__(self):
+        return f"Scan {self.scan_id} {self.module}: {self.status}"
+
+
 class FingerprintDetail(TimestampMixin, SoftDeleteMixin):
     """Detailed fingerprint results for each port/service"""
     
@@ -428,6 +838,13 @@ class FingerprintDetail(TimestampMixin, SoftDeleteMixin):
 class GceResult(TimestampMixin, SoftDeleteMixin):
     """Store GCE (Greenbone) scan results"""
     
+    INGEST_STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
     id = models.AutoField(primary_key=True)
     scan = models.ForeignKey(
         Scan,
@@ -482,6 +899,17 @@ class GceResult(TimestampMixin, SoftDeleteMixin):
         blank=True,
         help_text="Full XML/JSON report from GCE"
     )
+    report_file = models.FileField(
+        upload_to='gce_reports/',
+        max_length=255,
+        null=True,
+        blank=True,
+        help_text="Raw GCE report, gzip-compressed, uploaded in chunks by the plugin"
+    )
+    report_size = models.BigIntegerField(
+        default=0,
+        help_text="Size in bytes of the compressed report file"
+    )
     
     # Summary fields (to be populated when parsing is implemented)
     vulnerability_count = models.JSONField(
@@ -490,11 +918,29 @@ class GceResult(TimestampMixin, SoftDeleteMixin):
         default=dict,
         help_text="Count by severity: {critical: 0, high: 0, medium: 0, low: 0, log: 0}"
     )
+    nvt_summary = models.JSONField(
+        null=True,
+        blank=True,
+        default=list,
+        help_text="Per-NVT summary: [{oid, name, severity, count, hosts}], highest severity first"
+    )
     
     # Timing
     gce_scan_started_at = models.DateTimeField(null=True, blank=True)
     gce_scan_completed_at = models.DateTimeField(null=True, blank=True)
     
+    # Background ingest of the stored report (findings and counts)
+    ingest_status = models.CharField(
+        max_length=20,
+        choices=INGEST_STATUS_CHOICES,
+        null=True,
+        blank=True,
+        help_text="Null when there is no stored report to ingest"
+    )
+    ingest_requested_at = models.DateTimeField(null=True, blank=True)
+    ingested_at = models.DateTimeField(null=True, blank=True)
+    ingest_error = models.TextField(null=True, blank=True)
+    
     objects = SoftDeleteManager()
     all_objects = models.Manager()
     
@@ -509,4 +955,361 @@ class GceResult(TimestampMixin, SoftDeleteMixin):
         ]
     
     def __str__(self):
-        return f"GCE Result - {self.target.address} - Task: {self.gce_task_id}"
\ No newline at end of file
+        return f"GCE Result - {self.target.address} - Task: {self.gce_task_id}"
+
+class Vulnerability(TimestampMixin, SoftDeleteMixin):
+    """Single finding (GCE <result>) extracted from a report at ingest"""
+    
+    THREAT_CHOICES = [
+        ('critical', 'Critical'),
+        ('high', 'High'),
+        ('medium', 'Medium'),
+        ('low', 'Low'),
+        ('log', 'Log'),
+    ]
+    
+    id = models.BigAutoField(primary_key=True)
+    scan = models.ForeignKey(
+        Scan,
+        on_delete=models.CASCADE,
+        related_name='vulnerabilities'
+    )
+    target = models.ForeignKey(
+        Target,
+        on_delete=models.CASCADE,
+        related_name='vulnerabilities'
+    )
+    gce_result = models.ForeignKey(
+        GceResult,
+        on_delete=models.CASCADE,
+        related_name='vulnerabilities'
+    )
+    result_id = models.UUIDField(null=True, blank=True, help_text="Result ID in Greenbone")
+    
+    # NVT
+    nvt_oid = models.CharField(max_length=100, help_text="OID of the NVT that produced the finding")
+    name = models.CharField(max_length=500)
+    family = models.CharField(max_length=255, blank=True)
+    
+    # Where
+    host = models.CharField(max_length=255, help_text="Host address as reported by GCE")
+    hostname = models.CharField(max_length=255, blank=True)
+    port = models.IntegerField(null=True, blank=True, help_text="Null for host-level findings ('general/tcp')")
+    protocol = models.CharField(max_length=10, blank=True)
+    
+    # Severity
+    severity = models.FloatField(default=0.0, help_text="CVSS score")
+    threat = models.CharField(max_length=10, choices=THREAT_CHOICES, default='log')
+    qod = models.IntegerField(null=True, blank=True, help_text="Quality of detection 0-100")
+    
+    description = models.TextField(blank=True)
+    solution = models.TextField(blank=True)
+    
+    objects = SoftDeleteManager()
+    all_objects = models.Manager()
+    
+    class Meta:
+        db_table = 'vulnerability'
+        ordering = ['-severity', 'host', 'port']
+        verbose_name = 'Vulnerability'
+        verbose_name_plural = 'Vulnerabilities'
+        indexes = [
+            models.Index(fields=['nvt_oid']),
+            models.Index(fields=['severity']),
+            models.Index(fields=['host', 'port']),
+            models.Index(fields=['target', 'severity']),
+            models.Index(fields=['scan', 'severity']),
+        ]
+    
+    def __str__(self):
+        location = f"{self.host}:{self.port}" if self.port else self.host
+        return f"{self.name} ({self.severity}) - {location}"
+
+
+class VulnerabilityCve(models.Model):
+    """CVE referenced by a finding, one row per CVE for indexed lookups"""
+    
+    id = models.BigAutoField(primary_key=True)
+    vulnerability = models.ForeignKey(
+        Vulnerability,
+        on_delete=models.CASCADE,
+        related_name='cve_refs'
+    )
+    cve = models.CharField(max_length=50, db_index=True)
+    
+    class Meta:
+        db_table = 'vulnerability_cve'
+        verbose_name = 'Vulnerability CVE'
+        verbose_name_plural = 'Vulnerability CVEs'
+        constraints = [
+            models.UniqueConstraint(fields=['vulnerability', 'cve'], name='unique_vulnerability_cve'),
+        ]
+    
+    def __str__(self):
+        return self.cve
+
+
+class OsMatch(models.Model):
+    """OS match reported by nmap -O for a host, kept out of Scan.parsed_nmap_results"""
+    
+    id = models.BigAutoField(primary_key=True)
+    scan = models.ForeignKey(
+        Scan,
+        on_delete=models.CASCADE,
+        related_name='os_matches'
+    )
+    target = models.ForeignKey(
+        Target,
+        on_delete=models.CASCADE,
+        related_name='os_matches'
+    )
+    host = models.CharField(max_length=255)
+    rank = models.PositiveSmallIntegerField(default=0, help_text="0 = best match of the host")
+    name = models.CharField(max_length=255)
+    accuracy = models.PositiveSmallIntegerField(default=0, help_text="Accuracy 0-100")
+    line = models.CharField(max_length=20, blank=True, help_text="Line in the nmap OS database")
+    
+    # Prima <osclass> del match
+    vendor = models.CharField(max_length=100, blank=True)
+    os_type = models.CharField(max_length=100, blank=True)
+    osfamily = models.CharField(max_length=100, blank=True)
+    osgen = models.CharField(max_length=50, blank=True)
+    cpe = models.JSONField(default=list, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'os_match'
+        ordering = ['scan', 'host', 'rank']
+        verbose_name = 'OS Match'
+        verbose_name_plural = 'OS Matches'
+        indexes = [
+            models.Index(fields=['scan', 'host']),
+            models.Index(fields=['target', 'host']),
+            models.Index(fields=['osfamily']),
+        ]
+    
+    def __str__(self):
+        return f"{self.host}: {self.name} ({self.accuracy}%)"
+
+
+class ScriptResult(models.Model):
+    """Output of an NSE script, per port or per host (hostscript)"""
+    
+    id = models.BigAutoField(primary_key=True)
+    scan = models.ForeignKey(
+        Scan,
+        on_delete=models.CASCADE,
+        related_name='script_results'
+    )
+    target = models.ForeignKey(
+        Target,
+        on_delete=models.CASCADE,
+        related_name='script_results'
+    )
+    host = models.CharField(max_length=255)
+    port = models.IntegerField(null=True, blank=True, help_text="Null for host scripts")
+    protocol = models.CharField(max_length=10, blank=True)
+    script_id = models.CharField(max_length=100, help_text="NSE script name, e.g. http-title")
+    output = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'script_result'
+        ordering = ['scan', 'host', 'port', 'script_id']
+        verbose_name = 'Script Result'
+        verbose_name_plural = 'Script Results'
+        indexes = [
+            models.Index(fields=['scan', 'host', 'port']),
+            models.Index(fields=['script_id']),
+            models.Index(fields=['target', 'script_id']),
+        ]
+    
+    def __str__(self):
+        location = f"{self.host}:{self.port}/{self.protocol}" if self.port else self.host
+        return f"{self.script_id} - {location}"
+
+
+class ServiceInventory(models.Model):
+    """
+    Current state of every port/service seen on a target, one row per
+    (target, host, port, protocol). Upserted at nmap and fingerprint ingest.
+    """
+    
+    id = models.BigAutoField(primary_key=True)
+    target = models.ForeignKey(
+        Target,
+        on_delete=models.CASCADE,
+        related_name='services'
+    )
+    host = models.CharField(max_length=255, help_text="Target address for single hosts, scanned IP for ranges")
+    port = models.IntegerField()
+    protocol = models.CharField(max_length=10, default='tcp')
+    
+    service = models.CharField(max_length=100, blank=True)
+    product = models.CharField(max_length=255, blank=True)
+    version = models.CharField(max_length=255, blank=True)
+    
+    is_open = models.BooleanField(default=True, help_text="False once a later scan of the port found it closed")
+    first_seen = models.DateTimeField()
+    last_seen = models.DateTimeField()
+    last_scan = models.ForeignKey(
+        Scan,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    
+    class Meta:
+        db_table = 'service_inventory'
+        ordering = ['target', 'host', 'port', 'protocol']
+        verbose_name = 'Service Inventory'
+        verbose_name_plural = 'Service Inventory'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['target', 'host', 'port', 'protocol'],
+                name='unique_service_inventory'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['port', 'protocol']),
+            models.Index(fields=['service']),
+            models.Index(fields=['last_seen']),
+        ]
+    
+    def __str__(self):
+        return f"{self.host}:{self.port}/{self.protocol} {self.service}".strip()
+
+
+class ScanDiff(models.Model):
+    """
+    Changes of a completed scan against the previous completed scan of the
+    same target, materialized at completion time
+    """
+    
+    id = models.BigAutoField(primary_key=True)
+    scan = models.OneToOneField(
+        Scan,
+        on_delete=models.CASCADE,
+        related_name='diff'
+    )
+    previous_scan = models.ForeignKey(
+        Scan,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        help_text="Null for the first scan of the target"
+    )
+    target = models.ForeignKey(
+        Target,
+        on_delete=models.CASCADE,
+        related_name='scan_diffs'
+    )
+    
+    # Contatori per gli alert: la lista non carica il JSON del diff
+    ports_added = models.PositiveIntegerField(default=0)
+    ports_removed = models.PositiveIntegerField(default=0)
+    ports_changed = models.PositiveIntegerField(default=0)
+    vulns_added = models.PositiveIntegerField(default=0)
+    vulns_removed = models.PositiveIntegerField(default=0)
+    vulns_changed = models.PositiveIntegerField(default=0)
+    has_changes = models.BooleanField(default=False)
+    
+    diff = models.JSONField(default=dict, blank=True)
+    computed_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'scan_diff'
+        ordering = ['-computed_at']
+        verbose_name = 'Scan Diff'
+        verbose_name_plural = 'Scan Diffs'
+        indexes = [
+            models.Index(fields=['target', 'computed_at']),
+            models.Index(fields=['has_changes', 'computed_at']),
+        ]
+    
+    def __str__(self):
+        return f"Scan {self.scan_id} vs {self.previous_scan_id or '-'}"
+
+
+class TargetSummary(models.Model):
+    """Materialized counters of a target, refreshed when its scans finish or new GCE counts arrive"""
+    
+    target = models.OneToOneField(
+        Target,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='summary'
+    )
+    scans_count = models.PositiveIntegerField(default=0)
+    
+    # Ultima scansione avviata (anche in corso)
+    last_scan = models.ForeignKey(
+        Scan,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    last_scan_status = models.CharField(max_length=50, blank=True)
+    last_scan_at = models.DateTimeField(null=True, blank=True)
+    last_scan_completed_at = models.DateTimeField(null=True, blank=True)
+    
+    # Ultima scansione completata: porte, OS e vulnerabilità correnti del target
+    last_completed_scan = models.ForeignKey(
+        Scan,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    open_ports = models.JSONField(default=list, blank=True, help_text="[22, 80, 'udp/53']")
+    open_ports_count = models.PositiveIntegerField(default=0)
+    os_guess = models.CharField(max_length=255, blank=True)
+    vulns_critical = models.PositiveIntegerField(default=0)
+    vulns_high = models.PositiveIntegerField(default=0)
+    vulns_medium = models.PositiveIntegerField(default=0)
+    vulns_low = models.PositiveIntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'target_summary'
+        verbose_name = 'Target Summary'
+        verbose_name_plural = 'Target Summaries'
+    
+    def __str__(self):
+        return f"Summary of target {self.target_id}"
+
+
+class CustomerSummary(models.Model):
+    """Materialized dashboard counters of a customer, aggregated from its TargetSummary rows"""
+    
+    customer = models.OneToOneField(
+        Customer,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='summary'
+    )
+    targets_count = models.PositiveIntegerField(default=0)
+    scans_count = models.PositiveIntegerField(default=0)
+    status_distribution = models.JSONField(default=dict, blank=True)
+    open_ports_count = models.PositiveIntegerField(default=0)
+    vulns_critical = models.PositiveIntegerField(default=0)
+    vulns_high = models.PositiveIntegerField(default=0)
+    vulns_medium = models.PositiveIntegerField(default=0)
+    vulns_low = models.PositiveIntegerField(default=0)
+    last_scan_at = models.DateTimeField(null=True, blank=True)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'customer_summary'
+        verbose_name = 'Customer Summary'
+        verbose_name_plural = 'Customer Summaries'
+    
+    def __str__(self):
+        return f"Summary of customer {self.customer_id}"
@@ -0,0 +1,58 @@
+# backend/orchestrator_api/parsers.py
+
+import codecs
+import csv
+import io
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+from . import codec
+
+
+class OctetStreamParser(BaseParser):
+    """Raw binary body (application/octet-stream), returned as bytes"""
+
+    media_type = 'application/octet-stream'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return stream.read() if stream is not None else b''
+
+
+class CSVParser(BaseParser):
+    """CSV body with a header row (text/csv), returned as a list of dicts keyed by lowercase column"""
+
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if stream is None:
+            return []
+        try:
+            # utf-8-sig: toglie il BOM dei CSV esportati da Excel
+            text = stream.read().decode('utf-8-sig')
+            reader = csv.reader(io.StringIO(text))
+            header = [column.strip().lower() for column in next(reader, [])]
+            return [
+                dict(zip(header, (value.strip() for value in row)))
+                for row in reader
+                if any(value.strip() for value in row)
+            ]
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise ParseError(f"CSV parse error - {e}")
+
+
+class ORJSONParser(JSONParser):
+    """JSONParser decoding with orjson when installed"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if codec.orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            data = stream.read() if stream is not None else b''
+            if codecs.lookup(encoding).name != 'utf-8':
+                data = data.decode(encoding)
+            return codec.loads(data)
+        except ValueError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
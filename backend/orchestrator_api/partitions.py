@@ -0,0 +1,125 @@
+# backend/orchestrator_api/partitions.py
+
+import re
+from datetime import datetime, timezone as dt_timezone
+
+
+# Range partitioning by month of append-only tables, PostgreSQL only: old
+# months are dropped/archived as whole partitions and the queries on recent
+# rows only touch the recent partitions. Other databases keep the plain table.
+
+
+def month_start(year, month):
+    """First instant of the month in UTC, normalizing month overflow"""
+    year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+    return datetime(year, month, 1, tzinfo=dt_timezone.utc)
+
+
+def partition_name(table, moment):
+    return f"{table}_y{moment.year}m{moment.month:02d}"
+
+
+def is_partitioned(connection, table):
+    """True if table exists as a partitioned table"""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid '
+            'WHERE c.relname = %s AND pg_table_is_visible(c.oid)',
+            [table]
+        )
+        return cursor.fetchone() is not None
+
+
+def create_partitioned_table(schema_editor, table, column):
+    """
+    Rebuild a newly created (empty) table as partitioned by range of column,
+    with a default partition for the rows outside the monthly partitions.
+
+    PostgreSQL requires the partition key in the primary key: it becomes
+    (id, column). Django keeps using id alone, still unique since it comes
+    from one sequence.
+    """
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexdef FROM pg_indexes WHERE tablename = %s AND indexname <> %s",
+            [table, f'{table}_pkey']
+        )
+        indexes = [row[0] for row in cursor.fetchall()]
+
+    # LIKE senza IDENTITY: l'id diventa una sequenza classica, valida su ogni versione
+    schema_editor.execute(
+        f'CREATE TABLE "{table}__partitioned" (LIKE "{table}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+        f'PARTITION BY RANGE ("{column}")'
+    )
+    schema_editor.execute(f'DROP TABLE "{table}"')
+    schema_editor.execute(f'ALTER TABLE "{table}__partitioned" RENAME TO "{table}"')
+    schema_editor.execute(f'CREATE SEQUENCE "{table}_id_seq" OWNED BY "{table}"."id"')
+    schema_editor.execute(f'ALTER TABLE "{table}" ALTER COLUMN "id" SET DEFAULT nextval(\'"{table}_id_seq"\')')
+    schema_editor.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_pkey" PRIMARY KEY ("id", "{column}")')
+    for index in indexes:
+        schema_editor.execute(index)
+    schema_editor.execute(f'CREATE TABLE "{table}_default" PARTITION OF "{table}" DEFAULT')
+
+
+def ensure_monthly_partitions(connection, table, months_ahead, now=None):
+    """
+    Create the partitions of the current month and of the next months_ahead
+    months if missing. No-op on other databases or non partitioned tables.
+
+    Returns:
+        list: names of the partitions created
+    """
+    if not is_partitioned(connection, table):
+        return []
+
+    now = now or datetime.now(dt_timezone.utc)
+    created = []
+    with connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            start = month_start(now.year, now.month + offset)
+            end = month_start(now.year, now.month + offset + 1)
+            name = partition_name(table, start)
+            cursor.execute('SELECT to_regclass(%s)', [name])
+            if cursor.fetchone()[0] is not None:
+                continue
+            cursor.execute(
+                f'CREATE TABLE "{name}" PARTITION OF "{table}" '
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            )
+            created.append(name)
+    return created
+
+
+def drop_partitions_before(connection, table, cutoff):
+    """
+    Drop the monthly partitions whose whole month ends before cutoff: a
+    metadata operation instead of deleting the rows one by one. The default
+    partition is never dropped.
+
+    Returns:
+        list: names of the partitions dropped
+    """
+    if not is_partitioned(connection, table):
+        return []
+
+    pattern = re.compile(rf'^{re.escape(table)}_y(\d{{4}})m(\d{{2}})$')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname FROM pg_inherits i '
+            'JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent '
+            'WHERE p.relname = %s AND pg_table_is_visible(p.oid)',
+            [table]
+        )
+        names = sorted(row[0] for row in cursor.fetchall())
+
+        dropped = []
+        for name in names:
+            match = pattern.match(name)
+            if not match or month_start(int(match.group(1)), int(match.group(2)) + 1) > cutoff:
+                continue
+            cursor.execute(f'DROP TABLE "{name}"')
+            dropped.append(name)
+    return dropped
@@ -0,0 +1,88 @@
+# backend/orchestrator_api/plugin_graph.py
+
+
+class PluginGraph:
+    """Declarative dependency graph of the scan plugins"""
+
+    # Each plugin lists the plugins whose output it needs. Dependencies on
+    # plugins that are disabled for the scan type are ignored.
+    DEPENDENCIES = {
+        'nmap': [],
+        'fingerprint': ['nmap'],
+        'gce': ['nmap'],
+        'web': ['nmap', 'fingerprint'],
+        'vuln_lookup': ['nmap', 'fingerprint'],
+    }
+
+    # Scan type flag enabling each plugin (nmap always runs)
+    PLUGIN_FLAGS = {
+        'fingerprint': 'plugin_finger',
+        'gce': 'plugin_gce',
+        'web': 'plugin_web',
+        'vuln_lookup': 'plugin_vuln_lookup',
+    }
+
+    PENDING = 'pending'
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+    SKIPPED = 'skipped'
+    CANCELLED = 'cancelled'
+
+    TERMINAL_STATES = (COMPLETED, FAILED, SKIPPED, CANCELLED)
+
+    @classmethod
+    def enabled_plugins(cls, scan_type):
+        """Return the plugins enabled for a scan type, in graph order"""
+        return [
+            plugin for plugin in cls.DEPENDENCIES
+            if plugin == 'nmap' or getattr(scan_type, cls.PLUGIN_FLAGS[plugin], False)
+        ]
+
+    @classmethod
+    def initial_states(cls, scan_type):
+        """Build the initial node states for a new scan"""
+        return {plugin: cls.PENDING for plugin in cls.enabled_plugins(scan_type)}
+
+    @classmethod
+    def dependencies(cls, plugin, states):
+        """Dependencies of a plugin that are part of this scan's graph"""
+        return [dep for dep in cls.DEPENDENCIES.get(plugin, []) if dep in states]
+
+    @classmethod
+    def dependents(cls, plugin, states):
+        """All plugins in the graph that transitively depend on a plugin"""
+        result = []
+        frontier = [plugin]
+        while frontier:
+            current = frontier.pop()
+            for node in states:
+                if node not in result and current in cls.dependencies(node, states):
+                    result.append(node)
+                    frontier.append(node)
+        return result
+
+    @classmethod
+    def ready_plugins(cls, states):
+        """Pending plugins whose dependencies have all completed"""
+        return [
+            plugin for plugin, state in states.items()
+            if state == cls.PENDING and all(
+                states.get(dep) == cls.COMPLETED for dep in cls.dependencies(plugin, states)
+            )
+        ]
+
+    @classmethod
+    def active_plugins(cls, states):
+        """Plugins currently queued or running"""
+        return [plugin for plugin, state in states.items() if state in (cls.QUEUED, cls.RUNNING)]
+
+    @classmethod
+    def is_terminal(cls, states):
+        """True when every node of the graph reached a terminal state"""
+        return all(state in cls.TERMINAL_STATES for state in states.values())
+
+    @classmethod
+    def has_failures(cls, states):
+        return any(state == cls.FAILED for state in states.values())
@@ -0,0 +1,158 @@
+# backend/orchestrator_api/ports.py
+
+from bisect import bisect_right
+
+
+MIN_PORT = 1
+MAX_PORT = 65535
+
+
+class PortSet:
+    """
+    Immutable set of ports stored as sorted, merged, non-adjacent (start, end)
+    ranges. Every operation works on the ranges, never on single ports, so
+    "1-65535" costs the same as "22".
+    """
+
+    __slots__ = ('_ranges', '_count')
+
+    def __init__(self, ranges=()):
+        self._ranges = self._normalize(ranges)
+        self._count = sum(end - start + 1 for start, end in self._ranges)
+
+    @staticmethod
+    def _normalize(ranges):
+        merged = []
+        for start, end in sorted((int(start), int(end)) for start, end in ranges):
+            if merged and start <= merged[-1][1] + 1:
+                if end > merged[-1][1]:
+                    merged[-1] = (merged[-1][0], end)
+            else:
+                merged.append((start, end))
+        return tuple(merged)
+
+    @classmethod
+    def parse(cls, ports_string):
+        """
+        Parse a comma-separated port string ('22,80,443', '1-1000').
+
+        Raises:
+            ValueError: on malformed entries or ports outside 1-65535
+        """
+        ranges = []
+        for part in (ports_string or '').split(','):
+            part = part.strip()
+            if not part:
+                continue
+            try:
+                if '-' in part:
+                    start, end = (int(p) for p in part.split('-', 1))
+                else:
+                    start = end = int(part)
+            except ValueError:
+                raise ValueError(f"Invalid port format: {part}")
+            if not (MIN_PORT <= start <= MAX_PORT) or not (MIN_PORT <= end <= MAX_PORT):
+                raise ValueError(f"Port out of range: {part}")
+            if start > end:
+                raise ValueError(f"Invalid port range: {part} (start > end)")
+            ranges.append((start, end))
+        return cls(ranges)
+
+    @property
+    def ranges(self):
+        return self._ranges
+
+    def __len__(self):
+        return self._count
+
+    def __bool__(self):
+        return bool(self._ranges)
+
+    def __eq__(self, other):
+        return isinstance(other, PortSet) and self._ranges == other._ranges
+
+    def __hash__(self):
+        return hash(self._ranges)
+
+    def __repr__(self):
+        return f"PortSet('{self}')"
+
+    def __str__(self):
+        return ','.join(str(start) if start == end else f"{start}-{end}" for start, end in self._ranges)
+
+    def __contains__(self, port):
+        index = bisect_right(self._ranges, (port, MAX_PORT + 1)) - 1
+        return index >= 0 and self._ranges[index][0] <= port <= self._ranges[index][1]
+
+    def __or__(self, other):
+        return PortSet(self._ranges + other._ranges)
+
+    def __and__(self, other):
+        result, i, j = [], 0, 0
+        a, b = self._ranges, other._ranges
+        while i < len(a) and j < len(b):
+            start, end = max(a[i][0], b[j][0]), min(a[i][1], b[j][1])
+            if start <= end:
+                result.append((start, end))
+            if a[i][1] < b[j][1]:
+                i += 1
+            else:
+                j += 1
+        return PortSet(result)
+
+    def __sub__(self, other):
+        result, j = [], 0
+        b = other._ranges
+        for start, end in self._ranges:
+            # Skip removed ranges entirely before this one
+            while j < len(b) and b[j][1] < start:
+                j += 1
+            k = j
+            while k < len(b) and b[k][0] <= end:
+                if b[k][0] > start:
+                    result.append((start, b[k][0] - 1))
+                start = max(start, b[k][1] + 1)
+                k += 1
+            if start <= end:
+                result.append((start, end))
+        return PortSet(result)
+
+    union = __or__
+    intersection = __and__
+    difference = __sub__
+
+    def count(self):
+        return self._count
+
+    def split(self, max_ports):
+        """Split into PortSets holding at most max_ports ports each"""
+        chunks, current, count = [], [], 0
+        for start, end in self._ranges:
+            while start <= end:
+                take = min(end - start + 1, max_ports - count)
+                current.append((start, start + take - 1))
+                count += take
+                start += take
+                if count == max_ports:
+                    chunks.append(PortSet(current))
+                    current, count = [], 0
+        if current:
+            chunks.append(PortSet(current))
+        return chunks
+
+    def preview(self, max_length=50):
+        """Compact representation for listings"""
+        text = str(self)
+        if len(text) > max_length:
+            text = text[:max_length].rsplit(',', 1)[0] + ',...'
+        return text
+
+
+def nmap_port_spec(tcp=None, udp=None):
+    """Build the nmap -p argument ('T:1-1000,U:53,161') from two PortSets"""
+    parts = []
+    if tcp:
+        parts.append(f"T:{tcp}")
+    if udp:
+        parts.append(f"U:{udp}")
+    return ','.join(parts)
@@ -0,0 +1,98 @@
+# backend/orchestrator_api/recovery.py
+
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import ScanShard, JobLease
+from .leases import LeaseService
+from .messaging import RabbitMQService
+from .plugin_graph import PluginGraph
+from .services import ScanOrchestratorService, ScanStatusService
+from .sharding import ScanShardService
+
+logger = logging.getLogger(__name__)
+
+
+class LeaseRecoveryService:
+    """Recovery of the plugin jobs whose lease expired (see LeaseService)"""
+
+    @staticmethod
+    def reap(limit=500):
+        """
+        Recover the jobs whose lease expired: re-dispatch them with their
+        checkpoint up to SCAN_LEASE_MAX_ATTEMPTS times, then fail them so that
+        the scan finishes and the target can be scanned again.
+
+        Returns:
+            dict: number of re-dispatched, failed and released leases
+        """
+        now = timezone.now()
+        result = {'redispatched': 0, 'failed': 0, 'released': 0}
+        expired = JobLease.objects.filter(expires_at__lt=now).select_related(
+            'scan__scan_type', 'scan__target__customer', 'scan__details', 'shard'
+        )[:limit]
+
+        for lease in expired:
+            # Claim: another reaper or a late heartbeat may have moved the expiry meanwhile
+            claimed = JobLease.objects.filter(id=lease.id, expires_at=lease.expires_at).update(
+                expires_at=now + timedelta(seconds=settings.SCAN_LEASE_TTL)
+            )
+            if not claimed:
+                continue
+            try:
+                result[LeaseRecoveryService._recover(lease)] += 1
+            except Exception as e:
+                logger.error(f"Error recovering {lease}: {str(e)}")
+        return result
+
+    @staticmethod
+    def _recover(lease):
+        scan = lease.scan
+        scan_detail = getattr(scan, 'details', None)
+        state = (scan_detail.plugin_states or {}).get(lease.plugin) if scan_detail else None
+        if state in PluginGraph.TERMINAL_STATES or (lease.shard and lease.shard.is_terminal):
+            # Il job è già terminato (es. dispatch fallito): resta solo il lease da rilasciare
+            lease.delete()
+            return 'released'
+
+        job = f"nmap shard {lease.shard.index}" if lease.shard else lease.plugin
+        if lease.attempt >= settings.SCAN_LEASE_MAX_ATTEMPTS:
+            error = (f"{job} lost: lease expired after {lease.attempt} attempts "
+                     f"(last worker: {lease.worker or 'none'})")
+            logger.error(f"Scan {scan.id}: {error}")
+            ScanStatusService.update_scan_status(
+                scan.id, lease.plugin, 'failed', error_details=error, shard_id=lease.shard_id
+            )
+            JobLease.objects.filter(id=lease.id).delete()
+            return 'failed'
+
+        logger.warning(f"Scan {scan.id}: lease of {job} expired ({lease.state}, worker {lease.worker or 'none'}, "
+                       f"attempt {lease.attempt}), re-dispatching")
+        rabbitmq_service = RabbitMQService()
+        try:
+            if lease.shard:
+                # Solo lo shard perso: gli shard completati restano validi
+                shard_total = ScanShard.objects.filter(scan=scan).count()
+                ScanShardService.publish_shards(
+                    scan, [lease.shard], ScanOrchestratorService._nmap_request(scan),
+                    rabbitmq_service, shard_total
+                )
+                return 'redispatched'
+
+            with transaction.atomic():
+                scan_detail = ScanOrchestratorService._lock_scan_detail(scan)
+                if scan_detail.plugin_states.get(lease.plugin) == PluginGraph.RUNNING:
+                    scan_detail.plugin_states[lease.plugin] = PluginGraph.QUEUED
+                    scan_detail.save(update_fields=['plugin_states', 'updated_at'])
+
+            if lease.plugin == 'nmap':
+                message = ScanOrchestratorService._nmap_request(scan)
+                message.update(LeaseService.dispatch_fields(LeaseService.grant(scan, 'nmap')))
+                rabbitmq_service.publish_message(settings.RABBITMQ_NMAP_SCAN_REQUEST_QUEUE, message)
+            else:
+                ScanOrchestratorService._start_plugin_scan(scan, lease.plugin, rabbitmq_service)
+            return 'redispatched'
+        finally:
+            rabbitmq_service.close()
@@ -0,0 +1,29 @@
+# backend/orchestrator_api/renderers.py
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import codec
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer encoding with orjson when installed. Indented output (the
+    ?indent= of the browsable API) and the setups without orjson keep
+    the stdlib encoder.
+
+    Unlike DRF's STRICT_JSON, orjson renders the non-finite floats (NaN,
+    Infinity) as null instead of raising: the response stays valid JSON.
+    Checking every float in Python would cost more than the stdlib encoder
+    on the large payloads.
+    """
+
+    _encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if codec.orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Stesse conversioni di DRF (datetime con 'Z', Decimal, QuerySet, ...)
+        return codec.dumps(data, default=self._encoder.default)
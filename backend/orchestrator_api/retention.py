@@ -0,0 +1,418 @@
+# backend/orchestrator_api/retention.py
+
+import json
+import logging
+import os
+import shutil
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core import serializers
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from .models import (
+    Scan, ScanDetail, ScanShard, JobLease, ScanSchedule, ScanEvent, FingerprintDetail, GceResult, Vulnerability,
+    VulnerabilityCve, OsMatch, ScriptResult, ScanDiff, Target, Customer
+)
+from .archive import EXTENSIONS, open_archive, resolve_compression, write_archive
+from .incremental import IncrementalScanService
+from .partitions import drop_partitions_before
+from .summaries import SummaryService
+
+logger = logging.getLogger(__name__)
+
+
+class ScanArchiveService:
+    """
+    Archive of finished scans. Every scan is one JSONL line with all of its
+    rows (details, shards, fingerprints, GCE results and vulnerabilities, OS
+    matches, scripts, diff, events) in Django's serialization format, in zstd
+    or gzip files under SCAN_ARCHIVE_DIR/<customer id>/. The GCE report files
+    are moved next to the archives.
+    """
+
+    # (model, lookup of the scan id): parents first, the order of the restore
+    ARCHIVED_MODELS = [
+        (Scan, 'id'),
+        (ScanDetail, 'scan_id'),
+        (ScanShard, 'scan_id'),
+        (FingerprintDetail, 'scan_id'),
+        (GceResult, 'scan_id'),
+        (Vulnerability, 'scan_id'),
+        (VulnerabilityCve, 'vulnerability__scan_id'),
+        (OsMatch, 'scan_id'),
+        (ScriptResult, 'scan_id'),
+        (ScanDiff, 'scan_id'),
+        (ScanEvent, 'scan_id'),
+    ]
+
+    # SET_NULL references to rows outside of the archived scan: (model, attribute, referenced model)
+    EXTERNAL_REFERENCES = [
+        (Scan, 'baseline_scan_id', Scan),
+        (Scan, 'schedule_id', ScanSchedule),
+        (ScanDiff, 'previous_scan_id', Scan),
+    ]
+
+    @staticmethod
+    def baseline_of_unfinished():
+        """Condition on Scan: the scan is the baseline of an incremental scan still running"""
+        return Exists(
+            Scan._base_manager.filter(baseline_scan_id=OuterRef('id'), deleted_at__isnull=True).exclude(
+                status__in=RetentionService.FINISHED_STATUSES
+            )
+        )
+
+    @staticmethod
+    def bundles(scan_ids):
+        """
+        Serialize the scans with their rows, soft-deleted ones included
+
+        Returns:
+            dict: {scan_id: [serialized objects]}
+        """
+        bundles = {scan_id: [] for scan_id in scan_ids}
+        vulnerability_scans = {}
+        for model, lookup in ScanArchiveService.ARCHIVED_MODELS:
+            rows = model._base_manager.filter(**{f'{lookup}__in': scan_ids}).order_by('pk')
+            for data in serializers.serialize('python', rows.iterator(chunk_size=1000)):
+                if model is Scan:
+                    scan_id = data['pk']
+                elif model is VulnerabilityCve:
+                    scan_id = vulnerability_scans[data['fields']['vulnerability']]
+                else:
+                    scan_id = data['fields']['scan']
+                if model is Vulnerability:
+                    vulnerability_scans[data['pk']] = scan_id
+                bundles[scan_id].append(data)
+        return bundles
+
+    @staticmethod
+    def delete_scans(scan_ids):
+        """
+        Hard delete the scans and their rows, children first so that each
+        table is emptied with one DELETE per batch. Scans no longer finished
+        (restarted meanwhile) and baselines of running incremental scans are
+        left alone; finished incremental scans based on a deleted scan get
+        their inherited fingerprints and findings copied first.
+
+        Returns:
+            list: ids of the scans deleted
+        """
+        with transaction.atomic():
+            scan_ids = list(
+                Scan._base_manager.select_for_update().filter(
+                    Q(status__in=RetentionService.FINISHED_STATUSES) | Q(deleted_at__isnull=False),
+                    id__in=scan_ids
+                ).exclude(ScanArchiveService.baseline_of_unfinished()).values_list('id', flat=True)
+            )
+            if not scan_ids:
+                return []
+            # Il SET_NULL sulla baseline farebbe perdere i fingerprint e i finding ereditati
+            dependents = Scan._base_manager.filter(baseline_scan_id__in=scan_ids).exclude(
+                id__in=scan_ids
+            ).select_related('target')
+            for dependent in dependents:
+                IncrementalScanService.materialize_fingerprints(dependent)
+                IncrementalScanService.materialize_vulnerabilities(dependent)
+            JobLease.objects.filter(scan_id__in=scan_ids).delete()
+            for model, lookup in reversed(ScanArchiveService.ARCHIVED_MODELS[1:]):
+                model._base_manager.filter(**{f'{lookup}__in': scan_ids}).delete()
+            # Il collector azzera i riferimenti SET_NULL (baseline, diff, riepiloghi)
+            Scan._base_manager.filter(id__in=scan_ids).only('id').delete()
+        return scan_ids
+
+    @staticmethod
+    def archive(scan_ids, path):
+        """
+        Write the scans to the archive at path, then delete them and move
+        their GCE report files next to the archive
+
+        Returns:
+            list: ids of the scans archived and deleted
+        """
+        bundles = ScanArchiveService.bundles(scan_ids)
+        archived_at = timezone.now().isoformat()
+        write_archive(path, (
+            json.dumps({'scan_id': scan_id, 'archived_at': archived_at, 'objects': objects}, cls=DjangoJSONEncoder)
+            for scan_id, objects in bundles.items() if objects
+        ))
+
+        report_files = [
+            data['fields']['report_file']
+            for objects in bundles.values() for data in objects
+            if data['model'] == 'orchestrator_api.gceresult' and data['fields'].get('report_file')
+        ]
+        deleted = ScanArchiveService.delete_scans(scan_ids)
+        ScanArchiveService._move_files(report_files, settings.MEDIA_ROOT, os.path.dirname(path))
+        return deleted
+
+    @staticmethod
+    def restore(path, dry_run=False):
+        """
+        Restore the scans of an archive, each in its own transaction. Scans
+        that still exist and scans whose target is gone are skipped.
+
+        Returns:
+            dict: {'restored': [...], 'skipped': [...], 'errors': [...]} scan ids
+        """
+        result = {'restored': [], 'skipped': [], 'errors': []}
+        target_ids = set()
+        with open_archive(path, 'rt') as archive:
+            for line in archive:
+                if not line.strip():
+                    continue
+                bundle = json.loads(line)
+                scan_id = bundle['scan_id']
+                scan_data = bundle['objects'][0]
+                target_id = scan_data['fields']['target']
+                if (Scan._base_manager.filter(id=scan_id).exists()
+                        or not Target.all_objects.filter(id=target_id).exists()):
+                    result['skipped'].append(scan_id)
+                    continue
+                if dry_run:
+                    result['restored'].append(scan_id)
+                    continue
+                try:
+                    with transaction.atomic():
+                        for obj in serializers.deserialize('python', bundle['objects']):
+                            ScanArchiveService._clear_dangling_references(obj.object)
+                            obj.save()
+                    report_files = [
+                        data['fields']['report_file'] for data in bundle['objects']
+                        if data['model'] == 'orchestrator_api.gceresult' and data['fields'].get('report_file')
+                    ]
+                    ScanArchiveService._move_files(report_files, os.path.dirname(path), settings.MEDIA_ROOT)
+                    result['restored'].append(scan_id)
+                    target_ids.add(target_id)
+                except Exception as e:
+                    logger.error(f"Error restoring scan {scan_id} from {path}: {str(e)}")
+                    result['errors'].append(scan_id)
+
+        if result['restored'] and not dry_run:
+            ScanArchiveService._reset_sequences()
+        for target_id in target_ids:
+            SummaryService.refresh_target(target_id)
+        for customer_id in Target.all_objects.filter(id__in=target_ids).values_list('customer_id', flat=True).distinct():
+            SummaryService.refresh_customer(customer_id)
+        return result
+
+    @staticmethod
+    def _clear_dangling_references(instance):
+        """Null the references to rows deleted after the archive was written"""
+        for model, attribute, referenced in ScanArchiveService.EXTERNAL_REFERENCES:
+            referenced_id = getattr(instance, attribute) if isinstance(instance, model) else None
+            if referenced_id and not referenced._base_manager.filter(id=referenced_id).exists():
+                setattr(instance, attribute, None)
+
+    @staticmethod
+    def _move_files(names, source_root, destination_root):
+        """Move media files (relative names) between the media and archive directories"""
+        for name in names:
+            source = os.path.join(source_root, name)
+            if not os.path.exists(source):
+                continue
+            destination = os.path.join(destination_root, name)
+            try:
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+                shutil.move(source, destination)
+            except OSError as e:
+                logger.error(f"Error moving {source} to {destination}: {str(e)}")
+
+    @staticmethod
+    def _reset_sequences():
+        """Restored rows keep their ids: move the sequences past them (PostgreSQL)"""
+        models = [model for model, _ in ScanArchiveService.ARCHIVED_MODELS]
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        if statements:
+            with connection.cursor() as cursor:
+                for statement in statements:
+                    cursor.execute(statement)
+
+
+class RetentionService:
+    """
+    Bounded history: finished scans past the retention of their customer are
+    archived and deleted in batches, soft-deleted rows are purged for good
+    after SOFT_DELETE_RETENTION_DAYS. The latest completed scan of every
+    target (current state) and the baselines of running incremental scans
+    are always kept.
+    """
+
+    FINISHED_STATUSES = ('Completed', 'Failed')
+
+    @staticmethod
+    def retention_days(customer):
+        """Retention of a customer in days, 0 = keep forever"""
+        if customer.retention_days is not None:
+            return customer.retention_days
+        return settings.SCAN_RETENTION_DAYS
+
+    @staticmethod
+    def expired_scans(customer, now=None):
+        """Finished scans of the customer past its retention, oldest first"""
+        days = RetentionService.retention_days(customer)
+        if not days:
+            return Scan.objects.none()
+        now = now or timezone.now()
+        newer_completed = Scan.objects.filter(
+            target_id=OuterRef('target_id'), status='Completed', initiated_at__gt=OuterRef('initiated_at')
+        )
+        return Scan.objects.filter(
+            Q(status='Failed') | Exists(newer_completed),
+            target__customer=customer,
+            status__in=RetentionService.FINISHED_STATUSES,
+            initiated_at__lt=now - timedelta(days=days)
+        ).exclude(ScanArchiveService.baseline_of_unfinished()).order_by('initiated_at')
+
+    @staticmethod
+    def _batches(queryset):
+        """Ids of queryset, one batch at a time, with a pause between batches"""
+        while True:
+            ids = list(queryset.values_list('id', flat=True)[:settings.RETENTION_BATCH_SIZE])
+            if not ids:
+                return
+            yield ids
+            # Pausa tra i batch: le tabelle calde non restano sotto lock
+            time.sleep(settings.RETENTION_BATCH_PAUSE)
+
+    @staticmethod
+    def archive_customer(customer, now=None, dry_run=False):
+        """
+        Archive and delete the expired scans of a customer
+
+        Returns:
+            int: number of scans archived (to archive, with dry_run)
+        """
+        now = now or timezone.now()
+        expired = RetentionService.expired_scans(customer, now)
+        if dry_run:
+            return expired.count()
+
+        compression = resolve_compression(settings.SCAN_ARCHIVE_COMPRESSION)
+        archive_dir = os.path.join(settings.SCAN_ARCHIVE_DIR, str(customer.id))
+        stamp = now.strftime('%Y%m%dT%H%M%S')
+
+        archived = 0
+        target_ids = set()
+        for number, scan_ids in enumerate(RetentionService._batches(expired)):
+            target_ids.update(Scan.objects.filter(id__in=scan_ids).values_list('target_id', flat=True))
+            path = os.path.join(archive_dir, f"scans-{stamp}-{number:04d}{EXTENSIONS[compression]}")
+            deleted = ScanArchiveService.archive(scan_ids, path)
+            if not deleted:
+                # Nulla cancellato (scansioni riavviate): evita di riprendere lo stesso batch
+                break
+            archived += len(deleted)
+            logger.info(f"Archived {len(deleted)} scans of customer {customer.id} to {path}")
+
+        for target_id in target_ids:
+            SummaryService.refresh_target(target_id)
+        if archived:
+            SummaryService.refresh_customer(customer.id)
+        return archived
+
+    @staticmethod
+    def purge_deleted(now=None, dry_run=False):
+        """
+        Hard delete the scans, fingerprints and GCE results soft-deleted more
+        than SOFT_DELETE_RETENTION_DAYS ago
+
+        Returns:
+            dict: rows purged (to purge, with dry_run) per model
+        """
+        if not settings.SOFT_DELETE_RETENTION_DAYS:
+            return {}
+        cutoff = (now or timezone.now()) - timedelta(days=settings.SOFT_DELETE_RETENTION_DAYS)
+        querysets = {
+            'scans': Scan._base_manager.filter(deleted_at__lt=cutoff).exclude(
+                ScanArchiveService.baseline_of_unfinished()
+            ).order_by(),
+            'fingerprints': FingerprintDetail._base_manager.filter(deleted_at__lt=cutoff).order_by(),
+            'gce_results': GceResult._base_manager.filter(deleted_at__lt=cutoff).order_by(),
+        }
+        if dry_run:
+            return {name: queryset.count() for name, queryset in querysets.items()}
+
+        purged = {}
+        for name, queryset in querysets.items():
+            purged[name] = 0
+            for ids in RetentionService._batches(queryset):
+                reports = GceResult._base_manager.filter(
+                    **{'scan_id__in' if name == 'scans' else 'id__in': ids}
+                ).exclude(report_file='').values_list('report_file', flat=True)
+                report_files = list(reports) if name != 'fingerprints' else []
+                if name == 'scans':
+                    deleted = ScanArchiveService.delete_scans(ids)
+                else:
+                    with transaction.atomic():
+                        queryset.model._base_manager.filter(id__in=ids).delete()
+                    deleted = ids
+                if not deleted:
+                    break
+                for report_file in report_files:
+                    RetentionService._remove_media(report_file)
+                purged[name] += len(deleted)
+        return purged
+
+    @staticmethod
+    def _remove_media(name):
+        """Remove a media file (relative name) left behind by a purged row"""
+        path = os.path.join(settings.MEDIA_ROOT, name)
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except OSError as e:
+            logger.error(f"Error removing {path}: {str(e)}")
+
+    @staticmethod
+    def drop_event_partitions(now=None, dry_run=False):
+        """
+        Drop the scan event partitions older than the longest retention of any
+        customer (PostgreSQL). Nothing is dropped while some customer keeps
+        its history forever.
+
+        Returns:
+            list: partitions dropped
+        """
+        retentions = [RetentionService.retention_days(customer) for customer in Customer.all_objects.all()]
+        if not retentions or not all(retentions) or dry_run:
+            return []
+        cutoff = (now or timezone.now()) - timedelta(days=max(retentions))
+        try:
+            dropped = drop_partitions_before(connection, ScanEvent._meta.db_table, cutoff)
+            if dropped:
+                logger.info(f"Dropped scan event partitions: {', '.join(dropped)}")
+            return dropped
+        except Exception as e:
+            logger.error(f"Error dropping scan event partitions: {str(e)}")
+            return []
+
+    @staticmethod
+    def run(customer_id=None, now=None, dry_run=False):
+        """
+        One retention pass over every customer (or one)
+
+        Returns:
+            dict: {'archived': {customer_id: n}, 'purged': {...}, 'partitions_dropped': [...]}
+        """
+        now = now or timezone.now()
+        customers = Customer.all_objects.all()
+        if customer_id:
+            customers = customers.filter(id=customer_id)
+
+        archived = {}
+        for customer in customers:
+            try:
+                count = RetentionService.archive_customer(customer, now, dry_run)
+                if count:
+                    archived[str(customer.id)] = count
+            except Exception as e:
+                logger.error(f"Error archiving the scans of customer {customer.id}: {str(e)}")
+
+        return {
+            'archived': archived,
+            'purged': RetentionService.purge_deleted(now, dry_run) if not customer_id else {},
+            'partitions_dropped': RetentionService.drop_event_partitions(now, dry_run) if not customer_id else [],
+        }
@@ -0,0 +1,207 @@
+# backend/orchestrator_api/scheduler.py
+
+import hashlib
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from .models import Scan, ScanSchedule, Target
+from .events import ScanEventLogService
+from .messaging import BatchPublisher, RabbitMQService
+from .services import ScanOrchestratorService
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduleService:
+    """
+    Recurring scans. A due schedule creates the scans of its run in bulk as
+    Pending, each with a scheduled_for spread over the jitter window; dispatch()
+    then starts the ones whose time has come, as far as the concurrency limits
+    and the backlog of the plugin request queues allow.
+    """
+
+    # Scans in these statuses don't take a slot
+    IDLE_STATUSES = ['Pending', 'Completed', 'Failed']
+
+    @staticmethod
+    def jitter_offset(schedule, target_id):
+        """Offset of a target in the jitter window, stable from run to run"""
+        window = schedule.jitter_minutes * 60
+        if not window:
+            return timedelta(0)
+        digest = hashlib.sha1(f"{schedule.id}:{target_id}".encode()).digest()
+        return timedelta(seconds=int.from_bytes(digest[:8], 'big') % window)
+
+    @staticmethod
+    def target_ids(schedule):
+        """Targets of a schedule: the selected ones, or every target of the customer"""
+        targets = Target.objects.filter(customer_id=schedule.customer_id)
+        if ScanSchedule.targets.through.objects.filter(scanschedule_id=schedule.id).exists():
+            targets = targets.filter(scan_schedules=schedule)
+        return list(targets.values_list('id', flat=True))
+
+    @staticmethod
+    def create_run(schedule, now=None):
+        """
+        Create the scans of the current run of a schedule and move it to the
+        next run. Targets whose scan of a previous run is still waiting are
+        skipped, so that a backlog doesn't pile up.
+
+        Returns:
+            int: number of scans created
+        """
+        now = now or timezone.now()
+        run_at = schedule.next_run_at
+        # Dopo un fermo dello scheduler la finestra di jitter parte da adesso
+        window_start = max(run_at, now)
+
+        waiting = set(
+            Scan.objects.filter(schedule=schedule, status='Pending').values_list('target_id', flat=True)
+        )
+        scans = [
+            Scan(
+                target_id=target_id,
+                scan_type_id=schedule.scan_type_id,
+                scan_mode=schedule.scan_mode,
+                schedule=schedule,
+                status='Pending',
+                scheduled_for=window_start + ScheduleService.jitter_offset(schedule, target_id)
+            )
+            for target_id in ScheduleService.target_ids(schedule)
+            if target_id not in waiting
+        ]
+        # bulk_create non manda segnali: i riepiloghi si aggiornano all'avvio delle scansioni
+        Scan.objects.bulk_create(scans, batch_size=settings.SCHEDULER_BATCH_SIZE)
+
+        # Le esecuzioni perse durante un fermo non vengono recuperate
+        next_run_at = schedule.next_run_after(run_at)
+        if next_run_at <= now:
+            next_run_at = schedule.next_run_after(now)
+        schedule.last_run_at = run_at
+        schedule.next_run_at = next_run_at
+        schedule.save(update_fields=['last_run_at', 'next_run_at', 'updated_at'])
+
+        logger.info(
+            f"Schedule {schedule.id} ({schedule.name}): {len(scans)} scans created, "
+            f"{len(waiting)} still waiting, next run at {next_run_at.isoformat()}"
+        )
+        return len(scans)
+
+    @staticmethod
+    def run_due(now=None):
+        """
+        Create the runs of the due schedules.
+
+        Returns:
+            int: number of scans created
+        """
+        now = now or timezone.now()
+        created = 0
+        due = list(
+            ScanSchedule.objects.filter(enabled=True, next_run_at__lte=now).values_list('id', flat=True)
+        )
+        for schedule_id in due:
+            try:
+                with transaction.atomic():
+                    # skip_locked: the schedule is being handled by another scheduler instance
+                    schedule = ScanSchedule.objects.select_for_update(skip_locked=True).filter(
+                        id=schedule_id, enabled=True, next_run_at__lte=now
+                    ).first()
+                    if schedule is not None:
+                        created += ScheduleService.create_run(schedule, now)
+            except Exception as e:
+                logger.error(f"Error creating the run of schedule {schedule_id}: {str(e)}")
+        return created
+
+    @staticmethod
+    def dispatch(now=None, rabbitmq_service=None):
+        """
+        Start the due Pending scans, oldest first, within the limits:
+        SCHEDULER_MAX_RUNNING_SCANS and SCHEDULER_MAX_RUNNING_PER_CUSTOMER on the
+        scans in progress, SCHEDULER_MAX_QUEUE_DEPTH on the messages waiting in
+        the plugin request queues. A target with a scan in progress waits.
+        The plugin requests are published in one batch after the commit.
+
+        Returns:
+            int: number of scans started
+        """
+        now = now or timezone.now()
+        own_connection = rabbitmq_service is None
+        if own_connection:
+            rabbitmq_service = RabbitMQService()
+
+        try:
+            depths = [
+                rabbitmq_service.queue_depth(queue_name)
+                for queue_name in (
+                    settings.RABBITMQ_NMAP_SCAN_REQUEST_QUEUE,
+                    settings.RABBITMQ_FINGERPRINT_SCAN_REQUEST_QUEUE,
+                    settings.RABBITMQ_GCE_SCAN_REQUEST_QUEUE,
+                )
+            ]
+            if None in depths:
+                logger.error("Plugin queue depth unavailable, scheduled scans not dispatched")
+                return 0
+
+            active = Scan.objects.exclude(status__in=ScheduleService.IDLE_STATUSES)
+            running = dict(
+                active.order_by().values_list('target__customer_id').annotate(count=Count('id'))
+            )
+            busy_targets = set(active.values_list('target_id', flat=True))
+
+            slots = min(
+                settings.SCHEDULER_MAX_RUNNING_SCANS - sum(running.values()),
+                settings.SCHEDULER_MAX_QUEUE_DEPTH - max(depths)
+            )
+            if slots <= 0:
+                logger.info(f"No capacity for scheduled scans: {sum(running.values())} running, queue depth {max(depths)}")
+                return 0
+
+            chosen = []
+            due = Scan.objects.filter(
+                status='Pending', scheduled_for__lte=now, target__deleted_at__isnull=True
+            ).order_by('scheduled_for').values_list('id', 'target_id', 'target__customer_id')
+            for scan_id, target_id, customer_id in due.iterator(chunk_size=settings.SCHEDULER_BATCH_SIZE):
+                if len(chosen) >= slots:
+                    break
+                if target_id in busy_targets:
+                    continue
+                if running.get(customer_id, 0) >= settings.SCHEDULER_MAX_RUNNING_PER_CUSTOMER:
+                    continue
+                chosen.append(scan_id)
+                busy_targets.add(target_id)
+                running[customer_id] = running.get(customer_id, 0) + 1
+
+            publisher = BatchPublisher()
+            started_scans = []
+            with ScanEventLogService.buffered(), transaction.atomic():
+                # skip_locked: scans already taken by another scheduler instance
+                scans = Scan.objects.select_for_update(skip_locked=True, of=('self',)).select_related(
+                    'target', 'scan_type'
+                ).filter(id__in=chosen, status='Pending').order_by('scheduled_for')
+                for scan in scans:
+                    if ScanOrchestratorService.start_scan(scan, publisher):
+                        started_scans.append(scan)
+                # Pubblicazione dopo il commit: nessuna chiamata a RabbitMQ con i lock sulle righe
+                transaction.on_commit(lambda: ScheduleService._publish(publisher, started_scans))
+
+            # Le scansioni non pubblicate sono state chiuse come Failed da _publish
+            started = sum(1 for scan in started_scans if scan.status != 'Failed')
+            if started:
+                logger.info(f"Started {started} scheduled scans")
+            return started
+
+        finally:
+            if own_connection:
+                rabbitmq_service.close()
+
+    @staticmethod
+    def _publish(publisher, scans):
+        """Flush the plugin requests of the started scans, failing the ones not published"""
+        unpublished = publisher.flush()
+        for scan in scans:
+            if scan.id in unpublished:
+                ScanOrchestratorService.cancel_scan(scan, reason='Failed to queue scan in RabbitMQ')
@@ -0,0 +1,104 @@
+# backend/orchestrator_api/search.py
+
+"""
+Address-aware search helpers.
+
+Target.address holds single IPs, CIDR blocks, start-end ranges and FQDNs, so it
+cannot be cast to inet directly. Each target stores instead the first and last
+address it covers as fixed-width keys (family digit + 32 hex digits): the keys
+sort like the addresses do, so "which targets overlap 10.0.0.0/24" becomes a
+range overlap: && on an ip_key_range with a GiST index on PostgreSQL
+(migration 0021), the equivalent pair of comparisons on SQLite.
+"""
+
+import ipaddress
+import operator
+from functools import reduce
+
+from django.db.models import BooleanField, F, Func, Q, Value
+from rest_framework.filters import SearchFilter
+
+
+def ip_key(ip):
+    """Sortable key of an address; IPv4 and IPv6 never overlap"""
+    return f"{ip.version}{int(ip):032x}"
+
+
+def address_bounds(address):
+    """
+    First and last address covered by an IP, CIDR or start-end range.
+
+    Returns:
+        tuple: (first_key, last_key), or None for FQDNs and invalid values
+    """
+    if not address:
+        return None
+    address = address.strip()
+    try:
+        if '/' in address:
+            network = ipaddress.ip_network(address, strict=False)
+            return ip_key(network.network_address), ip_key(network.broadcast_address)
+        if address.count('-') == 1:
+            start, end = (ipaddress.ip_address(part.strip()) for part in address.split('-'))
+            if start.version != end.version or end < start:
+                return None
+            return ip_key(start), ip_key(end)
+        ip = ipaddress.ip_address(address)
+        return ip_key(ip), ip_key(ip)
+    except ValueError:
+        return None
+
+
+class KeyRangeOverlap(Func):
+    """[start, end] overlaps [first, last], in the form the GiST index of migration 0021 serves"""
+
+    arity = 4
+    output_field = BooleanField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        (start, start_params), (end, end_params), (first, first_params), (last, last_params) = (
+            compiler.compile(expression) for expression in self.get_source_expressions()
+        )
+        if connection.vendor == 'postgresql':
+            sql = f"ip_key_range({start}, {end}, '[]') && ip_key_range({first}, {last}, '[]')"
+            return sql, (*start_params, *end_params, *first_params, *last_params)
+        sql = f"({start} <= {last} AND {end} >= {first})"
+        return sql, (*start_params, *last_params, *end_params, *first_params)
+
+
+def overlaps(bounds, prefix=''):
+    """Q for the targets whose address range overlaps bounds"""
+    first, last = bounds
+    return Q(KeyRangeOverlap(F(f'{prefix}ip_start'), F(f'{prefix}ip_end'), Value(first), Value(last)))
+
+
+class NetworkSearchFilter(SearchFilter):
+    """
+    SearchFilter that also matches IP/CIDR/range terms by address range:
+    ?search=10.0.0.5 finds the 10.0.0.0/24 target, not only addresses
+    containing the string. The view sets search_network_prefix to the path
+    of the Target ('' on targets, 'target__' on scans).
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        prefix = getattr(view, 'search_network_prefix', None)
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+
+        if prefix is None or not search_fields or not search_terms:
+            return super().filter_queryset(request, queryset, view)
+
+        orm_lookups = [self.construct_search(str(search_field)) for search_field in search_fields]
+
+        conditions = []
+        for search_term in search_terms:
+            condition = reduce(operator.or_, [Q(**{orm_lookup: search_term}) for orm_lookup in orm_lookups])
+            bounds = address_bounds(search_term)
+            if bounds:
+                condition |= overlaps(bounds, prefix)
+            conditions.append(condition)
+        queryset = queryset.filter(reduce(operator.and_, conditions))
+
+        if self.must_call_distinct(queryset, search_fields):
+            queryset = queryset.distinct()
+        return queryset
@@ -4,8 +4,10 @@ from rest_framework import serializers
 from django.core.exceptions import ValidationError as DjangoValidationError
 from .models import (
     Customer, PortList, ScanType, Target, Scan, ScanDetail, 
-    FingerprintDetail, GceResult
+    ScanShard, FingerprintDetail, GceResult, Vulnerability, OsMatch, ScriptResult,
+    ServiceInventory, ScanDiff, ScanSchedule, ScanEvent
 )
+from .cron import CronExpression
 
 class CustomerSerializer(serializers.ModelSerializer):
     """Serializer for Customer model"""
@@ -17,17 +19,23 @@ class CustomerSerializer(serializers.ModelSerializer):
         model = Customer
         fields = [
             'id', 'name', 'company_name', 'email', 'phone', 
-            'contact_person', 'address', 'notes', 'created_at', 
+            'contact_person', 'address', 'notes', 'retention_days', 'created_at', 
             'updated_at', 'targets_count', 'scans_count'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
     
     def get_targets_count(self, obj):
         """Get number of targets for this customer"""
+        summary = getattr(obj, 'summary', None)
+        if summary is not None:
+            return summary.targets_count
         return obj.targets.count()
     
     def get_scans_count(self, obj):
         """Get number of scans for this customer"""
+        summary = getattr(obj, 'summary', None)
+        if summary is not None:
+            return summary.scans_count
         return Scan.objects.filter(target__customer=obj).count()
     
     def validate_email(self, value):
@@ -46,30 +54,17 @@ class CustomerSerializer(serializers.ModelSerializer):
 class PortListSerializer(serializers.ModelSerializer):
     """Serializer for PortList model"""
     
-    total_tcp_ports = serializers.SerializerMethodField()
-    total_udp_ports = serializers.SerializerMethodField()
+    total_tcp_ports = serializers.IntegerField(source='tcp_port_count', read_only=True)
+    total_udp_ports = serializers.IntegerField(source='udp_port_count', read_only=True)
     
     class Meta:
         model = PortList
         fields = [
             'id', 'name', 'tcp_ports', 'udp_ports', 'description',
-            'created_at', 'updated_at', 'total_tcp_ports', 'total_udp_ports'
+            'created_at', 'updated_at', 'total_tcp_ports', 'total_udp_ports',
+            'nmap_port_spec'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
-    
-    def get_total_tcp_ports(self, obj):
-        """Calculate approximate number of TCP ports"""
-        if not obj.tcp_ports:
-            return 0
-        # This is a simplified calculation
-        return len([p.strip() for p in obj.tcp_ports.split(',') if p.strip()])
-    
-    def get_total_udp_ports(self, obj):
-        """Calculate approximate number of UDP ports"""
-        if not obj.udp_ports:
-            return 0
-        # This is a simplified calculation
-        return len([p.strip() for p in obj.udp_ports.split(',') if p.strip()])
+        read_only_fields = ['id', 'created_at', 'updated_at', 'nmap_port_spec']
     
     def validate(self, data):
         """Validate PortList data"""
@@ -86,13 +81,14 @@ class ScanTypeSerializer(serializers.ModelSerializer):
     """Serializer for ScanType model"""
     
     port_list_name = serializers.CharField(source='port_list.name', read_only=True)
+    port_specification = serializers.CharField(source='port_list.nmap_port_spec', read_only=True, default=None)
     enabled_plugins = serializers.SerializerMethodField()
     
     class Meta:
         model = ScanType
         fields = [
             'id', 'name', 'only_discovery', 'consider_alive', 'be_quiet',
-            'port_list', 'port_list_name', 'plugin_finger', 'plugin_gce',
+            'port_list', 'port_list_name', 'port_specification', 'plugin_finger', 'plugin_gce',
             'plugin_web', 'plugin_vuln_lookup', 'description', 'created_at',
             'updated_at', 'enabled_plugins'
         ]
@@ -147,10 +143,24 @@ class TargetSerializer(serializers.ModelSerializer):
     
     def get_scans_count(self, obj):
         """Get number of scans for this target"""
+        summary = getattr(obj, 'summary', None)
+        if summary is not None:
+            return summary.scans_count
         return obj.scans.count()
     
     def get_last_scan(self, obj):
         """Get last scan information"""
+        summary = getattr(obj, 'summary', None)
+        if summary is not None:
+            if not summary.last_scan_id:
+                return None
+            return {
+                'id': summary.last_scan_id,
+                'status': summary.last_scan_status,
+                'initiated_at': summary.last_scan_at,
+                'completed_at': summary.last_scan_completed_at
+            }
+
         last_scan = obj.scans.first()  # Assuming ordering by -initiated_at
         if last_scan:
             return {
@@ -163,6 +173,10 @@ class TargetSerializer(serializers.ModelSerializer):
     
     def get_open_ports(self, obj):
         """Get list of open ports from last completed scan"""
+        summary = getattr(obj, 'summary', None)
+        if summary is not None:
+            return summary.open_ports
+
         # Trova l'ultima scansione completata
         last_completed_scan = obj.scans.filter(status='Completed').first()
         
@@ -192,6 +206,10 @@ class TargetSerializer(serializers.ModelSerializer):
     
     def get_os_guess(self, obj):
         """Get OS guess from last completed scan"""
+        summary = getattr(obj, 'summary', None)
+        if summary is not None:
+            return summary.os_guess or None
+
         # Trova l'ultima scansione completata
         last_completed_scan = obj.scans.filter(status='Completed').first()
         
@@ -226,6 +244,15 @@ class TargetSerializer(serializers.ModelSerializer):
         except ValueError:
             pass
         
+        # Address ranges (CIDR or start-end) are split into shards at scan time
+        try:
+            networks = Target.parse_address_range(value)
+            if networks is not None:
+                Target.validate_range_size(networks)
+                return value
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.messages)
+        
         # If not IP, validate as FQDN
         if len(value) > 253:
             raise serializers.ValidationError('FQDN too long (max 253 characters)')
@@ -283,7 +310,7 @@ class ScanDetailSerializer(serializers.ModelSerializer):
     class Meta:
         model = ScanDetail
         fields = [
-            'id', 'scan', 'open_ports', 'os_guess',
+            'id', 'scan', 'open_ports', 'os_guess', 'port_delta', 'plugin_states',
             'nmap_started_at', 'nmap_completed_at',
             'finger_started_at', 'finger_completed_at',
             'gce_started_at', 'gce_completed_at',
@@ -308,14 +335,15 @@ class ScanSerializer(serializers.ModelSerializer):
         model = Scan
         fields = [
             'id', 'target', 'target_name', 'target_address', 'customer_name',
-            'scan_type', 'scan_type_name', 'status', 'initiated_at',
-            'started_at', 'completed_at', 'parsed_nmap_results',
+            'scan_type', 'scan_type_name', 'status', 'scan_mode', 'baseline_scan',
+            'schedule', 'scheduled_for', 'initiated_at', 'started_at', 'completed_at', 'parsed_nmap_results',
             'parsed_finger_results', 'parsed_gce_results', 'parsed_web_results',
             'parsed_vuln_results', 'error_message', 'report_path', 'details',
             'duration_seconds', 'created_at', 'updated_at'
         ]
         read_only_fields = [
-            'id', 'initiated_at', 'started_at', 'completed_at', 'created_at', 'updated_at'
+            'id', 'baseline_scan', 'schedule', 'scheduled_for', 'initiated_at', 'started_at',
+            'completed_at', 'created_at', 'updated_at'
         ]
     
     def get_duration_seconds(self, obj):
@@ -330,7 +358,7 @@ class ScanCreateSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Scan
-        fields = ['target', 'scan_type']
+        fields = ['target', 'scan_type', 'scan_mode']
     
     def validate(self, data):
         """Validate scan creation data"""
@@ -373,7 +401,82 @@ class ScanUpdateSerializer(serializers.ModelSerializer):
             # Add status transition validation logic here if needed
             # For now, allow any transition (will be refined later)
         return value
+
+
+class ScanScheduleSerializer(serializers.ModelSerializer):
+    """Serializer for ScanSchedule model"""
+    
+    customer_name = serializers.CharField(source='customer.name', read_only=True)
+    scan_type_name = serializers.CharField(source='scan_type.name', read_only=True)
+    pending_scans = serializers.IntegerField(read_only=True, default=None)
     
+    class Meta:
+        model = ScanSchedule
+        fields = [
+            'id', 'name', 'customer', 'customer_name', 'targets', 'scan_type',
+            'scan_type_name', 'scan_mode', 'cron', 'interval_minutes', 'jitter_minutes',
+            'enabled', 'next_run_at', 'last_run_at', 'pending_scans', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'last_run_at', 'created_at', 'updated_at']
+    
+    def validate_cron(self, value):
+        """Validate the cron expression"""
+        if value:
+            try:
+                CronExpression.validate(value)
+            except ValueError as e:
+                raise serializers.ValidationError(str(e))
+        return value
+    
+    def validate(self, data):
+        """Validate recurrence and target group"""
+        cron = data.get('cron', self.instance.cron if self.instance else '')
+        interval = data.get('interval_minutes', self.instance.interval_minutes if self.instance else None)
+        if bool(cron) == bool(interval):
+            raise serializers.ValidationError("Set either a cron expression or an interval")
+        
+        customer = data.get('customer', self.instance.customer if self.instance else None)
+        targets = data.get('targets') or []
+        foreign = [target.name for target in targets if target.customer_id != customer.id]
+        if foreign:
+            raise serializers.ValidationError(
+                f"Targets not belonging to customer '{customer.name}': {', '.join(foreign)}"
+            )
+        
+        # Una nuova ricorrenza riparte dal prossimo orario utile
+        if 'cron' in data or 'interval_minutes' in data:
+            data.setdefault('next_run_at', None)
+        return data
+    
+class ScanEventSerializer(serializers.ModelSerializer):
+    """Serializer for ScanEvent model (read only: the log is append-only)"""
+    
+    class Meta:
+        model = ScanEvent
+        fields = ['id', 'scan', 'module', 'status', 'shard_id', 'progress', 'message', 'occurred_at']
+        read_only_fields = fields
+
+
+class ScanShardSerializer(serializers.ModelSerializer):
+    """Serializer for ScanShard model"""
+    
+    class Meta:
+        model = ScanShard
+        fields = [
+            'id', 'scan', 'index', 'hosts', 'ports', 'host_count', 'port_count',
+            'status', 'progress', 'parsed_nmap_results', 'error_message',
+            'started_at', 'completed_at', 'created_at', 'updated_at'
+        ]
+        read_only_fields = [
+            'id', 'scan', 'index', 'hosts', 'ports', 'host_count', 'port_count',
+            'status', 'progress', 'started_at', 'completed_at',
+            'created_at', 'updated_at'
+        ]
+        extra_kwargs = {
+            'parsed_nmap_results': {'write_only': True},
+        }
+
+
 class FingerprintDetailSerializer(serializers.ModelSerializer):
     """Serializer for FingerprintDetail model"""
     
@@ -424,6 +527,84 @@ class GceResultSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
+class VulnerabilitySerializer(serializers.ModelSerializer):
+    """Serializer for Vulnerability model"""
+    
+    target_address = serializers.CharField(source='target.address', read_only=True)
+    cves = serializers.SlugRelatedField(source='cve_refs', slug_field='cve', many=True, read_only=True)
+    
+    class Meta:
+        model = Vulnerability
+        fields = [
+            'id', 'scan', 'target', 'target_address', 'gce_result', 'result_id',
+            'nvt_oid', 'name', 'family', 'cves', 'host', 'hostname', 'port', 'protocol',
+            'severity', 'threat', 'qod', 'description', 'solution', 'created_at'
+        ]
+        read_only_fields = fields
+
+
+class OsMatchSerializer(serializers.ModelSerializer):
+    """Serializer for OsMatch model"""
+    
+    class Meta:
+        model = OsMatch
+        fields = [
+            'id', 'scan', 'target', 'host', 'rank', 'name', 'accuracy', 'line',
+            'vendor', 'os_type', 'osfamily', 'osgen', 'cpe', 'created_at'
+        ]
+        read_only_fields = fields
+
+
+class ScriptResultSerializer(serializers.ModelSerializer):
+    """Serializer for ScriptResult model"""
+    
+    class Meta:
+        model = ScriptResult
+        fields = ['id', 'scan', 'target', 'host', 'port', 'protocol', 'script_id', 'output', 'created_at']
+        read_only_fields = fields
+
+
+class ServiceInventorySerializer(serializers.ModelSerializer):
+    """Serializer for ServiceInventory model"""
+    
+    target_name = serializers.CharField(source='target.name', read_only=True)
+    customer = serializers.UUIDField(source='target.customer_id', read_only=True)
+    
+    class Meta:
+        model = ServiceInventory
+        fields = [
+            'id', 'target', 'target_name', 'customer', 'host', 'port', 'protocol',
+            'service', 'product', 'version', 'is_open', 'first_seen', 'last_seen', 'last_scan'
+        ]
+        read_only_fields = fields
+
+
+class ScanDiffSerializer(serializers.ModelSerializer):
+    """Serializer for ScanDiff model (counters only, for change alerting)"""
+    
+    target_name = serializers.CharField(source='target.name', read_only=True)
+    target_address = serializers.CharField(source='target.address', read_only=True)
+    customer = serializers.UUIDField(source='target.customer_id', read_only=True)
+    
+    class Meta:
+        model = ScanDiff
+        fields = [
+            'id', 'scan', 'previous_scan', 'target', 'target_name', 'target_address', 'customer',
+            'ports_added', 'ports_removed', 'ports_changed',
+            'vulns_added', 'vulns_removed', 'vulns_changed',
+            'has_changes', 'computed_at'
+        ]
+        read_only_fields = fields
+
+
+class ScanDiffDetailSerializer(ScanDiffSerializer):
+    """Serializer for ScanDiff model including the full diff"""
+    
+    class Meta(ScanDiffSerializer.Meta):
+        fields = ScanDiffSerializer.Meta.fields + ['diff']
+        read_only_fields = fields
+
+
 class GceProgressSerializer(serializers.Serializer):
     """Serializer for GCE scan progress updates"""
     gce_task_id = serializers.UUIDField()
@@ -436,8 +617,34 @@ class GceResultCreateSerializer(serializers.Serializer):
     gce_task_id = serializers.UUIDField()
     gce_report_id = serializers.UUIDField()
     gce_target_id = serializers.UUIDField()
-    report_format = serializers.ChoiceField(choices=['XML', 'JSON'])
-    full_report = serializers.CharField()
+    report_format = serializers.ChoiceField(choices=['XML', 'JSON'], default='XML')
+    # Legacy inline report: the plugin now uploads it in chunks to gce-report/
+    # and sends only the aggregated summary here
+    full_report = serializers.CharField(required=False)
     gce_scan_started_at = serializers.DateTimeField()
     gce_scan_completed_at = serializers.DateTimeField()
-    vulnerability_count = serializers.JSONField(required=False)
\ No newline at end of file
+    vulnerability_count = serializers.JSONField(required=False)
+    nvt_summary = serializers.JSONField(required=False)
+
+    def validate(self, data):
+        if not data.get('full_report') and data.get('vulnerability_count') is None:
+            raise serializers.ValidationError("Either full_report or vulnerability_count is required")
+        return data
+
+
+class GceReportChunkSerializer(serializers.Serializer):
+    """Query parameters of a chunked GCE report upload"""
+    gce_task_id = serializers.UUIDField()
+    offset = serializers.IntegerField(min_value=0, default=0)
+    final = serializers.BooleanField(default=False)
+    size = serializers.IntegerField(min_value=0, required=False)
+
+    def validate(self, data):
+        if data['final'] and 'size' not in data:
+            raise serializers.ValidationError("size is required to finalize the upload")
+        return data
+
+
+class TopNvtsParamsSerializer(serializers.Serializer):
+    """Query parameters of the NVT ranking"""
+    limit = serializers.IntegerField(min_value=1, default=20)
@@ -1,120 +1,70 @@
-import json
 import logging
-import pika
 from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
-from .models import Scan, ScanDetail
+from .models import Scan, ScanDetail, ScanShard, JobLease, ScanEvent
+from .diffs import ScanDiffService
+from .events import ScanEventLogService, ScanEventService
+from .incremental import IncrementalScanService
+from .inventory import ServiceInventoryService
+from .leases import LeaseService
+from .messaging import RabbitMQService
+from .plugin_graph import PluginGraph
+from .sharding import ScanShardService
+from .snapshots import ScanSnapshotService
+from .summaries import SummaryService
 
 logger = logging.getLogger(__name__)
 
 
-class RabbitMQService:
-    """Service for RabbitMQ communication"""
-    
-    def __init__(self):
-        self.connection = None
-        self.channel = None
-    
-    def connect(self):
-        """Establish connection to RabbitMQ"""
-        try:
-            # Parse RabbitMQ URL
-            parameters = pika.URLParameters(settings.RABBITMQ_URL)
-            self.connection = pika.BlockingConnection(parameters)
-            self.channel = self.connection.channel()
-            
-            # Declare all queues
-            self._declare_queues()
-            
-            logger.info("Connected to RabbitMQ successfully")
-            return True
-        except Exception as e:
-            logger.error(f"Failed to connect to RabbitMQ: {str(e)}")
-            return False
-    
-    def _declare_queues(self):
-        """Declare all required queues"""
-        queues = [
-            settings.RABBITMQ_NMAP_SCAN_REQUEST_QUEUE,
-            settings.RABBITMQ_GCE_SCAN_REQUEST_QUEUE,
-            settings.RABBITMQ_FINGERPRINT_SCAN_REQUEST_QUEUE,
-            settings.RABBITMQ_WEB_SCAN_REQUEST_QUEUE,
-            settings.RABBITMQ_VULN_LOOKUP_REQUEST_QUEUE,
-            settings.RABBITMQ_REPORT_REQUEST_QUEUE,
-            settings.RABBITMQ_SCAN_STATUS_UPDATE_QUEUE,
-        ]
-        
-        for queue in queues:
-            self.channel.queue_declare(queue=queue, durable=True)
-    
-    def publish_message(self, queue_name, message):
-        """Publish a message to a queue"""
-        try:
-            if not self.connection or self.connection.is_closed:
-                if not self.connect():
-                    return False
-            
-            # Ensure message is JSON string
-            if isinstance(message, dict):
-                message = json.dumps(message)
-            
-            self.channel.basic_publish(
-                exchange='',
-                routing_key=queue_name,
-                body=message,
-                properties=pika.BasicProperties(
-                    delivery_mode=2,  # Make message persistent
-                )
-            )
-            
-            logger.info(f"Published message to queue {queue_name}: {message}")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Failed to publish message to {queue_name}: {str(e)}")
-            return False
-    
-    def close(self):
-        """Close RabbitMQ connection"""
-        try:
-            if self.connection and not self.connection.is_closed:
-                self.connection.close()
-                logger.info("RabbitMQ connection closed")
-        except Exception as e:
-            logger.error(f"Error closing RabbitMQ connection: {str(e)}")
-
-
 class ScanOrchestratorService:
     """Service for orchestrating scan workflows"""
 
+    # Scan.status shown while a plugin is running
+    RUNNING_STATUS = {
+        'nmap': 'Nmap Scan Running',
+        'fingerprint': 'Finger Scan Running',
+        'gce': 'Gce Scan Running',
+        'web': 'Web Scan Running',
+        'vuln_lookup': 'Vuln Lookup Running',
+    }
+
     @staticmethod
-    def start_scan(scan):
+    def start_scan(scan, rabbitmq_service=None):
         """Start a scan by publishing to appropriate queue"""
         try:
             # Update scan status
             scan.status = 'Queued'
             scan.started_at = timezone.now()
-            scan.save()
+            scan.save(update_fields=['status', 'started_at'])
             
-            # Create scan details record
+            # Resolve the baseline of incremental scans
+            IncrementalScanService.prepare_scan(scan)
+
+            # Create scan details record and initialize the plugin graph
             scan_detail, created = ScanDetail.objects.get_or_create(scan=scan)
-            
-            # Prepare message for nmap scanner
-            message = {
-                'scan_id': scan.id,
-                'scan_type_id': scan.scan_type.id,
-                'target_host': scan.target.address,
-                'target_name': scan.target.name,
-                'customer_id': str(scan.target.customer.id),
-                'timestamp': timezone.now().isoformat()
-            }
-            
-            # Publish to nmap queue
-            rabbitmq_service = RabbitMQService()
-            success = rabbitmq_service.publish_message(
-                settings.RABBITMQ_NMAP_SCAN_REQUEST_QUEUE,
-                message
-            )
+            scan_detail.plugin_states = PluginGraph.initial_states(scan.scan_type)
+            scan_detail.plugin_states['nmap'] = PluginGraph.QUEUED
+            scan_detail.save(update_fields=['plugin_states', 'updated_at'])
+            
+            # Prepare message for nmap scanner (scan parameters embedded, no lookup needed)
+            message = ScanOrchestratorService._nmap_request(scan)
+            
+            # Large targets are split into shards, one nmap job each
+            shards = ScanShardService.create_shards(scan)
+            
+            # Publish to nmap queue, reusing the caller's connection when starting several scans
+            own_connection = rabbitmq_service is None
+            if own_connection:
+                rabbitmq_service = RabbitMQService()
+            if shards:
+                success = ScanShardService.publish_shards(scan, shards, message, rabbitmq_service)
+            else:
+                message.update(LeaseService.dispatch_fields(LeaseService.grant(scan, 'nmap')))
+                success = rabbitmq_service.publish_message(
+                    settings.RABBITMQ_NMAP_SCAN_REQUEST_QUEUE,
+                    message
+                )
             
             if success:
                 logger.info(f"Successfully queued scan {scan.id} for target {scan.target.address}")
@@ -122,204 +72,307 @@ class ScanOrchestratorService:
                 # Failed to queue, mark as failed
                 scan.status = 'Failed'
                 scan.error_message = 'Failed to queue scan in RabbitMQ'
-                scan.save()
+                scan.save(update_fields=['status', 'error_message'])
                 logger.error(f"Failed to queue scan {scan.id}")
             
-            rabbitmq_service.close()
+            if own_connection:
+                rabbitmq_service.close()
             return success
             
         except Exception as e:
             logger.error(f"Error starting scan {scan.id}: {str(e)}")
             scan.status = 'Failed'
             scan.error_message = f'Error starting scan: {str(e)}'
-            scan.save()
+            scan.save(update_fields=['status', 'error_message'])
             return False
+
+    @staticmethod
+    def _nmap_request(scan):
+        """Request message of the nmap plugin"""
+        return {
+            'scan_id': scan.id,
+            'scan_type_id': scan.scan_type.id,
+            'target_host': ScanShardService.nmap_targets(scan.target),
+            'target_name': scan.target.name,
+            'customer_id': str(scan.target.customer.id),
+            'scan_parameters': ScanSnapshotService.build(scan),
+            'timestamp': timezone.now().isoformat()
+        }
+
+    @staticmethod
+    def cancel_scan(scan, reason='Scan cancelled by user'):
+        """
+        Cancel a scan: close the plugin graph and broadcast the cancellation on
+        the control exchange, so that the plugins stop the running work and
+        drop the requests of this scan still waiting in their queues.
+        """
+        with transaction.atomic():
+            scan_detail = ScanOrchestratorService._lock_scan_detail(scan)
+            states = scan_detail.plugin_states
+            active = PluginGraph.active_plugins(states)
+            for plugin, state in states.items():
+                if state in (PluginGraph.QUEUED, PluginGraph.RUNNING):
+                    states[plugin] = PluginGraph.CANCELLED
+                elif state == PluginGraph.PENDING:
+                    states[plugin] = PluginGraph.SKIPPED
+            scan_detail.save(update_fields=['plugin_states', 'updated_at'])
+
+            ScanShard.objects.filter(scan=scan).exclude(status__in=ScanShard.TERMINAL_STATUSES).update(
+                status='failed', error_message=reason, completed_at=timezone.now()
+            )
+            JobLease.objects.filter(scan=scan).delete()
+
+            scan.status = 'Failed'
+            scan.error_message = reason
+            scan.completed_at = timezone.now()
+            scan.save(update_fields=['status', 'error_message', 'completed_at'])
+
+        rabbitmq_service = RabbitMQService()
+        broadcast = rabbitmq_service.broadcast(settings.RABBITMQ_SCAN_CONTROL_EXCHANGE, {
+            'action': 'cancel',
+            'scan_id': scan.id,
+            'plugins': active,
+            'timestamp': timezone.now().isoformat()
+        })
+        rabbitmq_service.close()
+
+        if not broadcast:
+            logger.error(f"Failed to broadcast cancellation of scan {scan.id}: plugins will finish their work")
+        logger.info(f"Scan {scan.id} cancelled, active plugins: {active}")
+        return broadcast
+
+    @staticmethod
+    def _lock_scan_detail(scan):
+        """
+        Fetch the ScanDetail row locked for update, initializing the plugin
+        graph for scans created before it existed. Must run inside a transaction.
+        """
+        scan_detail, created = ScanDetail.objects.select_for_update().get_or_create(scan=scan)
+        if not scan_detail.plugin_states:
+            states = PluginGraph.initial_states(scan.scan_type)
+            states['nmap'] = PluginGraph.COMPLETED if scan.parsed_nmap_results else PluginGraph.RUNNING
+            scan_detail.plugin_states = states
+        return scan_detail
+
+    @staticmethod
+    def mark_plugin_running(scan, plugin_name):
+        """Record that a plugin started working on the scan"""
+        with transaction.atomic():
+            scan_detail = ScanOrchestratorService._lock_scan_detail(scan)
+            states = scan_detail.plugin_states
+            if states.get(plugin_name) in (PluginGraph.PENDING, PluginGraph.QUEUED):
+                states[plugin_name] = PluginGraph.RUNNING
+                scan_detail.save(update_fields=['plugin_states', 'updated_at'])
     
     @staticmethod
     def process_nmap_completion(scan):
         """Process nmap scan completion and start next phase"""
-        try:
-            scan_type = scan.scan_type
-            
-            logger.info(f"Nmap scan completed for scan {scan.id}")
-            logger.info(f"Plugin status - Finger: {scan_type.plugin_finger}, Gce: {scan_type.plugin_gce}, "
-                       f"Web: {scan_type.plugin_web}, Vuln: {scan_type.plugin_vuln_lookup}")
-            
-            # Check which plugins should run next
-            next_plugin = None
-            
-            if scan_type.plugin_finger and not scan.parsed_finger_results:
-                next_plugin = 'fingerprint'
-            elif scan_type.plugin_gce and not scan.parsed_gce_results:
-                next_plugin = 'gce'
-            elif scan_type.plugin_web and not scan.parsed_web_results:
-                next_plugin = 'web'
-            elif scan_type.plugin_vuln_lookup and not scan.parsed_vuln_results:
-                next_plugin = 'vuln_lookup'
-            
-            if next_plugin:
-                return ScanOrchestratorService._start_plugin_scan(scan, next_plugin)
-            else:
-                # No more plugins, mark as completed
-                scan.status = 'Completed'
-                scan.completed_at = timezone.now()
-                scan.save()
-                
-                logger.info(f"Scan {scan.id} completed - no more plugins to run")
-                
-                # TODO: Start report generation if enabled
-                # ScanOrchestratorService._start_report_generation(scan)
-                
-                return True
-                
-        except Exception as e:
-            logger.error(f"Error processing nmap completion for scan {scan.id}: {str(e)}")
-            return False
+        return ScanOrchestratorService.process_plugin_completion(scan, 'nmap')
     
     @staticmethod
     def process_fingerprint_completion(scan):
         """Process fingerprint scan completion and start next phase"""
-        try:
-            scan_type = scan.scan_type
-            
-            logger.info(f"Fingerprint scan completed for scan {scan.id}")
-            
-            # Update status
-            scan.status = 'Finger Scan Completed'
-            scan.save()
-            
-            # Check which plugin should run next
-            next_plugin = None
-            
-            if scan_type.plugin_gce and not scan.parsed_gce_results:
-                next_plugin = 'gce'
-            elif scan_type.plugin_web and not scan.parsed_web_results:
-                next_plugin = 'web'
-            elif scan_type.plugin_vuln_lookup and not scan.parsed_vuln_results:
-                next_plugin = 'vuln_lookup'
-            
-            if next_plugin:
-                return ScanOrchestratorService._start_plugin_scan(scan, next_plugin)
-            else:
-                # No more plugins, mark as completed
-                scan.status = 'Completed'
-                scan.completed_at = timezone.now()
-                scan.save()
-                
-                logger.info(f"Scan {scan.id} completed after fingerprinting")
-                
-                return True
-                
-        except Exception as e:
-            logger.error(f"Error processing fingerprint completion for scan {scan.id}: {str(e)}")
-            return False
+        return ScanOrchestratorService.process_plugin_completion(scan, 'fingerprint')
     
     @staticmethod
     def process_gce_completion(scan):
         """Process GCE scan completion and start next phase"""
+        return ScanOrchestratorService.process_plugin_completion(scan, 'gce')
+    
+    @staticmethod
+    def process_plugin_completion(scan, plugin_name):
+        """Mark a plugin node as completed and fan out to the plugins it unblocks"""
         try:
-            scan_type = scan.scan_type
-            
-            logger.info(f"GCE scan completed for scan {scan.id}")
-            
-            # Update status
-            scan.status = 'Gce Scan Completed'
-            scan.save()
-            
-            # Check which plugin should run next
-            next_plugin = None
-            
-            if scan_type.plugin_web and not scan.parsed_web_results:
-                next_plugin = 'web'
-            elif scan_type.plugin_vuln_lookup and not scan.parsed_vuln_results:
-                next_plugin = 'vuln_lookup'
-            
-            if next_plugin:
-                return ScanOrchestratorService._start_plugin_scan(scan, next_plugin)
-            else:
-                # No more plugins, mark as completed
-                scan.status = 'Completed'
-                scan.completed_at = timezone.now()
-                scan.save()
-                
-                logger.info(f"Scan {scan.id} completed - no more plugins to run")
-                
-                # TODO: Start report generation if enabled
-                # ScanOrchestratorService._start_report_generation(scan)
-                
-                return True
-                
+            logger.info(f"{plugin_name} completed for scan {scan.id}")
+            return ScanOrchestratorService._transition(scan, plugin_name, PluginGraph.COMPLETED)
         except Exception as e:
-            logger.error(f"Error processing GCE completion for scan {scan.id}: {str(e)}")
+            logger.error(f"Error processing {plugin_name} completion for scan {scan.id}: {str(e)}")
             return False
-    
+
     @staticmethod
-    def process_plugin_completion(scan, plugin_name):
-        """Process plugin completion based on plugin name"""
-        plugin_handlers = {
-            'nmap': ScanOrchestratorService.process_nmap_completion,
-            'fingerprint': ScanOrchestratorService.process_fingerprint_completion,
-            'gce': ScanOrchestratorService.process_gce_completion,
-            # Add other plugin handlers here as they are implemented
-        }
-        
-        handler = plugin_handlers.get(plugin_name)
-        if handler:
-            return handler(scan)
-        else:
-            logger.warning(f"No handler found for plugin: {plugin_name}")
+    def process_plugin_failure(scan, plugin_name, error_message=None):
+        """Mark a plugin node as failed and skip everything that depends on it"""
+        try:
+            logger.warning(f"{plugin_name} failed for scan {scan.id}: {error_message}")
+            return ScanOrchestratorService._transition(scan, plugin_name, PluginGraph.FAILED, error_message)
+        except Exception as e:
+            logger.error(f"Error processing {plugin_name} failure for scan {scan.id}: {str(e)}")
             return False
-        
-    
+
+    @staticmethod
+    def _transition(scan, plugin_name, new_state, error_message=None):
+        """
+        Apply a terminal state to a plugin node, dispatch every plugin whose
+        dependencies are now satisfied (join), and finish the scan once the
+        whole graph is terminal.
+        """
+        with transaction.atomic():
+            scan_detail = ScanOrchestratorService._lock_scan_detail(scan)
+            states = scan_detail.plugin_states
+
+            if plugin_name not in states:
+                logger.warning(f"Plugin {plugin_name} is not part of the graph of scan {scan.id}")
+                return False
+
+            ready = []
+            if states[plugin_name] in PluginGraph.TERMINAL_STATES:
+                # Duplicate/redelivered status message: nothing to dispatch
+                logger.info(f"Plugin {plugin_name} already {states[plugin_name]} for scan {scan.id}")
+            else:
+                states[plugin_name] = new_state
+                if new_state == PluginGraph.FAILED:
+                    for dependent in PluginGraph.dependents(plugin_name, states):
+                        if states[dependent] == PluginGraph.PENDING:
+                            states[dependent] = PluginGraph.SKIPPED
+
+                ready = ScanOrchestratorService._queue_ready_plugins(scan, states)
+                scan_detail.save(update_fields=['plugin_states', 'updated_at'])
+
+        # Publish outside of the row lock, on a single connection
+        success = True
+        if ready:
+            logger.info(f"Dispatching plugins {ready} in parallel for scan {scan.id}")
+            rabbitmq_service = RabbitMQService()
+            failed_dispatch = [
+                plugin for plugin in ready
+                if not ScanOrchestratorService._start_plugin_scan(scan, plugin, rabbitmq_service)
+            ]
+            rabbitmq_service.close()
+
+            if failed_dispatch:
+                success = False
+                with transaction.atomic():
+                    scan_detail = ScanOrchestratorService._lock_scan_detail(scan)
+                    for plugin in failed_dispatch:
+                        scan_detail.plugin_states[plugin] = PluginGraph.FAILED
+                        for dependent in PluginGraph.dependents(plugin, scan_detail.plugin_states):
+                            if scan_detail.plugin_states[dependent] == PluginGraph.PENDING:
+                                scan_detail.plugin_states[dependent] = PluginGraph.SKIPPED
+                    scan_detail.save(update_fields=['plugin_states', 'updated_at'])
+                error_message = f"Failed to queue plugins: {', '.join(failed_dispatch)}"
+
+        ScanOrchestratorService._refresh_scan_status(scan, error_message)
+        return success
+
+    @staticmethod
+    def _queue_ready_plugins(scan, states):
+        """
+        Mark the plugins unblocked by the current states as queued and return
+        them. Delta-aware plugins of an incremental scan with no changed ports
+        reuse the baseline results and complete without being dispatched.
+        """
+        ready = []
+        newly_ready = PluginGraph.ready_plugins(states)
+        while newly_ready:
+            for plugin in newly_ready:
+                if (plugin in IncrementalScanService.DELTA_PLUGINS
+                        and IncrementalScanService.delta_ports(scan) == []):
+                    logger.info(f"No port changes for scan {scan.id}, reusing baseline {plugin} results")
+                    states[plugin] = PluginGraph.COMPLETED
+                else:
+                    states[plugin] = PluginGraph.QUEUED
+                    ready.append(plugin)
+            newly_ready = PluginGraph.ready_plugins(states)
+        return ready
+
+    @staticmethod
+    def _refresh_scan_status(scan, error_message=None):
+        """
+        Derive Scan.status from the plugin graph. The states are re-read under
+        the ScanDetail lock and the Scan row is locked too, so concurrent status
+        messages cannot write back a status computed from an older graph.
+        """
+        with transaction.atomic():
+            states = ScanOrchestratorService._lock_scan_detail(scan).plugin_states
+            current = Scan.objects.select_for_update().only(
+                'id', 'status', 'error_message', 'completed_at'
+            ).get(id=scan.id)
+            if error_message:
+                current.error_message = error_message
+
+            if PluginGraph.is_terminal(states):
+                if PluginGraph.has_failures(states):
+                    current.status = 'Failed'
+                    if not current.error_message:
+                        failed = [p for p, s in states.items() if s == PluginGraph.FAILED]
+                        current.error_message = f"Plugins failed: {', '.join(failed)}"
+                    logger.info(f"Scan {scan.id} finished with failures: {states}")
+                else:
+                    current.status = 'Completed'
+                    logger.info(f"Scan {scan.id} completed - all plugins finished")
+
+                    # TODO: Start report generation if enabled
+                    # ScanOrchestratorService._start_report_generation(scan)
+                if not current.completed_at:
+                    current.completed_at = timezone.now()
+            else:
+                active = PluginGraph.active_plugins(states)
+                if active:
+                    current.status = ScanOrchestratorService.RUNNING_STATUS[active[0]]
+            current.save(update_fields=['status', 'error_message', 'completed_at'])
+
+        # L'istanza del chiamante riflette la riga salvata
+        scan.status, scan.error_message, scan.completed_at = current.status, current.error_message, current.completed_at
+
+        if scan.status == 'Completed':
+            IncrementalScanService.materialize_fingerprints(scan)
+            IncrementalScanService.materialize_vulnerabilities(scan)
+            ScanDiffService.materialize(scan)
     
     @staticmethod
-    def _start_plugin_scan(scan, plugin_name):
-        """Start a specific plugin scan"""
+    def _start_plugin_scan(scan, plugin_name, rabbitmq_service=None):
+        """Publish the request for a specific plugin scan"""
         try:
             queue_mapping = {
-                'fingerprint': 'fingerprint_scan_requests',
-                'gce': 'gce_scan_requests',
-                'web': 'web_scan_requests',
-                'vuln_lookup': 'vuln_lookup_requests'
-            }
-            
-            status_mapping = {
-                'fingerprint': 'Finger Scan Running',
-                'gce': 'Gce Scan Running',
-                'web': 'Web Scan Running',
-                'vuln_lookup': 'Vuln Lookup Running'
+                'fingerprint': settings.RABBITMQ_FINGERPRINT_SCAN_REQUEST_QUEUE,
+                'gce': settings.RABBITMQ_GCE_SCAN_REQUEST_QUEUE,
+                'web': settings.RABBITMQ_WEB_SCAN_REQUEST_QUEUE,
+                'vuln_lookup': settings.RABBITMQ_VULN_LOOKUP_REQUEST_QUEUE
             }
             
             queue_name = queue_mapping.get(plugin_name)
-            new_status = status_mapping.get(plugin_name)
             
-            if not queue_name or not new_status:
+            if not queue_name:
                 logger.error(f"Unknown plugin: {plugin_name}")
                 return False
             
-            # Update scan status
-            scan.status = new_status
-            scan.save()
-            
             # Prepare message for plugin
             message = {
                 'scan_id': scan.id,
                 'target_id': scan.target.id,
                 'target_host': scan.target.address,
+                'target_name': scan.target.name,
                 'plugin': plugin_name,
+                'scan_parameters': ScanSnapshotService.build(scan),
                 'timestamp': timezone.now().isoformat()
             }
+
+            # Incremental scans: only send the ports that changed since the baseline
+            if plugin_name in IncrementalScanService.DELTA_PLUGINS:
+                ports = IncrementalScanService.delta_ports(scan)
+                if ports is not None:
+                    message['scan_mode'] = 'incremental'
+                    message['baseline_scan_id'] = scan.baseline_scan_id
+                    message['ports'] = ports
+
+            # Plugins working on the nmap output get the open ports in the message
+            if plugin_name in ScanSnapshotService.PORT_PLUGINS and 'ports' not in message:
+                message['ports'] = ScanSnapshotService.open_ports(scan)
             
             logger.info(f"queue_name: {queue_name}")
             logger.info(f"message: {message}")
-#            # Send to appropriate queue
-#            return RabbitMQService.publish_message(queue_name, message)
-            # Crea un'istanza di RabbitMQService
-            rabbitmq_service = RabbitMQService() # Aggiungi questa riga
+
+            message.update(LeaseService.dispatch_fields(LeaseService.grant(scan, plugin_name)))
+
+            # Reuse the caller's connection when fanning out several plugins
+            own_connection = rabbitmq_service is None
+            if own_connection:
+                rabbitmq_service = RabbitMQService()
             
             # Send to appropriate queue
-            success = rabbitmq_service.publish_message(queue_name, message) # Modifica questa riga
-            rabbitmq_service.close() # Aggiungi questa riga per chiudere la connessione
+            success = rabbitmq_service.publish_message(queue_name, message)
+            if own_connection:
+                rabbitmq_service.close()
             return success
 
         except Exception as e:
@@ -363,132 +416,146 @@ class ScanOrchestratorService:
 
 class ScanStatusService:
     """Service for updating scan status based on RabbitMQ messages"""
+
+    # module -> (ScanDetail timing prefix, status shown on completion, default error)
+    MODULES = {
+        'nmap': ('nmap', 'Nmap Scan Completed', 'Nmap scan failed'),
+        'fingerprint': ('finger', 'Finger Scan Completed', 'Fingerprint scan failed'),
+        'gce': ('gce', 'Gce Scan Completed', 'Gce scan failed'),
+        'web': ('web', 'Web Scan Completed', 'Web scan failed'),
+        'vuln_lookup': ('vuln', 'Vuln Lookup Completed', 'Vulnerability lookup failed'),
+    }
+
+    RUNNING_STATUSES = ScanEvent.RUNNING_STATUSES
+    FAILED_STATUSES = ScanEvent.FAILED_STATUSES
     
     @staticmethod
-    def update_scan_status(scan_id, module, status, message=None, error_details=None):
+    def _record_status_update(scan, previous_status):
+        """
+        What the Scan post_save signals do for a status written with
+        QuerySet.update(): event log row, summaries and live clients
+        """
+        ScanEventLogService.record(scan.id, ScanEvent.SCAN_MODULE, scan.status)
+        SummaryService.scan_status_changed(scan, previous_status)
+        transaction.on_commit(lambda: ScanEventService.publish(
+            'scan_status', scan, previous_status=previous_status
+        ))
+
+    @staticmethod
+    def update_scan_status(scan_id, module, status, message=None, error_details=None,
+                           shard_id=None, progress=None, attempt=None, worker=None, checkpoint=None):
         """Update scan status based on module status update"""
         try:
-            scan = Scan.objects.get(id=scan_id)
+            if status == 'heartbeat':
+                # Segno di vita del plugin: solo il rinnovo del lease, la scansione non viene toccata
+                LeaseService.renew(scan_id, module, shard_id, attempt, worker, checkpoint)
+                return True
+
+            scan = Scan.objects.select_related('scan_type', 'target').get(id=scan_id)
             scan_detail = scan.details if hasattr(scan, 'details') else None
-            
-            # Update status based on module and status
-            if module == 'nmap':
-                if status == 'running':
-                    scan.status = 'Nmap Scan Running'
-                    if scan_detail:
-                        scan_detail.nmap_started_at = timezone.now()
-                        scan_detail.save()
-                elif status == 'completed':
-                    scan.status = 'Nmap Scan Completed'
-                    if scan_detail:
-                        scan_detail.nmap_completed_at = timezone.now()
-                        scan_detail.save()
-                    
-                    # Process nmap completion
-                    ScanOrchestratorService.process_nmap_completion(scan)
-                    
-                elif status == 'failed':
-                    scan.status = 'Failed'
-                    scan.error_message = error_details or message or 'Nmap scan failed'
-                    scan.completed_at = timezone.now()
+            ScanEventLogService.record(scan.id, module, status, shard_id, progress, error_details or message)
 
-            elif module == 'fingerprint':
-                if status == 'running':
-                    scan.status = 'Finger Scan Running'
-                    if scan_detail:
-                        scan_detail.finger_started_at = timezone.now()
-                        scan_detail.save()
-                elif status == 'completed':
-                    scan.status = 'Finger Scan Completed'
-                    if scan_detail:
-                        scan_detail.finger_completed_at = timezone.now()
-                        scan_detail.save()
-                    
-                    # Process plugin completion
-                    ScanOrchestratorService.process_plugin_completion(scan, 'fingerprint')
-                    
-                elif status == 'failed':
-                    scan.status = 'Failed'
-                    scan.error_message = error_details or message or 'Fingerprint scan failed'
-                    scan.completed_at = timezone.now()
+            if (module in ScanStatusService.MODULES and scan_detail
+                    and (scan_detail.plugin_states or {}).get(module) == PluginGraph.CANCELLED):
+                # Plugin cancellato: gli aggiornamenti in volo non riaprono il grafo
+                if status == 'cancelled':
+                    timing_prefix = ScanStatusService.MODULES[module][0]
+                    setattr(scan_detail, f'{timing_prefix}_completed_at', timezone.now())
+                    scan_detail.save(update_fields=[f'{timing_prefix}_completed_at', 'updated_at'])
+                    logger.info(f"{module} confirmed cancellation of scan {scan_id}")
+                else:
+                    logger.info(f"Ignoring {module} status '{status}' for cancelled scan {scan_id}")
+                return True
 
-            elif module == 'gce':
-                if status == 'running':
-                    scan.status = 'Gce Scan Running'
-                    if scan_detail:
-                        scan_detail.gce_started_at = timezone.now()
-                        scan_detail.save()
-                elif status == 'completed':
-                    scan.status = 'Gce Scan Completed'
-                    if scan_detail:
-                        scan_detail.gce_completed_at = timezone.now()
-                        scan_detail.save()
-                    
-                    # Process plugin completion
-                    ScanOrchestratorService.process_plugin_completion(scan, 'gce')
-                    
-                elif status == 'failed':
-                    scan.status = 'Failed'
-                    scan.error_message = error_details or message or 'Gce scan failed'
-                    scan.completed_at = timezone.now()
+            terminal = status == 'completed' or status in ScanStatusService.FAILED_STATUSES
+            if module in ScanStatusService.MODULES:
+                if status != 'completed' and LeaseService.is_superseded(scan_id, module, shard_id, attempt):
+                    # Job ridistribuito dal reaper: del vecchio tentativo vale solo il completamento
+                    logger.info(f"Ignoring {module} status '{status}' of superseded attempt {attempt} for scan {scan_id}")
+                    return True
+                if not terminal:
+                    LeaseService.renew(scan_id, module, shard_id, attempt, worker, checkpoint)
+            
+            if module == 'nmap' and shard_id is not None:
+                # Sharded nmap scan: the node only completes/fails once every shard is done
+                status, shard_error = ScanShardService.update_shard_status(
+                    scan, shard_id, status, progress, error_details or message
+                )
+                if terminal:
+                    LeaseService.release(scan_id, module, shard_id)
+                if status in ('completed', 'failed'):
+                    # Ultimo shard: i risultati uniti sono sulla scansione
+                    NmapResultsParser.process_nmap_results(scan)
+                if status is None:
+                    ScanEventService.publish(
+                        'plugin_status', scan, module=module, status='running',
+                        progress=ScanShardService.overall_progress(scan)
+                    )
+                    return True
+                error_details = shard_error or error_details
+            
+            if module in ScanStatusService.MODULES:
+                timing_prefix, _, default_error = ScanStatusService.MODULES[module]
 
-            elif module == 'web':
-                if status == 'running':
-                    scan.status = 'Web Scan Running'
-                    if scan_detail:
-                        scan_detail.web_started_at = timezone.now()
-                        scan_detail.save()
-                elif status == 'completed':
-                    scan.status = 'Web Scan Completed'
-                    if scan_detail:
-                        scan_detail.web_completed_at = timezone.now()
-                        scan_detail.save()
-                    
-                    # Process plugin completion
-                    ScanOrchestratorService.process_plugin_completion(scan, 'web')
-                    
-                elif status == 'failed':
-                    scan.status = 'Failed'
-                    scan.error_message = error_details or message or 'Web scan failed'
-                    scan.completed_at = timezone.now()
+                if status in ScanStatusService.RUNNING_STATUSES:
+                    # Update condizionale sullo stato letto: un messaggio in ritardo non riapre una
+                    # scansione già chiusa, e lo stato precedente è quello sostituito
+                    running_status = ScanOrchestratorService.RUNNING_STATUS[module]
+                    previous_status = scan.status
+                    if previous_status not in ('Completed', 'Failed', running_status) and Scan.objects.filter(
+                        id=scan_id, status=previous_status
+                    ).update(status=running_status):
+                        scan.status = scan._loaded_status = running_status
+                        ScanStatusService._record_status_update(scan, previous_status)
+                    if scan_detail and not getattr(scan_detail, f'{timing_prefix}_started_at'):
+                        setattr(scan_detail, f'{timing_prefix}_started_at', timezone.now())
+                        scan_detail.save(update_fields=[f'{timing_prefix}_started_at', 'updated_at'])
+                    ScanOrchestratorService.mark_plugin_running(scan, module)
 
-            elif module == 'vuln_lookup':
-                if status == 'running':
-                    scan.status = 'Vuln Lookup Running'
-                    if scan_detail:
-                        scan_detail.vuln_started_at = timezone.now()
-                        scan_detail.save()
                 elif status == 'completed':
-                    scan.status = 'Vuln Lookup Completed'
                     if scan_detail:
-                        scan_detail.vuln_completed_at = timezone.now()
-                        scan_detail.save()
+                        setattr(scan_detail, f'{timing_prefix}_completed_at', timezone.now())
+                        scan_detail.save(update_fields=[f'{timing_prefix}_completed_at', 'updated_at'])
                     
-                    # Process plugin completion
-                    ScanOrchestratorService.process_plugin_completion(scan, 'vuln_lookup')
+                    # Join on the plugin graph and fan out to the next plugins
+                    ScanOrchestratorService.process_plugin_completion(scan, module)
+                    LeaseService.release(scan_id, module)
                     
-                elif status == 'failed':
-                    scan.status = 'Failed'
-                    scan.error_message = error_details or message or 'Vulnerability lookup failed'
-                    scan.completed_at = timezone.now()
+                elif status in ScanStatusService.FAILED_STATUSES:
+                    ScanOrchestratorService.process_plugin_failure(
+                        scan, module, error_details or message or default_error
+                    )
+                    LeaseService.release(scan_id, module)
+
+            elif module == 'gce_ingest':
+                # Findings GCE pronti (o ingest fallita): non cambia lo stato della scansione
+                logger.info(f"GCE ingest for scan {scan_id}: {status} - {message or error_details or ''}")
+                # L'ingest può finire dopo il completamento: il diff va ricalcolato con i nuovi finding
+                if status == 'completed' and scan.status == 'Completed':
+                    IncrementalScanService.materialize_vulnerabilities(scan)
+                    ScanDiffService.materialize(scan)
+                if status == 'completed':
+                    SummaryService.refresh_scan(scan)
+                return True
 
             elif module == 'report':
                 if status == 'running':
                     scan.status = 'Report Generation Running'
+                    scan.save(update_fields=['status'])
                 elif status == 'completed':
                     scan.status = 'Completed'
                     scan.completed_at = timezone.now()
+                    scan.save(update_fields=['status', 'completed_at'])
                 elif status == 'failed':
                     scan.status = 'Failed'
                     scan.error_message = error_details or message or 'Report generation failed'
                     scan.completed_at = timezone.now()
+                    scan.save(update_fields=['status', 'error_message', 'completed_at'])
 
-
-
-
-            # Save scan changes
-            scan.save()
-
+            ScanEventService.publish(
+                'plugin_status', scan, module=module, status=status, progress=progress,
+                shard_id=shard_id, message=message, error=error_details if status in ScanStatusService.FAILED_STATUSES else None
+            )
 
             logger.info(f"Updated scan {scan_id} status for module {module}: {status}")
             return True
@@ -517,44 +584,47 @@ class NmapResultsParser:
             if not parsed_nmap_results or 'hosts' not in parsed_nmap_results:
                 return open_ports
             
-            # Assumiamo sempre un singolo host
+            # Target di tipo range: più host, ogni porta riporta l'host di appartenenza
             hosts = parsed_nmap_results.get('hosts', [])
             if not hosts:
                 return open_ports
             
-            host = hosts[0]  # Prendiamo sempre il primo host
-            ports = host.get('ports', [])
-            
-            for port in ports:
-                protocol = port.get('protocol', 'tcp')
-                port_data = {
-                    'port': int(port.get('portid', 0)),
-                    'state': port.get('state', 'unknown')
-                }
+            for host in hosts:
+                address = host.get('address')
                 
-                # Aggiungi informazioni sul servizio se disponibili
-                service = port.get('service', {})
-                if service:
-                    port_data['service'] = service.get('name', '')
-                    if service.get('product'):
-                        port_data['product'] = service.get('product')
-                    if service.get('version'):
-                        port_data['version'] = service.get('version')
-                    if service.get('extrainfo'):
-                        port_data['extrainfo'] = service.get('extrainfo')
-                
-                # Aggiungi solo porte aperte
-                if port_data['state'] == 'open':
-                    if protocol == 'tcp':
-                        open_ports['tcp'].append(port_data)
-                    elif protocol == 'udp':
-                        open_ports['udp'].append(port_data)
+                for port in host.get('ports', []):
+                    protocol = port.get('protocol', 'tcp')
+                    port_data = {
+                        'port': int(port.get('portid', 0)),
+                        'state': port.get('state', 'unknown')
+                    }
+                    if address:
+                        port_data['host'] = address
+                    
+                    # Aggiungi informazioni sul servizio se disponibili
+                    service = port.get('service', {})
+                    if service:
+                        port_data['service'] = service.get('name', '')
+                        if service.get('product'):
+                            port_data['product'] = service.get('product')
+                        if service.get('version'):
+                            port_data['version'] = service.get('version')
+                        if service.get('extrainfo'):
+                            port_data['extrainfo'] = service.get('extrainfo')
+                    
+                    # Aggiungi solo porte aperte
+                    if port_data['state'] == 'open':
+                        if protocol == 'tcp':
+                            open_ports['tcp'].append(port_data)
+                        elif protocol == 'udp':
+                            open_ports['udp'].append(port_data)
             
-            # Ordina le porte per numero
-            open_ports['tcp'].sort(key=lambda x: x['port'])
-            open_ports['udp'].sort(key=lambda x: x['port'])
+            # Ordina le porte per numero (e per host a parità di porta)
+            open_ports['tcp'].sort(key=lambda x: (x['port'], x.get('host') or ''))
+            open_ports['udp'].sort(key=lambda x: (x['port'], x.get('host') or ''))
             
-            logger.info(f"Extracted {len(open_ports['tcp'])} TCP and {len(open_ports['udp'])} UDP open ports")
+            logger.info(f"Extracted {len(open_ports['tcp'])} TCP and {len(open_ports['udp'])} UDP open ports "
+                        f"from {len(hosts)} hosts")
             
         except Exception as e:
             logger.error(f"Error extracting open ports: {str(e)}")
@@ -575,13 +645,12 @@ class NmapResultsParser:
             if not parsed_nmap_results or 'hosts' not in parsed_nmap_results:
                 return os_guess
             
-            # Assumiamo sempre un singolo host
             hosts = parsed_nmap_results.get('hosts', [])
             if not hosts:
                 return os_guess
             
-            host = hosts[0]  # Prendiamo sempre il primo host
-            os_info = host.get('os', {})
+            # Primo host con un OS rilevato (i target di tipo range hanno più host)
+            os_info = next((host['os'] for host in hosts if host.get('os')), {})
             
             if os_info:
                 # Estrai informazioni OS
@@ -624,17 +693,37 @@ class NmapResultsParser:
             # Crea o ottieni ScanDetail
             scan_detail, created = ScanDetail.objects.get_or_create(scan=scan)
             
-            # Estrai porte aperte
-            open_ports = NmapResultsParser.extract_open_ports(scan.parsed_nmap_results)
-            scan_detail.open_ports = open_ports
+            # Il plugin nmap invia porte aperte e OS guess già nel formato di ScanDetail;
+            # i risultati delle versioni precedenti vengono estratti dagli host
+            results = scan.parsed_nmap_results
+            if isinstance(results.get('open_ports'), dict):
+                scan_detail.open_ports = {
+                    'tcp': results['open_ports'].get('tcp', []),
+                    'udp': results['open_ports'].get('udp', []),
+                }
+            else:
+                scan_detail.open_ports = NmapResultsParser.extract_open_ports(results)
             
-            # Estrai OS guess
-            os_guess = NmapResultsParser.extract_os_guess(scan.parsed_nmap_results)
-            scan_detail.os_guess = os_guess
+            if 'os_guess' in results:
+                scan_detail.os_guess = results['os_guess'] or {}
+            else:
+                scan_detail.os_guess = NmapResultsParser.extract_os_guess(results)
+
+            # Delta contro la scansione baseline (solo scansioni incrementali)
+            IncrementalScanService.process_nmap_delta(scan, scan_detail)
             
             # Salva
             scan_detail.save()
             
+            # Inventario porte/servizi del target: un errore non blocca la scansione, i risultati sono salvati
+            try:
+                ServiceInventoryService.record_nmap(scan, scan_detail.open_ports, results.get('hosts'))
+            except Exception as e:
+                logger.error(
+                    f"Service inventory not updated for scan {scan.id}, rebuild it with "
+                    f"backfill_service_inventory --target {scan.target_id}: {str(e)}"
+                )
+            
             logger.info(f"Successfully processed nmap results for scan {scan.id}")
             
         except Exception as e:
@@ -0,0 +1,282 @@
+# backend/orchestrator_api/sharding.py
+
+import ipaddress
+import logging
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import ScanDetail, ScanEvent, ScanShard
+from .host_data import NmapHostDataService
+from .leases import LeaseService
+from .plugin_graph import PluginGraph
+from .ports import nmap_port_spec
+
+logger = logging.getLogger(__name__)
+
+
+class ScanShardService:
+    """Service for splitting range targets and large port lists into nmap shards"""
+
+    @staticmethod
+    def nmap_targets(target):
+        """
+        nmap target specification of a whole target: range targets as the list
+        of their CIDR networks, since nmap does not accept start-end IP ranges
+        """
+        networks = target.parse_address_range(target.address)
+        if networks is None:
+            return target.address
+        return ' '.join(
+            str(network.network_address) if network.num_addresses == 1 else str(network)
+            for network in networks
+        )
+
+    @staticmethod
+    def address_blocks(target):
+        """
+        Split a target into address blocks of at most NMAP_SHARD_MAX_HOSTS addresses.
+
+        Returns:
+            list: (nmap target specification, address count) tuples
+        """
+        networks = target.parse_address_range(target.address)
+        if networks is None:
+            return [(target.address, 1)]
+
+        # Largest power of two not above the configured block size
+        max_hosts = max(1, settings.NMAP_SHARD_MAX_HOSTS)
+        host_bits = max_hosts.bit_length() - 1
+
+        blocks, current, count = [], [], 0
+        for network in networks:
+            new_prefix = max(network.prefixlen, network.max_prefixlen - host_bits)
+            for subnet in network.subnets(new_prefix=new_prefix):
+                # Pack the small networks of a start-end range together
+                if current and count + subnet.num_addresses > max_hosts:
+                    blocks.append((' '.join(current), count))
+                    current, count = [], 0
+                current.append(str(subnet.network_address) if subnet.num_addresses == 1 else str(subnet))
+                count += subnet.num_addresses
+        if current:
+            blocks.append((' '.join(current), count))
+        return blocks
+
+    @staticmethod
+    def port_chunks(port_list):
+        """
+        Split the scan type port list into nmap -p specifications of at most
+        NMAP_SHARD_MAX_PORTS ports.
+
+        Returns:
+            list: (port specification, port count) tuples; a single (None, None)
+            entry when the port list does not need to be split
+        """
+        max_ports = settings.NMAP_SHARD_MAX_PORTS
+        if not port_list or not max_ports or port_list.total_ports <= max_ports:
+            return [(None, None)]
+
+        chunks = []
+        for chunk in port_list.tcp_port_set.split(max_ports):
+            chunks.append((nmap_port_spec(tcp=chunk), len(chunk)))
+        for chunk in port_list.udp_port_set.split(max_ports):
+            chunks.append((nmap_port_spec(udp=chunk), len(chunk)))
+        return chunks
+
+    @staticmethod
+    def create_shards(scan):
+        """
+        Create the shards of a scan (address blocks x port chunks).
+
+        Returns:
+            list: ScanShard instances, empty when the scan runs as a single nmap job
+        """
+        blocks = ScanShardService.address_blocks(scan.target)
+        chunks = ScanShardService.port_chunks(scan.scan_type.port_list)
+
+        ScanShard.all_objects.filter(scan=scan).delete()
+        if len(blocks) * len(chunks) <= 1:
+            return []
+
+        ScanShard.objects.bulk_create([
+            ScanShard(
+                scan=scan,
+                index=index,
+                hosts=hosts,
+                host_count=host_count,
+                ports=ports,
+                port_count=port_count,
+            )
+            for index, ((hosts, host_count), (ports, port_count)) in enumerate(
+                (block, chunk) for block in blocks for chunk in chunks
+            )
+        ])
+        shards = list(ScanShard.objects.filter(scan=scan))
+        logger.info(f"Scan {scan.id} split into {len(shards)} shards "
+                    f"({len(blocks)} address blocks x {len(chunks)} port chunks)")
+        return shards
+
+    @staticmethod
+    def publish_shards(scan, shards, base_message, rabbitmq_service, shard_total=None):
+        """Publish one nmap request per shard"""
+        leases = LeaseService.grant_shards(scan, shards)
+        queued = []
+        for shard in shards:
+            message = {
+                **base_message,
+                **LeaseService.dispatch_fields(leases[shard.id]),
+                'target_host': shard.hosts,
+                'shard_id': shard.id,
+                'shard_index': shard.index,
+                'shard_total': shard_total or len(shards),
+            }
+            if shard.ports:
+                message['ports'] = shard.ports
+
+            if rabbitmq_service.publish_message(settings.RABBITMQ_NMAP_SCAN_REQUEST_QUEUE, message):
+                queued.append(shard.id)
+            else:
+                logger.error(f"Failed to queue shard {shard.index} of scan {scan.id}")
+
+        ScanShard.objects.filter(id__in=queued).update(status='queued', updated_at=timezone.now())
+        return len(queued) == len(shards)
+
+    @staticmethod
+    def update_shard_status(scan, shard_id, status, progress=None, error_message=None):
+        """
+        Apply a status update of one shard. When the last shard reaches a
+        terminal state the results are merged into scan.parsed_nmap_results,
+        for the caller to process.
+
+        Returns:
+            tuple: (nmap node status to apply or None, error message)
+        """
+        with transaction.atomic():
+            # Lock every shard of the scan so that exactly one update sees the last completion
+            shards = list(ScanShard.objects.select_for_update().filter(scan=scan))
+            shard = next((s for s in shards if s.id == int(shard_id)), None)
+
+            if shard is None:
+                logger.warning(f"Shard {shard_id} not found for scan {scan.id}")
+                return None, None
+            if shard.is_terminal:
+                logger.info(f"Shard {shard.index} of scan {scan.id} already {shard.status}")
+                return None, None
+
+            if status in ScanEvent.RUNNING_STATUSES:
+                shard.status = 'running'
+                if not shard.started_at:
+                    shard.started_at = timezone.now()
+                if progress is not None:
+                    shard.progress = max(shard.progress, min(float(progress), 100.0))
+                shard.save(update_fields=['status', 'progress', 'started_at', 'updated_at'])
+                return 'running', None
+
+            if status == 'completed':
+                shard.status = 'completed'
+                shard.progress = 100.0
+            elif status in ScanEvent.FAILED_STATUSES:
+                shard.status = 'failed'
+                shard.error_message = error_message
+            else:
+                return None, None
+
+            shard.completed_at = timezone.now()
+            shard.save(update_fields=['status', 'progress', 'error_message', 'completed_at', 'updated_at'])
+
+            if not all(s.is_terminal for s in shards):
+                return None, None
+
+            # Last shard: merge the per-host results and close the nmap node
+            completed = [s for s in shards if s.status == 'completed']
+            failed = [s for s in shards if s.status == 'failed']
+            scan.parsed_nmap_results, host_data = NmapHostDataService.split(
+                ScanShardService.merge_shard_results(completed, len(shards))
+            )
+            scan.save(update_fields=['parsed_nmap_results', 'updated_at'])
+            NmapHostDataService.store(scan, host_data)
+
+        if failed:
+            errors = '; '.join(f"shard {s.index} ({s.hosts}): {s.error_message or 'failed'}" for s in failed)
+            return 'failed', f"{len(failed)}/{len(shards)} nmap shards failed: {errors}"
+        return 'completed', None
+
+    @staticmethod
+    def _host_sort_key(host):
+        try:
+            address = ipaddress.ip_address(host.get('address') or '')
+            return (0, address.version, int(address))
+        except ValueError:
+            return (1, 0, host.get('address') or host.get('hostname') or '')
+
+    @staticmethod
+    def merge_shard_results(shards, shard_total=None):
+        """Merge the parsed nmap results of several shards per host"""
+        hosts = {}
+        scan_info = {}
+        open_ports = {'tcp': {}, 'udp': {}}
+        os_guess = {}
+        precomputed = True
+
+        for shard in shards:
+            results = shard.parsed_nmap_results or {}
+            scan_info = scan_info or results.get('scan_info', {})
+
+            # Porte aperte già estratte dal plugin: unione senza ripassare gli host
+            if isinstance(results.get('open_ports'), dict):
+                for protocol, ports in open_ports.items():
+                    for port in results['open_ports'].get(protocol, []):
+                        ports.setdefault((port.get('port'), port.get('host')), port)
+                os_guess = os_guess or results.get('os_guess') or {}
+            else:
+                precomputed = False
+
+            for host in results.get('hosts', []):
+                key = host.get('address') or host.get('hostname')
+                merged = hosts.get(key)
+                if merged is None:
+                    hosts[key] = {**host, 'ports': list(host.get('ports', []))}
+                    continue
+
+                # Same host scanned on another port chunk
+                for field, value in host.items():
+                    if field != 'ports' and value and not merged.get(field):
+                        merged[field] = value
+                if host.get('state') == 'up':
+                    merged['state'] = 'up'
+                seen = {(p.get('protocol'), p.get('portid')) for p in merged['ports']}
+                merged['ports'].extend(
+                    p for p in host.get('ports', [])
+                    if (p.get('protocol'), p.get('portid')) not in seen
+                )
+
+        merged_results = {
+            'hosts': sorted(hosts.values(), key=ScanShardService._host_sort_key),
+            'scan_info': scan_info,
+            'shards': {
+                'total': shard_total if shard_total is not None else len(shards),
+                'completed': len(shards),
+            },
+        }
+        if precomputed and shards:
+            merged_results['open_ports'] = {
+                protocol: sorted(ports.values(), key=lambda x: (x['port'], x.get('host') or ''))
+                for protocol, ports in open_ports.items()
+            }
+            merged_results['os_guess'] = os_guess
+        return merged_results
+
+    @staticmethod
+    def overall_progress(scan):
+        """Scan-wide nmap progress, the shard progresses weighted by their size"""
+        shards = list(ScanShard.objects.filter(scan=scan).only('status', 'progress', 'host_count', 'port_count'))
+        if not shards:
+            scan_detail = ScanDetail.objects.filter(scan=scan).first()
+            nmap_state = (scan_detail.plugin_states or {}).get('nmap') if scan_detail else None
+            return 100.0 if nmap_state in PluginGraph.TERMINAL_STATES else 0.0
+
+        total = sum(shard.weight for shard in shards)
+        done = sum(
+            shard.weight * (100.0 if shard.is_terminal else shard.progress)
+            for shard in shards
+        )
+        return round(done / total, 1) if total else 0.0
@@ -0,0 +1,97 @@
+# backend/orchestrator_api/signals.py
+
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import PortList, Scan, ScanEvent, Target
+from .events import ScanEventLogService, ScanEventService
+from .summaries import SummaryService
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(pre_save, sender=PortList)
+def compile_port_list(sender, instance, **kwargs):
+    """Keep the compiled port ranges in sync, fixtures (raw saves) included"""
+    instance.compile_ports()
+
+
+@receiver(pre_save, sender=Target)
+def compile_target_address(sender, instance, **kwargs):
+    """Keep the address range bounds in sync with the address"""
+    instance.compile_address()
+
+
+@receiver(post_init, sender=Scan)
+def load_scan_status(sender, instance, **kwargs):
+    """Keep the status the scan was loaded with, None when the field is deferred"""
+    # Da __dict__: un campo differito non va caricato con una query
+    instance._loaded_status = instance.__dict__.get('status')
+
+
+@receiver(pre_save, sender=Scan)
+def remember_scan_status(sender, instance, raw=False, **kwargs):
+    """Keep the stored status to tell status changes from other saves"""
+    if raw or not instance.pk:
+        instance._previous_status = None
+    elif instance._loaded_status is None:
+        instance._previous_status = Scan.all_objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+    else:
+        instance._previous_status = instance._loaded_status
+    # Salvataggi successivi della stessa istanza partono dallo stato appena scritto
+    instance._loaded_status = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender=Scan)
+def refresh_summaries_on_scan(sender, instance, created, raw=False, **kwargs):
+    """Update the target/customer summaries when a scan is created or changes status"""
+    # I lanci bulk aggiornano i riepiloghi una volta per batch
+    if raw or getattr(instance, '_defer_summaries', False):
+        return
+    previous_status = getattr(instance, '_previous_status', None)
+    if created:
+        SummaryService.scan_created(instance)
+    elif previous_status != instance.status:
+        SummaryService.scan_status_changed(instance, previous_status)
+
+
+@receiver(post_save, sender=Target)
+def refresh_summaries_on_target(sender, instance, created, raw=False, **kwargs):
+    """Targets added or (soft) deleted change the customer counters"""
+    if raw:
+        return
+    try:
+        if created:
+            SummaryService.refresh_target(instance.id)
+        SummaryService.refresh_customer(instance.customer_id)
+    except Exception as e:
+        logger.error(f"Error refreshing summaries for target {instance.id}: {str(e)}")
+
+
+@receiver(post_save, sender=Scan)
+def publish_scan_status_event(sender, instance, created, raw=False, **kwargs):
+    """Push status changes to the live clients through the API gateway"""
+    if raw:
+        return
+    previous_status = getattr(instance, '_previous_status', None)
+    if created or previous_status != instance.status:
+        # Dopo il commit: un client che ricarica la scansione all'evento vede già il nuovo stato
+        error = instance.error_message if instance.status == 'Failed' else None
+        transaction.on_commit(lambda: ScanEventService.publish(
+            'scan_status', instance, previous_status=previous_status, error=error
+        ))
+
+
+@receiver(post_save, sender=Scan)
+def record_scan_status_event(sender, instance, created, raw=False, **kwargs):
+    """Append the status transitions to the scan event log"""
+    if raw:
+        return
+    if created or getattr(instance, '_previous_status', None) != instance.status:
+        ScanEventLogService.record(
+            instance.id, ScanEvent.SCAN_MODULE, instance.status,
+            message=instance.error_message if instance.status == 'Failed' else None
+        )
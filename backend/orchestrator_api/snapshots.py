@@ -0,0 +1,82 @@
+# backend/orchestrator_api/snapshots.py
+
+from .models import ScanDetail
+from .plugin_graph import PluginGraph
+
+
+class ScanSnapshotService:
+    """Versioned snapshot of the scan parameters embedded in the plugin messages"""
+
+    # Bump when the structure changes: plugins fall back to the context endpoint
+    # for snapshot versions they do not know
+    VERSION = 1
+
+    # Plugins that receive the open ports found by nmap in their message
+    PORT_PLUGINS = ('fingerprint',)
+
+    @staticmethod
+    def build(scan):
+        """Resolve target, scan type and port list of a scan into a plain dict"""
+        target = scan.target
+        scan_type = scan.scan_type
+        port_list = scan_type.port_list
+
+        return {
+            'version': ScanSnapshotService.VERSION,
+            'scan': {
+                'id': scan.id,
+                'scan_mode': scan.scan_mode,
+                'baseline_scan_id': scan.baseline_scan_id,
+            },
+            'target': {
+                'id': target.id,
+                'name': target.name,
+                'address': target.address,
+                'is_range': target.is_range,
+                'customer_id': str(target.customer_id),
+            },
+            'scan_type': {
+                'id': scan_type.id,
+                'name': scan_type.name,
+                'only_discovery': scan_type.only_discovery,
+                'consider_alive': scan_type.consider_alive,
+                'be_quiet': scan_type.be_quiet,
+                'port_specification': port_list.nmap_port_spec if port_list else None,
+                'plugins': PluginGraph.enabled_plugins(scan_type),
+            },
+            'port_list': {
+                'id': port_list.id,
+                'name': port_list.name,
+                'tcp_port_count': port_list.tcp_port_count,
+                'udp_port_count': port_list.udp_port_count,
+                'nmap_port_spec': port_list.nmap_port_spec,
+            } if port_list else None,
+        }
+
+    @staticmethod
+    def open_ports(scan):
+        """
+        Open ports of a scan as plugin work items: [{"host", "port", "protocol"}].
+        Single-host targets keep the configured address (FQDN preferred over the IP).
+        """
+        open_ports = ScanDetail.objects.filter(scan=scan).values_list('open_ports', flat=True).first() or {}
+        is_range = scan.target.is_range
+
+        ports = []
+        for protocol in ('tcp', 'udp'):
+            for port_data in open_ports.get(protocol, []):
+                host = port_data.get('host') if is_range else None
+                ports.append({
+                    'host': host or scan.target.address,
+                    'port': port_data.get('port'),
+                    'protocol': protocol,
+                })
+        return ports
+
+    @staticmethod
+    def context(scan):
+        """Compact scan context for plugins handling messages without a usable snapshot"""
+        return {
+            **ScanSnapshotService.build(scan),
+            'ports': ScanSnapshotService.open_ports(scan),
+        }
@@ -0,0 +1,217 @@
+# backend/orchestrator_api/summaries.py
+
+import logging
+from django.db import transaction
+from django.db.models import Count, F, Max, Sum
+from django.utils import timezone
+from .models import Scan, ScanDetail, Target, TargetSummary, CustomerSummary, Customer
+from .incremental import IncrementalScanService
+
+logger = logging.getLogger(__name__)
+
+
+class SummaryService:
+    """
+    Materialized TargetSummary/CustomerSummary rows read by the dashboard and
+    the customer/target lists instead of counting the raw tables per request
+    """
+
+    SEVERITIES = ('critical', 'high', 'medium', 'low')
+
+    # Counters of a target summed into the customer summary
+    COUNTERS = ('open_ports_count',) + tuple(f'vulns_{severity}' for severity in SEVERITIES)
+
+    # Solo alla fine di una scansione cambiano porte, OS e vulnerabilità del target
+    FINISHED_STATUSES = ('Completed', 'Failed')
+
+    @staticmethod
+    def open_port_labels(open_ports):
+        """Port numbers of a ScanDetail.open_ports dict, UDP ones as 'udp/N'"""
+        tcp = {p.get('port') for p in (open_ports or {}).get('tcp', []) if p.get('port')}
+        udp = {p.get('port') for p in (open_ports or {}).get('udp', []) if p.get('port')}
+        labels = [(port, port) for port in tcp] + [(port, f"udp/{port}") for port in udp]
+        return [label for _, label in sorted(labels, key=lambda x: (x[0], isinstance(x[1], str)))]
+
+    @staticmethod
+    def refresh_target(target_id):
+        """Recompute the summary of a target from its scans"""
+        scans = Scan.objects.filter(target_id=target_id)
+        last_scan = scans.order_by('-initiated_at').only('id', 'status', 'initiated_at', 'completed_at').first()
+        last_completed = scans.filter(status='Completed').order_by('-initiated_at').select_related('target').only(
+            'id', 'scan_mode', 'baseline_scan_id', 'target__address'
+        ).first()
+
+        values = {
+            'scans_count': scans.count(),
+            'last_scan': last_scan,
+            'last_scan_status': last_scan.status if last_scan else '',
+            'last_scan_at': last_scan.initiated_at if last_scan else None,
+            'last_scan_completed_at': last_scan.completed_at if last_scan else None,
+            'last_completed_scan': last_completed,
+            'open_ports': [],
+            'open_ports_count': 0,
+            'os_guess': '',
+            **{f'vulns_{severity}': 0 for severity in SummaryService.SEVERITIES},
+        }
+
+        if last_completed:
+            scan_detail = ScanDetail.objects.filter(scan=last_completed).only('open_ports', 'os_guess').first()
+            if scan_detail:
+                values['open_ports'] = SummaryService.open_port_labels(scan_detail.open_ports)
+                values['open_ports_count'] = len(values['open_ports'])
+                values['os_guess'] = ((scan_detail.os_guess or {}).get('name') or '')[:255]
+
+            # Anche i finding ereditati dalla baseline non ancora copiati (scansioni incrementali)
+            counts = IncrementalScanService.effective_vulnerability_counts(last_completed, SummaryService.SEVERITIES)
+            for severity in SummaryService.SEVERITIES:
+                values[f'vulns_{severity}'] = counts[severity]
+
+        summary, _ = TargetSummary.objects.update_or_create(target_id=target_id, defaults=values)
+        return summary
+
+    @staticmethod
+    def refresh_customer(customer_id):
+        """Aggregate the target summaries of a customer"""
+        totals = TargetSummary.objects.filter(
+            target__customer_id=customer_id, target__deleted_at__isnull=True
+        ).aggregate(
+            open_ports_count=Sum('open_ports_count'),
+            last_scan_at=Max('last_scan_at'),
+            **{f'vulns_{severity}': Sum(f'vulns_{severity}') for severity in SummaryService.SEVERITIES},
+        )
+
+        status_distribution = dict(
+            Scan.objects.filter(target__customer_id=customer_id)
+            .order_by().values_list('status').annotate(count=Count('id'))
+        )
+
+        summary, _ = CustomerSummary.objects.update_or_create(
+            customer_id=customer_id,
+            defaults={
+                'targets_count': Target.objects.filter(customer_id=customer_id).count(),
+                'scans_count': sum(status_distribution.values()),
+                'status_distribution': status_distribution,
+                'last_scan_at': totals.pop('last_scan_at'),
+                **{field: value or 0 for field, value in totals.items()},
+            }
+        )
+        return summary
+
+    @staticmethod
+    def _update_customer(customer_id, previous_status=None, status=None, last_scan_at=None, **increments):
+        """
+        Apply a change to the summary of a customer without re-aggregating:
+        F() increments of the counters and, on a status change, one scan moved
+        between two status_distribution entries (previous_status None for a
+        new scan). A missing summary row is computed from scratch.
+        """
+        with transaction.atomic():
+            summary = CustomerSummary.objects.select_for_update().filter(customer_id=customer_id).first()
+            if summary is None:
+                SummaryService.refresh_customer(customer_id)
+                return
+
+            fields = ['updated_at']
+            if status != previous_status:
+                distribution = summary.status_distribution or {}
+                if previous_status is not None:
+                    remaining = distribution.get(previous_status, 0) - 1
+                    if remaining > 0:
+                        distribution[previous_status] = remaining
+                    else:
+                        distribution.pop(previous_status, None)
+                distribution[status] = distribution.get(status, 0) + 1
+                summary.status_distribution = distribution
+                fields.append('status_distribution')
+            if last_scan_at and (summary.last_scan_at is None or last_scan_at > summary.last_scan_at):
+                summary.last_scan_at = last_scan_at
+                fields.append('last_scan_at')
+            for field, value in increments.items():
+                if value:
+                    setattr(summary, field, F(field) + value)
+                    fields.append(field)
+            summary.save(update_fields=fields)
+
+    @staticmethod
+    def scan_created(scan):
+        """Count a new scan in the summaries of its target and customer"""
+        try:
+            updated = TargetSummary.objects.filter(target_id=scan.target_id).update(
+                scans_count=F('scans_count') + 1,
+                last_scan=scan,
+                last_scan_status=scan.status,
+                last_scan_at=scan.initiated_at,
+                last_scan_completed_at=scan.completed_at,
+                updated_at=timezone.now(),
+            )
+            if not updated:
+                SummaryService.refresh_target(scan.target_id)
+            SummaryService._update_customer(
+                scan.target.customer_id, status=scan.status, last_scan_at=scan.initiated_at, scans_count=1
+            )
+        except Exception as e:
+            logger.error(f"Error updating summaries for new scan {scan.id}: {str(e)}")
+
+    @staticmethod
+    def scan_status_changed(scan, previous_status):
+        """
+        Follow a status transition: intermediate statuses only update the last
+        scan status and the customer distribution, finished scans refresh the
+        target summary (see refresh_scan).
+        """
+        try:
+            if scan.status in SummaryService.FINISHED_STATUSES:
+                SummaryService.refresh_scan(scan, previous_status=previous_status)
+                return
+            TargetSummary.objects.filter(target_id=scan.target_id, last_scan_id=scan.id).update(
+                last_scan_status=scan.status, updated_at=timezone.now()
+            )
+            SummaryService._update_customer(scan.target.customer_id, previous_status, scan.status)
+        except Exception as e:
+            logger.error(f"Error updating summaries for scan {scan.id}: {str(e)}")
+
+    @staticmethod
+    def refresh_scan(scan, previous_status=None):
+        """
+        Recompute the summary of the scan's target (finished scans, new GCE
+        counts) and apply the change of its counters to the customer summary.
+        previous_status moves the scan in the status distribution as well.
+        """
+        try:
+            before = TargetSummary.objects.filter(target_id=scan.target_id).values(*SummaryService.COUNTERS).first()
+            after = SummaryService.refresh_target(scan.target_id)
+            customer_id, deleted_at = Target.all_objects.filter(id=scan.target_id).values_list(
+                'customer_id', 'deleted_at'
+            ).first()
+            increments = {}
+            # I target eliminati non sono sommati nel riepilogo del cliente
+            if deleted_at is None:
+                increments = {
+                    field: getattr(after, field) - (before or {}).get(field, 0) for field in SummaryService.COUNTERS
+                }
+            status = scan.status if previous_status is not None else None
+            SummaryService._update_customer(customer_id, previous_status, status, **increments)
+        except Exception as e:
+            logger.error(f"Error refreshing summaries for scan {scan.id}: {str(e)}")
+
+    @staticmethod
+    def rebuild(customer_id=None):
+        """Recompute every summary (or those of one customer) from the raw tables"""
+        targets = Target.all_objects.all()
+        if customer_id:
+            targets = targets.filter(customer_id=customer_id)
+
+        customer_ids = set()
+        target_count = 0
+        for target_id, target_customer_id in targets.values_list('id', 'customer_id').iterator():
+            SummaryService.refresh_target(target_id)
+            customer_ids.add(target_customer_id)
+            target_count += 1
+
+        if customer_id:
+            customer_ids.add(customer_id)
+        else:
+            customer_ids.update(Customer.objects.values_list('id', flat=True))
+        for cid in customer_ids:
+            SummaryService.refresh_customer(cid)
+        return target_count, len(customer_ids)
@@ -2,9 +2,12 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     CustomerViewSet, PortListViewSet, ScanTypeViewSet,
-    TargetViewSet, ScanViewSet, ScanDetailViewSet,
-    FingerprintDetailViewSet, GceResultViewSet
+    TargetViewSet, ScanViewSet, ScanDetailViewSet, ScanShardViewSet,
+    FingerprintDetailViewSet, GceResultViewSet, VulnerabilityViewSet,
+    OsMatchViewSet, ScriptResultViewSet, ServiceInventoryViewSet, ScanDiffViewSet,
+    ScanScheduleViewSet
 )
+from .parsers import OctetStreamParser
 
 # Create router and register viewsets
 router = DefaultRouter()
@@ -14,14 +17,22 @@ router.register(r'scan-types', ScanTypeViewSet, basename='scantype')
 router.register(r'targets', TargetViewSet, basename='target')
 router.register(r'scans', ScanViewSet, basename='scan')
 router.register(r'scan-details', ScanDetailViewSet, basename='scandetail')
+router.register(r'scan-shards', ScanShardViewSet, basename='scanshard')
+router.register(r'scan-schedules', ScanScheduleViewSet, basename='scanschedule')
 router.register(r'fingerprint-details', FingerprintDetailViewSet)
 router.register(r'gce-results', GceResultViewSet)
+router.register(r'vulnerabilities', VulnerabilityViewSet, basename='vulnerability')
+router.register(r'os-matches', OsMatchViewSet, basename='osmatch')
+router.register(r'script-results', ScriptResultViewSet, basename='scriptresult')
+router.register(r'service-inventory', ServiceInventoryViewSet, basename='serviceinventory')
+router.register(r'scan-diffs', ScanDiffViewSet, basename='scandiff')
 
 urlpatterns = [
     # API routes
     path('', include(router.urls)),
     path('scans/<int:pk>/gce-progress/', ScanViewSet.as_view({'patch': 'update_gce_progress'}), name='scan-gce-progress'),
     path('scans/<int:pk>/gce-results/', ScanViewSet.as_view({'post': 'create_gce_results'}), name='scan-gce-results'),
+    path('scans/<int:pk>/gce-report/', ScanViewSet.as_view({'post': 'upload_gce_report'}, parser_classes=[OctetStreamParser]), name='scan-gce-report'),
 ]
 
 # API endpoints will be available at:
@@ -31,6 +42,13 @@ urlpatterns = [
 # /api/orchestrator/targets/
 # /api/orchestrator/scans/
 # /api/orchestrator/scan-details/
+# /api/orchestrator/scan-shards/
+# /api/orchestrator/scan-schedules/  (filters: customer, scan_type, enabled)
+# /api/orchestrator/vulnerabilities/  (filters: customer, scan, target, cve, nvt_oid, host, port, severity_min, threat)
+# /api/orchestrator/os-matches/  (filters: customer, scan, target, host, osfamily, accuracy_min, best)
+# /api/orchestrator/script-results/  (filters: customer, scan, target, host, port, script_id, host_scripts)
+# /api/orchestrator/service-inventory/  (filters: customer, target, host, port, protocol, service, is_open, seen_after)
+# /api/orchestrator/scan-diffs/  (filters: customer, target, has_changes, new_ports, new_vulns, since)
 
 # Additional custom endpoints:
 # /api/orchestrator/customers/{id}/targets/
@@ -38,8 +56,18 @@ urlpatterns = [
 # /api/orchestrator/customers/{id}/statistics/
 # /api/orchestrator/targets/{id}/scans/
 # /api/orchestrator/targets/{id}/scan/  (POST to create scan)
+# /api/orchestrator/targets/bulk/  (POST, JSON or CSV target import, NDJSON results)
 # /api/orchestrator/scans/{id}/restart/  (POST)
 # /api/orchestrator/scans/{id}/cancel/  (POST)
+# /api/orchestrator/scans/{id}/context/  (GET, compact scan context for plugins)
+# /api/orchestrator/scans/{id}/shards/  (GET, shard status and overall nmap progress)
+# /api/orchestrator/scans/{id}/diff/  (GET, changes vs the previous scan or ?against={scan_id})
+# /api/orchestrator/scan-schedules/{id}/scans/  (GET, scans created by the schedule)
+# /api/orchestrator/scans/bulk/  (POST, scan launch on many targets, NDJSON results)
 # /api/orchestrator/scans/statistics/
+# /api/orchestrator/vulnerabilities/top_nvts/
+# /api/orchestrator/vulnerabilities/targets/
+# /api/orchestrator/service-inventory/targets/
 # /api/orchestrator/scans/{id}/gce-progress/ (PATCH)
-# /api/orchestrator/scans/{id}/gce-results/ (POST)
\ No newline at end of file
+# /api/orchestrator/scans/{id}/gce-results/ (POST)
+# /api/orchestrator/scans/{id}/gce-report/ (POST, chunked gzip report upload)
\ No newline at end of file
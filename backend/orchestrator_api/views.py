@@ -6,146 +6,70 @@ from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Count
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, Count, Max, Min
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 import logging
-
-# Import per il parsing XML/JSON
-import xml.etree.ElementTree as ET
-import json
-import xmltodict # Assicurati di averlo installato: pip install xmltodict
-import traceback # Per loggare lo stack trace completo degli errori
+import uuid
 
 from .serializers import (
     CustomerSerializer, PortListSerializer, ScanTypeSerializer,
-    TargetSerializer, ScanSerializer, ScanDetailSerializer,
+    TargetSerializer, ScanSerializer, ScanDetailSerializer, ScanShardSerializer,
     ScanCreateSerializer, ScanUpdateSerializer,
     FingerprintDetailSerializer, FingerprintDetailBulkCreateSerializer,
-    GceResultSerializer, GceProgressSerializer, GceResultCreateSerializer
+    GceResultSerializer, GceProgressSerializer, GceResultCreateSerializer,
+    GceReportChunkSerializer, TopNvtsParamsSerializer, VulnerabilitySerializer, OsMatchSerializer, ScriptResultSerializer,
+    ServiceInventorySerializer, ScanDiffSerializer, ScanDiffDetailSerializer, ScanScheduleSerializer,
+    ScanEventSerializer
 )
+from . import codec
+from .parsers import CSVParser, OctetStreamParser, ORJSONParser
+from .search import NetworkSearchFilter
 from .filters import (
-    CustomerFilter, TargetFilter, ScanFilter
+    CustomerFilter, TargetFilter, ScanFilter, VulnerabilityFilter, OsMatchFilter, ScriptResultFilter,
+    ServiceInventoryFilter, ScanDiffFilter
 )
 from .services import ScanOrchestratorService, NmapResultsParser
+from .bulk import BulkTargetService, BulkScanService
+from .diffs import ScanDiffService
+from .events import ScanEventLogService
+from .gce import GceReportStorageService, GceIngestService
+from .host_data import NmapHostDataService
+from .incremental import IncrementalScanService
+from .inventory import ServiceInventoryService
+from .sharding import ScanShardService
+from .snapshots import ScanSnapshotService
+from .summaries import SummaryService
 from .models import (
     Customer, PortList, ScanType, Target, Scan, ScanDetail, 
-    FingerprintDetail, GceResult
+    ScanShard, FingerprintDetail, GceResult, Vulnerability, OsMatch, ScriptResult,
+    ServiceInventory, ScanDiff, ScanSchedule
 )
 
 
 logger = logging.getLogger(__name__)
 
-# Funzione helper per parsare il riepilogo del report GCE
-def _parse_gce_report_summary(full_report_content, report_format):
-    """
-    Parsa il contenuto completo del report GCE per estrarre i conteggi delle vulnerabilità per gravità.
-    """
-    vulnerability_counts = {
-        'critical': 0,
-        'high': 0,
-        'medium': 0,
-        'low': 0,
-        'log': 0,
-        'total': 0
-    }
-
-    try:
-        if not full_report_content:
-            logger.warning("Il contenuto del report GCE è vuoto.")
-            return vulnerability_counts
-
-        if report_format == 'XML':
-            root = ET.fromstring(full_report_content)
-            # Naviga al tag <report> all'interno di <get_reports_response>
-            # Il tuo log mostra che <report> è un figlio diretto di <get_reports_response>
-            report_element = root.find('report') 
-            if report_element is None:
-                logger.warning("Nessun elemento <report> trovato nell'XML GCE.")
-                return vulnerability_counts
-
-            # Estrai i conteggi da <report>/<result_count>
-            result_count_element = report_element.find('result_count')
-            if result_count_element:
-                # I conteggi di gravità sono figli diretti di <result_count>
-                for severity_level in ['high', 'medium', 'low', 'log']:
-                    count_element = result_count_element.find(severity_level)
-                    if count_element is not None and count_element.text:
-                        try:
-                            count = int(count_element.text)
-                            vulnerability_counts[severity_level] = count
-                            # Non sommare qui, il 'total' verrà preso dal tag 'full' o sommato alla fine
-                        except ValueError:
-                            pass # Ignora se non è un numero valido
-                
-                # Prendi il conteggio totale dal tag 'full' se disponibile
-                total_full_element = result_count_element.find('full')
-                if total_full_element is not None and total_full_element.text:
-                    try:
-                        vulnerability_counts['total'] = int(total_full_element.text)
-                    except ValueError:
-                        pass
-                else:
-                    # Se 'full' non è disponibile, somma i conteggi individuali
-                    vulnerability_counts['total'] = sum(vulnerability_counts[s] for s in ['high', 'medium', 'low', 'log'])
-                
-            # Potresti anche voler iterare attraverso i singoli tag <result>
-            # per ottenere dati più granulari o verificare i conteggi, ma per un riepilogo,
-            # result_count è solitamente sufficiente.
-            
-        elif report_format == 'JSON':
-            # Se il gce_scanner invia JSON, si assume che sia già stato convertito da xmltodict.
-            # La struttura JSON sarà simile all'XML ma con chiavi basate sui nomi dei tag.
-            report_dict = json.loads(full_report_content)
-            
-            # Accedi al report principale e poi a 'result_count'
-            # La struttura esatta potrebbe variare leggermente a seconda di come xmltodict gestisce i nodi radice
-            report_data = report_dict.get('get_reports_response', {}).get('report', {})
-            result_count_data = report_data.get('result_count', {})
-
-            if result_count_data:
-                for severity_level in ['high', 'medium', 'low', 'log']:
-                    count = result_count_data.get(severity_level)
-                    if count is not None:
-                        try:
-                            vulnerability_counts[severity_level] = int(count)
-                        except ValueError:
-                            pass
-                
-                total_full = result_count_data.get('full')
-                if total_full is not None:
-                    try:
-                        vulnerability_counts['total'] = int(total_full)
-                    except ValueError:
-                        pass
-                else:
-                    vulnerability_counts['total'] = sum(vulnerability_counts[s] for s in ['high', 'medium', 'low', 'log'])
-
-        else:
-            logger.warning(f"Formato report non supportato: {report_format}")
-
-    except ET.ParseError as e:
-        logger.error(f"Errore di parsing XML del report GCE: {str(e)}")
-        logger.error(traceback.format_exc())
-    except json.JSONDecodeError as e:
-        logger.error(f"Errore di decodifica JSON del report GCE: {str(e)}")
-        logger.error(traceback.format_exc())
-    except Exception as e:
-        logger.error(f"Errore generico durante il parsing del riepilogo del report GCE ({report_format}): {str(e)}")
-        logger.error(traceback.format_exc())
 
-    return vulnerability_counts
+def ndjson_response(results):
+    """Stream the per-item results of a bulk operation, one JSON object per line"""
+    lines = (codec.dumps(result) + b'\n' for result in results)
+    return StreamingHttpResponse(lines, content_type='application/x-ndjson')
 
 
 class CustomerViewSet(viewsets.ModelViewSet):
     """ViewSet for Customer CRUD operations"""
     
-    queryset = Customer.objects.all()
+    queryset = Customer.objects.select_related('summary').all()
     serializer_class = CustomerSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_class = CustomerFilter
     search_fields = ['name', 'company_name', 'email', 'contact_person']
     ordering_fields = ['name', 'created_at', 'updated_at']
     ordering = ['name']
+    # Letture pesanti servite dalla replica se configurata (vedi db_router)
+    replica_actions = ('list', 'statistics')
     
     @action(detail=True, methods=['get'])
     def targets(self, request, pk=None):
@@ -182,27 +106,27 @@ class CustomerViewSet(viewsets.ModelViewSet):
         """Get customer statistics"""
         customer = self.get_object()
         
-        # Get counts
-        targets_count = customer.targets.count()
-        scans = Scan.objects.filter(target__customer=customer)
-        scans_count = scans.count()
-        
-        # Get status distribution
-        status_distribution = {}
-        for status_choice in Scan.STATUS_CHOICES:
-            status_code = status_choice[0]
-            count = scans.filter(status=status_code).count()
-            if count > 0:
-                status_distribution[status_code] = count
+        # Contatori dal riepilogo materializzato (calcolato al volo se manca)
+        summary = getattr(customer, 'summary', None) or SummaryService.refresh_customer(customer.id)
         
         # Recent activity
-        recent_scans = scans.order_by('-initiated_at')[:5]
+        recent_scans = Scan.objects.filter(target__customer=customer).select_related(
+            'target__customer', 'scan_type'
+        ).order_by('-initiated_at')[:5]
         recent_scans_data = ScanSerializer(recent_scans, many=True).data
         
         return Response({
-            'targets_count': targets_count,
-            'scans_count': scans_count,
-            'status_distribution': status_distribution,
+            'targets_count': summary.targets_count,
+            'scans_count': summary.scans_count,
+            'status_distribution': summary.status_distribution,
+            'open_ports_count': summary.open_ports_count,
+            'vulnerabilities': {
+                'critical': summary.vulns_critical,
+                'high': summary.vulns_high,
+                'medium': summary.vulns_medium,
+                'low': summary.vulns_low,
+            },
+            'last_scan_at': summary.last_scan_at,
             'recent_scans': recent_scans_data
         })
 
@@ -210,7 +134,8 @@ class CustomerViewSet(viewsets.ModelViewSet):
 class PortListViewSet(viewsets.ModelViewSet):
     """ViewSet for PortList CRUD operations"""
     
-    queryset = PortList.objects.all()
+    # The compiled ranges are only needed to build scans, not for the API
+    queryset = PortList.objects.defer('tcp_ranges', 'udp_ranges')
     serializer_class = PortListSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'description']
@@ -221,7 +146,7 @@ class PortListViewSet(viewsets.ModelViewSet):
     def scan_types(self, request, pk=None):
         """Get scan types using this port list"""
         port_list = self.get_object()
-        scan_types = port_list.scantype_set.all()
+        scan_types = port_list.scantype_set.select_related('port_list')
         serializer = ScanTypeSerializer(scan_types, many=True)
         return Response(serializer.data)
 
@@ -229,7 +154,7 @@ class PortListViewSet(viewsets.ModelViewSet):
 class ScanTypeViewSet(viewsets.ModelViewSet):
     """ViewSet for ScanType CRUD operations"""
     
-    queryset = ScanType.objects.all()
+    queryset = ScanType.objects.select_related('port_list').all()
     serializer_class = ScanTypeSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'description']
@@ -264,16 +189,16 @@ class ScanTypeViewSet(viewsets.ModelViewSet):
 class TargetViewSet(viewsets.ModelViewSet):
     """ViewSet for Target CRUD operations"""
     
-    queryset = Target.objects.select_related('customer').prefetch_related(
-        'scans__details',  # Prefetch scan details per accedere a open_ports e os_guess
-        'scans'  # Prefetch tutte le scansioni
-    ).all()
+    # scans_count, last_scan, open_ports e os_guess arrivano da TargetSummary
+    queryset = Target.objects.select_related('customer', 'summary').all()
     serializer_class = TargetSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, NetworkSearchFilter, filters.OrderingFilter]
     filterset_class = TargetFilter
     search_fields = ['name', 'address', 'description']
+    search_network_prefix = ''
     ordering_fields = ['name', 'address', 'created_at']
     ordering = ['customer__name', 'name']
+    replica_actions = ('list',)
     
     @action(detail=True, methods=['get'])
     def scans(self, request, pk=None):
@@ -313,7 +238,8 @@ class TargetViewSet(viewsets.ModelViewSet):
         # Create scan using the specialized serializer
         scan_data = {
             'target': target.id,
-            'scan_type': scan_type.id
+            'scan_type': scan_type.id,
+            'scan_mode': request.data.get('scan_mode', 'full')
         }
         
         serializer = ScanCreateSerializer(data=scan_data)
@@ -335,17 +261,46 @@ class TargetViewSet(viewsets.ModelViewSet):
             return Response(response_serializer.data, status=status.HTTP_201_CREATED)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    @action(detail=False, methods=['post'], url_path='bulk', parser_classes=[ORJSONParser, CSVParser])
+    def bulk_import(self, request):
+        """
+        Import many targets from a JSON list or a CSV body (columns customer,
+        name, address, description). The default customer comes from
+        ?customer= or {"customer": ..., "targets": [...]}. Per-row results are
+        streamed back as NDJSON.
+        """
+        rows = request.data
+        default_customer = request.query_params.get('customer')
+        if isinstance(rows, dict):
+            default_customer = rows.get('customer') or default_customer
+            rows = rows.get('targets')
+        
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            return Response(
+                {'error': 'Expected a list of targets'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(rows) > settings.BULK_MAX_ITEMS:
+            return Response(
+                {'error': f'Too many targets: {len(rows)} (max {settings.BULK_MAX_ITEMS})'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return ndjson_response(BulkTargetService.import_targets(rows, default_customer))
 
 
 class ScanViewSet(viewsets.ModelViewSet):
     """ViewSet for Scan CRUD operations"""
     
     queryset = Scan.objects.select_related('target', 'target__customer', 'scan_type').all()
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, NetworkSearchFilter, filters.OrderingFilter]
     filterset_class = ScanFilter
     search_fields = ['target__name', 'target__address', 'target__customer__name']
+    search_network_prefix = 'target__'
     ordering_fields = ['initiated_at', 'completed_at', 'status']
     ordering = ['-initiated_at']
+    replica_actions = ('list', 'statistics')
     
     def get_serializer_class(self):
         """Return appropriate serializer based on action"""
@@ -363,8 +318,13 @@ class ScanViewSet(viewsets.ModelViewSet):
         if 'parsed_nmap_results' in serializer.validated_data:
             logger.info(f"Detected nmap results update for scan {serializer.instance.id}")
         
-        # Salva le modifiche
-        scan = serializer.save()
+        # Salva le modifiche (OS match e output degli script vanno nelle loro tabelle)
+        if 'parsed_nmap_results' in serializer.validated_data:
+            results, host_data = NmapHostDataService.split(serializer.validated_data['parsed_nmap_results'])
+            scan = serializer.save(parsed_nmap_results=results)
+            NmapHostDataService.store(scan, host_data)
+        else:
+            scan = serializer.save()
         
         # Se sono stati aggiornati i risultati nmap, processali
         if 'parsed_nmap_results' in serializer.validated_data and scan.parsed_nmap_results:
@@ -412,7 +372,12 @@ class ScanViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['post'])
     def restart(self, request, pk=None):
-        """Restart a failed or completed scan"""
+        """
+        Restart a failed or completed scan.
+
+        Pass {"scan_mode": "incremental"} to rescan against the latest completed
+        scan of the target instead of re-running every plugin from scratch.
+        """
         scan = self.get_object()
         
         if scan.status not in ['Failed', 'Completed']:
@@ -420,6 +385,13 @@ class ScanViewSet(viewsets.ModelViewSet):
                 {'error': 'Can only restart failed or completed scans'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+
+        scan_mode = request.data.get('scan_mode', 'full')
+        if scan_mode not in dict(Scan.SCAN_MODE_CHOICES):
+            return Response(
+                {'error': f'Invalid scan_mode: {scan_mode}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         # Reset scan status and clear previous results
         scan.status = 'Pending'
@@ -432,11 +404,13 @@ class ScanViewSet(viewsets.ModelViewSet):
         scan.parsed_web_results = None
         scan.parsed_vuln_results = None
         scan.report_path = None
+        scan.scan_mode = scan_mode
+        scan.baseline_scan = None
         scan.save()
         
-        # Clear scan details if exists
+        # Clear scan details if exists (hard delete: the row is recreated by start_scan)
         if hasattr(scan, 'details'):
-            scan.details.delete()
+            scan.details.hard_delete()
         
         # Start the scan orchestration
         try:
@@ -451,6 +425,90 @@ class ScanViewSet(viewsets.ModelViewSet):
         serializer = ScanSerializer(scan)
         return Response(serializer.data)
     
+    @action(detail=True, methods=['get'])
+    def fingerprints(self, request, pk=None):
+        """
+        Get the fingerprints valid for this scan. For incremental scans the
+        unchanged ports are resolved from the baseline scan.
+        """
+        scan = self.get_object()
+        fingerprints = IncrementalScanService.effective_fingerprints(scan)
+        serializer = FingerprintDetailSerializer(fingerprints, many=True)
+        return Response(serializer.data)
+    
+    @action(detail=True, methods=['get'])
+    def context(self, request, pk=None):
+        """
+        Compact scan context for the plugins: resolved scan type, port list,
+        target and open ports, without the results blobs.
+        """
+        scan = self.get_object()
+        return Response(ScanSnapshotService.context(scan))
+    
+    @action(detail=True, methods=['get'])
+    def shards(self, request, pk=None):
+        """Get the nmap shards of a range scan and the overall nmap progress"""
+        scan = self.get_object()
+        shards = scan.shards.defer('parsed_nmap_results')
+        return Response({
+            'scan_id': scan.id,
+            'progress': ScanShardService.overall_progress(scan),
+            'shards': ScanShardSerializer(shards, many=True).data
+        })
+    
+    @action(detail=True, methods=['get'])
+    def events(self, request, pk=None):
+        """Timeline of the scan: status transitions and plugin updates (?module= to filter)"""
+        scan = self.get_object()
+        events = scan.events.all()
+        module = request.query_params.get('module')
+        if module:
+            events = events.filter(module=module)
+        
+        page = self.paginate_queryset(events)
+        if page is not None:
+            return self.get_paginated_response(ScanEventSerializer(page, many=True).data)
+        return Response(ScanEventSerializer(events, many=True).data)
+    
+    @action(detail=True, methods=['get'])
+    def timeline(self, request, pk=None):
+        """Current state of every module and per-phase timings, from the event log"""
+        scan = self.get_object()
+        return Response({
+            'scan_id': scan.id,
+            'status': scan.status,
+            'modules': ScanEventLogService.current_state([scan.id])[scan.id],
+            'phases': ScanEventLogService.phase_timings(scan.id)
+        })
+    
+    @action(detail=True, methods=['get'])
+    def diff(self, request, pk=None):
+        """Changes against the previous completed scan of the target, or against ?against={scan_id}"""
+        scan = self.get_object()
+        
+        against = request.query_params.get('against')
+        if against:
+            try:
+                other = Scan.objects.get(id=int(against))
+            except (ValueError, Scan.DoesNotExist):
+                return Response({'error': 'Scan to compare against not found'}, status=status.HTTP_404_NOT_FOUND)
+            if other.target_id != scan.target_id:
+                return Response(
+                    {'error': 'Only scans of the same target can be compared'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            return Response(ScanDiffService.compute(other, scan))
+        
+        scan_diff = ScanDiff.objects.filter(scan=scan).first()
+        if scan_diff is None:
+            if scan.status != 'Completed':
+                return Response({'error': 'Scan not completed yet'}, status=status.HTTP_409_CONFLICT)
+            # Scansioni completate prima del diff materializzato
+            scan_diff = ScanDiffService.materialize(scan)
+            if scan_diff is None:
+                return Response({'error': 'Diff computation failed'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response(ScanDiffDetailSerializer(scan_diff).data)
+    
     @action(detail=True, methods=['post'])
     def cancel(self, request, pk=None):
         """Cancel a running scan"""
@@ -462,17 +520,61 @@ class ScanViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Set scan as failed with cancellation message
-        scan.status = 'Failed'
-        scan.error_message = 'Scan cancelled by user'
-        scan.completed_at = timezone.now()
-        scan.save()
+        # Close the plugin graph and tell the plugins to stop the scan's work
+        ScanOrchestratorService.cancel_scan(scan)
         
         logger.info(f"Scan {scan.id} cancelled by user")
         
         serializer = ScanSerializer(scan)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['post'], url_path='bulk', parser_classes=[ORJSONParser, CSVParser])
+    def bulk_launch(self, request):
+        """
+        Start scans on many targets: {"scan_type", "scan_mode", "targets": [ids]}
+        or {"scan_type", "customer"} for every target of a customer, or a CSV
+        body with a target column and ?scan_type=&scan_mode=. Per-target results
+        are streamed back as NDJSON.
+        """
+        data = request.data
+        if isinstance(data, list):
+            params = request.query_params
+            target_ids = [row.get('target') if isinstance(row, dict) else None for row in data]
+        elif isinstance(data, dict):
+            params = data
+            target_ids = data.get('targets')
+        else:
+            return Response({'error': 'Expected a JSON object or a CSV body'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            scan_type = ScanType.objects.get(id=params.get('scan_type'))
+        except (ScanType.DoesNotExist, ValueError, TypeError):
+            return Response({'error': 'Invalid scan_type'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        scan_mode = params.get('scan_mode') or 'full'
+        if scan_mode not in dict(Scan.SCAN_MODE_CHOICES):
+            return Response({'error': f'Invalid scan_mode: {scan_mode}'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        customer = params.get('customer')
+        if customer and target_ids is None:
+            try:
+                customer = uuid.UUID(str(customer))
+            except ValueError:
+                return Response({'error': 'Invalid customer'}, status=status.HTTP_400_BAD_REQUEST)
+            target_ids = list(Target.objects.filter(customer_id=customer).values_list('id', flat=True))
+        
+        if not isinstance(target_ids, list):
+            return Response({'error': 'targets or customer is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(target_ids) > settings.BULK_MAX_ITEMS:
+            return Response(
+                {'error': f'Too many targets: {len(target_ids)} (max {settings.BULK_MAX_ITEMS})'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Gli id del CSV arrivano come stringhe
+        target_ids = [int(t) if isinstance(t, str) and t.isdigit() else t for t in target_ids]
+        return ndjson_response(BulkScanService.launch(target_ids, scan_type, scan_mode))
+    
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """Get overall scan statistics"""
@@ -544,25 +646,29 @@ class ScanViewSet(viewsets.ModelViewSet):
 
         # Estrai i dati dal serializer
         validated_data = serializer.validated_data
-        full_report_content = validated_data['full_report']
+        full_report_content = validated_data.get('full_report')
         report_format = validated_data['report_format']
 
-        # Parsa i conteggi delle vulnerabilità dal report completo
-        vulnerability_counts = _parse_gce_report_summary(full_report_content, report_format)
-        
-        # Aggiungi i conteggi delle vulnerabilità parsati ai defaults
         defaults = {
             'gce_report_id': validated_data['gce_report_id'],
             'gce_target_id': validated_data['gce_target_id'],
             'report_format': report_format,
-            'full_report': full_report_content,
             'gce_scan_started_at': validated_data['gce_scan_started_at'],
             'gce_scan_completed_at': validated_data['gce_scan_completed_at'],
             'gce_scan_status': 'Done',
             'gce_scan_progress': 100,
-            'vulnerability_count': vulnerability_counts # Usa i conteggi parsati
         }
 
+        if full_report_content:
+            # Report inline (legacy): viene solo salvato, il parsing lo fa
+            # in background il worker consume_gce_ingest
+            defaults['full_report'] = full_report_content
+        else:
+            # Riepilogo già aggregato dal plugin pagina per pagina; il report
+            # grezzo è stato caricato a parte su gce-report/
+            defaults['vulnerability_count'] = validated_data['vulnerability_count']
+            defaults['nvt_summary'] = validated_data.get('nvt_summary', [])
+
         # Ottieni o aggiorna GceResult
         gce_result, created = GceResult.objects.update_or_create(
             scan=scan,
@@ -571,6 +677,9 @@ class ScanViewSet(viewsets.ModelViewSet):
             defaults=defaults
         )
 
+        if full_report_content:
+            GceIngestService.request(gce_result)
+
         # Aggiorna lo stato della scansione
         scan.parsed_gce_results = True
         scan.save()
@@ -581,10 +690,59 @@ class ScanViewSet(viewsets.ModelViewSet):
             scan_detail.gce_completed_at = timezone.now()
             scan_detail.save()
 
+        if full_report_content:
+            # Accettato: conteggi e findings arrivano con l'ingest (vedi ingest_status)
+            return Response({
+                'id': gce_result.id,
+                'gce_task_id': str(gce_result.gce_task_id),
+                'ingest_status': gce_result.ingest_status,
+            }, status=status.HTTP_202_ACCEPTED)
+
+        # Conteggi già disponibili: aggiorna subito i riepiloghi
+        SummaryService.refresh_scan(scan)
+
         result_serializer = GceResultSerializer(gce_result)
         status_code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
         return Response(result_serializer.data, status=status_code)
 
+    @action(detail=True, methods=['post'], url_path='gce-report', parser_classes=[OctetStreamParser])
+    def upload_gce_report(self, request, pk=None):
+        """
+        Chunked upload of the gzip-compressed GCE report.
+        Each chunk is the raw request body written at ?offset=; a final call with
+        ?final=true&size= checks the stored size, attaches the file to the GceResult
+        and queues the background ingest (202).
+        """
+        scan = self.get_object()
+        params = GceReportChunkSerializer(data=request.query_params)
+        if not params.is_valid():
+            return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        gce_task_id = params.validated_data['gce_task_id']
+
+        if params.validated_data['final']:
+            gce_result = GceReportStorageService.finalize(scan, gce_task_id, params.validated_data['size'])
+            if gce_result is None:
+                return Response(
+                    {'error': 'Stored report size does not match'},
+                    status=status.HTTP_409_CONFLICT
+                )
+            GceIngestService.request(gce_result)
+            return Response({
+                'status': 'report stored',
+                'size': gce_result.report_size,
+                'ingest_status': gce_result.ingest_status,
+            }, status=status.HTTP_202_ACCEPTED)
+
+        data = request.data if isinstance(request.data, bytes) else b''
+        size = GceReportStorageService.append_chunk(scan, gce_task_id, params.validated_data['offset'], data)
+        if size is None:
+            return Response(
+                {'error': 'Chunk offset beyond the stored size'},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response({'size': size})
+
 class ScanDetailViewSet(viewsets.ModelViewSet):
     """ViewSet for ScanDetail CRUD operations"""
     
@@ -602,6 +760,61 @@ class ScanDetailViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(scan_id=scan_id)
         return queryset
     
+class ScanShardViewSet(viewsets.ModelViewSet):
+    """ViewSet for the nmap shards of range scans (results are PATCHed by the nmap plugin)"""
+    
+    queryset = ScanShard.objects.select_related('scan').all()
+    serializer_class = ScanShardSerializer
+    http_method_names = ['get', 'patch', 'head', 'options']
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['scan', 'status']
+    ordering_fields = ['index', 'progress', 'created_at']
+    ordering = ['scan', 'index']
+    
+    def get_queryset(self):
+        """Skip the raw results when listing"""
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            queryset = queryset.defer('parsed_nmap_results')
+        return queryset
+    
+class ScanScheduleViewSet(viewsets.ModelViewSet):
+    """ViewSet for the recurring scan schedules (runs are created by the scheduler daemon)"""
+    
+    queryset = ScanSchedule.objects.select_related('customer', 'scan_type').prefetch_related('targets').annotate(
+        pending_scans=Count('scans', filter=Q(scans__status='Pending'))
+    )
+    serializer_class = ScanScheduleSerializer
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filterset_fields = ['customer', 'scan_type', 'enabled']
+    search_fields = ['name']
+    ordering_fields = ['name', 'next_run_at', 'last_run_at', 'created_at']
+    ordering = ['next_run_at']
+    
+    def perform_destroy(self, instance):
+        """Soft delete the schedule; its scans still waiting are dropped"""
+        instance.scans.filter(status='Pending').update(deleted_at=timezone.now())
+        instance.delete()
+    
+    @action(detail=True, methods=['get'])
+    def scans(self, request, pk=None):
+        """Scans created by this schedule"""
+        schedule = self.get_object()
+        scans = schedule.scans.select_related('target__customer', 'scan_type', 'details').defer(
+            'parsed_nmap_results', 'parsed_finger_results', 'parsed_gce_results',
+            'parsed_web_results', 'parsed_vuln_results'
+        )
+        
+        status_filter = request.query_params.get('status')
+        if status_filter:
+            scans = scans.filter(status=status_filter)
+        
+        page = self.paginate_queryset(scans)
+        if page is not None:
+            return self.get_paginated_response(ScanSerializer(page, many=True).data)
+        return Response(ScanSerializer(scans, many=True).data)
+    
+
 class FingerprintDetailViewSet(viewsets.ModelViewSet):
     """ViewSet for FingerprintDetail CRUD operations"""
     
@@ -700,6 +913,12 @@ class FingerprintDetailViewSet(viewsets.ModelViewSet):
     search_fields = ['service_name', 'service_product', 'service_version']
     ordering_fields = ['created_at', 'port', 'confidence_score']
     ordering = ['-created_at']
+    
+    def perform_create(self, serializer):
+        """Save the fingerprint and update the service inventory, both or neither"""
+        with transaction.atomic():
+            detail = serializer.save()
+            ServiceInventoryService.record_fingerprints(detail.scan, [detail])
 
 
 class GceResultViewSet(viewsets.ModelViewSet):
@@ -713,3 +932,156 @@ class GceResultViewSet(viewsets.ModelViewSet):
     ordering_fields = ['created_at', 'gce_scan_completed_at']
     ordering = ['-created_at']
 
+
+class VulnerabilityViewSet(viewsets.ReadOnlyModelViewSet):
+    """Read-only ViewSet for the findings extracted from GCE reports"""
+    queryset = Vulnerability.objects.select_related('target').prefetch_related('cve_refs')
+    serializer_class = VulnerabilitySerializer
+    permission_classes = [AllowAny]
+    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filterset_class = VulnerabilityFilter
+    search_fields = ['name', 'nvt_oid', 'host']
+    ordering_fields = ['severity', 'host', 'port', 'created_at']
+    ordering = ['-severity', 'host', 'port']
+    # La lista dei finding alimenta il workflow delle scansioni: resta sul primario
+    replica_actions = ('top_nvts', 'targets')
+
+    # Righe massime della classifica degli NVT, qualunque sia ?limit=
+    TOP_NVTS_MAX_LIMIT = 500
+    
+    @action(detail=False, methods=['get'])
+    def top_nvts(self, request):
+        """NVTs ranked by severity and number of affected targets (same filters as the list)"""
+        params = TopNvtsParamsSerializer(data=request.query_params)
+        if not params.is_valid():
+            return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+        limit = min(params.validated_data['limit'], self.TOP_NVTS_MAX_LIMIT)
+
+        queryset = self.filter_queryset(Vulnerability.objects.all()).order_by()
+        
+        nvts = (
+            queryset.values('nvt_oid', 'name')
+            .annotate(
+                severity=Max('severity'),
+                findings=Count('id'),
+                targets=Count('target', distinct=True),
+            )
+            .order_by('-severity', '-targets', 'name')[:limit]
+        )
+        return Response(list(nvts))
+    
+    @action(detail=False, methods=['get'])
+    def targets(self, request):
+        """Targets affected by the filtered findings (e.g. ?cve=CVE-2021-44228)"""
+        queryset = self.filter_queryset(Vulnerability.objects.all()).order_by()
+        
+        targets = (
+            queryset.values('target', 'target__name', 'target__address', 'target__customer')
+            .annotate(
+                severity=Max('severity'),
+                findings=Count('id'),
+                last_seen=Max('created_at'),
+            )
+            .order_by('-severity', 'target__name')
+        )
+        return Response([
+            {
+                'target': row['target'],
+                'target_name': row['target__name'],
+                'target_address': row['target__address'],
+                'customer': row['target__customer'],
+                'severity': row['severity'],
+                'findings': row['findings'],
+                'last_seen': row['last_seen'],
+            }
+            for row in targets
+        ])
+
+
+class OsMatchViewSet(viewsets.ReadOnlyModelViewSet):
+    """Read-only ViewSet for the OS matches found by nmap -O"""
+    queryset = OsMatch.objects.all()
+    serializer_class = OsMatchSerializer
+    permission_classes = [AllowAny]
+    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filterset_class = OsMatchFilter
+    search_fields = ['name', 'host']
+    ordering_fields = ['host', 'rank', 'accuracy', 'created_at']
+    ordering = ['scan', 'host', 'rank']
+
+
+class ScriptResultViewSet(viewsets.ReadOnlyModelViewSet):
+    """Read-only ViewSet for the NSE script output of nmap scans"""
+    queryset = ScriptResult.objects.all()
+    serializer_class = ScriptResultSerializer
+    permission_classes = [AllowAny]
+    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filterset_class = ScriptResultFilter
+    search_fields = ['script_id', 'host', 'output']
+    ordering_fields = ['host', 'port', 'script_id', 'created_at']
+    ordering = ['scan', 'host', 'port', 'script_id']
+
+
+class ServiceInventoryViewSet(viewsets.ReadOnlyModelViewSet):
+    """Read-only ViewSet for the port/service inventory of the targets"""
+    queryset = ServiceInventory.objects.filter(target__deleted_at__isnull=True).select_related('target')
+    serializer_class = ServiceInventorySerializer
+    permission_classes = [AllowAny]
+    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filterset_class = ServiceInventoryFilter
+    search_fields = ['host', 'service', 'product']
+    ordering_fields = ['host', 'port', 'service', 'first_seen', 'last_seen']
+    ordering = ['target', 'host', 'port', 'protocol']
+    replica_actions = ('list', 'targets')
+    
+    @action(detail=False, methods=['get'])
+    def targets(self, request):
+        """Targets matching the filters (e.g. ?customer={uuid}&port=3389&is_open=true)"""
+        queryset = self.filter_queryset(self.get_queryset()).order_by()
+        
+        targets = (
+            queryset.values('target', 'target__name', 'target__address', 'target__customer')
+            .annotate(
+                services=Count('id'),
+                hosts=Count('host', distinct=True),
+                first_seen=Min('first_seen'),
+                last_seen=Max('last_seen'),
+            )
+            .order_by('target__name')
+        )
+        return Response([
+            {
+                'target': row['target'],
+                'target_name': row['target__name'],
+                'target_address': row['target__address'],
+                'customer': row['target__customer'],
+                'services': row['services'],
+                'hosts': row['hosts'],
+                'first_seen': row['first_seen'],
+                'last_seen': row['last_seen'],
+            }
+            for row in targets
+        ])
+
+
+class ScanDiffViewSet(viewsets.ReadOnlyModelViewSet):
+    """Read-only ViewSet for the materialized diffs between consecutive scans"""
+    queryset = ScanDiff.objects.select_related('target')
+    serializer_class = ScanDiffSerializer
+    permission_classes = [AllowAny]
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filterset_class = ScanDiffFilter
+    ordering_fields = ['computed_at', 'ports_added', 'vulns_added']
+    ordering = ['-computed_at']
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # La lista serve per gli alert: il JSON del diff si carica solo nel dettaglio
+        if self.action == 'list':
+            queryset = queryset.defer('diff')
+        return queryset
+    
+    def get_serializer_class(self):
+        if self.action == 'retrieve':
+            return ScanDiffDetailSerializer
+        return ScanDiffSerializer
@@ -13,7 +13,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vapter_backend.settings')
 django.setup()
 
 from orchestrator_api.models import Scan, Target, Customer, ScanType
-from orchestrator_api.services import RabbitMQService
+from orchestrator_api.messaging import RabbitMQService
 
 
 def test_send_gce_scan_request():
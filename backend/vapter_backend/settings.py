@@ -37,6 +37,11 @@ LOCAL_APPS = [
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
+try:
+    import whitenoise
+except ImportError:  # whitenoise è opzionale: senza, i file statici li serve solo DEBUG
+    whitenoise = None
+
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -48,6 +53,10 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Static files (admin, swagger) served by gunicorn workers, right after SecurityMiddleware
+if whitenoise is not None:
+    MIDDLEWARE.insert(2, 'whitenoise.middleware.WhiteNoiseMiddleware')
+
 ROOT_URLCONF = 'vapter_backend.urls'
 
 TEMPLATES = [
@@ -67,15 +76,62 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'vapter_backend.wsgi.application'
+ASGI_APPLICATION = 'vapter_backend.asgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
+# Persistent connections: each worker thread (and consumer) keeps its
+# connection for CONN_MAX_AGE seconds (0 = one connection per request, e.g.
+# under ASGI), checked before reuse when CONN_HEALTH_CHECKS is on
+CONN_MAX_AGE = config('CONN_MAX_AGE', default=60, cast=int)
+CONN_HEALTH_CHECKS = config('CONN_HEALTH_CHECKS', default=True, cast=bool)
+
+# Behind pgbouncer in transaction pooling mode: no server-side cursors
+# (QuerySet.iterator() would lose them between transactions)
+DATABASE_PGBOUNCER = config('DATABASE_PGBOUNCER', default=False, cast=bool)
+
+
+def database_config(url):
+    database = dj_database_url.parse(url, conn_max_age=CONN_MAX_AGE, conn_health_checks=CONN_HEALTH_CHECKS)
+    if database['ENGINE'] == 'django.db.backends.postgresql':
+        database['DISABLE_SERVER_SIDE_CURSORS'] = DATABASE_PGBOUNCER
+        # Connessioni morte (failover, rete) rilevate dal kernel invece di bloccare il worker
+        database['OPTIONS'] = {
+            'connect_timeout': config('DATABASE_CONNECT_TIMEOUT', default=5, cast=int),
+            'keepalives': 1,
+            'keepalives_idle': 30,
+            'keepalives_interval': 10,
+            'keepalives_count': 3,
+            **database.get('OPTIONS', {}),
+        }
+    return database
+
+
 DATABASES = {
-    'default': dj_database_url.config(
-        default=config('DATABASE_URL', default='sqlite:///db.sqlite3')
-    )
+    'default': database_config(config('DATABASE_URL', default='sqlite:///db.sqlite3')),
 }
 
+# Read replica: the heavy GET actions of the viewsets (replica_actions) read
+# from it, see orchestrator_api/db_router.py. Clients that wrote are pinned to
+# the primary for REPLICA_PIN_SECONDS; the replica is skipped while it lags
+# more than REPLICA_MAX_LAG seconds (checked every REPLICA_CHECK_INTERVAL)
+REPLICA_DATABASE_ALIAS = 'replica'
+DATABASE_REPLICA_URL = config('DATABASE_REPLICA_URL', default='')
+REPLICA_MAX_LAG = config('REPLICA_MAX_LAG', default=2, cast=float)
+REPLICA_CHECK_INTERVAL = config('REPLICA_CHECK_INTERVAL', default=5, cast=float)
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=10, cast=int)
+REPLICA_PIN_COOKIE = 'vapter_primary'
+# Client senza cookie (plugin, script): letture dal primario con questo header
+REPLICA_PRIMARY_HEADER = 'X-Vapter-Read-Primary'
+
+if DATABASE_REPLICA_URL:
+    DATABASES[REPLICA_DATABASE_ALIAS] = {
+        **database_config(DATABASE_REPLICA_URL),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['orchestrator_api.db_router.ReplicaRouter']
+    MIDDLEWARE.append('orchestrator_api.db_router.ReplicaRoutingMiddleware')
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 AUTH_PASSWORD_VALIDATORS = [
@@ -121,10 +177,16 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',  # For now, no authentication
     ],
+    # orjson quando installato, json della libreria standard altrimenti (orchestrator_api/codec.py)
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'orchestrator_api.renderers.ORJSONRenderer',
         'rest_framework.renderers.BrowsableAPIRenderer',
     ],
+    'DEFAULT_PARSER_CLASSES': [
+        'orchestrator_api.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': [
@@ -163,6 +225,55 @@ RABBITMQ_WEB_SCAN_REQUEST_QUEUE = 'web_scan_requests'
 RABBITMQ_VULN_LOOKUP_REQUEST_QUEUE = 'vuln_lookup_requests'
 RABBITMQ_REPORT_REQUEST_QUEUE = 'report_requests'
 RABBITMQ_SCAN_STATUS_UPDATE_QUEUE = 'scan_status_updates'
+RABBITMQ_GCE_INGEST_QUEUE = 'gce_ingest_requests'
+
+# Fanout exchange every plugin instance listens on for scan cancellations
+RABBITMQ_SCAN_CONTROL_EXCHANGE = config('RABBITMQ_SCAN_CONTROL_EXCHANGE', default='scan_control')
+
+# Fanout exchange of the live scan events pushed by the API gateway (SSE/WebSocket)
+RABBITMQ_SCAN_EVENTS_EXCHANGE = config('RABBITMQ_SCAN_EVENTS_EXCHANGE', default='scan_events')
+
+# Range targets are split into shards published as separate nmap jobs
+NMAP_MAX_TARGET_ADDRESSES = config('NMAP_MAX_TARGET_ADDRESSES', default=65536, cast=int)
+NMAP_SHARD_MAX_HOSTS = config('NMAP_SHARD_MAX_HOSTS', default=256, cast=int)
+NMAP_SHARD_MAX_PORTS = config('NMAP_SHARD_MAX_PORTS', default=16384, cast=int)
+
+# Job leases: plugins renew them with heartbeats, reap_leases recovers the expired ones.
+# A queued job has no heartbeat: its lease covers the wait in the plugin queue
+# (the nmap queue drops messages after 1 hour).
+SCAN_LEASE_TTL = config('SCAN_LEASE_TTL', default=120, cast=int)
+SCAN_LEASE_QUEUED_TIMEOUT = config('SCAN_LEASE_QUEUED_TIMEOUT', default=7200, cast=int)
+SCAN_LEASE_MAX_ATTEMPTS = config('SCAN_LEASE_MAX_ATTEMPTS', default=3, cast=int)
+
+# Scan scheduler: scheduled scans start only while the running scans and the
+# backlog of the plugin request queues stay under these limits
+SCHEDULER_MAX_RUNNING_SCANS = config('SCHEDULER_MAX_RUNNING_SCANS', default=50, cast=int)
+SCHEDULER_MAX_RUNNING_PER_CUSTOMER = config('SCHEDULER_MAX_RUNNING_PER_CUSTOMER', default=10, cast=int)
+SCHEDULER_MAX_QUEUE_DEPTH = config('SCHEDULER_MAX_QUEUE_DEPTH', default=200, cast=int)
+SCHEDULER_BATCH_SIZE = config('SCHEDULER_BATCH_SIZE', default=500, cast=int)
+
+# Bulk target import and scan launch: rows per request, rows per transaction
+BULK_MAX_ITEMS = config('BULK_MAX_ITEMS', default=50000, cast=int)
+BULK_BATCH_SIZE = config('BULK_BATCH_SIZE', default=500, cast=int)
+
+# Scan event log: the status consumer writes the events in batches of up to
+# SCAN_EVENT_LOG_BATCH_SIZE rows, at least every SCAN_EVENT_LOG_FLUSH_INTERVAL
+# seconds; on PostgreSQL the monthly partitions are created this many months ahead
+SCAN_EVENT_LOG_BATCH_SIZE = config('SCAN_EVENT_LOG_BATCH_SIZE', default=500, cast=int)
+SCAN_EVENT_LOG_FLUSH_INTERVAL = config('SCAN_EVENT_LOG_FLUSH_INTERVAL', default=2, cast=float)
+SCAN_EVENT_PARTITION_MONTHS_AHEAD = config('SCAN_EVENT_PARTITION_MONTHS_AHEAD', default=3, cast=int)
+
+# Retention: finished scans older than the customer's retention_days (default
+# SCAN_RETENTION_DAYS, 0 = keep forever) are archived to SCAN_ARCHIVE_DIR and
+# deleted, RETENTION_BATCH_SIZE scans per transaction; soft-deleted rows are
+# purged SOFT_DELETE_RETENTION_DAYS after deletion.
+# SCAN_ARCHIVE_COMPRESSION: auto (zstd if zstandard is installed), zstd, gzip
+SCAN_RETENTION_DAYS = config('SCAN_RETENTION_DAYS', default=0, cast=int)
+SOFT_DELETE_RETENTION_DAYS = config('SOFT_DELETE_RETENTION_DAYS', default=30, cast=int)
+RETENTION_BATCH_SIZE = config('RETENTION_BATCH_SIZE', default=100, cast=int)
+RETENTION_BATCH_PAUSE = config('RETENTION_BATCH_PAUSE', default=0.5, cast=float)
+SCAN_ARCHIVE_DIR = config('SCAN_ARCHIVE_DIR', default=str(BASE_DIR / 'archive'))
+SCAN_ARCHIVE_COMPRESSION = config('SCAN_ARCHIVE_COMPRESSION', default='auto')
 
 # Internal API Gateway URL
 INTERNAL_API_GATEWAY_URL = config('INTERNAL_API_GATEWAY_URL', default='http://localhost:8080')
@@ -9,9 +9,36 @@ from typing import Dict, Any, Callable, Optional
 import pika
 from pika.exceptions import AMQPConnectionError, AMQPChannelError, ConnectionClosedByBroker
 
+try:
+    import orjson
+except ImportError:  # orjson è opzionale: senza i messaggi usano il modulo json
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 
+def encode_message(message: Any) -> bytes:
+    """
+    Corpo JSON (UTF-8, compatto) di un messaggio, con orjson se installato.
+    orjson codifica NaN/Infinity come null, json come NaN/Infinity (non JSON valido).
+    """
+    if orjson is not None:
+        return orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(message, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def decode_message(body: bytes) -> Any:
+    """
+    Decodifica il corpo JSON di un messaggio.
+
+    Raises:
+        json.JSONDecodeError: se il corpo non è JSON valido (anche con orjson, che ne deriva)
+    """
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body.decode('utf-8'))
+
+
 class RabbitMQConnection:
     """
     Gestisce le connessioni RabbitMQ con:
@@ -180,7 +207,7 @@ class RabbitMQConnection:
                 self.channel.basic_publish(
                     exchange='',
                     routing_key=routing_key,
-                    body=json.dumps(message),
+                    body=encode_message(message),
                     properties=properties
                 )
                 
@@ -224,7 +251,7 @@ class RabbitMQConnection:
                         self._last_activity = time.time()
                         
                         # Parse JSON body
-                        message = json.loads(body.decode('utf-8'))
+                        message = decode_message(body)
                         
                         # Chiama callback utente
                         callback(ch, method, properties, message)
@@ -348,7 +375,7 @@ class RabbitMQRPC:
     def on_response(self, ch, method, props, body):
         """Callback per le risposte RPC."""
         if self.correlation_id == props.correlation_id:
-            self.response = json.loads(body.decode('utf-8'))
+            self.response = decode_message(body)
     
     def call(self, message: Dict[str, Any], timeout: int = 30) -> Optional[Dict[str, Any]]:
         """
@@ -385,7 +412,7 @@ class RabbitMQRPC:
                 reply_to=self.callback_queue,
                 correlation_id=self.correlation_id,
             ),
-            body=json.dumps(message)
+            body=encode_message(message)
         )
         
         # Attendi risposta con timeout
@@ -0,0 +1,229 @@
+# common/scan_control.py
+
+"""
+Canale di controllo delle scansioni.
+
+L'orchestratore pubblica {'action': 'cancel', 'scan_id': N} sull'exchange fanout
+RABBITMQ_SCAN_CONTROL_EXCHANGE; ogni istanza del plugin lo riceve su una coda
+esclusiva, con una connessione e un thread dedicati (il consumer principale è
+bloccato nel lavoro della richiesta corrente).
+
+Nella direzione opposta LeaseHeartbeat rinnova il lease dei job in corso con un
+heartbeat periodico sulla coda degli stati: se il container muore l'orchestratore
+se ne accorge alla scadenza del lease e ridistribuisce il job.
+"""
+
+import json
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Set
+
+import pika
+
+logger = logging.getLogger(__name__)
+
+
+def terminate_process_group(process, grace: float = 5.0):
+    """SIGTERM al process group (nmap, fingerprintx e i loro figli), SIGKILL dopo grace secondi"""
+    if process.poll() is not None:
+        return
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+    except (ProcessLookupError, PermissionError):
+        return
+
+    def force_kill():
+        if process.poll() is None:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+
+    timer = threading.Timer(grace, force_kill)
+    timer.daemon = True
+    timer.start()
+
+
+class CancelToken:
+    """Stato di cancellazione del lavoro in corso per una scansione"""
+
+    def __init__(self, scan_id: int):
+        self.scan_id = scan_id
+        self.event = threading.Event()
+        self._processes = set()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.event.is_set()
+
+    def wait(self, timeout: float) -> bool:
+        """Sleep interrompibile: True se la scansione è stata cancellata"""
+        return self.event.wait(timeout)
+
+    def add_process(self, process):
+        """Registra un subprocess avviato con start_new_session=True"""
+        with self._lock:
+            if not self.cancelled:
+                self._processes.add(process)
+                return
+        terminate_process_group(process)
+
+    def remove_process(self, process):
+        with self._lock:
+            self._processes.discard(process)
+
+    def on_cancel(self, callback):
+        with self._lock:
+            if not self.cancelled:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def cancel(self):
+        with self._lock:
+            if self.cancelled:
+                return
+            self.event.set()
+            processes, self._processes = list(self._processes), set()
+            callbacks, self._callbacks = self._callbacks, []
+        for process in processes:
+            terminate_process_group(process)
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Cancel callback failed for scan {self.scan_id}: {e}")
+
+
+class CancellationListener(threading.Thread):
+    """Riceve le cancellazioni dall'exchange fanout e interrompe il lavoro in corso"""
+
+    def __init__(self, connection_params: pika.ConnectionParameters, exchange: str, ttl: int = 86400):
+        super().__init__(name='scan-control', daemon=True)
+        self.connection_params = connection_params
+        self.exchange = exchange
+        self.ttl = ttl
+        self._cancelled: Dict[int, float] = {}
+        self._tokens: Dict[int, Set[CancelToken]] = {}
+        self._lock = threading.Lock()
+
+    def is_cancelled(self, scan_id: int) -> bool:
+        """True se la scansione è stata cancellata (anche prima che la richiesta arrivasse qui)"""
+        with self._lock:
+            return scan_id in self._cancelled
+
+    @contextmanager
+    def watch(self, scan_id: int):
+        """Token di cancellazione per il lavoro su scan_id, attivo per la durata del blocco"""
+        token = CancelToken(scan_id)
+        with self._lock:
+            self._tokens.setdefault(scan_id, set()).add(token)
+            cancelled = scan_id in self._cancelled
+        if cancelled:
+            token.cancel()
+        try:
+            yield token
+        finally:
+            with self._lock:
+                tokens = self._tokens.get(scan_id)
+                if tokens is not None:
+                    tokens.discard(token)
+                    if not tokens:
+                        del self._tokens[scan_id]
+
+    def cancel(self, scan_id: int):
+        now = time.monotonic()
+        with self._lock:
+            self._cancelled[scan_id] = now
+            # Le scansioni cancellate da più di ttl secondi non possono più avere richieste in coda
+            for expired in [sid for sid, at in self._cancelled.items() if now - at > self.ttl]:
+                del self._cancelled[expired]
+            tokens = list(self._tokens.get(scan_id, ()))
+        for token in tokens:
+            logger.info(f"Cancelling in-flight work for scan {scan_id}")
+            token.cancel()
+
+    def _on_message(self, channel, method, properties, body):
+        try:
+            message = json.loads(body.decode('utf-8'))
+        except (ValueError, UnicodeDecodeError):
+            logger.warning(f"Ignoring malformed control message: {body[:200]!r}")
+            return
+        if message.get('action') == 'cancel' and message.get('scan_id') is not None:
+            logger.info(f"Received cancellation for scan {message['scan_id']}")
+            self.cancel(int(message['scan_id']))
+
+    def run(self):
+        while True:
+            try:
+                connection = pika.BlockingConnection(self.connection_params)
+                channel = connection.channel()
+                channel.exchange_declare(exchange=self.exchange, exchange_type='fanout', durable=True)
+                queue = channel.queue_declare(queue='', exclusive=True, auto_delete=True).method.queue
+                channel.queue_bind(queue=queue, exchange=self.exchange)
+                channel.basic_consume(queue=queue, on_message_callback=self._on_message, auto_ack=True)
+                logger.info(f"Listening for scan cancellations on exchange {self.exchange}")
+                channel.start_consuming()
+            except Exception as e:
+                logger.error(f"Scan control connection lost: {e}")
+                time.sleep(5)
+
+
+class LeaseHeartbeat(threading.Thread):
+    """Heartbeat dei job in corso, pubblicato da un thread con la sua connessione"""
+
+    def __init__(self, connection_params: pika.ConnectionParameters, queue_name: str,
+                 module: str, interval: int = 30):
+        super().__init__(name='lease-heartbeat', daemon=True)
+        self.connection_params = connection_params
+        self.queue_name = queue_name
+        self.module = module
+        self.interval = interval
+        self.worker = socket.gethostname()
+        self._jobs: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def hold(self, scan_id: int, attempt: Optional[int] = None, shard_id: Optional[int] = None):
+        """Mantiene il lease del job per la durata del blocco"""
+        job = {'scan_id': scan_id, 'module': self.module, 'status': 'heartbeat', 'worker': self.worker}
+        if attempt is not None:
+            job['attempt'] = attempt
+        if shard_id is not None:
+            job['shard_id'] = shard_id
+        with self._lock:
+            self._jobs[id(job)] = job
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._jobs.pop(id(job), None)
+
+    def run(self):
+        while True:
+            try:
+                connection = pika.BlockingConnection(self.connection_params)
+                channel = connection.channel()
+                while True:
+                    with self._lock:
+                        jobs = list(self._jobs.values())
+                    for job in jobs:
+                        # Messaggi non persistenti: un heartbeat perso è sostituito dal successivo
+                        channel.basic_publish(
+                            exchange='',
+                            routing_key=self.queue_name,
+                            body=json.dumps({**job, 'timestamp': datetime.now(timezone.utc).isoformat()})
+                        )
+                    # sleep di pika: mantiene viva la connessione tra un heartbeat e l'altro
+                    connection.sleep(self.interval)
+            except Exception as e:
+                logger.error(f"Lease heartbeat connection lost: {e}")
+                time.sleep(5)
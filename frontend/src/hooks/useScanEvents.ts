@@ -0,0 +1,85 @@
+// frontend/src/hooks/useScanEvents.ts
+
+import { useEffect, useState } from 'react'
+import { useQueryClient } from '@tanstack/react-query'
+import { isActiveScan } from '@/services/scanService'
+import type { Scan, ScanStatus } from '@/types'
+
+const API_BASE_URL = import.meta.env.VITE_API_URL || '/api'
+
+interface ScanEvent {
+  type: 'scan_status' | 'plugin_status'
+  scan_id: number
+  target_id: number
+  customer_id: string
+  scan_status: ScanStatus
+  previous_status?: ScanStatus
+  module?: string
+  status?: string
+  progress?: number
+  message?: string
+  error?: string
+  timestamp: string
+}
+
+/**
+ * Keeps the ['scans', customerId] query up to date with the live scan events
+ * pushed by the API gateway (Server-Sent Events).
+ *
+ * Returns true while the stream is connected: the caller can stop polling.
+ * EventSource reconnects on its own and resumes from the last event id.
+ */
+export function useScanEvents(customerId?: string): boolean {
+  const queryClient = useQueryClient()
+  const [connected, setConnected] = useState(false)
+
+  useEffect(() => {
+    if (!customerId || typeof EventSource === 'undefined') {
+      return
+    }
+
+    const queryKey = ['scans', customerId]
+    const source = new EventSource(
+      `${API_BASE_URL}/events/stream?customer_id=${encodeURIComponent(customerId)}`
+    )
+
+    const handleReady = (message: MessageEvent) => {
+      setConnected(true)
+      // Eventi persi durante la disconnessione: si ricarica la lista
+      if (JSON.parse(message.data).resync) {
+        queryClient.invalidateQueries({ queryKey })
+      }
+    }
+
+    const handleScanEvent = (message: MessageEvent) => {
+      const event: ScanEvent = JSON.parse(message.data)
+      const scans = queryClient.getQueryData<Scan[]>(queryKey)
+      const scan = scans?.find((item) => item.id === event.scan_id)
+
+      // Scansione nuova o conclusa: servono i dati completi (date, risultati)
+      if (!scan || (scan.status !== event.scan_status && !isActiveScan(event.scan_status))) {
+        queryClient.invalidateQueries({ queryKey })
+        return
+      }
+      if (scan.status !== event.scan_status) {
+        queryClient.setQueryData<Scan[]>(queryKey, (current) =>
+          current?.map((item) =>
+            item.id === event.scan_id ? { ...item, status: event.scan_status } : item
+          )
+        )
+      }
+    }
+
+    source.addEventListener('ready', handleReady)
+    source.addEventListener('scan_status', handleScanEvent)
+    source.addEventListener('plugin_status', handleScanEvent)
+    source.onerror = () => setConnected(false)
+
+    return () => {
+      source.close()
+      setConnected(false)
+    }
+  }, [customerId, queryClient])
+
+  return connected
+}
@@ -20,6 +20,7 @@ import {
   isActiveScan 
 } from '@/services/scanService'
 import { getScanTypes } from '@/services/scanTypeService'
+import { useScanEvents } from '@/hooks/useScanEvents'
 
 export default function Scans() {
   const [searchTerm, setSearchTerm] = useState('')
@@ -28,6 +29,9 @@ export default function Scans() {
   const { toast } = useToast()
   const queryClient = useQueryClient()
   
+  // Live status updates from the gateway; polling only while they are unavailable
+  const liveUpdates = useScanEvents(selectedCustomer?.id)
+  
   // Fetch scans with polling for active scans
   const { 
     data: scans = [], 
@@ -38,10 +42,11 @@ export default function Scans() {
     queryKey: ['scans', selectedCustomer?.id],
     queryFn: () => getScans(selectedCustomer?.id),
     enabled: !!selectedCustomer,
-    refetchInterval: (data) => {
+    refetchInterval: (query) => {
       // Poll every 3 seconds if there are active scans
       // Check if data is an array and has active scans
-      if (!Array.isArray(data) || data.length === 0) {
+      const data = query.state.data
+      if (liveUpdates || !Array.isArray(data) || data.length === 0) {
         return false
       }
       const hasActiveScans = data.some(scan => isActiveScan(scan.status))
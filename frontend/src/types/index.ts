@@ -21,6 +21,7 @@ export interface PortList {
   description?: string
   total_tcp_ports: number
   total_udp_ports: number
+  nmap_port_spec?: string
   created_at: string
   updated_at: string
 }
@@ -33,6 +34,7 @@ export interface ScanType {
   be_quiet: boolean
   port_list?: number
   port_list_name?: string
+  port_specification?: string | null
   plugin_finger: boolean
   plugin_gce: boolean
   plugin_web: boolean
@@ -72,6 +74,8 @@ export interface Scan {
   scan_type: number
   scan_type_name: string
   status: ScanStatus
+  scan_mode?: 'full' | 'incremental'
+  baseline_scan?: number | null
   initiated_at: string
   started_at?: string
   completed_at?: string
@@ -88,11 +92,21 @@ export interface Scan {
   updated_at: string
 }
 
+export type PluginState =
+  | 'pending'
+  | 'queued'
+  | 'running'
+  | 'completed'
+  | 'failed'
+  | 'skipped'
+
 export interface ScanDetail {
   id: number
   scan: number
   open_ports?: any
   os_guess?: any
+  plugin_states?: Record<string, PluginState>
+  port_delta?: any
   nmap_started_at?: string
   nmap_completed_at?: string
   finger_started_at?: string
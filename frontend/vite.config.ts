@@ -18,6 +18,7 @@ export default defineConfig({
       '/api': {
         target: 'http://api_gateway:8080',
         changeOrigin: true,
+        ws: true,
       },
     },
   },
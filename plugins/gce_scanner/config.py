@@ -36,6 +36,8 @@ class Settings:
     
     # Report Configuration
     GCE_REPORT_FORMAT = os.environ.get('GCE_REPORT_FORMAT', 'XML')  # XML or JSON
+    GCE_REPORT_PAGE_SIZE = int(os.environ.get('GCE_REPORT_PAGE_SIZE', '1000'))  # results per page
+    GCE_REPORT_CHUNK_SIZE = int(os.environ.get('GCE_REPORT_CHUNK_SIZE', '1048576'))  # bytes per upload chunk
     
     # Retry Configuration
     MAX_RETRIES = int(os.environ.get('MAX_RETRIES', '5'))
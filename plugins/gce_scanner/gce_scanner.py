@@ -1,13 +1,13 @@
 # gce/plugins/gce_scanner/gce_scanner.py
 
 import os
-import json
 import logging
 import time
 import socket
+import zlib
 import xml.etree.ElementTree as ET
 from datetime import datetime, timezone
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 import threading
 
 import pika
@@ -17,6 +17,9 @@ from gvm.connections import UnixSocketConnection
 from gvm.protocols.gmp import Gmp
 from gvm.transforms import EtreeTransform
 
+from common.scan_control import CancellationListener, LeaseHeartbeat
+from common.rabbitmq_utils import encode_message, decode_message
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -112,7 +115,7 @@ class RabbitMQConnection:
                 self.channel.basic_publish(
                     exchange='',
                     routing_key=self.queue_name,
-                    body=json.dumps(message),
+                    body=encode_message(message),
                     properties=pika.BasicProperties(
                         delivery_mode=2,  # Make message persistent
                         expiration='3600000'  # 1 hour expiration
@@ -148,7 +151,7 @@ class RabbitMQConnection:
                 ):
                     try:
                         self._last_activity = time.time()
-                        message = json.loads(body.decode('utf-8'))
+                        message = decode_message(body)
                         
                         # Process message
                         callback(self.channel, method, properties, message)
@@ -184,6 +187,120 @@ class RabbitMQConnection:
                 logger.error(f"Error closing connection: {e}")
 
 
+class ReportAggregator:
+    """Aggrega i risultati del report GCE pagina per pagina: conteggi per severità e riepilogo per NVT"""
+
+    # Soglie CVSS delle severità GCE; sotto 0.1 il risultato è solo 'log'
+    SEVERITY_LEVELS = (('critical', 9.0), ('high', 7.0), ('medium', 4.0), ('low', 0.1))
+
+    def __init__(self):
+        self.counts = {'critical': 0, 'high': 0, 'medium': 0, 'low': 0, 'log': 0, 'total': 0}
+        self.nvts = {}
+
+    @classmethod
+    def severity_level(cls, severity: float) -> str:
+        for level, threshold in cls.SEVERITY_LEVELS:
+            if severity >= threshold:
+                return level
+        return 'log'
+
+    def add(self, result: ET.Element):
+        """Aggiunge un elemento <result> ai conteggi"""
+        try:
+            severity = float(result.findtext('severity') or 0)
+        except ValueError:
+            severity = 0.0
+
+        self.counts[self.severity_level(severity)] += 1
+        self.counts['total'] += 1
+
+        nvt = result.find('nvt')
+        oid = nvt.get('oid') if nvt is not None else None
+        if not oid:
+            return
+
+        entry = self.nvts.get(oid)
+        if entry is None:
+            entry = self.nvts[oid] = {
+                'oid': oid,
+                'name': nvt.findtext('name') or oid,
+                'severity': severity,
+                'count': 0,
+                'hosts': set(),
+            }
+        entry['severity'] = max(entry['severity'], severity)
+        entry['count'] += 1
+        host = (result.findtext('host') or '').strip()
+        if host:
+            entry['hosts'].add(host)
+
+    def nvt_summary(self) -> List[Dict[str, Any]]:
+        """Riepilogo per NVT, severità più alta per prima"""
+        summary = [
+            {
+                **entry,
+                'level': self.severity_level(entry['severity']),
+                'hosts': len(entry['hosts']),
+            }
+            for entry in self.nvts.values()
+        ]
+        summary.sort(key=lambda entry: (-entry['severity'], entry['name']))
+        return summary
+
+
+class ReportUploader:
+    """Comprime il report in un unico stream gzip e lo carica a chunk sull'API"""
+
+    def __init__(self, url: str, gce_task_id: str, chunk_size: int, max_retries: int = 3):
+        self.url = url
+        self.gce_task_id = gce_task_id
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        self.compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = formato gzip
+        self.buffer = bytearray()
+        self.offset = 0
+
+    def write(self, text: str):
+        self.buffer += self.compressor.compress(text.encode('utf-8'))
+        while len(self.buffer) >= self.chunk_size:
+            self._send_chunk(bytes(self.buffer[:self.chunk_size]))
+            del self.buffer[:self.chunk_size]
+
+    def close(self) -> int:
+        """Svuota il compressore, invia l'ultimo chunk e chiude l'upload; ritorna la dimensione compressa"""
+        self.buffer += self.compressor.flush()
+        if self.buffer:
+            self._send_chunk(bytes(self.buffer))
+            self.buffer.clear()
+        self._post({'final': 'true', 'size': self.offset})
+        return self.offset
+
+    def _send_chunk(self, chunk: bytes):
+        self._post({'offset': self.offset}, chunk)
+        self.offset += len(chunk)
+
+    def _post(self, params: Dict[str, Any], data: bytes = b''):
+        # Il backend scrive ogni chunk al suo offset: ritrasmettere è idempotente
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                response = requests.post(
+                    self.url,
+                    params={'gce_task_id': self.gce_task_id, **params},
+                    data=data,
+                    headers={'Content-Type': 'application/octet-stream'},
+                    timeout=60
+                )
+                if response.status_code in [200, 202]:
+                    return
+                if response.status_code == 409:
+                    break
+                logger.warning(f"Report upload attempt {attempt} failed: {response.status_code} - {response.text}")
+            except requests.RequestException as e:
+                logger.warning(f"Report upload attempt {attempt} failed: {e}")
+            time.sleep(2 ** attempt)
+        raise Exception(f"Failed to upload GCE report at offset {self.offset}")
+
+
 class GCEScanner:
     def __init__(self):
         # Configuration from environment
@@ -211,11 +328,31 @@ class GCEScanner:
             heartbeat=60
         )
         
+        # Cancellazioni dall'orchestratore, su una connessione separata
+        self.cancellations = CancellationListener(
+            pika.ConnectionParameters(host=self.rabbitmq_host, port=self.rabbitmq_port, heartbeat=60),
+            os.environ.get('RABBITMQ_SCAN_CONTROL_EXCHANGE', 'scan_control')
+        )
+        
+        # Heartbeat del lease dei job in corso; il tentativo corrente viene riportato negli aggiornamenti
+        self.heartbeat = LeaseHeartbeat(
+            pika.ConnectionParameters(host=self.rabbitmq_host, port=self.rabbitmq_port, heartbeat=60),
+            self.publisher_connection.queue_name,
+            'gce',
+            interval=int(os.environ.get('SCAN_HEARTBEAT_INTERVAL', '30'))
+        )
+        self.current_attempt = None
+        
         # GCE configuration
         self.scan_config_id = os.environ.get('GCE_SCAN_CONFIG_ID', 'daba56c8-73ec-11df-a475-002264764cea')
         self.port_list_id = os.environ.get('GCE_PORT_LIST_ID', 'c7e03b6c-3bbe-11e1-a057-406186ea4fc5')
         
-    def publish_status_update(self, scan_id: int, status: str, message: str = None, error_details: str = None):
+        # Report: risultati per pagina (filtro first/rows) e dimensione dei chunk compressi
+        self.report_page_size = int(os.environ.get('GCE_REPORT_PAGE_SIZE', '1000'))
+        self.report_chunk_size = int(os.environ.get('GCE_REPORT_CHUNK_SIZE', str(1024 * 1024)))
+        
+    def publish_status_update(self, scan_id: int, status: str, message: str = None, error_details: str = None,
+                              progress: Optional[int] = None, checkpoint: Optional[Dict[str, Any]] = None):
         """Pubblica un aggiornamento di stato con formato corretto"""
         update = {
             'scan_id': scan_id,
@@ -228,6 +365,12 @@ class GCEScanner:
             update['message'] = message
         if error_details:
             update['error_details'] = error_details
+        if progress is not None:
+            update['progress'] = progress
+        if checkpoint:
+            update['checkpoint'] = checkpoint
+        if self.current_attempt is not None:
+            update['attempt'] = self.current_attempt
             
         success = self.publisher_connection.publish(update)
         if success:
@@ -260,17 +403,40 @@ class GCEScanner:
             logger.error(f"Failed to connect to GCE: {e}")
             return None
     
-    def create_target(self, gmp: Gmp, host: str, name: str) -> Optional[str]:
+    @staticmethod
+    def build_port_range(ports: List[Dict[str, Any]]) -> str:
+        """Costruisce un port range GMP (es. 'T:22,80,U:53') da una lista di porte"""
+        tcp = sorted({int(p['port']) for p in ports if p.get('protocol', 'tcp') == 'tcp'})
+        udp = sorted({int(p['port']) for p in ports if p.get('protocol') == 'udp'})
+        parts = []
+        if tcp:
+            parts.append('T:' + ','.join(str(p) for p in tcp))
+        if udp:
+            parts.append('U:' + ','.join(str(p) for p in udp))
+        return ','.join(parts)
+    
+    def create_target(self, gmp: Gmp, host: str, name: str,
+                      ports: Optional[List[Dict[str, Any]]] = None) -> Optional[str]:
         """Crea un target in GCE"""
         try:
             target_name = f"VaPtER - {name} - {host} - {datetime.now(timezone.utc).isoformat()}"
             logger.info(f"Creating GCE target: {target_name}")
             
-            resp = gmp.create_target(
-                name=target_name,
-                hosts=[host],
-                port_list_id=self.port_list_id
-            )
+            if ports:
+                # Scansione incrementale: solo le porte cambiate rispetto alla baseline
+                port_range = self.build_port_range(ports)
+                logger.info(f"Restricting GCE target to changed ports: {port_range}")
+                resp = gmp.create_target(
+                    name=target_name,
+                    hosts=[host],
+                    port_range=port_range
+                )
+            else:
+                resp = gmp.create_target(
+                    name=target_name,
+                    hosts=[host],
+                    port_list_id=self.port_list_id
+                )
             
             target_id = resp.get('id')
             logger.info(f"Created GCE target with ID: {target_id}")
@@ -312,7 +478,8 @@ class GCEScanner:
             logger.error(f"Failed to start scan: {e}")
             return False
     
-    def monitor_scan(self, gmp: Gmp, task_id: str, scan_id: int) -> Tuple[bool, Optional[str]]:
+    def monitor_scan(self, gmp: Gmp, task_id: str, scan_id: int,
+                     cancel_token=None) -> Tuple[bool, Optional[str]]:
         """Monitora il progresso della scansione con heartbeat"""
         try:
             start_time = datetime.now(timezone.utc)
@@ -339,13 +506,7 @@ class GCEScanner:
                     last_progress = progress
                     
                     # Send progress update
-                    self.publisher_connection.publish({
-                        'scan_id': scan_id,
-                        'module': 'gce',
-                        'status': 'running',
-                        'progress': progress,
-                        'timestamp': datetime.now(timezone.utc).isoformat()
-                    })
+                    self.publish_status_update(scan_id, 'running', progress=progress)
                 
                 # Send heartbeat
                 if time.time() - last_heartbeat > heartbeat_interval:
@@ -369,30 +530,147 @@ class GCEScanner:
                     logger.error("Scan timeout reached (4 hours)")
                     return False, None
                 
-                # Wait before next check
-                time.sleep(30)
+                # Wait before next check (interrotto subito da una cancellazione)
+                if cancel_token is None:
+                    time.sleep(30)
+                elif cancel_token.wait(30):
+                    logger.info(f"GCE scan {scan_id} cancelled while task {task_id} was {status}")
+                    return False, None
                 
         except Exception as e:
             logger.error(f"Error monitoring scan: {e}")
             return False, None
     
-    def get_report(self, gmp: Gmp, report_id: str) -> Optional[str]:
-        """Recupera il report GCE in formato XML"""
+    def resume_task(self, gmp: Gmp, checkpoint: Dict[str, Any]) -> Optional[Tuple[str, str, datetime]]:
+        """
+        Riprende il task gvmd salvato nel checkpoint di un tentativo precedente
+        invece di ricominciare la scansione da capo.
+        
+        Returns:
+            (target_id, task_id, started_at), o None se non c'è un task da riprendere
+        """
+        task_id = checkpoint.get('gce_task_id')
+        if not task_id:
+            return None
         try:
-            logger.info(f"Retrieving report: {report_id}")
-            
-            # Get full report with results
+            task = gmp.get_task(task_id).find('task')
+            status = task.findtext('status') if task is not None else None
+            if status is None:
+                logger.warning(f"Checkpoint task {task_id} no longer exists, starting a new task")
+                return None
+            if status in ('Stopped', 'Interrupted'):
+                gmp.resume_task(task_id)
+            elif status == 'New':
+                gmp.start_task(task_id)
+        except Exception as e:
+            logger.warning(f"Cannot resume checkpoint task {task_id}, starting a new task: {e}")
+            return None
+        
+        logger.info(f"Resuming GCE task {task_id} (status: {status})")
+        started_at = checkpoint.get('gce_started_at')
+        return (
+            checkpoint.get('gce_target_id'),
+            task_id,
+            datetime.fromisoformat(started_at) if started_at else datetime.now(timezone.utc)
+        )
+    
+    def cancel_task(self, gmp: Gmp, task_id: Optional[str], target_id: Optional[str]):
+        """Ferma il task GCE e lo rimuove con il suo target, liberando lo scanner"""
+        if task_id:
+            try:
+                gmp.stop_task(task_id)
+            except Exception as e:
+                logger.warning(f"Failed to stop GCE task {task_id}: {e}")
+            try:
+                gmp.delete_task(task_id, ultimate=True)
+            except Exception as e:
+                logger.warning(f"Failed to delete GCE task {task_id}: {e}")
+        if target_id:
+            try:
+                gmp.delete_target(target_id, ultimate=True)
+            except Exception as e:
+                logger.warning(f"Failed to delete GCE target {target_id}: {e}")
+        logger.info(f"Cancelled GCE task {task_id} (target {target_id})")
+    
+    def iter_report_pages(self, gmp: Gmp, report_id: str):
+        """Itera il report GCE a pagine (filtro first/rows): yield (elemento <report>, lista di <result>)"""
+        first = 1
+        while True:
             resp = gmp.get_report(
                 report_id,
                 report_format_id=None,  # Use default XML format
-                filter_string="rows=-1"  # Get all results
+                filter_string=f"first={first} rows={self.report_page_size}"
             )
             
-            # Convert to string
-            report_xml = ET.tostring(resp, encoding='unicode')
-            logger.info(f"GCE Report XML: {report_xml[:2000]}...")  # Log first 2000 chars
+            # La risposta annida <report> dentro <report>
+            report = resp.find('report')
+            if report is not None and report.find('report') is not None:
+                report = report.find('report')
+            if report is None:
+                raise Exception(f"No report element in GCE response for report {report_id}")
+            
+            results = report.findall('results/result')
+            yield report, results
+            
+            filtered = report.findtext('result_count/filtered')
+            first += len(results)
+            if len(results) < self.report_page_size:
+                break
+            if filtered and filtered.strip().isdigit() and first > int(filtered):
+                break
+    
+    @staticmethod
+    def _open_tag(element: ET.Element) -> str:
+        """Tag di apertura di un elemento, con i suoi attributi"""
+        shell = ET.Element(element.tag, element.attrib)
+        return ET.tostring(shell, encoding='unicode', short_empty_elements=False)[:-len(f"</{element.tag}>")]
+    
+    def stream_report(self, gmp: Gmp, report_id: str, scan_id: int, task_id: str,
+                      cancel_token=None) -> Optional[Dict[str, Any]]:
+        """
+        Recupera il report GCE a pagine: ogni pagina viene aggregata e scritta
+        compressa sullo stream di upload, poi scartata. La memoria dipende dalla
+        dimensione della pagina, non da quella del report.
+        """
+        try:
+            logger.info(f"Retrieving report: {report_id}")
             
-            return report_xml
+            aggregator = ReportAggregator()
+            uploader = ReportUploader(
+                f"{self.api_gateway_url}/api/orchestrator/scans/{scan_id}/gce-report/",
+                task_id,
+                self.report_chunk_size
+            )
+            
+            pages = 0
+            for report, results in self.iter_report_pages(gmp, report_id):
+                if cancel_token and cancel_token.cancelled:
+                    logger.info(f"Report download of scan {scan_id} cancelled after {pages} pages")
+                    return None
+                if pages == 0:
+                    # Intestazione dalla prima pagina: tutto tranne i risultati
+                    uploader.write('<get_reports_response status="200" status_text="OK">')
+                    uploader.write(self._open_tag(report))
+                    for child in report:
+                        if child.tag != 'results':
+                            uploader.write(ET.tostring(child, encoding='unicode'))
+                    uploader.write('<results>')
+                
+                for result in results:
+                    aggregator.add(result)
+                    uploader.write(ET.tostring(result, encoding='unicode'))
+                pages += 1
+            
+            uploader.write('</results></report></get_reports_response>')
+            size = uploader.close()
+            
+            logger.info(f"Report {report_id}: {aggregator.counts['total']} results in {pages} pages, "
+                        f"{size} bytes compressed, counts {aggregator.counts}")
+            
+            return {
+                'vulnerability_count': aggregator.counts,
+                'nvt_summary': aggregator.nvt_summary(),
+            }
             
         except Exception as e:
             logger.error(f"Failed to get report: {e}")
@@ -429,44 +707,84 @@ class GCEScanner:
         
         logger.info(f"Processing GCE scan request for scan {scan_id}, target {target_host}")
         
+        self.current_attempt = message.get('attempt')
+        
+        # Richiesta di una scansione già cancellata: scartata senza creare il task
+        if self.cancellations.is_cancelled(scan_id):
+            logger.info(f"Dropping request of cancelled scan {scan_id}")
+            self.publish_status_update(scan_id, 'cancelled', 'Scan cancelled before start')
+            return
+        
+        with self.cancellations.watch(scan_id) as cancel_token, self.heartbeat.hold(scan_id, self.current_attempt):
+            self._run_scan(message, cancel_token)
+    
+    def _run_scan(self, message: Dict[str, Any], cancel_token):
+        """Esegue il task GCE di una richiesta e pubblica l'esito"""
+        scan_id = message.get('scan_id')
+        target_host = message.get('target_host')
+        target_name = message.get('target_name', target_host)
+        
         # Update status to running
         self.publish_status_update(scan_id, 'running', 'Starting GCE scan')
         
         gmp = None
+        target_id = task_id = None
         try:
             # Connect to GCE
             gmp = self.connect_to_gce()
             if not gmp:
                 raise Exception("Failed to connect to GCE")
             
-            # Create target
-            target_id = self.create_target(gmp, target_host, target_name)
-            if not target_id:
-                raise Exception("Failed to create target")
-            
-            # Create task
-            task_id = self.create_task(gmp, target_id, scan_id)
-            if not task_id:
-                raise Exception("Failed to create task")
-            
-            # Start scan
-            if not self.start_scan(gmp, task_id):
-                raise Exception("Failed to start scan")
+            # Job ridistribuito dopo la perdita del worker: riprende il task del checkpoint
+            resumed = self.resume_task(gmp, message.get('checkpoint') or {})
+            if resumed:
+                target_id, task_id, started_at = resumed
+            else:
+                # Create target
+                target_id = self.create_target(gmp, target_host, target_name, message.get('ports'))
+                if not target_id:
+                    raise Exception("Failed to create target")
+                
+                # Create task
+                task_id = self.create_task(gmp, target_id, scan_id)
+                if not task_id:
+                    raise Exception("Failed to create task")
+                
+                # Start scan
+                started_at = datetime.now(timezone.utc)
+                if not self.start_scan(gmp, task_id):
+                    raise Exception("Failed to start scan")
+                
+                # Checkpoint: un nuovo tentativo riprende questo task invece di crearne un altro
+                self.publish_status_update(scan_id, 'running', 'GCE task started', checkpoint={
+                    'gce_task_id': task_id,
+                    'gce_target_id': target_id,
+                    'gce_started_at': started_at.isoformat(),
+                })
             
             # Monitor scan with heartbeat
-            success, report_id = self.monitor_scan(gmp, task_id, scan_id)
+            success, report_id = self.monitor_scan(gmp, task_id, scan_id, cancel_token)
             
-            if success and report_id:
-                # Get report
-                report_xml = self.get_report(gmp, report_id)
+            if cancel_token.cancelled:
+                self.cancel_task(gmp, task_id, target_id)
+                self.publish_status_update(scan_id, 'cancelled', 'GCE scan cancelled')
+            elif success and report_id:
+                # Get report (paged, uploaded compressed in chunks)
+                summary = self.stream_report(gmp, report_id, scan_id, task_id, cancel_token)
                 
-                if report_xml:
-                    # Prepare results
+                if cancel_token.cancelled:
+                    self.cancel_task(gmp, task_id, target_id)
+                    self.publish_status_update(scan_id, 'cancelled', 'GCE scan cancelled')
+                elif summary:
+                    # Prepare results: only the aggregated summary, the raw report is already stored
                     results = {
                         'gce_task_id': task_id,
                         'gce_report_id': report_id,
-                        'report_xml': report_xml,
-                        'gce_scan_completed_at': datetime.now(timezone.utc).isoformat()
+                        'gce_target_id': target_id,
+                        'report_format': 'XML',
+                        'gce_scan_started_at': started_at.isoformat(),
+                        'gce_scan_completed_at': datetime.now(timezone.utc).isoformat(),
+                        **summary
                     }
                     
                     # Send to API
@@ -504,6 +822,9 @@ class GCEScanner:
             logger.error("Failed to connect publisher to RabbitMQ")
             return
         
+        self.cancellations.start()
+        self.heartbeat.start()
+        
         logger.info(f"GCE Scanner started, waiting for messages on {self.consumer_connection.queue_name}")
         
         try:
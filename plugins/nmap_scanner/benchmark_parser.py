@@ -0,0 +1,138 @@
+# plugins/nmap_scanner/benchmark_parser.py
+
+"""
+Benchmark of the nmap XML parser backends on synthetic scans.
+
+Every case is a host count and a number of ports listed per host; the remaining
+ports of the 1-65535 range are summarized in <extraports>, as nmap does for -p-.
+Each (case, backend) run happens in a fresh process, so the peak RSS reported
+belongs to that backend alone.
+
+Usage:
+    python3 benchmark_parser.py
+    python3 benchmark_parser.py --cases 1:65535 100:1000 10000:20 --backends etree lxml
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from nmap_parser import available_backends, get_parser
+
+DEFAULT_CASES = ['1:65535', '100:1000', '10000:20']
+SERVICES = ['ssh', 'http', 'https', 'smtp', 'domain', 'mysql', 'rdp', 'smb']
+
+
+def write_scan(path, hosts, ports_per_host, seed=0):
+    """Synthetic nmap -sV -O --script output with ports spread over the full range"""
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as xml_file:
+        xml_file.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        xml_file.write('<nmaprun scanner="nmap" args="nmap -sV -O -p- -oX -" version="7.94">\n')
+        xml_file.write('<scaninfo type="syn" protocol="tcp" numservices="65535" services="1-65535"/>\n')
+        for h in range(hosts):
+            address = f"10.{h // 65536 % 256}.{h // 256 % 256}.{h % 256}"
+            xml_file.write(
+                f'<host starttime="1700000000" endtime="1700000100"><status state="up" reason="echo-reply"/>'
+                f'<address addr="{address}" addrtype="ipv4"/>'
+                f'<hostnames><hostname name="host{h}.example.com" type="PTR"/></hostnames><ports>'
+            )
+            if ports_per_host < 65535:
+                xml_file.write(f'<extraports state="closed" count="{65535 - ports_per_host}"/>')
+                ports = sorted(rng.sample(range(1, 65536), ports_per_host))
+            else:
+                ports = range(1, 65536)
+            for port in ports:
+                state = 'open' if port % 7 == 0 or ports_per_host < 65535 else 'closed'
+                xml_file.write(f'<port protocol="tcp" portid="{port}"><state state="{state}" reason="syn-ack"/>')
+                if state == 'open':
+                    name = SERVICES[port % len(SERVICES)]
+                    xml_file.write(
+                        f'<service name="{name}" product="Synthetic {name}" version="1.{port % 10}" '
+                        f'extrainfo="protocol 2.0" method="probed" conf="10"/>'
+                        f'<script id="{name}-info" output="Synthetic script output for port {port}"/>'
+                    )
+                xml_file.write('</port>')
+            xml_file.write(
+                '</ports><os><portused state="open" proto="tcp" portid="22"/>'
+                '<osmatch name="Linux 5.0 - 5.14" accuracy="98" line="67000">'
+                '<osclass type="general purpose" vendor="Linux" osfamily="Linux" osgen="5.X" accuracy="98">'
+                '<cpe>cpe:/o:linux:linux_kernel:5</cpe></osclass></osmatch>'
+                '<osmatch name="Linux 4.15 - 5.8" accuracy="95" line="66000">'
+                '<osclass type="general purpose" vendor="Linux" osfamily="Linux" osgen="4.X" accuracy="95"/>'
+                '</osmatch></os>'
+                '<hostscript><script id="smb-os-discovery" output="OS: Synthetic"/></hostscript>'
+                '</host>\n'
+            )
+        xml_file.write('<runstats><finished time="1700000100" exit="success"/>'
+                       f'<hosts up="{hosts}" down="0" total="{hosts}"/></runstats></nmaprun>\n')
+
+
+def run_one(backend, path):
+    """Child process: parse once and print time and memory as JSON"""
+    with open(path, 'rb') as xml_file:
+        xml_output = xml_file.read()
+    # RSS dopo la lettura del file: il delta è la memoria del solo parsing
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    parser = get_parser(backend)
+    start = time.perf_counter()
+    results = parser.parse(xml_output)
+    elapsed = time.perf_counter() - start
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({
+        'backend': parser.name,
+        'seconds': elapsed,
+        'peak_rss_kb': peak,
+        'parse_rss_kb': peak - baseline,
+        'hosts': len(results['hosts']),
+        'open_ports': len(results['open_ports']['tcp']) + len(results['open_ports']['udp']),
+    }))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--cases', nargs='+', default=DEFAULT_CASES,
+                            help='hosts:ports_per_host pairs (default: %(default)s)')
+    arg_parser.add_argument('--backends', nargs='+', default=available_backends(),
+                            help='parser backends to compare (default: the installed ones)')
+    arg_parser.add_argument('--run', nargs=2, metavar=('BACKEND', 'FILE'), help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.run:
+        run_one(*args.run)
+        return
+
+    print(f"{'hosts':>7} {'ports/host':>10} {'XML MB':>8} {'backend':>8} {'parse s':>8} "
+          f"{'hosts/s':>9} {'peak RSS MB':>12} {'parse RSS MB':>13}")
+    for case in args.cases:
+        hosts, ports_per_host = (int(value) for value in case.split(':'))
+        handle, path = tempfile.mkstemp(suffix='.xml')
+        os.close(handle)
+        try:
+            write_scan(path, hosts, ports_per_host)
+            xml_mb = os.path.getsize(path) / 1024 / 1024
+            for backend in args.backends:
+                output = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), '--run', backend, path],
+                    capture_output=True, text=True, check=True
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                if result['backend'] != backend:
+                    print(f"  {backend} not available, ran {result['backend']} instead")
+                print(f"{hosts:>7} {ports_per_host:>10} {xml_mb:>8.1f} {result['backend']:>8} "
+                      f"{result['seconds']:>8.2f} {hosts / result['seconds']:>9.0f} "
+                      f"{result['peak_rss_kb'] / 1024:>12.1f} {result['parse_rss_kb'] / 1024:>13.1f}")
+        finally:
+            os.unlink(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+# plugins/nmap_scanner/nmap_parser.py
+
+import io
+import logging
+import os
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, Optional, Union
+
+try:
+    from lxml import etree as lxml_etree
+except ImportError:  # lxml è opzionale: senza si usa ElementTree
+    lxml_etree = None
+
+logger = logging.getLogger(__name__)
+
+
+class NmapXmlParser:
+    """
+    Single-pass parser for nmap XML output.
+
+    The document is streamed with iterparse: every <host> is turned into a dict
+    as soon as it is closed and then dropped from the tree, so memory depends on
+    the largest host, not on the number of hosts. The open ports and the OS
+    guess are built in the same pass, already in the ScanDetail shape.
+    """
+
+    name = 'etree'
+
+    def _iterparse(self, source):
+        return ET.iterparse(source, events=('start', 'end'))
+
+    def parse(self, xml_output: Union[str, bytes]) -> Dict[str, Any]:
+        if isinstance(xml_output, str):
+            xml_output = xml_output.encode('utf-8')
+
+        results = {
+            'hosts': [],
+            'scan_info': {},
+            'open_ports': {'tcp': [], 'udp': []},
+            'os_guess': {},
+        }
+        root = None
+
+        for event, elem in self._iterparse(io.BytesIO(xml_output)):
+            if event == 'start':
+                if root is None:
+                    root = elem
+                continue
+
+            tag = elem.tag
+            if tag == 'host':
+                host_data = self._parse_host(elem, results['open_ports'])
+                results['hosts'].append(host_data)
+                if not results['os_guess'] and host_data.get('os'):
+                    results['os_guess'] = dict(host_data['os'])
+                # L'host è già convertito: lo togliamo dall'albero
+                if root is not None:
+                    root.remove(elem)
+            elif tag == 'scaninfo' and not results['scan_info']:
+                results['scan_info'] = {
+                    'type': elem.get('type'),
+                    'protocol': elem.get('protocol'),
+                    'services': elem.get('services')
+                }
+
+        # Stesso ordinamento di NmapResultsParser.extract_open_ports lato backend
+        for protocol_ports in results['open_ports'].values():
+            protocol_ports.sort(key=lambda x: (x['port'], x.get('host') or ''))
+
+        return results
+
+    def _parse_host(self, host, open_ports) -> Dict[str, Any]:
+        host_data = {
+            'address': None,
+            'hostname': None,
+            'state': None,
+            'ports': []
+        }
+
+        for child in host:
+            tag = child.tag
+            if tag == 'address':
+                if child.get('addrtype') == 'mac':
+                    host_data['mac'] = child.get('addr')
+                    if child.get('vendor'):
+                        host_data['mac_vendor'] = child.get('vendor')
+                elif host_data['address'] is None:
+                    host_data['address'] = child.get('addr')
+            elif tag == 'hostnames':
+                if host_data['hostname'] is None:
+                    hostname = child.find('hostname')
+                    if hostname is not None:
+                        host_data['hostname'] = hostname.get('name')
+            elif tag == 'status':
+                host_data['state'] = child.get('state')
+            elif tag == 'ports':
+                for port in child:
+                    if port.tag == 'port':
+                        host_data['ports'].append(self._parse_port(port))
+            elif tag == 'os':
+                osmatches = self._parse_os(child)
+                if osmatches:
+                    host_data['osmatches'] = osmatches
+                    best = osmatches[0]
+                    host_data['os'] = {
+                        'name': best['name'],
+                        'accuracy': best['accuracy'],
+                        'line': best['line'],
+                        **{key: value for key, value in best.get('osclass', {}).items() if value}
+                    }
+            elif tag == 'hostscript':
+                scripts = [self._parse_script(script) for script in child if script.tag == 'script']
+                if scripts:
+                    host_data['scripts'] = scripts
+
+        # Senza indirizzo IP (es. scansioni ARP) si usa il MAC
+        if host_data['address'] is None:
+            host_data['address'] = host_data.get('mac')
+
+        address = host_data['address']
+        for port in host_data['ports']:
+            if port['state'] != 'open' or port['protocol'] not in open_ports:
+                continue
+            port_data = {'port': int(port['portid'] or 0), 'state': 'open'}
+            if address:
+                port_data['host'] = address
+            service = port['service']
+            if service:
+                port_data['service'] = service.get('name') or ''
+                for field in ('product', 'version', 'extrainfo'):
+                    if service.get(field):
+                        port_data[field] = service[field]
+            open_ports[port['protocol']].append(port_data)
+
+        return host_data
+
+    def _parse_port(self, port) -> Dict[str, Any]:
+        port_data = {
+            'protocol': port.get('protocol'),
+            'portid': port.get('portid'),
+            'state': None,
+            'service': {}
+        }
+        scripts = []
+
+        for child in port:
+            tag = child.tag
+            if tag == 'state':
+                port_data['state'] = child.get('state')
+            elif tag == 'service':
+                port_data['service'] = {
+                    'name': child.get('name'),
+                    'product': child.get('product'),
+                    'version': child.get('version'),
+                    'extrainfo': child.get('extrainfo')
+                }
+            elif tag == 'script':
+                scripts.append(self._parse_script(child))
+
+        if scripts:
+            port_data['scripts'] = scripts
+        return port_data
+
+    @staticmethod
+    def _parse_os(os_elem):
+        osmatches = []
+        for match in os_elem:
+            if match.tag != 'osmatch':
+                continue
+            osclass = match.find('osclass')
+            osmatches.append({
+                'name': match.get('name', ''),
+                'accuracy': match.get('accuracy', ''),
+                'line': match.get('line', ''),
+                'osclass': {
+                    'vendor': osclass.get('vendor'),
+                    'type': osclass.get('type'),
+                    'osfamily': osclass.get('osfamily'),
+                    'osgen': osclass.get('osgen'),
+                } if osclass is not None else {},
+                'cpe': [cpe.text for cpe in match.iter('cpe') if cpe.text],
+            })
+        # nmap le ordina già per accuratezza, ma non è garantito tra versioni
+        osmatches.sort(key=lambda m: -int(m['accuracy'] or 0))
+        return osmatches
+
+    @staticmethod
+    def _parse_script(script) -> Dict[str, Any]:
+        return {'id': script.get('id'), 'output': script.get('output', '')}
+
+
+class LxmlNmapParser(NmapXmlParser):
+    """Same extraction on top of lxml's iterparse (C parser, faster on large scans)"""
+
+    name = 'lxml'
+
+    def _iterparse(self, source):
+        # Nessuna risoluzione di entità esterne; huge_tree per script output molto lunghi
+        return lxml_etree.iterparse(
+            source, events=('start', 'end'), resolve_entities=False, huge_tree=True
+        )
+
+
+PARSER_BACKENDS = {
+    'etree': NmapXmlParser,
+    'lxml': LxmlNmapParser,
+}
+
+
+def available_backends():
+    """Backends usable in this environment"""
+    return [name for name in PARSER_BACKENDS if name != 'lxml' or lxml_etree is not None]
+
+
+def get_parser(backend: Optional[str] = None) -> NmapXmlParser:
+    """
+    Return a parser instance.
+
+    backend: 'etree', 'lxml' or 'auto' (default: NMAP_XML_PARSER, then auto).
+    'auto' picks lxml when it is installed.
+    """
+    backend = (backend or os.environ.get('NMAP_XML_PARSER', 'auto')).lower()
+    if backend == 'auto':
+        backend = 'lxml' if lxml_etree is not None else 'etree'
+    if backend == 'lxml' and lxml_etree is None:
+        logger.warning("lxml requested but not installed, falling back to ElementTree")
+        backend = 'etree'
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown nmap XML parser backend: {backend}")
+    return PARSER_BACKENDS[backend]()
@@ -1,11 +1,11 @@
 # plugins/nmap_scanner/nmap_scanner.py
 
 import os
-import json
+import re
 import logging
 import time
 import subprocess
-import xml.etree.ElementTree as ET
+import tempfile
 from datetime import datetime, timezone
 from typing import Dict, Any, List, Optional
 import threading
@@ -14,6 +14,10 @@ import pika
 from pika.exceptions import AMQPConnectionError, AMQPChannelError, ConnectionClosedByBroker
 import requests
 
+from nmap_parser import get_parser
+from common.scan_control import CancellationListener, LeaseHeartbeat, terminate_process_group
+from common.rabbitmq_utils import encode_message, decode_message
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -110,7 +114,7 @@ class RabbitMQConnection:
                 self.channel.basic_publish(
                     exchange='',
                     routing_key=self.queue_name,
-                    body=json.dumps(message),
+                    body=encode_message(message),
                     properties=pika.BasicProperties(
                         delivery_mode=2,  # Make message persistent
                         expiration='3600000'  # 1 hour expiration
@@ -148,7 +152,7 @@ class RabbitMQConnection:
                 ):
                     try:
                         self._last_activity = time.time()
-                        message = json.loads(body.decode('utf-8'))
+                        message = decode_message(body)
                         
                         # Process message
                         callback(self.channel, method, properties, message)
@@ -188,11 +192,23 @@ class RabbitMQConnection:
 
 
 class NmapScanner:
+    # Versione dello snapshot dei parametri di scansione supportata
+    SNAPSHOT_VERSION = 1
+    
+    # <taskprogress task="SYN Stealth Scan" time="..." percent="42.17" .../>
+    TASKPROGRESS_RE = re.compile(r'<taskprogress\b[^>]*\bpercent="([\d.]+)"')
+    
     def __init__(self):
         # Configuration
         self.api_gateway_url = os.environ.get('INTERNAL_API_GATEWAY_URL', 'http://api_gateway:5000')
+        self.stats_interval = os.environ.get('NMAP_STATS_INTERVAL', '15s')
         self.rabbitmq_host = os.environ.get('RABBITMQ_HOST', 'rabbitmq')
         self.rabbitmq_port = int(os.environ.get('RABBITMQ_PORT', '5672'))
+        self.keep_raw_output = os.environ.get('KEEP_RAW_OUTPUT', 'false').lower() == 'true'
+        self.nmap_timeout = int(os.environ.get('NMAP_TIMEOUT', '3600'))
+        
+        # Parser XML: lxml se installato, altrimenti ElementTree (NMAP_XML_PARSER per forzarlo)
+        self.xml_parser = get_parser()
         
         # Initialize connections
         self.consumer_connection = RabbitMQConnection(
@@ -208,8 +224,24 @@ class NmapScanner:
             os.environ.get('RABBITMQ_SCAN_STATUS_UPDATE_QUEUE', 'scan_status_updates'),
             heartbeat=60
         )
+        
+        # Cancellazioni dall'orchestratore, su una connessione separata
+        self.cancellations = CancellationListener(
+            pika.ConnectionParameters(host=self.rabbitmq_host, port=self.rabbitmq_port, heartbeat=60),
+            os.environ.get('RABBITMQ_SCAN_CONTROL_EXCHANGE', 'scan_control')
+        )
+        
+        # Heartbeat del lease dei job in corso
+        self.heartbeat = LeaseHeartbeat(
+            pika.ConnectionParameters(host=self.rabbitmq_host, port=self.rabbitmq_port, heartbeat=60),
+            self.publisher_connection.queue_name,
+            'nmap',
+            interval=int(os.environ.get('SCAN_HEARTBEAT_INTERVAL', '30'))
+        )
     
-    def publish_status_update(self, scan_id: int, status: str, message: str = None):
+    def publish_status_update(self, scan_id: int, status: str, message: str = None,
+                              shard_id: Optional[int] = None, progress: Optional[float] = None,
+                              attempt: Optional[int] = None):
         """Pubblica un aggiornamento di stato"""
         update = {
             'scan_id': scan_id,
@@ -220,6 +252,12 @@ class NmapScanner:
         
         if message:
             update['message'] = message
+        if shard_id is not None:
+            update['shard_id'] = shard_id
+        if progress is not None:
+            update['progress'] = progress
+        if attempt is not None:
+            update['attempt'] = attempt
             
         success = self.publisher_connection.publish(update)
         if success:
@@ -227,14 +265,24 @@ class NmapScanner:
         else:
             logger.error(f"Failed to publish status update for scan {scan_id}")
     
-    def get_scan_parameters(self, scan_type_id: int) -> Optional[Dict[str, Any]]:
-        """Recupera i parametri di scansione dall'API Gateway"""
+    def get_scan_parameters(self, message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Parametri di scansione: snapshot incluso nel messaggio dall'orchestratore,
+        con fallback sull'endpoint compatto /scans/{id}/context/ per i messaggi
+        senza snapshot o con una versione non supportata
+        """
+        snapshot = message.get('scan_parameters')
+        if snapshot and snapshot.get('version') == self.SNAPSHOT_VERSION:
+            return snapshot.get('scan_type')
+        
+        scan_id = message.get('scan_id')
         try:
-            url = f"{self.api_gateway_url}/api/orchestrator/scan_types/{scan_type_id}/"
-            response = requests.get(url, timeout=30)
+            url = f"{self.api_gateway_url}/api/orchestrator/scans/{scan_id}/context/"
+            # Letture dal primario: il plugin non ha il cookie del read-your-writes
+            response = requests.get(url, headers={'X-Vapter-Read-Primary': '1'}, timeout=30)
             
             if response.status_code == 200:
-                return response.json()
+                return response.json().get('scan_type')
             else:
                 logger.error(f"Failed to get scan parameters: {response.status_code} - {response.text}")
                 return None
@@ -243,7 +291,8 @@ class NmapScanner:
             logger.error(f"Error getting scan parameters: {e}")
             return None
     
-    def build_nmap_command(self, target_host: str, scan_params: Dict[str, Any]) -> List[str]:
+    def build_nmap_command(self, target_host: str, scan_params: Dict[str, Any],
+                           ports: Optional[str] = None) -> List[str]:
         """Costruisce il comando nmap basato sui parametri"""
         cmd = ['nmap']
         
@@ -261,128 +310,119 @@ class NmapScanner:
         if scan_params.get('aggressive'):
             cmd.append('-A')
         
+        # Host discovery
+        if scan_params.get('consider_alive'):
+            cmd.append('-Pn')
+        if scan_params.get('only_discovery'):
+            cmd.append('-sn')
+        
         # Timing template
         timing = scan_params.get('timing_template', 'T3')
         cmd.append(f'-{timing}')
         
-        # Port specification
-        port_spec = scan_params.get('port_specification', '-')
-        if port_spec != '-':
+        # Port specification (gli shard di una scansione range portano il proprio range di porte)
+        port_spec = ports or scan_params.get('port_specification')
+        if port_spec and port_spec != '-' and not scan_params.get('only_discovery'):
+            # Le porte 'U:' richiedono -sU, che disattiva la scansione TCP di default
+            if 'U:' in port_spec and '-sU' not in cmd:
+                cmd.append('-sU')
+            if 'T:' in port_spec and not any(flag in cmd for flag in ('-sS', '-sT')):
+                cmd.append('-sS')
             cmd.extend(['-p', port_spec])
         
         # Output format
         cmd.extend(['-oX', '-'])  # XML output to stdout
         
-        # Target
-        cmd.append(target_host)
+        # Progress periodico (elementi <taskprogress> nell'output XML)
+        cmd.extend(['--stats-every', self.stats_interval])
+        
+        # Target: singolo host, blocco CIDR o più blocchi separati da spazio
+        cmd.extend(target_host.split())
         
         logger.info(f"Nmap command: {' '.join(cmd)}")
         return cmd
     
-    def execute_nmap_scan(self, command: List[str]) -> Optional[str]:
+    def execute_nmap_scan(self, command: List[str], progress_callback=None,
+                          cancel_token=None) -> Optional[str]:
         """Esegue la scansione nmap e ritorna l'output XML"""
+        process = None
+        deadline = None
+        timed_out = threading.Event()
         try:
             start_time = time.time()
             
-            # Execute nmap
-            result = subprocess.run(
-                command,
-                capture_output=True,
-                text=True,
-                timeout=3600  # 1 hour timeout
-            )
-            
+            # stderr su file temporaneo: una PIPE letta solo alla fine si riempie e blocca nmap
+            with tempfile.TemporaryFile(mode='w+') as stderr_file:
+                # Execute nmap, leggendo l'output riga per riga per intercettare il progress
+                process = subprocess.Popen(
+                    command,
+                    stdout=subprocess.PIPE,
+                    stderr=stderr_file,
+                    text=True,
+                    start_new_session=True  # process group proprio: la cancellazione lo termina per intero
+                )
+                if cancel_token:
+                    cancel_token.add_process(process)
+                
+                # Timeout indipendente dall'output: nmap può restare muto a lungo tra due righe
+                def on_timeout():
+                    timed_out.set()
+                    terminate_process_group(process)
+                
+                deadline = threading.Timer(self.nmap_timeout, on_timeout)
+                deadline.daemon = True
+                deadline.start()
+                
+                output_lines = []
+                last_progress = 0.0
+                for line in process.stdout:
+                    output_lines.append(line)
+                    
+                    match = self.TASKPROGRESS_RE.search(line)
+                    if match and progress_callback:
+                        # Le percentuali sono per singola fase: riportiamo un valore monotono
+                        percent = min(float(match.group(1)), 99.0)
+                        if percent > last_progress:
+                            last_progress = percent
+                            progress_callback(percent)
+                
+                returncode = process.wait()
+                deadline.cancel()
+                stderr_file.seek(0)
+                stderr = stderr_file.read()[-4000:]
             elapsed_time = time.time() - start_time
             
-            if result.returncode == 0:
+            if timed_out.is_set():
+                logger.error(f"Nmap scan timed out after {self.nmap_timeout}s")
+                return None
+            if returncode == 0:
                 logger.info(f"Nmap scan completed successfully in {elapsed_time:.2f}s")
-                return result.stdout
+                return ''.join(output_lines)
             else:
-                logger.error(f"Nmap scan failed with code {result.returncode}: {result.stderr}")
+                logger.error(f"Nmap scan failed with code {returncode}: {stderr}")
                 return None
                 
-        except subprocess.TimeoutExpired:
-            logger.error("Nmap scan timed out")
-            return None
         except Exception as e:
             logger.error(f"Error executing nmap: {e}")
+            if process and process.poll() is None:
+                process.kill()
             return None
+        finally:
+            if deadline:
+                deadline.cancel()
+            if cancel_token and process:
+                cancel_token.remove_process(process)
     
     def parse_nmap_results(self, xml_output: str) -> Dict[str, Any]:
-        """Parse i risultati XML di nmap"""
+        """Parse i risultati XML di nmap (hosts, open_ports e os_guess in un solo passaggio)"""
         try:
-            root = ET.fromstring(xml_output)
-            
-            results = {
-                'hosts': [],
-                'scan_info': {},
-                'raw_xml': xml_output
-            }
-            
-            # Parse scan info
-            scaninfo = root.find('scaninfo')
-            if scaninfo is not None:
-                results['scan_info'] = {
-                    'type': scaninfo.get('type'),
-                    'protocol': scaninfo.get('protocol'),
-                    'services': scaninfo.get('services')
-                }
+            start_time = time.time()
+            results = self.xml_parser.parse(xml_output)
+            logger.info(f"Parsed {len(results['hosts'])} hosts with {self.xml_parser.name} "
+                        f"in {time.time() - start_time:.2f}s")
             
-            # Parse hosts
-            for host in root.findall('host'):
-                host_data = {
-                    'address': None,
-                    'hostname': None,
-                    'state': None,
-                    'ports': []
-                }
-                
-                # Address
-                address = host.find('address')
-                if address is not None:
-                    host_data['address'] = address.get('addr')
-                
-                # Hostname
-                hostnames = host.find('hostnames')
-                if hostnames is not None:
-                    hostname = hostnames.find('hostname')
-                    if hostname is not None:
-                        host_data['hostname'] = hostname.get('name')
-                
-                # State
-                status = host.find('status')
-                if status is not None:
-                    host_data['state'] = status.get('state')
-                
-                # Ports
-                ports = host.find('ports')
-                if ports is not None:
-                    for port in ports.findall('port'):
-                        port_data = {
-                            'protocol': port.get('protocol'),
-                            'portid': port.get('portid'),
-                            'state': None,
-                            'service': {}
-                        }
-                        
-                        # Port state
-                        state = port.find('state')
-                        if state is not None:
-                            port_data['state'] = state.get('state')
-                        
-                        # Service info
-                        service = port.find('service')
-                        if service is not None:
-                            port_data['service'] = {
-                                'name': service.get('name'),
-                                'product': service.get('product'),
-                                'version': service.get('version'),
-                                'extrainfo': service.get('extrainfo')
-                            }
-                        
-                        host_data['ports'].append(port_data)
-                
-                results['hosts'].append(host_data)
+            if self.keep_raw_output:
+                results['raw_xml'] = xml_output
             
             return results
             
@@ -390,17 +430,21 @@ class NmapScanner:
             logger.error(f"Error parsing nmap results: {e}")
             return {}
     
-    def send_results_to_api(self, scan_id: int, results: Dict[str, Any]) -> bool:
+    def send_results_to_api(self, scan_id: int, results: Dict[str, Any],
+                            shard_id: Optional[int] = None) -> bool:
         """Invia i risultati all'API Gateway"""
         try:
             # Add metadata
             results['nmap_scan_completed_at'] = datetime.now(timezone.utc).isoformat()
             
-            # Send results
-            url = f"{self.api_gateway_url}/api/orchestrator/scans/{scan_id}/"
+            # Send results (gli shard vengono uniti dall'orchestratore quando sono tutti completati)
+            if shard_id is not None:
+                url = f"{self.api_gateway_url}/api/orchestrator/scan-shards/{shard_id}/"
+            else:
+                url = f"{self.api_gateway_url}/api/orchestrator/scans/{scan_id}/"
             response = requests.patch(
                 url,
-                json={'nmap_results': results},
+                json={'parsed_nmap_results': results},
                 headers={'Content-Type': 'application/json'},
                 timeout=30
             )
@@ -419,44 +463,74 @@ class NmapScanner:
     def process_scan_request(self, channel, method, properties, message: Dict[str, Any]):
         """Processa una richiesta di scansione"""
         scan_id = message.get('scan_id')
-        scan_type_id = message.get('scan_type_id')
         target_host = message.get('target_host')
+        shard_id = message.get('shard_id')
+        attempt = message.get('attempt')
+        
+        if shard_id is not None:
+            logger.info(f"Processing scan request: scan_id={scan_id}, shard "
+                        f"{message.get('shard_index')}/{message.get('shard_total')}, target={target_host}")
+        else:
+            logger.info(f"Processing scan request: scan_id={scan_id}, target={target_host}")
         
-        logger.info(f"Processing scan request: scan_id={scan_id}, target={target_host}")
+        def status(state, text=None, progress=None):
+            self.publish_status_update(scan_id, state, text, shard_id=shard_id, progress=progress, attempt=attempt)
+        
+        # Richiesta di una scansione già cancellata: scartata senza avviare nmap
+        if self.cancellations.is_cancelled(scan_id):
+            logger.info(f"Dropping request of cancelled scan {scan_id}")
+            status('cancelled', 'Scan cancelled before start')
+            return
         
         # Update status
-        self.publish_status_update(scan_id, 'received', 'Scan request received by Nmap module')
+        status('received', 'Scan request received by Nmap module')
         
+        with self.cancellations.watch(scan_id) as cancel_token, self.heartbeat.hold(scan_id, attempt, shard_id):
+            self._run_scan(message, status, cancel_token)
+    
+    def _run_scan(self, message: Dict[str, Any], status, cancel_token):
+        """Esegue nmap per una richiesta e pubblica l'esito"""
+        scan_id = message.get('scan_id')
+        target_host = message.get('target_host')
+        shard_id = message.get('shard_id')
         try:
             # Get scan parameters
-            scan_params = self.get_scan_parameters(scan_type_id)
+            scan_params = self.get_scan_parameters(message)
             if not scan_params:
                 raise Exception("Failed to get scan parameters")
             
             # Build nmap command
-            command = self.build_nmap_command(target_host, scan_params)
+            command = self.build_nmap_command(target_host, scan_params, message.get('ports'))
             
             # Update status
-            self.publish_status_update(scan_id, 'running', 'Executing nmap scan')
+            status('running', 'Executing nmap scan', progress=0.0)
             
             # Execute scan
-            xml_output = self.execute_nmap_scan(command)
+            xml_output = self.execute_nmap_scan(
+                command,
+                progress_callback=lambda percent: status('running', progress=percent),
+                cancel_token=cancel_token
+            )
+            if cancel_token.cancelled:
+                logger.info(f"Nmap scan cancelled for scan {scan_id}")
+                status('cancelled', 'Nmap scan cancelled')
+                return
             if not xml_output:
                 raise Exception("Nmap scan failed")
             
             # Parse results
-            self.publish_status_update(scan_id, 'parsing', 'Parsing scan results')
+            status('parsing', 'Parsing scan results')
             results = self.parse_nmap_results(xml_output)
             
             # Send results to API
-            if self.send_results_to_api(scan_id, results):
-                self.publish_status_update(scan_id, 'completed', 'Nmap scan completed successfully')
+            if self.send_results_to_api(scan_id, results, shard_id):
+                status('completed', 'Nmap scan completed successfully')
             else:
-                self.publish_status_update(scan_id, 'error', 'Failed to send results to API')
+                status('error', 'Failed to send results to API')
                 
         except Exception as e:
             logger.error(f"Error processing scan request: {e}", exc_info=True)
-            self.publish_status_update(scan_id, 'error', f'Scan failed: {str(e)}')
+            status('error', f'Scan failed: {str(e)}')
     
     def run(self):
         """Avvia lo scanner"""
@@ -471,6 +545,9 @@ class NmapScanner:
             logger.error("Failed to connect publisher to RabbitMQ")
             return
         
+        self.cancellations.start()
+        self.heartbeat.start()
+        
         logger.info(f"Nmap Scanner started, waiting for messages on {self.consumer_connection.queue_name}")
         
         try: